@@ -2,7 +2,7 @@
 from datetime import datetime
 from typing import Optional, Tuple , Dict, Any
 from fastapi import HTTPException
-from database.connection import get_db_connection
+from database.connection import get_db_connection, release_db_connection
 from utils.jwt import verify_access_token, hash_token
 
 def insert_user(data: Dict[str, Any]) -> Dict[str, Any]:
@@ -28,7 +28,7 @@ def insert_user(data: Dict[str, Any]) -> Dict[str, Any]:
         }
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 
 def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
@@ -49,7 +49,7 @@ def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
         }
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 
 
@@ -72,7 +72,7 @@ def add_session(user_id: int, token_hash: str, expires_at: datetime) -> int:
         raise
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_session_by_token_hash(token_hash: str) -> dict | None:
     conn = get_db_connection()
@@ -92,7 +92,7 @@ def get_session_by_token_hash(token_hash: str) -> dict | None:
         return dict(zip(cols, row))
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_active_session_by_user_id(user_id: int) -> dict | None:
     conn = get_db_connection()
@@ -111,7 +111,7 @@ def get_active_session_by_user_id(user_id: int) -> dict | None:
         return dict(zip(clos, row))
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def has_any_active_session(user_id: int) -> bool:
     conn = get_db_connection()
@@ -126,7 +126,7 @@ def has_any_active_session(user_id: int) -> bool:
         return cur.fetchone() 
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 
 def fetch_me_if_session_active(user_id: int) -> Optional[Dict[str, Any]]:
@@ -154,7 +154,7 @@ def fetch_me_if_session_active(user_id: int) -> Optional[Dict[str, Any]]:
         return dict(zip(cols, row))
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 
 
@@ -168,7 +168,6 @@ def delete_session_by_token(token_hash: str) -> None:
         conn.commit()
     finally:
         cur.close()
-        from database.connection import release_db_connection
         release_db_connection(conn)
 
 
@@ -181,4 +180,4 @@ def delete_all_sessions_for_user(user_id: int) -> None:
         conn.commit()
     finally:
         cur.close()
-        conn.close()
\ No newline at end of file
+        release_db_connection(conn)
\ No newline at end of file
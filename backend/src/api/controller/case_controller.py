@@ -1,11 +1,13 @@
 from fastapi import HTTPException,  Query
-from database.connection import get_db_connection
+from fastapi.concurrency import run_in_threadpool
+from database.connection import get_db_connection, release_db_connection
+from database.async_connection import async_pool_ready, async_transaction
 from schema.case_schema import CaseStartIn, StepAnswerIn
-from api.services.service_training.case_engine import CaseEngineService
+from api.services.service_training.case_engine import CaseEngineService, CaseEngineServiceAsync
 from core.case_repo import CaseRepo
 
 
-async def list_cases(limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0)):
+def list_cases(limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0)):
     conn = get_db_connection()
 
     try:
@@ -13,9 +15,9 @@ async def list_cases(limit: int = Query(20, ge=1, le=100), offset: int = Query(0
             rows = CaseRepo.list_cases(cur, limit=limit, offset=offset)
         return{"items": rows, "limit": limit, "offset": offset}
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-async def get_case(case_id: int):
+def get_case(case_id: int):
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
@@ -24,9 +26,9 @@ async def get_case(case_id: int):
             raise HTTPException(status_code=404, detail="case not found")
         return row
     finally: 
-        conn.close()
+        release_db_connection(conn)
 
-async def start_case(case_id: int, payload: CaseStartIn):
+def start_case(case_id: int, payload: CaseStartIn):
     conn = get_db_connection()
     try:
         service = CaseEngineService(conn)
@@ -35,8 +37,8 @@ async def start_case(case_id: int, payload: CaseStartIn):
         conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
     finally:
-        conn.close()
-async def get_attempt_state(attempt_id: int):
+        release_db_connection(conn)
+def get_attempt_state(attempt_id: int):
     conn = get_db_connection()
     try:
         service = CaseEngineService(conn)
@@ -46,10 +48,26 @@ async def get_attempt_state(attempt_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur serveur: {e}")
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 
 async def answer_step(attempt_id: int, step_id: int, payload: StepAnswerIn):
+    if not async_pool_ready():
+        return await run_in_threadpool(_answer_step_sync, attempt_id, step_id, payload)
+    try:
+        async with async_transaction() as conn:
+            return await CaseEngineServiceAsync(conn).answer_step(
+                attempt_id=attempt_id,
+                step_id=step_id,
+                payload=payload.model_dump(),
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur serveur: {e}")
+
+
+def _answer_step_sync(attempt_id: int, step_id: int, payload: StepAnswerIn):
     conn = get_db_connection()
     try:
         service = CaseEngineService(conn)
@@ -63,4 +81,4 @@ async def answer_step(attempt_id: int, step_id: int, payload: StepAnswerIn):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur serveur: {e}")
     finally:
-        conn.close()
\ No newline at end of file
+        release_db_connection(conn)
\ No newline at end of file
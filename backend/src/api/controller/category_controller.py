@@ -1,5 +1,5 @@
 from typing import Optional, Tuple, List, Dict
-from database.connection import get_db_connection
+from database.connection import get_db_connection, release_db_connection
 
 
 def insert_category(data: Dict) -> Dict:
@@ -18,7 +18,7 @@ def insert_category(data: Dict) -> Dict:
     
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_category_by_id(cid: int) -> Optional[Dict]:
     conn = get_db_connection()
@@ -39,7 +39,7 @@ def get_category_by_id(cid: int) -> Optional[Dict]:
         return dict(zip(cols, row))
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_category_by_code(code: str) -> Optional[Dict]:
     conn = get_db_connection()
@@ -57,7 +57,7 @@ def get_category_by_code(code: str) -> Optional[Dict]:
         return dict(zip(clos, row))
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def list_categories(limit: int = 100, offset: int = 0, q: Optional[str] = None) -> Tuple[List[tuple], int]:
     conn = get_db_connection(); cur = conn.cursor()
@@ -79,7 +79,7 @@ def list_categories(limit: int = 100, offset: int = 0, q: Optional[str] = None)
         return rows, total
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
         
 def update_category(cid: int, data: Dict) -> Optional[Dict]:
     conn = get_db_connection()
@@ -101,7 +101,7 @@ def update_category(cid: int, data: Dict) -> Optional[Dict]:
         return dict(zip(cols, row))
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def delete_category(cid: int) -> bool:
     conn = get_db_connection()
@@ -113,4 +113,4 @@ def delete_category(cid: int) -> bool:
         return deleted
     finally:
         cur.close()
-        conn.close()
\ No newline at end of file
+        release_db_connection(conn)
\ No newline at end of file
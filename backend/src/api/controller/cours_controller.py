@@ -1,15 +1,23 @@
-from database.connection import get_db_connection, release_db_connection
+from database.connection import get_db_connection, release_db_connection, read_connection
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Query
 import fitz 
-from psycopg2.extras import RealDictCursor
+from database.rows import dict_cursor
 import traceback, psycopg2
 from io import BytesIO
 from pathlib import Path
 from typing import Optional, List, Any, Dict, Literal, Tuple
 import re
 from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import nullcontext
 
-from utils.course import _inspect_pdf_type, _parse_bool, ingest_pdf_to_db, get_ue_id_from_code, extract_images, manual_slide_media, extract_text_filtered_from_bytes, get_embedded_image_rects_by_page
+from core import config
+
+from utils.course import _inspect_pdf_type, _parse_bool, decide_slide_mode, ingest_pdf_to_db, get_ue_id_from_code, extract_images, extract_text_filtered_from_bytes, get_embedded_image_rects_by_page
+from utils.pdf_analysis import PdfAnalysis
+from utils.spooled_upload import SpooledPdf, spool_upload
+from utils.ingest_profile import IngestProfiler, profile_stage
+from api.services.service_ingest.ingest_job_service import submit_ingest_job, get_ingest_job, IngestQueueFull
 
 
 
@@ -42,6 +50,99 @@ async def _read_upload_bytes_any(uf: Any) -> bytes:
         return data
     return b""
 
+def _resolve_flags(create_course: Optional[str], create_sections: Optional[str],
+                   no_course: Optional[str], no_sections: Optional[str]) -> Tuple[bool, bool]:
+    cc = _parse_bool(create_course, default=True)
+    cs = _parse_bool(create_sections, default=True)
+    nc = _parse_bool(no_course, default=None)
+    ns = _parse_bool(no_sections, default=None)
+    if nc is not None:
+        cc = not nc
+    if ns is not None:
+        cs = not ns
+    return cc, cs
+
+# Images manuelles (optionnel) — Postman: img_p3, img_p5, img_p13 ...
+async def _read_manual_slide_media(request: Request) -> List[Tuple[int, bytes, str]]:
+    form = await request.form()
+    pat = re.compile(r"^img_p(\d+)(?:_(\d+))?$")
+    manual_slide_media: List[Tuple[int, bytes, str]] = []
+
+    for key, val in form.items():
+        m = pat.match(str(key))
+        if not m:
+            continue
+        if not hasattr(val, "filename") or not hasattr(val, "read"):
+            continue
+        page_no = int(m.group(1))
+        idx = int(m.group(2)) if m.group(2) else 1
+
+        img_bytes = await val.read()
+        try:
+            await val.seek(0)
+        except Exception:
+            pass
+
+        if img_bytes:
+            tag = f"img_p{page_no}" if idx == 1 else f"img_p{page_no}_{idx}"
+            caption = f"{tag} | {val.filename}" if getattr(val, "filename", None) else tag
+            manual_slide_media.append((page_no, img_bytes, caption))
+
+    manual_slide_media.sort(key=lambda t: (t[0], t[2]))
+    return manual_slide_media
+
+def _classify_and_ingest(pdf_file: SpooledPdf, force_slide: Optional[bool], **ingest_kwargs) -> Tuple[str, Any]:
+    """
+    Partie bloquante (fitz/numpy/psycopg2) de create_course,
+    exécutée hors de la boucle d'événements.
+    """
+    analysis = None
+    conn = None
+    profiler = None
+    try:
+        try:
+            analysis = pdf_file.open_analysis()
+        except Exception:
+            raise HTTPException(status_code=400, detail="Fichier illisible comme PDF.")
+
+        # Détection slide/classic + doc_mode
+        # (PDF ouvert une seule fois, analyse partagée avec l'ingestion)
+        profiler = IngestProfiler(label=f"ingest-{pdf_file.md5[:8]}").start() if config.INGEST_PROFILE else None
+        with (profiler.activate() if profiler else nullcontext()), profile_stage("classify"):
+            info = _inspect_pdf_type(analysis=analysis)
+        slide_mode_flag = decide_slide_mode(info, force_slide)
+        doc_mode = "SLIDE" if slide_mode_flag else "CLASSIC"
+
+        conn = get_db_connection()
+        if conn is None:
+            raise HTTPException(status_code=500, detail="Connexion DB impossible (conn=None)")
+
+        res = ingest_pdf_to_db(
+            pdf_file=pdf_file,
+            conn=conn,
+            doc_mode=doc_mode,
+            slide_mode=slide_mode_flag,
+
+            # hooks indispensables
+            extract_text_filtered_from_bytes=extract_text_filtered_from_bytes,
+            extract_images=extract_images,
+            get_embedded_image_rects_by_page=get_embedded_image_rects_by_page,
+            analysis=analysis,
+            profiler=profiler,
+            **ingest_kwargs,
+        )
+        return doc_mode, res
+    finally:
+        if profiler is not None:
+            profiler.finish()
+        if analysis is not None:
+            analysis.close()
+        if conn is not None:
+            try:
+                release_db_connection(conn)
+            except Exception:
+                pass
+
 # Création d'un cours
 async def create_course(
     request: Request,
@@ -63,120 +164,48 @@ async def create_course(
 
     # Forçage slide
     slide_mode: Optional[str] = Form(None),
+
+    # Révision d'un PDF déjà ingéré (ré-ingestion incrémentale)
+    previous_source_id: Optional[int] = Form(None),
 ):
-    conn = None
+    pdf_file = None
     try:
         # ----------------------------
         # 0) Flags cohérents
         # ----------------------------
-        cc = _parse_bool(create_course, default=True)
-        cs = _parse_bool(create_sections, default=True)
-        nc = _parse_bool(no_course, default=None)
-        ns = _parse_bool(no_sections, default=None)
-        if nc is not None:
-            cc = not nc
-        if ns is not None:
-            cs = not ns
+        cc, cs = _resolve_flags(create_course, create_sections, no_course, no_sections)
+        force_slide = _parse_bool(slide_mode, default=None)
 
         # ----------------------------
-        # 1) Lecture du PDF
+        # 1) Lecture du PDF (en flux vers un fichier temporaire)
         # ----------------------------
-        pdf_bytes = await file.read()
-        if not pdf_bytes:
+        pdf_file = await spool_upload(file)
+        if pdf_file.size <= 0:
             raise HTTPException(status_code=400, detail="Fichier PDF vide ou non reçu.")
 
         # ----------------------------
-        # 2) Détection slide/classic + doc_mode
-        # ----------------------------
-        info = _inspect_pdf_type(pdf_bytes)
-        force_slide = _parse_bool(slide_mode, default=None)
-
-        slide_ratio = float(info.get("slide_ratio", 0.0) or 0.0)
-        mean_ar = float(info.get("mean_aspect_ratio", 0.0) or 0.0)
-        mean_words = float(info.get("mean_words_per_page", 0.0) or 0.0)
-        mean_draws = float(info.get("mean_drawings_per_page", 0.0) or 0.0)
-
-        if force_slide is True:
-            slide_mode_flag = True
-        elif force_slide is False:
-            slide_mode_flag = False
-        else:
-            is_slide_strong = (
-                slide_ratio >= 0.60 and
-                mean_ar >= 1.35 and
-                mean_words <= 120 and
-                mean_draws >= 4
-            )
-            is_classic_strong = (
-                slide_ratio <= 0.20 and
-                mean_ar <= 1.15 and
-                mean_words >= 160 and
-                mean_draws <= 4
-            )
-            if is_slide_strong:
-                slide_mode_flag = True
-            elif is_classic_strong:
-                slide_mode_flag = False
-            else:
-                # par défaut: CLASSIC (prudent)
-                slide_mode_flag = False
-
-        doc_mode = "SLIDE" if slide_mode_flag else "CLASSIC"
-
-        # ----------------------------
-        # 3) ue_id (cas C : on ASSIGNE)
+        # 2) ue_id (cas C : on ASSIGNE)
         # ----------------------------
         ue_id = None
         if cc:
             if not ue_code or not ue_code.strip():
                 raise HTTPException(status_code=422, detail="ue_id requis quand create_course=true")
 
-            ue_id = get_ue_id_from_code(ue_code)  # ✅ cas C
+            ue_id = await run_in_threadpool(get_ue_id_from_code, ue_code)  # ✅ cas C
             print("DEBUG ue_code =", ue_code, "| ue_id =", ue_id)
 
         # ----------------------------
-        # 4) Connexion DB (jamais None)
+        # 3) Images manuelles (optionnel)
         # ----------------------------
-        conn = get_db_connection()
-        if conn is None:
-            raise HTTPException(status_code=500, detail="Connexion DB impossible (conn=None)")
+        manual_slide_media = await _read_manual_slide_media(request)
 
         # ----------------------------
-        # 5) Images manuelles (optionnel)
-        #    Postman: img_p3, img_p5, img_p13 ...
+        # 4) Détection + ingestion (threadpool : ne bloque pas l'event loop)
         # ----------------------------
-        form = await request.form()
-        pat = re.compile(r"^img_p(\d+)(?:_(\d+))?$")
-        manual_slide_media: List[Tuple[int, bytes, str]] = []
-
-        for key, val in form.items():
-            m = pat.match(str(key))
-            if not m:
-                continue
-            if not hasattr(val, "filename") or not hasattr(val, "read"):
-                continue
-            page_no = int(m.group(1))
-            idx = int(m.group(2)) if m.group(2) else 1
-
-            img_bytes = await val.read()
-            try:
-                await val.seek(0)
-            except Exception:
-                pass
-
-            if img_bytes:
-                tag = f"img_p{page_no}" if idx == 1 else f"img_p{page_no}_{idx}"
-                caption = f"{tag} | {val.filename}" if getattr(val, "filename", None) else tag
-                manual_slide_media.append((page_no, img_bytes, caption))
-
-        manual_slide_media.sort(key=lambda t: (t[0], t[2]))
-
-        # ----------------------------
-        # 6) Ingestion (avec hooks)
-        # ----------------------------
-        res = ingest_pdf_to_db(
-            pdf_bytes=pdf_bytes,
-            conn=conn,
+        doc_mode, res = await run_in_threadpool(
+            _classify_and_ingest,
+            pdf_file,
+            force_slide,
             original_filename=file.filename,
             course_title=title,
             ue_id=ue_id,
@@ -186,14 +215,8 @@ async def create_course(
             year=year,
             create_course=cc,
             create_sections=cs,
-            doc_mode=doc_mode,
-            slide_mode=slide_mode_flag,
             manual_slide_media=manual_slide_media,
-
-            # hooks indispensables
-            extract_text_filtered_from_bytes=extract_text_filtered_from_bytes,
-            extract_images=extract_images,
-            get_embedded_image_rects_by_page=get_embedded_image_rects_by_page,
+            previous_source_id=previous_source_id,
         )
 
         return JSONResponse({
@@ -206,7 +229,10 @@ async def create_course(
             "pages_pdf": res.total_pages_pdf,
             "pages_db": res.total_pages_db,
             "images_db": res.total_images_db,
+            "pages_reused": res.pages_reused,
+            "pages_extracted": res.pages_extracted,
             "manual_images_received": len(manual_slide_media),
+            "profile": res.profile,
         })
 
     except HTTPException:
@@ -215,65 +241,156 @@ async def create_course(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
     finally:
-        if conn is not None:
-            try:
-                conn.close()
-            except Exception:
-                pass
+        if pdf_file is not None:
+            pdf_file.cleanup()
+
+# Création d'un cours en arrière-plan : renvoie un job_id immédiatement
+async def create_course_job(
+    request: Request,
+    file: UploadFile = File(...),
+
+    # Métadonnées
+    title: Optional[str] = Form(None),
+    ue_code: Optional[str] = Form(None),
+    desc: Optional[str] = Form(None),
+    semester: Optional[int] = Form(None),
+    ects: Optional[float] = Form(None),
+    year: Optional[int] = Form(None),
+
+    # Flags
+    create_course: Optional[str] = Form("true"),
+    create_sections: Optional[str] = Form("true"),
+    no_course: Optional[str] = Form(None),
+    no_sections: Optional[str] = Form(None),
+
+    # Forçage slide
+    slide_mode: Optional[str] = Form(None),
+
+    # Révision d'un PDF déjà ingéré (ré-ingestion incrémentale)
+    previous_source_id: Optional[int] = Form(None),
+):
+    pdf_file = None
+    submitted = False
+    try:
+        cc, cs = _resolve_flags(create_course, create_sections, no_course, no_sections)
+        force_slide = _parse_bool(slide_mode, default=None)
+
+        pdf_file = await spool_upload(file)
+        if pdf_file.size <= 0:
+            raise HTTPException(status_code=400, detail="Fichier PDF vide ou non reçu.")
+
+        ue_id = None
+        if cc:
+            if not ue_code or not ue_code.strip():
+                raise HTTPException(status_code=422, detail="ue_id requis quand create_course=true")
+            ue_id = await run_in_threadpool(get_ue_id_from_code, ue_code)
+
+        manual_slide_media = await _read_manual_slide_media(request)
+
+        params = {
+            "filename": file.filename,
+            "title": title,
+            "ue_code": ue_code,
+            "ue_id": ue_id,
+            "description": desc or "",
+            "semester": semester,
+            "ects": ects,
+            "year": year,
+            "create_course": cc,
+            "create_sections": cs,
+            "force_slide": force_slide,
+            "previous_source_id": previous_source_id,
+        }
+        # le job devient propriétaire du fichier temporaire (supprimé en fin de job)
+        submitted = True
+        job_id = await run_in_threadpool(submit_ingest_job, pdf_file, params, manual_slide_media)
+
+        return JSONResponse(status_code=202, content={
+            "ok": True,
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"{request.url.path.rstrip('/')}/{job_id}",
+        })
+
+    except HTTPException:
+        raise
+    except IngestQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
+    finally:
+        # soumis : le fichier appartient au job (submit_ingest_job le supprime s'il échoue)
+        if pdf_file is not None and not submitted:
+            pdf_file.cleanup()
+
+async def get_course_job(job_id: int):
+    job = await run_in_threadpool(get_ingest_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="job introuvable")
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": job.get("progress") or {},
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
         
 async def inspect_pdf_type_endpoint(file: UploadFile = File(...)):
    
-    pdf_bytes = await file.read()
-    if not pdf_bytes:
-        raise HTTPException(status_code=400, detail="Fichier PDF vide ou non reçu.")
+    with await spool_upload(file) as pdf_file:
+        if pdf_file.size <= 0:
+            raise HTTPException(status_code=400, detail="Fichier PDF vide ou non reçu.")
 
-    info = _inspect_pdf_type(pdf_bytes)
+        def _inspect() -> dict:
+            with pdf_file.open_analysis() as analysis:
+                return _inspect_pdf_type(analysis=analysis)
+
+        info = await run_in_threadpool(_inspect)
 
     info.update({
         "filename": file.filename,
-        "size_bytes": len(pdf_bytes),
+        "size_bytes": pdf_file.size,
     })
 
     return JSONResponse(info)
 
 
 def get_all_courses():
-    conn = get_db_connection()
-    try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("""
-                SELECT
-                    c.id,
-                    c.code,
-                    c.title,
-                    c.description,
-                    c.order_no,
-                    c.doc_mode,
-                    c.created_at,
-                    c.updated_at,
-                    u.code  AS ue_code,
-                    u.title AS ue_title,
-                    u.year_no,
-                    u.sem_no,
-                    u.ects  AS ue_ects,
-                    COUNT(DISTINCT cv.id) AS versions_count,
-                    COUNT(DISTINCT cs.source_id) AS sources_count
-                FROM academics.courses c
-                JOIN academics.ue u ON u.id = c.ue_id
-                LEFT JOIN academics.course_versions cv ON cv.course_id = c.id
-                LEFT JOIN academics.course_sources cs ON cs.course_id = c.id
-                GROUP BY c.id, u.id
-                ORDER BY c.updated_at DESC, c.id DESC
-            """)
-            return cur.fetchall()
-    finally:
-        conn.close()
+    with read_connection() as conn, dict_cursor(conn) as cur:
+        cur.execute("""
+            SELECT
+                c.id,
+                c.code,
+                c.title,
+                c.description,
+                c.order_no,
+                c.doc_mode,
+                c.created_at,
+                c.updated_at,
+                u.code  AS ue_code,
+                u.title AS ue_title,
+                u.year_no,
+                u.sem_no,
+                u.ects  AS ue_ects,
+                COUNT(DISTINCT cv.id) AS versions_count,
+                COUNT(DISTINCT cs.source_id) AS sources_count
+            FROM academics.courses c
+            JOIN academics.ue u ON u.id = c.ue_id
+            LEFT JOIN academics.course_versions cv ON cv.course_id = c.id
+            LEFT JOIN academics.course_sources cs ON cs.course_id = c.id
+            GROUP BY c.id, u.id
+            ORDER BY c.updated_at DESC, c.id DESC
+        """)
+        return cur.fetchall()
 
 
 def get_course_by_id(course_id: int):
     conn = get_db_connection()
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with dict_cursor(conn) as cur:
             cur.execute("""
                 SELECT
                     c.id,
@@ -331,13 +448,13 @@ def get_course_by_id(course_id: int):
                 "sources": sources,
             }
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-async def get_course_versions(course_id: int):
+def get_course_versions(course_id: int):
     conn = None
     try:
         conn = get_db_connection()
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with dict_cursor(conn) as cur:
             cur.execute("""
                 SELECT * FROM academics.course_versions
                         WHERE course_id = %s
@@ -347,10 +464,10 @@ async def get_course_versions(course_id: int):
     except Exception:
         raise HTTPException("aucun donnée")
     
-async def get_course_sources(course_id: int, version_id: Optional[int] = Query(None)):
+def get_course_sources(course_id: int, version_id: Optional[int] = Query(None)):
         conn = get_db_connection()
         try:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            with dict_cursor(conn) as cur:
                 cur.execute("""
                     SELECT
                         cs.id AS course_source_id,
@@ -382,7 +499,7 @@ async def get_course_sources(course_id: int, version_id: Optional[int] = Query(N
         finally:
             release_db_connection(conn)
     
-async def update_course(
+def update_course(
     course_id: int,
     title: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
@@ -392,7 +509,7 @@ async def update_course(
     conn = None
     try:
         conn = get_db_connection()
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with dict_cursor(conn) as cur:
             fields = []
             params: Dict[str, Any] = {"id": course_id}
 
@@ -434,11 +551,11 @@ async def update_course(
         raise
     finally:
         if conn:
-            try: conn.close()
+            try: release_db_connection(conn)
             except Exception: pass
 
 
-async def delete_course(course_id: int):
+def delete_course(course_id: int):
     conn = None
     try:
         with conn.cursor() as cur:
@@ -452,11 +569,11 @@ async def delete_course(course_id: int):
     except Exception:
         raise HTTPException("aucune donnée")
 
-async def debug_last_courses(limit: int = Query(5, ge=1, le=50)):
+def debug_last_courses(limit: int = Query(5, ge=1, le=50)):
     conn = None
     try:
         conn = get_db_connection()
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with dict_cursor(conn) as cur:
             cur.execute("""
                 SELECT
                   c.id AS course_id,
@@ -475,12 +592,12 @@ async def debug_last_courses(limit: int = Query(5, ge=1, le=50)):
             return {"items": cur.fetchall()}
     finally:
         if conn:
-            try: conn.close()
+            try: release_db_connection(conn)
             except Exception: pass
 
 
 
-async def delete_course_version(course_id: int, version_id: int):
+def delete_course_version(course_id: int, version_id: int):
         conn = get_db_connection()
         try:
             with conn.cursor() as cur:
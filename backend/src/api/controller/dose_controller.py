@@ -1,11 +1,29 @@
 from fastapi import HTTPException, Query
-from database.connection import get_db_connection
+from fastapi.concurrency import run_in_threadpool
+from database.connection import get_db_connection, release_db_connection, read_connection
+from database.async_connection import async_pool_ready, async_transaction
 from core.dose_repo import DoseRepo
 from schema.dose_schema import DoseCalculateIn, DoseCalculateOut, DoseCalculatuionUpdateIn
-from api.services.service_dose.dose_service import DoseService
+from api.services.service_dose.dose_service import DoseService, DoseServiceAsync
 
 
 async def calculate(payload: DoseCalculateIn) -> DoseCalculateOut:
+    if not async_pool_ready():
+        return await run_in_threadpool(_calculate_sync, payload)
+    try:
+        async with async_transaction() as conn:
+            res = await DoseServiceAsync(conn).calculate(payload)
+        return DoseCalculateOut(
+            calculation_id=res["calculation_id"],
+            dose_result=res["dose_result"]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur serveur: {e}")
+
+
+def _calculate_sync(payload: DoseCalculateIn) -> DoseCalculateOut:
     conn = get_db_connection()
     try:
         service = DoseService(conn)
@@ -19,22 +37,18 @@ async def calculate(payload: DoseCalculateIn) -> DoseCalculateOut:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur serveur: {e}")
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-async def list_calculations(
+def list_calculations(
     user_id: int | None = None,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
 ):
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            rows = DoseRepo.list_calculations(cur, user_id=user_id, limit=limit, offset=offset)
-        return {"items": rows, "limit": limit, "offset": offset}
-    finally:
-        conn.close()
+    with read_connection() as conn, conn.cursor() as cur:
+        rows = DoseRepo.list_calculations(cur, user_id=user_id, limit=limit, offset=offset)
+    return {"items": rows, "limit": limit, "offset": offset}
 
-async def get_calculation(calc_id: int):
+def get_calculation(calc_id: int):
     conn = get_db_connection()
     try: 
         with conn.cursor() as cur:
@@ -43,11 +57,11 @@ async def get_calculation(calc_id: int):
             raise HTTPException(status_code=404, detail="calculation not found")
         return row
     finally :
-        conn.close()
+        release_db_connection(conn)
 
     
 
-async def update_calculation(calc_id: int, payload: DoseCalculatuionUpdateIn):
+def update_calculation(calc_id: int, payload: DoseCalculatuionUpdateIn):
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
@@ -66,9 +80,9 @@ async def update_calculation(calc_id: int, payload: DoseCalculatuionUpdateIn):
         conn.rollback()
         raise HTTPException(status_code=500, detail=f"Erreur serveur: {e}")
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-async def delete_calculation(calc_id: int):
+def delete_calculation(calc_id: int):
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
@@ -83,4 +97,4 @@ async def delete_calculation(calc_id: int):
         conn.rollback()
         raise HTTPException(status_code=500, detail="Erreur serveur: {e}")
     finally: 
-        conn.close()
\ No newline at end of file
+        release_db_connection(conn)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from typing import Optional, Tuple, List
-from database.connection import get_db_connection
+from database.connection import get_db_connection, release_db_connection
 
 
 def create_lesson(course_id: Optional[int], code: str, title: str, summary: Optional[str], body_md: Optional[str]):
@@ -21,7 +21,7 @@ def create_lesson(course_id: Optional[int], code: str, title: str, summary: Opti
         return row 
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def update_lesson(lesson_id: int, course_id: Optional[int], title: Optional[str], summary: Optional[str], body_md: Optional[str]):
     conn = get_db_connection()
@@ -47,7 +47,7 @@ def update_lesson(lesson_id: int, course_id: Optional[int], title: Optional[str]
         conn.rollback(); raise
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_lesson(lesson_id: int):
     conn = get_db_connection()
@@ -62,7 +62,7 @@ def get_lesson(lesson_id: int):
         return cur.fetchone()
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_list_lessons(limit: int = 50, offset: int = 0, q: Optional[str] = None, course_id: Optional[int] = None) -> Tuple[List[tuple], int]:
     conn = get_db_connection(); 
@@ -92,7 +92,7 @@ def get_list_lessons(limit: int = 50, offset: int = 0, q: Optional[str] = None,
         return rows, total
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def delete_lesson(lesson_id: int):
     conn = get_db_connection()
@@ -106,4 +106,4 @@ def delete_lesson(lesson_id: int):
         conn.commit()
     finally: 
         cur.close()
-        conn.close()
\ No newline at end of file
+        release_db_connection(conn)
\ No newline at end of file
@@ -0,0 +1,20 @@
+from typing import Optional
+from fastapi import Request, Query
+
+from api.services.service_media.media_stream_service import stream_page_media, stream_source_pdf
+from api.services.service_media.variant_service import stream_page_media_variant
+
+
+# Binaire d'un média de page (PNG), Range + ETag/304
+def get_page_media_file(media_id: int, request: Request):
+    return stream_page_media(request, media_id)
+
+# PDF source d'origine, Range + ETag/304 (lecteurs PDF progressifs)
+def get_source_pdf_file(source_id: int, request: Request):
+    return stream_source_pdf(request, source_id)
+
+# Variante dérivée (miniature / WebP / AVIF), générée au premier appel puis en cache
+def get_page_media_variant(media_id: int, request: Request,
+                           w: Optional[int] = Query(None, ge=1, le=4096),
+                           fmt: Optional[str] = Query("webp")):
+    return stream_page_media_variant(request, media_id, w, fmt)
@@ -1,5 +1,5 @@
 from typing import List, Optional, Tuple
-from database.connection import get_db_connection
+from database.connection import get_db_connection, release_db_connection
 
 def list_permissions(limit: int = 100, offset: int = 0, q: Optional[str] = None) -> Tuple[List[tuple], int]:
     conn = get_db_connection()
@@ -28,7 +28,7 @@ def list_permissions(limit: int = 100, offset: int = 0, q: Optional[str] = None)
         return rows, total
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def list_permissions_by_role(role_id: int) -> List[Tuple]:
     if not _role_exists(role_id):
@@ -47,7 +47,7 @@ def list_permissions_by_role(role_id: int) -> List[Tuple]:
         return cur.fetchall()
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def list_role_by_permission(perm_code: str) -> List[Tuple]:
     perm_id= _get_permission_id_by_code(perm_code)
@@ -64,7 +64,7 @@ def list_role_by_permission(perm_code: str) -> List[Tuple]:
         return cur.fetchall()
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_permissions_by_user_id(user_id: int) -> List[str]:
     conn = get_db_connection()
@@ -96,7 +96,7 @@ def get_permission_by_code(code: str) -> Optional[Tuple]:
         return cur.fetchone()
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def _get_permission_id_by_code(code: str) -> Optional[int] : 
     conn = get_db_connection()
@@ -107,7 +107,7 @@ def _get_permission_id_by_code(code: str) -> Optional[int] :
         return row[0] if row else None
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def _role_exists(role_id: int) -> bool:
     conn = get_db_connection()
@@ -119,7 +119,7 @@ def _role_exists(role_id: int) -> bool:
         return cur.fetchone() 
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def create_permission(code: str, label: str, description: Optional[str]) -> int:
     conn = get_db_connection()
@@ -136,7 +136,7 @@ def create_permission(code: str, label: str, description: Optional[str]) -> int:
         return pid
     finally: 
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def add_permission_to_role(role_id: int, perm_code: str) -> bool:
     perm_id = _get_permission_id_by_code(perm_code)
@@ -158,7 +158,7 @@ def add_permission_to_role(role_id: int, perm_code: str) -> bool:
         return inserted
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def update_permissions(code: str, label: Optional[str], description: Optional[str]) -> None:
     conn = get_db_connection()
@@ -173,7 +173,7 @@ def update_permissions(code: str, label: Optional[str], description: Optional[st
         conn.commit()
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 
 
@@ -187,7 +187,7 @@ def delete_permissions(code: str) -> None:
         conn.commit()
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def remove_permission_from_role(role_id: int, perm_code: str ) -> bool:
     perm_id = _get_permission_id_by_code(perm_code)
@@ -208,4 +208,4 @@ def remove_permission_from_role(role_id: int, perm_code: str ) -> bool:
         return deleted
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
@@ -1,5 +1,5 @@
 from typing import Optional, Tuple, List
-from database.connection import get_db_connection
+from database.connection import get_db_connection, release_db_connection
 
 def create_program(code: str, label: str, ects_total: Optional[int]):
     code = code.strip().lower()
@@ -19,7 +19,7 @@ def create_program(code: str, label: str, ects_total: Optional[int]):
         return row
     finally: 
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def update_program(pid: int, label: Optional[str], ects_total: Optional[int]):
     conn= get_db_connection()
@@ -41,7 +41,7 @@ def update_program(pid: int, label: Optional[str], ects_total: Optional[int]):
         return row
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_program(pid: int):
     conn = get_db_connection()
@@ -54,7 +54,7 @@ def get_program(pid: int):
         return cur.fetchone()
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_list_programs(limit: int, offset: int, q: Optional[str]) -> Tuple[List[tuple], int]:
     conn = get_db_connection()
@@ -76,7 +76,7 @@ def get_list_programs(limit: int, offset: int, q: Optional[str]) -> Tuple[List[t
         return cur.fetchall(), total
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def delete_program(pid: int):
     conn = get_db_connection()
@@ -89,5 +89,5 @@ def delete_program(pid: int):
 
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
         
\ No newline at end of file
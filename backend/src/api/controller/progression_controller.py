@@ -1,10 +1,7 @@
-from database.connection import get_db_connection
+from database.connection import read_connection, transaction
 
 def upsert_progress(user_id: int, lesson_id: int, status: str):
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    try:
+    with transaction() as conn, conn.cursor() as cur:
         cur.execute("""
         INSERT INTO academics.lesson_progress(user_id, lesson_id, status, updated_at)
                     VALUES (%s, %s, %s, NOW())
@@ -12,26 +9,25 @@ def upsert_progress(user_id: int, lesson_id: int, status: str):
                     DO UPDATE SET status = EXECLUDED.status , updated_at = NOW()
                     RETURNING user_id, lesson_id, status, updated_at ;
         """,(user_id, lesson_id, status))
-        row = cur.fetchone()
-        conn.commit()
-        return row
-    finally:
-        cur.close()
-        conn.close()
+        return cur.fetchone()
 
 def get_progress(user_id: int, lesson_id: int):
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    try:
+    # après set_progress, l'utilisateur relit sur le primaire (read-your-writes)
+    with read_connection() as conn, conn.cursor() as cur:
         cur.execute("""
             SELECT user_id, lesson_id, status, updated_at
                     FROM academics.lesson_progress
                     WHERE user_id=%s AND lesson_id=%s;
         """, (user_id, lesson_id))
         return cur.fetchone()
-    finally:
-        cur.close()
-        conn.close()
 
-        
\ No newline at end of file
+
+def list_ue_progress(user_id: int):
+    with read_connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT ue_id, ue_title, total_lessons, started_lessons, done_lessons
+                    FROM academics.v_user_ue_progress
+                    WHERE user_id=%s
+                    ORDER BY ue_id;
+        """, (user_id,))
+        return cur.fetchall()
@@ -1,5 +1,5 @@
 from typing import Optional, Tuple, List
-from database.connection import get_db_connection
+from database.connection import get_db_connection, release_db_connection, read_connection
 
 def create_protocol(category_id: Optional[int], code: str, title: str, summary: Optional[str],
                     tags: list, is_published: bool, external_url: Optional[str] ):
@@ -20,7 +20,7 @@ def create_protocol(category_id: Optional[int], code: str, title: str, summary:
         return row
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
     
 def update_protocol(pid: int, category_id: Optional[int], title: Optional[str], summary: Optional[str],
@@ -49,7 +49,7 @@ def update_protocol(pid: int, category_id: Optional[int], title: Optional[str],
         return row
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_protocol(pid: int):
     conn = get_db_connection()
@@ -62,12 +62,10 @@ def get_protocol(pid: int):
         return cur.fetchone()
     finally: 
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def list_protocols(limit=50, offset=0, q: Optional[str]=None, category_id: Optional[int]=None):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
+    with read_connection() as conn, conn.cursor() as cur:
         where, params = [] , []
         if q: 
             where.append("(p.code ILIKE  %s OR p.title ILIKE %s OR P.summary ILIKE %s)")
@@ -75,7 +73,7 @@ def list_protocols(limit=50, offset=0, q: Optional[str]=None, category_id: Optio
         if category_id is not None:
             where.append("p.category_id = %s")
             params.append(category_id)
-        wh = "WHERE" - "AND".join(where) if where else ""
+        wh = "WHERE " + " AND ".join(where) if where else ""
         cur.execute(f"SELECT COUNT(*) FROM content.protocols p {wh} ;", tuple(params))
         total = cur.fetchone()[0]
         cur.execute(f"""
@@ -86,9 +84,6 @@ def list_protocols(limit=50, offset=0, q: Optional[str]=None, category_id: Optio
              LIMIT %s OFFSET %s;
         """, (*params, limit, offset) if params else (limit, offset))
         return cur.fetchall(), total
-    finally:
-        cur.close()
-        conn.close()
 
 def update_protocol(protocol_id: int, category_id: Optional[int], title: Optional[str], summary: Optional[str],
                     tags: Optional[list], is_published: Optional[bool], external_url: Optional[str]):
@@ -115,7 +110,7 @@ def update_protocol(protocol_id: int, category_id: Optional[int], title: Optiona
         conn.rollback(); raise
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def delete_protocol(protocol_id: int):
     conn = get_db_connection()
@@ -128,7 +123,7 @@ def delete_protocol(protocol_id: int):
         conn.commit()
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 
 def create_protocol_version(protocol_id: int, body_md: str, changelog: Optional[str], publish: bool):
@@ -158,7 +153,7 @@ def create_protocol_version(protocol_id: int, body_md: str, changelog: Optional[
         conn.rollback(); raise
     finally:
         cur.close() 
-        conn.close()
+        release_db_connection(conn)
 
 def list_protocol_versions(protocol_id: int) -> List[tuple]:
     conn = get_db_connection()
@@ -174,4 +169,4 @@ def list_protocol_versions(protocol_id: int) -> List[tuple]:
         return cur.fetchall()
     finally:
         cur.close()
-        conn.close()
\ No newline at end of file
+        release_db_connection(conn)
\ No newline at end of file
@@ -1,8 +1,10 @@
 from __future__ import annotations
 from fastapi import HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from database.connection import get_db_connection , release_db_connection
+from database.async_connection import async_pool_ready, async_transaction
 from core.quiz_repo import QuizRepo
-from api.services.service_quiz.quiz_service import QuizService
+from api.services.service_quiz.quiz_service import QuizService, QuizServiceAsync
 
 from schema.quiz_schema import (
     QuizCreateIn,
@@ -13,7 +15,7 @@ from schema.quiz_schema import (
 )
 
 
-async def create_quiz(payload: QuizCreateIn):
+def create_quiz(payload: QuizCreateIn):
     conn = get_db_connection()
     try:
         service = QuizService(conn)
@@ -24,7 +26,7 @@ async def create_quiz(payload: QuizCreateIn):
         conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
-async def list_quizzes(
+def list_quizzes(
     tag: str | None = None,
     mode: str | None = None,
     is_published: bool | None = None,
@@ -46,7 +48,7 @@ async def list_quizzes(
     finally:
         release_db_connection(conn)
 
-async def get_quiz(quiz_id: int):
+def get_quiz(quiz_id: int):
     conn = get_db_connection()
     try:
         service = QuizService(conn)
@@ -61,7 +63,7 @@ async def get_quiz(quiz_id: int):
     finally:
         release_db_connection(conn)
     
-async def update_quiz(quiz_id: int, payload: QuizUpdateIn):
+def update_quiz(quiz_id: int, payload: QuizUpdateIn):
     conn = get_db_connection()
     try:
         service = QuizService(conn)
@@ -77,7 +79,7 @@ async def update_quiz(quiz_id: int, payload: QuizUpdateIn):
     finally:
         release_db_connection(conn)
 
-async def delete_quiz(quiz_id: int):
+def delete_quiz(quiz_id: int):
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
@@ -95,7 +97,7 @@ async def delete_quiz(quiz_id: int):
     finally:
         release_db_connection(conn)
 
-async def create_item(quiz_id: int, payload: QuizItemCreateIn):
+def create_item(quiz_id: int, payload: QuizItemCreateIn):
     conn = get_db_connection()
     try: 
         service = QuizService(conn)
@@ -108,7 +110,7 @@ async def create_item(quiz_id: int, payload: QuizItemCreateIn):
     finally:
         release_db_connection(conn)
 
-async def list_items(quiz_id: int):
+def list_items(quiz_id: int):
     conn = get_db_connection()
     try:
         with conn.cursor as cur:
@@ -120,7 +122,7 @@ async def list_items(quiz_id: int):
     finally:
         release_db_connection(conn)
 
-async def start_attempt(quiz_id: int, payload: QuizAttemptStartIn):
+def start_attempt(quiz_id: int, payload: QuizAttemptStartIn):
     conn = get_db_connection()
     try:
         service = QuizService(conn)
@@ -140,6 +142,16 @@ async def start_attempt(quiz_id: int, payload: QuizAttemptStartIn):
 
 
 async def answer_item(attempt_id: int, item_id: int, payload: QuizAnswerIn):
+    if not async_pool_ready():
+        return await run_in_threadpool(_answer_item_sync, attempt_id, item_id, payload)
+    try:
+        async with async_transaction() as conn:
+            return await QuizServiceAsync(conn).answer_item(attempt_id, item_id, payload.answers_json)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _answer_item_sync(attempt_id: int, item_id: int, payload: QuizAnswerIn):
     conn = get_db_connection()
     try:
         service = QuizService(conn)
@@ -153,7 +165,7 @@ async def answer_item(attempt_id: int, item_id: int, payload: QuizAnswerIn):
         release_db_connection(conn)
 
 
-async def finish_attempt(attempt_id: int):
+def finish_attempt(attempt_id: int):
     conn = get_db_connection()
     try:
         service = QuizService(conn)
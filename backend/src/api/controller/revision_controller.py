@@ -15,7 +15,7 @@ from database.connection import get_db_connection, release_db_connection
 
 
 
-async def create_sheet(payload: RevisionSheetCreateIn):
+def create_sheet(payload: RevisionSheetCreateIn):
     conn = get_db_connection()
     try:
         service = RevisionService(conn)
@@ -31,7 +31,7 @@ async def create_sheet(payload: RevisionSheetCreateIn):
     finally:
         release_db_connection(conn)
 
-async def list_sheets(
+def list_sheets(
       course_id: int | None = None,
     version_id: int | None = None,
     target_type: str | None = None,
@@ -56,7 +56,7 @@ async def list_sheets(
     finally:
         release_db_connection(conn)
 
-async def get_sheet(sheet_id: int):
+def get_sheet(sheet_id: int):
     conn = get_db_connection()
     try:
         service = RevisionService(conn)
@@ -67,7 +67,7 @@ async def get_sheet(sheet_id: int):
         release_db_connection(conn)
 
 
-async def get_sheet_full(sheet_id: int):
+def get_sheet_full(sheet_id: int):
     conn = get_db_connection()
     try:
         service = RevisionService(conn)
@@ -79,7 +79,7 @@ async def get_sheet_full(sheet_id: int):
 
 
 
-async def render_sheet(sheet_id: int):
+def render_sheet(sheet_id: int):
     conn = get_db_connection()
     try:
         service = RevisionService(conn)
@@ -96,7 +96,7 @@ async def render_sheet(sheet_id: int):
     finally:
         release_db_connection(conn)
 
-async def update_sheet(sheet_id: int, payload: RevisionSheetUpdateIn):
+def update_sheet(sheet_id: int, payload: RevisionSheetUpdateIn):
     conn = get_db_connection()
     try:
         service = RevisionService(conn)
@@ -110,7 +110,7 @@ async def update_sheet(sheet_id: int, payload: RevisionSheetUpdateIn):
         release_db_connection(conn)
 
 
-async def delete_sheet(sheet_id: int):
+def delete_sheet(sheet_id: int):
     conn = get_db_connection()
     try:
         service = RevisionService(conn)
@@ -127,7 +127,7 @@ async def delete_sheet(sheet_id: int):
     finally:
         release_db_connection(conn)
 
-async def add_item(payload: RevisionSheetItemCreateIn):
+def add_item(payload: RevisionSheetItemCreateIn):
     conn = get_db_connection()
     try:
         service = RevisionService(conn)
@@ -141,7 +141,7 @@ async def add_item(payload: RevisionSheetItemCreateIn):
         release_db_connection(conn)
 
 
-async def list_items(sheet_id: int):
+def list_items(sheet_id: int):
     conn = get_db_connection()
     try:
         service = RevisionService(conn)
@@ -153,7 +153,7 @@ async def list_items(sheet_id: int):
         release_db_connection(conn)
 
 
-async def delete_item(item_id: int):
+def delete_item(item_id: int):
     conn = get_db_connection()
     try:
         service = RevisionService(conn)
@@ -169,7 +169,7 @@ async def delete_item(item_id: int):
     finally:
         release_db_connection(conn)
 
-async def add_asset(payload: SheetAssetCreateIn):
+def add_asset(payload: SheetAssetCreateIn):
     conn = get_db_connection()
     try:
         service = RevisionService(conn)
@@ -183,7 +183,7 @@ async def add_asset(payload: SheetAssetCreateIn):
         release_db_connection(conn)
 
 
-async def list_assets(sheet_id: int):
+def list_assets(sheet_id: int):
     conn = get_db_connection()
     try:
         service = RevisionService(conn)
@@ -195,7 +195,7 @@ async def list_assets(sheet_id: int):
         release_db_connection(conn)
 
 
-async def delete_asset(asset_id: int):
+def delete_asset(asset_id: int):
     conn = get_db_connection()
     try:
         service = RevisionService(conn)
@@ -212,7 +212,7 @@ async def delete_asset(asset_id: int):
         release_db_connection(conn)
 
 
-async def render_sheet_pages(sheet_id: int):
+def render_sheet_pages(sheet_id: int):
     conn = get_db_connection()
     try:
         service = RevisionService(conn)
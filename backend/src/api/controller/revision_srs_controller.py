@@ -1,11 +1,13 @@
 from fastapi import HTTPException
-from database.connection import get_db_connection, release_db_connection
-from api.services.service_revision.revision_srs_service import RevisionSrsService
+from fastapi.concurrency import run_in_threadpool
+from database.connection import get_db_connection, release_db_connection, read_connection
+from database.async_connection import async_pool_ready, async_transaction
+from api.services.service_revision.revision_srs_service import RevisionSrsService, RevisionSrsServiceAsync
 from schema.revision_schema import FlashcardCreateIn, FlashcardUpdateIn, SrsReviewIn
 
 
 
-async def create_flashcard(payload: FlashcardCreateIn):
+def create_flashcard(payload: FlashcardCreateIn):
     conn = get_db_connection()
     try:
         service = RevisionSrsService(conn)
@@ -18,16 +20,13 @@ async def create_flashcard(payload: FlashcardCreateIn):
     finally:
         release_db_connection(conn)
 
-async def list_flashcards(lesson_id: int | None = None, note_id: int | None = None, tag: str | None = None, limit: int = 50, offset: int = 0):
-    conn = get_db_connection()
-    try:
+def list_flashcards(lesson_id: int | None = None, note_id: int | None = None, tag: str | None = None, limit: int = 50, offset: int = 0):
+    with read_connection() as conn:
         service = RevisionSrsService(conn)
         items = service.list_flashcards(lesson_id=lesson_id, note_id=note_id, tag=tag, limit=limit, offset=offset)
         return {"items": items, "limit": limit, "offset": offset}
-    finally:
-        release_db_connection(conn)
 
-async def update_flashcard(flashcard_id: int, payload: FlashcardUpdateIn):
+def update_flashcard(flashcard_id: int, payload: FlashcardUpdateIn):
     conn = get_db_connection()
     try:
         service = RevisionSrsService(conn)
@@ -43,7 +42,7 @@ async def update_flashcard(flashcard_id: int, payload: FlashcardUpdateIn):
     finally:
         release_db_connection(conn)
 
-async def delete_flashcard(flashcard_id: int):
+def delete_flashcard(flashcard_id: int):
     conn = get_db_connection()
     try:
         service = RevisionSrsService(conn)
@@ -60,6 +59,13 @@ async def delete_flashcard(flashcard_id: int):
         release_db_connection(conn)
 
 async def srs_due(user_id: int, limit: int = 20):
+    if not async_pool_ready():
+        return await run_in_threadpool(_srs_due_sync, user_id, limit)
+    async with async_transaction() as conn:
+        return await RevisionSrsServiceAsync(conn).due(user_id=user_id, limit=limit)
+
+
+def _srs_due_sync(user_id: int, limit: int = 20):
     conn = get_db_connection()
     try:
         service = RevisionSrsService(conn)
@@ -68,6 +74,21 @@ async def srs_due(user_id: int, limit: int = 20):
         release_db_connection(conn)
 
 async def srs_review(payload: SrsReviewIn):
+    if not async_pool_ready():
+        return await run_in_threadpool(_srs_review_sync, payload)
+    try:
+        async with async_transaction() as conn:
+            return await RevisionSrsServiceAsync(conn).review(
+                user_id=payload.user_id,
+                flashcard_id=payload.flashcard_id,
+                quality=payload.quality,
+                meta=payload.meta,
+            )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _srs_review_sync(payload: SrsReviewIn):
     conn = get_db_connection()
     try:
         service = RevisionSrsService(conn)
@@ -85,10 +106,7 @@ async def srs_review(payload: SrsReviewIn):
     finally:
         release_db_connection(conn)
 
-async def srs_stats(user_id: int):
-    conn = get_db_connection()
-    try:
+def srs_stats(user_id: int):
+    with read_connection() as conn:
         service = RevisionSrsService(conn)
         return service.stats(user_id=user_id)
-    finally:
-        release_db_connection(conn)
@@ -27,7 +27,7 @@ def list_roles(limit: int = 50, offset: int = 0, q: Optional[str] = None) -> Tup
         return rows, total
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_role_by_id(role_id: int) -> Optional[Tuple]:
     conn = get_db_connection()
@@ -41,7 +41,7 @@ def get_role_by_id(role_id: int) -> Optional[Tuple]:
         return cur.fetchone()
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_role_by_code(code: str) -> Optional[Tuple]:
     conn = get_db_connection()
@@ -81,7 +81,7 @@ def create_role(code: str, label: str, description: Optional[str]) -> Dict[str,
         raise
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def update_role(code: str, label: Optional[str], description: Optional[str]) -> Dict[str, Any]:
     code = code.strip().lower()
@@ -108,7 +108,7 @@ def update_role(code: str, label: Optional[str], description: Optional[str]) ->
         raise
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def delete_role(code: str) -> None:
     code = code.strip().lower()
@@ -125,7 +125,7 @@ def delete_role(code: str) -> None:
         raise
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_permissions_by_role_code(role_code: str) -> List[str]:
     conn = get_db_connection()
@@ -142,7 +142,7 @@ def get_permissions_by_role_code(role_code: str) -> List[str]:
         return [row[0] for row in cur.fetchall()]
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_roles_codes_by_user_id(user_id: int) -> List[str]:
     conn = get_db_connection()
@@ -157,7 +157,7 @@ def get_roles_codes_by_user_id(user_id: int) -> List[str]:
         return [row[0] for row in cur.fetchall()]
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def assing_permission(role_code: str, permission_code: str) -> None:
     role_code = role_code.strip().lower()
@@ -189,7 +189,7 @@ def assing_permission(role_code: str, permission_code: str) -> None:
         raise
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def revoke_permission(role_code: str, permission_code: str) -> None:
     role_code = role_code.strip().lower()
@@ -218,4 +218,4 @@ def revoke_permission(role_code: str, permission_code: str) -> None:
         conn.rollback()
     finally:
         cur.close()
-        conn.close()
\ No newline at end of file
+        release_db_connection(conn)
\ No newline at end of file
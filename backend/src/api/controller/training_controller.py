@@ -1,11 +1,11 @@
 from fastapi import HTTPException, Query
-from database.connection import get_db_connection
+from database.connection import get_db_connection, release_db_connection
 from core.training_repo import TrainingRepo
 from api.services.service_training.generator import TrainingGeneratorService
 from api.services.service_training.corrector import TrainingCorrectorService
 from schema.training_schema import ExerciseCreateIn, AttemptCreateIn
 
-async def create_exercise(payload: ExerciseCreateIn):
+def create_exercise(payload: ExerciseCreateIn):
     conn = get_db_connection()
     try:
         service = TrainingGeneratorService(conn)
@@ -15,9 +15,9 @@ async def create_exercise(payload: ExerciseCreateIn):
         conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-async def list_exercises(
+def list_exercises(
     exercise_type: str | None = None,
     difficulty: int | None = None,
     tag: str | None = None,
@@ -37,9 +37,9 @@ async def list_exercises(
             )
         return {"items": rows, "limit": limit, "offset": offset}
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-async def get_exercise(exercise_id: int):
+def get_exercise(exercise_id: int):
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
@@ -48,9 +48,9 @@ async def get_exercise(exercise_id: int):
             raise HTTPException(status_code=404, detail="exercise not found")
         return row
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-async def submit_attempt(exercise_id: int, payload: AttemptCreateIn):
+def submit_attempt(exercise_id: int, payload: AttemptCreateIn):
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
@@ -67,9 +67,9 @@ async def submit_attempt(exercise_id: int, payload: AttemptCreateIn):
         conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-async def list_attempts(
+def list_attempts(
     user_id: int | None = None,
     exercise_id: int | None = None,
     limit: int = Query(20, ge=1, le=100),
@@ -87,9 +87,9 @@ async def list_attempts(
             )
         return {"items": rows, "limit": limit, "offset": offset}
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-async def get_attempt(attempt_id: int):
+def get_attempt(attempt_id: int):
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
@@ -99,4 +99,4 @@ async def get_attempt(attempt_id: int):
             fb = TrainingRepo.list_attempt_feedback(cur, attempt_id)
         return {"attempt": att, "feedback_items": fb}
     finally:
-        conn.close()
+        release_db_connection(conn)
@@ -1,4 +1,4 @@
-from database.connection import get_db_connection
+from database.connection import get_db_connection, release_db_connection
 from typing import Optional, Tuple, List, Dict, Any
 
 def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
@@ -15,7 +15,7 @@ def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
         return { "id": r[0], "email": r[1], "first_name": r[2], "last_name": r[3], "pseudo": r[4], "is_active": r[5] }
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_all_users():
     conn = get_db_connection()
@@ -28,7 +28,7 @@ def get_all_users():
         return cur.fetchall()
     finally: 
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_user_by_email(email: str) -> dict | None: 
     conn = get_db_connection()
@@ -50,7 +50,7 @@ def get_user_by_email(email: str) -> dict | None:
         return dict(zip(cols, row))
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def get_roles_by_user_id(user_id: int) -> List[str]:
     conn = get_db_connection()
@@ -66,7 +66,7 @@ def get_roles_by_user_id(user_id: int) -> List[str]:
         return [r[0] for r in rows]
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 
 def get_permissions_by_user_id(user_id: int) -> List[str]:
@@ -88,7 +88,7 @@ def get_permissions_by_user_id(user_id: int) -> List[str]:
         return [r[0] for r in rows]
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def update_user_basic(user_id: int, first_name: str, last_name: str) -> None:
     conn = get_db_connection()
@@ -100,7 +100,7 @@ def update_user_basic(user_id: int, first_name: str, last_name: str) -> None:
         conn.commit()
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 def delete_user(user_id: int) -> None:
     conn = get_db_connection()
@@ -110,7 +110,7 @@ def delete_user(user_id: int) -> None:
         conn.commit()
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 
         
\ No newline at end of file
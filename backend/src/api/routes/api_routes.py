@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from api.routes import (auth_router, user_router, roles_router, permissions_router, protocols_router, categories_routes, protocols_router, lesson_routes, 
                         course_routes, programs_router, ue_router, dose_routes, training_routes, case_routes,quiz_router
-                        , revision_router)
+                        , revision_router, media_routes)
 
 api_router = APIRouter()
 api_router.include_router(auth_router.router)
@@ -18,4 +18,5 @@ api_router.include_router(dose_routes.router)
 api_router.include_router(training_routes.router)
 api_router.include_router(case_routes.router)
 api_router.include_router(quiz_router.router)
-api_router.include_router(revision_router.router)
\ No newline at end of file
+api_router.include_router(revision_router.router)
+api_router.include_router(media_routes.router)
\ No newline at end of file
@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from api.controller.cours_controller import (create_course, get_course_by_id, get_all_courses,
                                              debug_last_courses, get_course_versions, get_course_sources,
-                                             update_course,delete_course)
+                                             update_course,delete_course, create_course_job, get_course_job)
 
 
 router = APIRouter(prefix="/courses", tags=["courses"])
@@ -9,6 +9,8 @@ router = APIRouter(prefix="/courses", tags=["courses"])
 
 
 router.post("")(create_course)
+router.post("/jobs")(create_course_job)
+router.get("/jobs/{job_id}")(get_course_job)
 router.get("")(get_all_courses)
 router.get("/{course_id}")(get_course_by_id)
 router.get("/debug/last")(debug_last_courses)
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from api.controller.media_controller import get_page_media_file, get_source_pdf_file, get_page_media_variant
+
+
+router = APIRouter(prefix="/media", tags=["media"])
+
+
+router.get("/page/{media_id}")(get_page_media_file)
+router.head("/page/{media_id}")(get_page_media_file)
+router.get("/page/{media_id}/variant")(get_page_media_variant)
+router.get("/sources/{source_id}/pdf")(get_source_pdf_file)
+router.head("/sources/{source_id}/pdf")(get_source_pdf_file)
@@ -6,6 +6,12 @@ from api.services import progression_service as svc
 
 router = APIRouter(prefix="/lessons", tags=["progress"])
 
+@router.get("/progress/ue")
+def list_ue_progress(
+    user_id: int = Depends(require_permissions(["lesson.read"]))
+):
+    return {"items": svc.list_ue_progress(user_id=user_id)}
+
 @router.post("/{lesson_id}/progress", response_model=LessonProgressOut)
 def set_progress(
     lesson_id: int,
@@ -7,4 +7,10 @@ def set_progress(user_id: int, lesson_id: int, status: str):
 def get_progress(user_id: int, lesson_id: int):
     r = pc.get_progress(user_id, lesson_id)
     if not r: return None
-    return  {"user_id": r[0], "lesson_id": r[1], "status": r[2], "updated_at": r[3]}
\ No newline at end of file
+    return  {"user_id": r[0], "lesson_id": r[1], "status": r[2], "updated_at": r[3]}
+
+def list_ue_progress(user_id: int):
+    return [
+        {"ue_id": r[0], "ue_title": r[1], "total_lessons": r[2], "started_lessons": r[3], "done_lessons": r[4]}
+        for r in pc.list_ue_progress(user_id)
+    ]
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from typing import Any, Dict, Optional
-from core.dose_repo import DoseRepo
+from core.dose_repo import DoseRepo, DoseRepoAsync
 from api.services.service_dose.validators import DoseValidator
 from api.services.service_dose.calculator import DoseCalculator
 from api.services.service_dose.safety import DrugSafetyService
@@ -12,6 +12,11 @@ def calculate_from_dict(self, payload_dict: dict) -> dict:
     return self.calculate(payload)
 
 
+def _context_of(payload) -> str:
+    context = (payload.context or "FREE")
+    return context.strip().upper() if isinstance(context, str) else str(context).strip().upper()
+
+
 class DoseService:
     def __init__(self, conn):
         self.conn = conn
@@ -22,9 +27,28 @@ class DoseService:
     
 
     def calculate(self, payload) -> Dict[str, Any]:
-        context = (payload.context or "FREE")
-        context = context.strip().upper() if isinstance(context, str) else str(context).strip().upper()
+        context = _context_of(payload)
+        dose_result = self._compute(payload, context)
+
+        with self.conn.cursor() as cur:
+            calc_id = DoseRepo.insert_calculation(
+                cur,
+                user_id=payload.user_id,
+                context=context,
+                exercise_id=getattr(payload, "exercise_id", None),
+                case_id=getattr(payload, "case_id", None),
+                patient_age_y=payload.patient_age_y,
+                weight_kg=payload.weight_kg,
+                drug_name=payload.drug_name,
+                dose_input=payload.dose_input,
+                dose_result=dose_result,
+            )
+        self.conn.commit()
+
+        return {"calculation_id": calc_id, "dose_result": dose_result}
 
+    def _compute(self, payload, context: str) -> Dict[str, Any]:
+        # calcul pur (unités déjà chargées ou chargées à la demande par load())
         self.validator.validate_request(payload, context=context)
 
         dose_result = self.calculator.compute(payload, context=context)
@@ -37,9 +61,19 @@ class DoseService:
             context=context,
         )
         dose_result["safety"] = safety
+        return dose_result
 
-        with self.conn.cursor() as cur:
-            calc_id = DoseRepo.insert_calculation(
+
+class DoseServiceAsync(DoseService):
+    """calculate() sur le pool async : unités lues en async, puis calcul pur, puis INSERT."""
+
+    async def calculate(self, payload) -> Dict[str, Any]:
+        context = _context_of(payload)
+        await self.calculator.units.load_async(self.conn)
+        dose_result = self._compute(payload, context)
+
+        async with self.conn.cursor() as cur:
+            calc_id = await DoseRepoAsync.insert_calculation(
                 cur,
                 user_id=payload.user_id,
                 context=context,
@@ -51,6 +85,5 @@ class DoseService:
                 dose_input=payload.dose_input,
                 dose_result=dose_result,
             )
-        self.conn.commit()
 
         return {"calculation_id": calc_id, "dose_result": dose_result}
\ No newline at end of file
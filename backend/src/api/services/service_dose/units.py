@@ -3,6 +3,8 @@ from dataclasses import dataclass
 from decimal import Decimal, InvalidOperation
 from typing import Dict, Optional, Tuple, Any
 
+from database.statements import statement, execute, execute_async
+
 
 class UnitError(ValueError):
     pass
@@ -69,6 +71,17 @@ def split_compound_unit(u: str) -> Tuple[str, str]:
     return normalize_unit_code(parts[0]), normalize_unit_code(parts[1])
 
 
+# requêtes partagées par load() et load_async()
+_STMT_UNITS = statement("units.list_units", """
+    SELECT code, kind, base_code, to_base_factor
+    FROM core.units
+""")
+_STMT_CONVERSIONS = statement("units.list_conversions", """
+    SELECT from_unit, to_unit, factor
+    FROM core.unit_conversions
+""")
+
+
 class UnitsService:
     """
     Service de conversion d'unités basé sur:
@@ -103,35 +116,45 @@ class UnitsService:
             return
 
         with self.conn.cursor() as cur:
-            # core.units
-            cur.execute("""
-                SELECT code, kind, base_code, to_base_factor
-                FROM core.units
-            """)
-            for r in self._fetchall(cur):
-                code = normalize_unit_code(self._row_get(r, "code", 0))
-                kind = self._row_get(r, "kind", 1)
-                base_code = self._row_get(r, "base_code", 2)
-                to_base_factor = self._row_get(r, "to_base_factor", 3)
-                self._units[code] = Unit(
-                    code=code,
-                    kind=kind,
-                    base_code=normalize_unit_code(base_code) if base_code else None,
-                    to_base_factor=_to_decimal(to_base_factor) if to_base_factor is not None else None
-                )
-
-            cur.execute("""
-                SELECT from_unit, to_unit, factor
-                FROM core.unit_conversions
-            """)
-            for r in self._fetchall(cur):
-                fu = normalize_unit_code(self._row_get(r, "from_unit", 0))
-                tu = normalize_unit_code(self._row_get(r, "to_unit", 1))
-                factor = _to_decimal(self._row_get(r, "factor", 2))
-                self._direct[(fu, tu)] = factor
+            execute(cur, _STMT_UNITS)
+            units_rows = self._fetchall(cur)
+            execute(cur, _STMT_CONVERSIONS)
+            conv_rows = self._fetchall(cur)
+        self._fill(units_rows, conv_rows)
+        self._loaded = True
 
+    async def load_async(self, aconn) -> None:
+        """Comme load(), via une connexion psycopg 3 async (endpoints async)."""
+        if self._loaded:
+            return
+        async with aconn.cursor() as cur:
+            await execute_async(cur, _STMT_UNITS)
+            units_rows = await cur.fetchall()
+            await execute_async(cur, _STMT_CONVERSIONS)
+            conv_rows = await cur.fetchall()
+        self._fill(units_rows, conv_rows)
         self._loaded = True
 
+    def _fill(self, units_rows: list, conv_rows: list) -> None:
+        # core.units
+        for r in units_rows:
+            code = normalize_unit_code(self._row_get(r, "code", 0))
+            kind = self._row_get(r, "kind", 1)
+            base_code = self._row_get(r, "base_code", 2)
+            to_base_factor = self._row_get(r, "to_base_factor", 3)
+            self._units[code] = Unit(
+                code=code,
+                kind=kind,
+                base_code=normalize_unit_code(base_code) if base_code else None,
+                to_base_factor=_to_decimal(to_base_factor) if to_base_factor is not None else None
+            )
+        # core.unit_conversions
+        for r in conv_rows:
+            fu = normalize_unit_code(self._row_get(r, "from_unit", 0))
+            tu = normalize_unit_code(self._row_get(r, "to_unit", 1))
+            factor = _to_decimal(self._row_get(r, "factor", 2))
+            self._direct[(fu, tu)] = factor
+
 
 
     def _get_unit(self, code: str) -> Optional[Unit]:
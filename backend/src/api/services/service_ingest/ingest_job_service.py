@@ -0,0 +1,270 @@
+from __future__ import annotations
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+import threading
+import time
+import traceback
+
+from core import config
+from core.job_repo import JobRepo
+from database.connection import get_db_connection, release_db_connection
+from utils.course import (
+    _inspect_pdf_type, decide_slide_mode, ingest_pdf_to_db,
+    extract_images, extract_text_filtered_from_bytes, get_embedded_image_rects_by_page,
+)
+from utils.spooled_upload import SpooledPdf, cleanup_stale_spools
+from utils.pdf_workers import shutdown_pdf_workers
+from utils.ingest_profile import IngestProfiler, profile_stage
+from utils.worker import worker_id
+
+# ===================================================================
+# JOBS D'INGESTION PDF EN ARRIÈRE-PLAN (ai.jobs)
+# ===================================================================
+# L'endpoint crée la ligne ai.jobs puis rend la main ; l'ingestion tourne
+# dans un pool de threads borné (INGEST_JOB_CONCURRENCY) avec une file
+# d'attente bornée (INGEST_JOB_QUEUE_MAX) pour ne pas affamer l'API.
+# Chaque job porte son worker (hôte:pid) et un bail (lease_until) renouvelé
+# par un heartbeat tant que le processus vit : au démarrage d'un worker,
+# seuls les jobs au bail expiré (worker mort) sont passés en erreur.
+
+JOB_KIND = "ingest"
+PROGRESS_MIN_INTERVAL_S = 1.0
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_SLOTS: Optional[threading.BoundedSemaphore] = None
+_LOCK = threading.Lock()
+_HEARTBEAT: Optional[threading.Thread] = None
+_HEARTBEAT_STOP = threading.Event()
+
+
+class IngestQueueFull(Exception):
+    pass
+
+
+def _lease_s() -> int:
+    return max(5, config.INGEST_JOB_LEASE_S)
+
+
+def _heartbeat_loop() -> None:
+    """Renouvelle le bail des jobs de ce worker toutes les ~LEASE_S/3."""
+    wid = worker_id()
+    while not _HEARTBEAT_STOP.wait(_lease_s() / 3.0):
+        try:
+            _write_job(JobRepo.renew_leases, wid, _lease_s())
+        except Exception:
+            # DB indisponible : on réessaie au prochain tour (bail = marge)
+            traceback.print_exc()
+
+
+def init_ingest_executor() -> None:
+    """À appeler au startup, après init_db_pool()."""
+    global _EXECUTOR, _SLOTS, _HEARTBEAT
+    with _LOCK:
+        if _EXECUTOR is not None:
+            return
+        _EXECUTOR = ThreadPoolExecutor(
+            max_workers=max(1, config.INGEST_JOB_CONCURRENCY),
+            thread_name_prefix="ingest-job",
+        )
+        _SLOTS = threading.BoundedSemaphore(
+            max(1, config.INGEST_JOB_CONCURRENCY) + max(0, config.INGEST_JOB_QUEUE_MAX)
+        )
+        _HEARTBEAT_STOP.clear()
+        _HEARTBEAT = threading.Thread(target=_heartbeat_loop, name="ingest-job-lease", daemon=True)
+        _HEARTBEAT.start()
+
+    # jobs des workers morts (bail expiré) et leurs fichiers d'upload ; les
+    # jobs / uploads des autres workers vivants ne sont pas touchés
+    cleanup_stale_spools()
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            JobRepo.fail_orphans(cur, JOB_KIND, "Serveur redémarré pendant l'ingestion")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+    finally:
+        release_db_connection(conn)
+
+
+def shutdown_ingest_executor() -> None:
+    global _EXECUTOR, _SLOTS, _HEARTBEAT
+    with _LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        _EXECUTOR = None
+        _SLOTS = None
+        _HEARTBEAT_STOP.set()
+        _HEARTBEAT = None
+    shutdown_pdf_workers()     # pool de l'extraction parallèle (créé au premier ingest)
+
+
+def _write_job(fn, job_id: int, *args) -> None:
+    """Écriture ai.jobs sur sa propre connexion (hors transaction d'ingestion)."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            fn(cur, job_id, *args)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_db_connection(conn)
+
+
+class _JobProgress:
+    """Callback de progression, écritures DB limitées à ~1/s par job."""
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self._last_write = 0.0
+        self._last_stage: Optional[str] = None
+
+    def __call__(self, stage: str, done: int, total: int) -> None:
+        now = time.monotonic()
+        last_page = total > 0 and done >= total
+        if stage == self._last_stage and not last_page and now - self._last_write < PROGRESS_MIN_INTERVAL_S:
+            return
+        self._last_stage = stage
+        self._last_write = now
+        pct = round(100.0 * done / total, 1) if total else 0.0
+        try:
+            _write_job(JobRepo.update_progress, self.job_id, {
+                "stage": stage,
+                "page": int(done),
+                "pages_total": int(total),
+                "pct": pct,
+            })
+        except Exception:
+            # la progression ne doit jamais faire échouer l'ingestion
+            traceback.print_exc()
+
+
+def _run_ingest_job(
+    job_id: int,
+    pdf_file: SpooledPdf,
+    params: Dict[str, Any],
+    manual_slide_media: List[Tuple[int, bytes, str]],
+) -> None:
+    analysis = None
+    conn = None
+    profiler = None
+    try:
+        _write_job(JobRepo.mark_running, job_id)
+        progress = _JobProgress(job_id)
+
+        analysis = pdf_file.open_analysis()
+        profiler = IngestProfiler(label=f"job-{job_id}").start() if config.INGEST_PROFILE else None
+        with (profiler.activate() if profiler else nullcontext()), profile_stage("classify"):
+            info = _inspect_pdf_type(analysis=analysis)
+        slide_mode_flag = decide_slide_mode(info, params.get("force_slide"))
+        doc_mode = "SLIDE" if slide_mode_flag else "CLASSIC"
+        progress("classify", 0, len(analysis))
+
+        conn = get_db_connection()
+        res = ingest_pdf_to_db(
+            pdf_file=pdf_file,
+            conn=conn,
+            original_filename=params.get("filename"),
+            course_title=params.get("title"),
+            ue_id=params.get("ue_id"),
+            description=params.get("description") or "",
+            semester=params.get("semester"),
+            ects=params.get("ects"),
+            year=params.get("year"),
+            create_course=bool(params.get("create_course")),
+            create_sections=bool(params.get("create_sections")),
+            doc_mode=doc_mode,
+            slide_mode=slide_mode_flag,
+            manual_slide_media=manual_slide_media,
+            extract_text_filtered_from_bytes=extract_text_filtered_from_bytes,
+            extract_images=extract_images,
+            get_embedded_image_rects_by_page=get_embedded_image_rects_by_page,
+            analysis=analysis,
+            profiler=profiler,
+            progress=progress,
+            previous_source_id=params.get("previous_source_id"),
+        )
+
+        result = asdict(res)
+        result.update({
+            "doc_mode": doc_mode,
+            "ue_id": params.get("ue_id"),
+            "manual_images_received": len(manual_slide_media),
+        })
+        _write_job(JobRepo.mark_done, job_id, result)
+
+    except Exception as e:
+        traceback.print_exc()
+        detail = getattr(e, "detail", None) or str(e) or e.__class__.__name__
+        try:
+            _write_job(JobRepo.mark_error, job_id, str(detail))
+        except Exception:
+            traceback.print_exc()
+    finally:
+        if profiler is not None:
+            profiler.finish()
+        if analysis is not None:
+            analysis.close()
+        if conn is not None:
+            release_db_connection(conn)
+        pdf_file.cleanup()
+        if _SLOTS is not None:
+            _SLOTS.release()
+
+
+def submit_ingest_job(
+    pdf_file: SpooledPdf,
+    params: Dict[str, Any],
+    manual_slide_media: Optional[List[Tuple[int, bytes, str]]] = None,
+) -> int:
+    """
+    Crée le job (status 'queued') et le place dans le pool.
+    Lève IngestQueueFull si la file est pleine. Le job devient propriétaire
+    de `pdf_file` (supprimé en fin de job, ou ici si la soumission échoue).
+    """
+    if _EXECUTOR is None or _SLOTS is None:
+        pdf_file.cleanup()
+        raise RuntimeError("Ingest executor not ready")
+    if not _SLOTS.acquire(blocking=False):
+        pdf_file.cleanup()
+        raise IngestQueueFull("File d'ingestion pleine, réessayer plus tard.")
+
+    try:
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                # le payload ne garde que les métadonnées (pas les bytes)
+                job_id = JobRepo.create_job(cur, kind=JOB_KIND, payload={
+                    **params,
+                    "size_bytes": pdf_file.size,
+                    "manual_images": len(manual_slide_media or []),
+                }, worker_id=worker_id(), lease_s=_lease_s())
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            release_db_connection(conn)
+
+        _EXECUTOR.submit(_run_ingest_job, job_id, pdf_file, params, list(manual_slide_media or []))
+        return job_id
+    except Exception:
+        _SLOTS.release()
+        pdf_file.cleanup()
+        raise
+
+
+def get_ingest_job(job_id: int) -> Optional[Dict[str, Any]]:
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            job = JobRepo.get_job(cur, job_id)
+        if job is None or job.get("kind") != JOB_KIND:
+            return None
+        return job
+    finally:
+        release_db_connection(conn)
@@ -0,0 +1,39 @@
+from __future__ import annotations
+from typing import Dict, Optional
+import traceback
+
+from database.connection import get_db_connection, release_db_connection
+from utils.media_dedup import purge_orphan_blobs, delete_store_keys, sweep_unreferenced_store_keys
+
+# ===================================================================
+# PURGE DES BLOBS D'IMAGES ORPHELINS (academics.media_blobs)
+# ===================================================================
+# Un blob n'est supprimé que si plus aucun page_media_assets ne le
+# référence (ref_count = 0, relu sous verrou). Les fichiers du blob store
+# sont effacés après commit, et seulement s'ils ne servent plus ailleurs.
+# Puis balayage du store : fichiers écrits par une ingestion annulée
+# (aucune ligne ne les référence), après BLOB_STORE_SWEEP_GRACE_MIN.
+
+
+def purge_orphan_media_blobs(max_batches: Optional[int] = 20) -> Dict[str, int]:
+    blobs_deleted = files_deleted = swept = batches = 0
+    conn = get_db_connection()
+    try:
+        while max_batches is None or batches < max_batches:
+            with conn.cursor() as cur:
+                n, keys = purge_orphan_blobs(cur)
+            conn.commit()
+            batches += 1
+            blobs_deleted += n
+            files_deleted += delete_store_keys(keys)
+            if n == 0:
+                break
+        with conn.cursor() as cur:
+            swept = len(sweep_unreferenced_store_keys(cur))
+        conn.commit()
+    except Exception:
+        traceback.print_exc()
+        conn.rollback()
+    finally:
+        release_db_connection(conn)
+    return {"blobs_deleted": blobs_deleted, "files_deleted": files_deleted, "files_swept": swept}
@@ -0,0 +1,204 @@
+from __future__ import annotations
+from typing import Callable, Dict, Iterator, Optional, Tuple
+import re
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from core import config
+from core.media_repo import MediaRepo
+from database.connection import connection, get_db_connection, release_db_connection
+from utils.blob_store import get_blob_store
+
+# ===================================================================
+# DIFFUSION BINAIRE (médias de page, PDF sources)
+# ===================================================================
+# StreamingResponse par blocs fixes, Range (une plage), ETag basé sur le
+# md5 stocké (304 sur If-None-Match) et Cache-Control long : le contenu
+# d'un id ne change jamais (md5 = identité du contenu).
+
+_RANGE_RE = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$", re.IGNORECASE)
+
+ChunkReader = Callable[[int, int], Iterator[bytes]]
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def stream_chunk_size() -> int:
+    return max(4, config.MEDIA_STREAM_CHUNK_KB) * 1024
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    'bytes=a-b' / 'bytes=a-' / 'bytes=-n' -> (start, end) inclus.
+    None = pas de Range exploitable (plages multiples, syntaxe inconnue) -> 200.
+    """
+    if not header:
+        return None
+    if "," in header:
+        return None
+    m = _RANGE_RE.match(header)
+    if not m:
+        return None
+    a, b = m.group(1), m.group(2)
+    if a == "" and b == "":
+        return None
+    if a == "":
+        n = int(b)
+        if n <= 0 or size <= 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - n), size - 1
+    start = int(a)
+    end = int(b) if b != "" else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match : comparaison faible, liste séparée par des virgules ou '*'."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    bare = etag.strip('"')
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"') == bare:
+            return True
+    return False
+
+
+def binary_response(
+    request: Request,
+    *,
+    size: int,
+    etag: Optional[str],
+    media_type: str,
+    reader: ChunkReader,
+    filename: Optional[str] = None,
+) -> Response:
+    headers: Dict[str, str] = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"public, max-age={config.MEDIA_CACHE_MAX_AGE}, immutable",
+    }
+    if etag:
+        headers["ETag"] = f'"{etag}"'
+    if filename:
+        headers["Content-Disposition"] = f'inline; filename="{filename}"'
+
+    if etag and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    # If-Range : la plage n'est honorée que si la version n'a pas changé
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and not (etag and etag_matches(if_range, etag)):
+        range_header = None
+
+    try:
+        rng = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    if rng is None:
+        status, start, end = 200, 0, size - 1
+    else:
+        status, (start, end) = 206, rng
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(max(0, end - start + 1))
+
+    if request.method == "HEAD" or size <= 0:
+        return Response(status_code=status, headers=headers, media_type=media_type)
+    return StreamingResponse(reader(start, end), status_code=status, headers=headers, media_type=media_type)
+
+
+# ---------------------------------------------------------------------
+# Lecteurs par blocs (BYTEA en base ou blob store)
+# ---------------------------------------------------------------------
+def _db_reader(read_chunk, key: int) -> ChunkReader:
+    """
+    Lit [start, end] par substring() successifs, une connexion du pool par
+    bloc : un client lent ne garde pas une connexion pendant tout le transfert.
+    (Contenus avec path : blob store, sans connexion, cf. _store_reader.)
+    """
+    def reader(start: int, end: int) -> Iterator[bytes]:
+        chunk = stream_chunk_size()
+        pos = start
+        while pos <= end:
+            with connection() as conn, conn.cursor() as cur:
+                buf = read_chunk(cur, key, pos, min(chunk, end - pos + 1))
+            if not buf:
+                break
+            pos += len(buf)
+            yield buf
+    return reader
+
+
+def _store_reader(path: str) -> Tuple[int, ChunkReader]:
+    store = get_blob_store()
+    if store is None:
+        raise HTTPException(status_code=500, detail="Blob externe mais BLOB_STORE_BACKEND=db")
+    try:
+        size = store.size(path)
+    except (FileNotFoundError, ValueError):
+        raise HTTPException(status_code=404, detail="Contenu introuvable")
+
+    def reader(start: int, end: int) -> Iterator[bytes]:
+        return store.iter_chunks(path, start, end, chunk_size=stream_chunk_size())
+    return size, reader
+
+
+def _load_meta(fn, key: int):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            return fn(cur, key)
+    finally:
+        release_db_connection(conn)
+
+
+def stream_page_media(request: Request, media_id: int) -> Response:
+    meta = _load_meta(MediaRepo.get_page_media_meta, media_id)
+    if not meta:
+        raise HTTPException(status_code=404, detail="Média introuvable")
+
+    if meta.get("path"):
+        size, reader = _store_reader(meta["path"])
+    else:
+        size = int(meta.get("size") or 0)
+        reader = _db_reader(MediaRepo.read_page_media_chunk, media_id)
+
+    return binary_response(
+        request,
+        size=size,
+        etag=meta.get("md5"),
+        media_type=meta.get("mime") or "application/octet-stream",
+        reader=reader,
+    )
+
+
+def stream_source_pdf(request: Request, source_id: int) -> Response:
+    meta = _load_meta(MediaRepo.get_source_file_meta, source_id)
+    if not meta:
+        raise HTTPException(status_code=404, detail="PDF source introuvable")
+
+    if meta.get("path"):
+        size, reader = _store_reader(meta["path"])
+    else:
+        size = int(meta.get("size") or 0)
+        reader = _db_reader(MediaRepo.read_source_file_chunk, source_id)
+
+    return binary_response(
+        request,
+        size=size,
+        etag=meta.get("md5"),
+        media_type="application/pdf",
+        reader=reader,
+        filename=f"source-{source_id}.pdf",
+    )
@@ -0,0 +1,202 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+from io import BytesIO
+import os
+import threading
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from PIL import Image, features
+
+from core import config
+from core.media_repo import MediaRepo
+from database.connection import get_db_connection, release_db_connection
+from utils.blob_store import load_blob
+from utils.disk_cache import DiskLRUCache
+from api.services.service_media.media_stream_service import binary_response, stream_chunk_size
+
+# ===================================================================
+# VARIANTES D'IMAGES (miniatures, WebP / AVIF) À LA DEMANDE
+# ===================================================================
+# Premier appel : décodage de l'original, réduction à la largeur demandée
+# (jamais d'agrandissement), encodage, écriture dans le cache disque LRU
+# et enregistrement dans media.asset_variants. Appels suivants : fichier
+# servi depuis le cache (Range / ETag / 304 comme l'original). Les fichiers
+# évincés par le LRU perdent leur ligne asset_variants dans la même
+# transaction ; la variante est régénérée au prochain appel.
+
+FORMATS: Dict[str, Tuple[str, str]] = {
+    # fmt -> (format Pillow, mime)
+    "webp": ("WEBP", "image/webp"),
+    "avif": ("AVIF", "image/avif"),
+    "png": ("PNG", "image/png"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+_CACHE: Optional[DiskLRUCache] = None
+_CACHE_LOCK = threading.Lock()
+# verrous par tranche de clés (nombre fixe, pas un verrou par variante
+# conservé indéfiniment) : deux clés de la même tranche se sérialisent
+_KEY_LOCK_STRIPES = 64
+_KEY_LOCKS = [threading.Lock() for _ in range(_KEY_LOCK_STRIPES)]
+
+
+def get_variant_cache() -> DiskLRUCache:
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = DiskLRUCache(config.VARIANT_CACHE_DIR, config.VARIANT_CACHE_MAX_MB * 1024 * 1024)
+    return _CACHE
+
+
+def _key_lock(key: str) -> threading.Lock:
+    # une seule génération par variante, même avec des requêtes simultanées
+    return _KEY_LOCKS[hash(key) % _KEY_LOCK_STRIPES]
+
+
+def _resolve_width(w: Optional[int]) -> Optional[int]:
+    """Largeur demandée -> plus petite largeur autorisée >= w (clés de cache bornées)."""
+    if w is None or w <= 0:
+        return None
+    widths = sorted(config.VARIANT_WIDTHS)
+    if not widths:
+        return None
+    for allowed in widths:
+        if allowed >= w:
+            return allowed
+    return widths[-1]
+
+
+def _resolve_format(fmt: Optional[str]) -> str:
+    fmt = (fmt or "webp").strip().lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=422, detail=f"Format non supporté: {fmt!r}")
+    if fmt in ("webp", "avif") and not features.check(fmt):
+        raise HTTPException(status_code=422, detail=f"Format {fmt} indisponible sur ce serveur")
+    return fmt
+
+
+def variant_key(width: Optional[int], fmt: str) -> str:
+    return f"w{width or 0}.{fmt}"
+
+
+def render_variant(src: bytes, width: Optional[int], fmt: str, quality: int) -> Tuple[bytes, int, int]:
+    pil_format, _mime = FORMATS[fmt]
+    with Image.open(BytesIO(src)) as img:
+        img.load()
+        if width and img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.LANCZOS)
+        if fmt == "jpeg" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA", "L", "LA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+        out = BytesIO()
+        opts = {}
+        if fmt in ("webp", "avif", "jpeg"):
+            opts["quality"] = quality
+        if fmt == "webp":
+            opts["method"] = 4
+        if fmt == "png":
+            opts["optimize"] = True
+        img.save(out, format=pil_format, **opts)
+        return out.getvalue(), img.width, img.height
+
+
+def _generate(media_id: int, width: Optional[int], fmt: str, cache_key: str) -> str:
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            media = MediaRepo.get_page_media_content(cur, media_id)
+            if not media:
+                raise HTTPException(status_code=404, detail="Média introuvable")
+            src = load_blob(media.get("data"), media.get("path"))
+            if not src:
+                raise HTTPException(status_code=404, detail="Contenu introuvable")
+
+            try:
+                data, w, h = render_variant(src, width, fmt, config.VARIANT_QUALITY)
+            except Exception as e:
+                raise HTTPException(status_code=422, detail=f"Image illisible: {e}")
+            evicted: List[str] = []
+            path = get_variant_cache().put(cache_key, data, evicted=evicted)
+            MediaRepo.delete_variants_by_storage_keys(cur, [f"variant_cache/{k}" for k in evicted])
+
+            asset_id = MediaRepo.ensure_page_media_asset(cur, media, bytes_size=len(src))
+            MediaRepo.upsert_variant(
+                cur,
+                asset_id=asset_id,
+                variant_key=variant_key(width, fmt),
+                storage_key=f"variant_cache/{cache_key}",
+                mime_type=FORMATS[fmt][1],
+                width_px=w,
+                height_px=h,
+            )
+        conn.commit()
+        return path
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_db_connection(conn)
+
+
+def stream_page_media_variant(request: Request, media_id: int,
+                              width: Optional[int], fmt: Optional[str]) -> Response:
+    fmt = _resolve_format(fmt)
+    width = _resolve_width(width)
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            meta = MediaRepo.get_page_media_meta(cur, media_id)
+    finally:
+        release_db_connection(conn)
+    if not meta:
+        raise HTTPException(status_code=404, detail="Média introuvable")
+
+    # clé de cache = contenu (md5) + variante : partagée entre médias identiques
+    vkey = variant_key(width, fmt)
+    cache_key = f"{meta['md5']}-{vkey}"
+    cache = get_variant_cache()
+
+    path = cache.get(cache_key)
+    if path is None:
+        with _key_lock(cache_key):
+            path = cache.get(cache_key) or _generate(media_id, width, fmt, cache_key)
+
+    # fichier ouvert tout de suite : une éviction concurrente ne casse pas le flux
+    try:
+        f = open(path, "rb")
+    except OSError:
+        raise HTTPException(status_code=503, detail="Variante évincée, réessayer")
+    size = os.fstat(f.fileno()).st_size
+
+    def reader(start: int, end: int):
+        chunk = stream_chunk_size()
+        try:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                buf = f.read(min(chunk, remaining))
+                if not buf:
+                    break
+                remaining -= len(buf)
+                yield buf
+        finally:
+            f.close()
+
+    resp = binary_response(
+        request,
+        size=size,
+        etag=f"{meta['md5']}-{vkey}",
+        media_type=FORMATS[fmt][1],
+        reader=reader,
+    )
+    if not isinstance(resp, StreamingResponse):
+        f.close()
+    return resp
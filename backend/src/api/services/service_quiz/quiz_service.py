@@ -2,9 +2,9 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 import random
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 
-from core.quiz_repo import QuizRepo
+from core.quiz_repo import QuizRepo, QuizRepoAsync
 
 
 def _norm_str (v: Any) -> str:
@@ -88,6 +88,35 @@ def grade_item(item: Dict[str, Any], student_answers: Dict[str, Any]) -> Tuple[O
 
 
 
+# Contrôles d'une réponse (communs à QuizService et QuizServiceAsync)
+def _check_attempt_open(attempt: Optional[Dict[str, Any]]) -> None:
+    if not attempt:
+        raise ValueError("attempt not found")
+    if attempt.get("finished_at"):
+        raise ValueError("attempt already finished")
+
+
+def _check_attempt_not_expired(attempt: Dict[str, Any], quiz: Optional[Dict[str, Any]]) -> None:
+    if quiz and quiz.get("duration_sec") and attempt.get("started_at"):
+        deadline = attempt["started_at"] + timedelta(seconds=int(quiz["duration_sec"]))
+        if datetime.now(timezone.utc) > deadline:
+            raise ValueError("attempt expired")
+
+
+def _check_item_in_attempt(item: Optional[Dict[str, Any]], attempt: Dict[str, Any]) -> None:
+    if not item:
+        raise ValueError("item not found")
+    if int(item.get("quiz_id")) != int(attempt.get("quiz_id")):
+        raise ValueError("item not in this quiz")
+
+
+def _answer_feedback(item: Dict[str, Any], is_correct: Optional[bool], details: Dict[str, Any]) -> Dict[str, Any]:
+    feedback: Dict[str, Any] = {"is_correct": is_correct, "details": details}
+    if is_correct is False and item.get("explication_md"):
+        feedback["explication_md"] = item.get("explication_md")
+    return feedback
+
+
 @dataclass
 class AttemptStartResult:
     attempt: Dict[str, Any]
@@ -185,24 +214,11 @@ class QuizService:
     def answer_item(self, attempt_id: int, item_id: int, answers_json: Dict[str, Any]) -> Dict[str, Any]:
         with self.conn.cursor() as cur:
             attempt = QuizRepo.get_attempt(cur, attempt_id)
-            if not attempt:
-                raise ValueError("attempt not found")
-            if attempt.get("finished_at"):
-                raise ValueError("attempt already finished")
-
-     
+            _check_attempt_open(attempt)
             quiz = QuizRepo.get_quiz(cur, int(attempt["quiz_id"]))
-            if quiz and quiz.get("duration_sec") and attempt.get("started_at"):
-                deadline = attempt["started_at"] + timedelta(seconds=int(quiz["duration_sec"]))
-                from datetime import datetime, timezone
-                if datetime.now(timezone.utc) > deadline:
-                    raise ValueError("attempt expired")
-
+            _check_attempt_not_expired(attempt, quiz)
             item = QuizRepo.get_item(cur, item_id)
-            if not item:
-                raise ValueError("item not found")
-            if int(item.get("quiz_id")) != int(attempt.get("quiz_id")):
-                raise ValueError("item not in this quiz")
+            _check_item_in_attempt(item, attempt)
 
             is_correct, details = grade_item(item, answers_json)
             saved = QuizRepo.upsert_answer(
@@ -213,11 +229,7 @@ class QuizService:
                 is_correct=is_correct,
             )
 
-            feedback: Dict[str, Any] = {"is_correct": is_correct, "details": details}
-            if is_correct is False and item.get("explication_md"):
-                feedback["explication_md"] = item.get("explication_md")
-
-        return {"answer": saved, "feedback": feedback}
+        return {"answer": saved, "feedback": _answer_feedback(item, is_correct, details)}
 
     def finish_attempt(self, attempt_id: int) -> Dict[str, Any]:
         with self.conn.cursor() as cur:
@@ -248,4 +260,31 @@ class QuizService:
                 pm = float(pass_mark)
                 passed = (score_raw / score_max) >= pm if pm <= 1.0 else score_raw >= pm
 
-        return {"attempt": finished, "score_raw": score_raw, "score_max": score_max, "passed": passed}
\ No newline at end of file
+        return {"attempt": finished, "score_raw": score_raw, "score_max": score_max, "passed": passed}
+
+
+class QuizServiceAsync:
+    """Chemin de réponse sur le pool async (connexion psycopg 3)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def answer_item(self, attempt_id: int, item_id: int, answers_json: Dict[str, Any]) -> Dict[str, Any]:
+        async with self.conn.cursor() as cur:
+            attempt = await QuizRepoAsync.get_attempt(cur, attempt_id)
+            _check_attempt_open(attempt)
+            quiz = await QuizRepoAsync.get_quiz(cur, int(attempt["quiz_id"]))
+            _check_attempt_not_expired(attempt, quiz)
+            item = await QuizRepoAsync.get_item(cur, item_id)
+            _check_item_in_attempt(item, attempt)
+
+            is_correct, details = grade_item(item, answers_json)
+            saved = await QuizRepoAsync.upsert_answer(
+                cur,
+                attempt_id=attempt_id,
+                item_id=item_id,
+                answers_json=answers_json,
+                is_correct=is_correct,
+            )
+
+        return {"answer": saved, "feedback": _answer_feedback(item, is_correct, details)}
@@ -1,26 +1,7 @@
 from __future__ import annotations
 from typing import Any, Dict, List, Optional, Tuple
 from core.revision_repo import RevisionRepo
-
-def _fetchone_dict(cur) -> Optional[Dict[str, Any]]:
-    row = cur.fetchone()
-    if row is None:
-        return None
-    if isinstance(row, dict):
-        return row
-    cols = [d.name if hasattr(d, "name") else d[0] for d in cur.description]
-    return dict(zip(cols, row))
-
-
-def _fetchall_dict(cur) -> List[Dict[str, Any]]:
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    if isinstance(rows[0], dict):
-        return rows
-    cols = [d.name if hasattr(d, "name") else d[0] for d in cur.description]
-    return [dict(zip(cols, r)) for r in rows]
-
+from database.rows import fetchone_dict, fetchall_dict
 
 
      
@@ -44,7 +25,7 @@ class RevisionService:
                 """,
                 (sheet_id,),
             )
-            sheet = _fetchone_dict(cur)
+            sheet = fetchone_dict(cur)
             if sheet is None:
                 raise ValueError("sheet not found")
 
@@ -60,7 +41,7 @@ class RevisionService:
                 """,
                 (sheet_id,),
             )
-            items = _fetchall_dict(cur)
+            items = fetchall_dict(cur)
 
             # Assets
             cur.execute(
@@ -76,7 +57,7 @@ class RevisionService:
                 """,
                 (sheet_id,),
             )
-            assets = _fetchall_dict(cur)
+            assets = fetchall_dict(cur)
 
         # Groupement items
         blocks: Dict[str, List[Dict[str, Any]]] = {}
@@ -2,7 +2,7 @@ from __future__ import annotations
 from typing import Any, Dict, Optional
 from datetime import datetime, timedelta, timezone
 
-from core.revision_srs_repo import RevisionSrsRepo
+from core.revision_srs_repo import RevisionSrsRepo, RevisionSrsRepoAsync
 
 
 def _now_utc() -> datetime:
@@ -29,6 +29,17 @@ def _sm2(interval_days: int, ease_factor: float, repetitions: int, quality: int)
 
     return interval_days, ef, repetitions
 
+def _next_schedule(schedule: Dict[str, Any], quality: int):
+    """Planning courant + note => (intervalle, facteur, répétitions, échéance)."""
+    new_interval, new_ef, new_rep = _sm2(
+        int(schedule["interval_days"]),
+        float(schedule["ease_factor"]),
+        int(schedule["repetitions"]),
+        quality,
+    )
+    return new_interval, new_ef, new_rep, _now_utc() + timedelta(days=new_interval)
+
+
 class RevisionSrsService:
     def __init__(self, conn):
         self.conn = conn
@@ -80,12 +91,7 @@ class RevisionSrsService:
                     due_at_iso=_now_utc().isoformat(),
                 )
 
-            interval_days = int(schedule["interval_days"])
-            ease_factor = float(schedule["ease_factor"])
-            repetitions = int(schedule["repetitions"])
-
-            new_interval, new_ef, new_rep = _sm2(interval_days, ease_factor, repetitions, quality)
-            due_at = _now_utc() + timedelta(days=new_interval)
+            new_interval, new_ef, new_rep, due_at = _next_schedule(schedule, quality)
 
             review_id = RevisionSrsRepo.insert_review(cur, user_id, flashcard_id, quality, meta or {})
             new_schedule = RevisionSrsRepo.upsert_schedule(
@@ -102,4 +108,46 @@ class RevisionSrsService:
 
     def stats(self, user_id: int) -> Dict[str, Any]:
         with self.conn.cursor() as cur:
-            return RevisionSrsRepo.stats_7d(cur, user_id)
\ No newline at end of file
+            return RevisionSrsRepo.stats_7d(cur, user_id)
+
+
+class RevisionSrsServiceAsync:
+    """File du jour et notation SRS sur le pool async (connexion psycopg 3)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def due(self, user_id: int, limit: int = 20) -> Dict[str, Any]:
+        async with self.conn.cursor() as cur:
+            items = await RevisionSrsRepoAsync.list_due(cur, user_id, limit)
+            return {"items": items, "due_count": len(items)}
+
+    async def review(self, user_id: int, flashcard_id: int, quality: int, meta: Dict[str, Any]) -> Dict[str, Any]:
+        async with self.conn.cursor() as cur:
+            schedule = await RevisionSrsRepoAsync.get_schedule(cur, user_id, flashcard_id)
+            if schedule is None:
+                # lazy init : dû maintenant
+                schedule = await RevisionSrsRepoAsync.upsert_schedule(
+                    cur,
+                    user_id=user_id,
+                    flashcard_id=flashcard_id,
+                    interval_days=1,
+                    ease_factor=2.5,
+                    repetitions=0,
+                    due_at_iso=_now_utc().isoformat(),
+                )
+
+            new_interval, new_ef, new_rep, due_at = _next_schedule(schedule, quality)
+
+            review_id = await RevisionSrsRepoAsync.insert_review(cur, user_id, flashcard_id, quality, meta or {})
+            new_schedule = await RevisionSrsRepoAsync.upsert_schedule(
+                cur,
+                user_id=user_id,
+                flashcard_id=flashcard_id,
+                interval_days=new_interval,
+                ease_factor=new_ef,
+                repetitions=new_rep,
+                due_at_iso=due_at.isoformat(),
+            )
+
+            return {"review_id": review_id, "schedule": new_schedule}
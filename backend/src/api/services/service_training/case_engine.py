@@ -1,25 +1,79 @@
-from typing import Dict, Any, Optional
-from core.case_repo import CaseRepo
+from typing import Dict, Any, List, Optional, Tuple
+from core.case_repo import CaseRepo, CaseRepoAsync
 from utils.case_scoring import compute_case_score
 from fastapi import HTTPException
+from database.rows import as_dicts
+
+# -------------------------------------------------------------------
+# Règles de réponse à une étape (communes à CaseEngineService et
+# CaseEngineServiceAsync : seules les lectures / écritures diffèrent)
+# -------------------------------------------------------------------
+def _check_step_answer(att: Optional[Dict[str, Any]], step: Optional[Dict[str, Any]],
+                       payload: Dict[str, Any]) -> Tuple[str, Any, Any, bool]:
+    """-> (step_type, selected_choice_id, free_answer_text, choix à corriger ?)"""
+    if not att:
+        raise ValueError("Tentative introuvable")
+    if not step:
+        raise ValueError("Étape introuvable")
+
+    # ✅ Cohérence: l'étape doit appartenir au cas de la tentative
+    if int(step["case_id"]) != int(att["case_id"]):
+        raise ValueError("Cette étape n'appartient pas à ce cas clinique.")
+
+    step_type = (step.get("step_type") or "").upper()
+    selected_choice_id = payload.get("selected_choice_id")
+    free_answer_text = payload.get("free_answer_text")
+
+    if step_type == "MCQ":
+        if not selected_choice_id:
+            raise ValueError("selected_choice_id est requis pour un QCM.")
+        return step_type, selected_choice_id, free_answer_text, True
+
+    if step_type in ("FREE", "CALC", "DECISION"):
+        # Pour l'instant: sans règle métier stockée en DB, on ne peut pas “corriger” un FREE/CALC proprement.
+        # Donc: on enregistre la réponse, et is_correct reste False par défaut,
+        # sauf si tu ajoutes une mécanique dans metadata (recommandé).
+        if (free_answer_text is None or str(free_answer_text).strip() == "") and not selected_choice_id:
+            raise ValueError("Réponse requise (free_answer_text ou selected_choice_id).")
+        # Si DECISION en QCM => même logique que MCQ
+        return step_type, selected_choice_id, free_answer_text, bool(step_type == "DECISION" and selected_choice_id)
+
+    raise ValueError(f"step_type non supporté: {step_type}")
+
+
+def _grade_choice(choice: Optional[Dict[str, Any]], step_id: int) -> Tuple[bool, Optional[str]]:
+    if not choice or int(choice["step_id"]) != int(step_id):
+        raise ValueError("Choix invalide pour cette étape.")
+    return bool(choice["is_correct"]), choice.get("feedback_md")
+
+
+def _next_unanswered_step(steps: List[Dict[str, Any]], answers: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    answered_step_ids = {a["step_id"] for a in answers}
+    for s in steps:
+        if s["id"] not in answered_step_ids:
+            return s
+    return None
+
+
+def _hydrated_step(step_row: Dict[str, Any], choices: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "id": step_row["id"],
+        "case_id": step_row["case_id"],
+        "position": step_row["position"],
+        "prompt_md": step_row["prompt_md"],
+        "step_type": step_row["step_type"],
+        "choices": [
+            {
+                "id": c["id"],
+                "position": c["position"],
+                "label": c["label"],
+                # On ne renvoie PAS is_correct au client (sinon triche)
+                "feedback_md": c.get("feedback_md"),
+            }
+            for c in choices
+        ],
+    }
 
-def _to_dict(cur, row):
-    """Supporte cursor dict OU tuple."""
-    if row is None:
-        return None
-    if isinstance(row, dict):
-        return row
-    cols = [d[0] for d in cur.description] if cur.description else []
-    return dict(zip(cols, row))
-
-
-def _to_dicts(cur, rows):
-    if not rows:
-        return []
-    if isinstance(rows[0], dict):
-        return rows
-    cols = [d[0] for d in cur.description] if cur.description else []
-    return [dict(zip(cols, r)) for r in rows]
 
 class CaseEngineService:
     def __init__(self, conn):
@@ -91,59 +145,15 @@ class CaseEngineService:
         """
         with self.conn.cursor() as cur:
             att = CaseRepo.get_attempt(cur, attempt_id)
-            if not att:
-                raise ValueError("Tentative introuvable")
-
-            step = CaseRepo.get_step(cur, step_id)
-            if not step:
-                raise ValueError("Étape introuvable")
-
-            # ✅ Cohérence: l'étape doit appartenir au cas de la tentative
-            if int(step["case_id"]) != int(att["case_id"]):
-                raise ValueError("Cette étape n'appartient pas à ce cas clinique.")
-
-            # Optionnel: empêcher de répondre 2 fois
-            # existing = CaseRepo.get_answer(cur, attempt_id=attempt_id, step_id=step_id)
-            # if existing: raise ValueError("Étape déjà répondue")
-
-            step_type = (step.get("step_type") or "").upper()
-            selected_choice_id = payload.get("selected_choice_id")
-            free_answer_text = payload.get("free_answer_text")
+            step = CaseRepo.get_step(cur, step_id) if att else None
+            step_type, selected_choice_id, free_answer_text, needs_choice = _check_step_answer(att, step, payload)
 
             # Correction
             is_correct = False
             feedback_md = None
-
-            if step_type == "MCQ":
-                if not selected_choice_id:
-                    raise ValueError("selected_choice_id est requis pour un QCM.")
+            if needs_choice:
                 choice = CaseRepo.get_choice(cur, int(selected_choice_id))
-                if not choice or int(choice["step_id"]) != int(step_id):
-                    raise ValueError("Choix invalide pour cette étape.")
-                is_correct = bool(choice["is_correct"])
-                feedback_md = choice.get("feedback_md")
-
-            elif step_type in ("FREE", "CALC", "DECISION"):
-                # Pour l'instant: sans règle métier stockée en DB, on ne peut pas “corriger” un FREE/CALC proprement.
-                # Donc: on enregistre la réponse, et is_correct reste False par défaut,
-                # sauf si tu ajoutes une mécanique dans metadata (recommandé).
-                if (free_answer_text is None or str(free_answer_text).strip() == "") and not selected_choice_id:
-                    raise ValueError("Réponse requise (free_answer_text ou selected_choice_id).")
-
-                # Si DECISION en QCM => même logique que MCQ
-                if step_type == "DECISION" and selected_choice_id:
-                    choice = CaseRepo.get_choice(cur, int(selected_choice_id))
-                    if not choice or int(choice["step_id"]) != int(step_id):
-                        raise ValueError("Choix invalide pour cette étape.")
-                    is_correct = bool(choice["is_correct"])
-                    feedback_md = choice.get("feedback_md")
-
-                # Sinon: on laisse is_correct = False (à upgrader avec metadata / IA)
-                # Tu peux aussi décider is_correct=True par défaut pour FREE (validation manuelle).
-                # is_correct = False
-
-            else:
-                raise ValueError(f"step_type non supporté: {step_type}")
+                is_correct, feedback_md = _grade_choice(choice, step_id)
 
             # Persist answer
             answer_id = CaseRepo.insert_or_update_answer(
@@ -168,13 +178,7 @@ class CaseEngineService:
             # step suivant
             steps = CaseRepo.list_steps(cur, att["case_id"])
             answers = CaseRepo.list_answers(cur, attempt_id)
-            answered_step_ids = {a["step_id"] for a in answers}
-
-            next_step = None
-            for s in steps:
-                if s["id"] not in answered_step_ids:
-                    next_step = s
-                    break
+            next_step = _next_unanswered_step(steps, answers)
 
             next_step_hydrated = self._hydrate_step(cur, next_step) if next_step else None
 
@@ -192,25 +196,7 @@ class CaseEngineService:
     def _hydrate_step(self, cur, step_row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
         if not step_row:
             return None
-        step_id = step_row["id"]
-        choices = CaseRepo.list_choices(cur, step_id)
-        return {
-            "id": step_row["id"],
-            "case_id": step_row["case_id"],
-            "position": step_row["position"],
-            "prompt_md": step_row["prompt_md"],
-            "step_type": step_row["step_type"],
-            "choices": [
-                {
-                    "id": c["id"],
-                    "position": c["position"],
-                    "label": c["label"],
-                    # On ne renvoie PAS is_correct au client (sinon triche)
-                    "feedback_md": c.get("feedback_md"),
-                }
-                for c in choices
-            ],
-        }
+        return _hydrated_step(step_row, CaseRepo.list_choices(cur, step_row["id"]))
     
     def _enrich_step(self, cur, step: Dict[str, Any]) -> Dict[str, Any]:
         out = dict(step)
@@ -218,7 +204,7 @@ class CaseEngineService:
 
         if step_type == "MCQ":
             choices = CaseRepo.list_choices(cur, out["id"])
-            choices = _to_dicts(cur, choices)
+            choices = as_dicts(cur, choices)
 
             # On cache is_correct au client (sinon triche)
             out["choices"] = [
@@ -228,4 +214,58 @@ class CaseEngineService:
         else:
             out["choices"] = []
 
-        return out
\ No newline at end of file
+        return out
+
+
+class CaseEngineServiceAsync:
+    """Réponse à une étape sur le pool async (connexion psycopg 3, commit par l'appelant)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def answer_step(self, *, attempt_id: int, step_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+        async with self.conn.cursor() as cur:
+            att = await CaseRepoAsync.get_attempt(cur, attempt_id)
+            step = await CaseRepoAsync.get_step(cur, step_id) if att else None
+            step_type, selected_choice_id, free_answer_text, needs_choice = _check_step_answer(att, step, payload)
+
+            is_correct = False
+            feedback_md = None
+            if needs_choice:
+                choice = await CaseRepoAsync.get_choice(cur, int(selected_choice_id))
+                is_correct, feedback_md = _grade_choice(choice, step_id)
+
+            answer_id = await CaseRepoAsync.insert_or_update_answer(
+                cur,
+                attempt_id=attempt_id,
+                step_id=step_id,
+                selected_choice_id=selected_choice_id,
+                free_answer_text=free_answer_text,
+                is_correct=is_correct,
+            )
+
+            total_steps = await CaseRepoAsync.count_steps(cur, att["case_id"])
+            answered = await CaseRepoAsync.count_answers(cur, attempt_id)
+            correct = await CaseRepoAsync.count_correct_answers(cur, attempt_id)
+
+            completed = answered >= total_steps and total_steps > 0
+            score = (correct / total_steps) * 100 if total_steps else 0
+
+            await CaseRepoAsync.update_attempt_status(cur, attempt_id=attempt_id, score=score, completed=completed)
+
+            steps = await CaseRepoAsync.list_steps(cur, att["case_id"])
+            answers = await CaseRepoAsync.list_answers(cur, attempt_id)
+            next_step = _next_unanswered_step(steps, answers)
+            next_step_hydrated = (
+                _hydrated_step(next_step, await CaseRepoAsync.list_choices(cur, next_step["id"]))
+                if next_step else None
+            )
+
+        return {
+            "answer_id": answer_id,
+            "is_correct": is_correct,
+            "feedback_md": feedback_md,
+            "score": score,
+            "completed": completed,
+            "next_step": next_step_hydrated,
+        }
@@ -12,21 +12,6 @@ except Exception:
     DoseService = None
 
 
-def _row_to_dict_if_needed(row, cur=None):
-    """
-    Airbag : si row est un tuple, et qu'on a cur.description, on convertit.
-    Normalement inutile si TrainingRepo.get_exercise renvoie déjà un dict.
-    """
-    if row is None:
-        return None
-    if isinstance(row, dict):
-        return row
-    if cur is None or cur.description is None:
-        raise ValueError("Row tuple reçu sans description cursor (impossible de convertir).")
-    cols = [d.name if hasattr(d, "name") else d[0] for d in cur.description]
-    return dict(zip(cols, row))
-
-
 def build_feedback_items(error_codes: List[str], details: Dict[str, Any]) -> List[Dict[str, Any]]:
     mapping = {
         "MISSING_VALUE": (5, "Tu n’as pas renseigné de valeur. Mets un nombre puis recommence."),
@@ -0,0 +1,138 @@
+"""
+Classifieur slide / classic : mode "legacy" (20 premières pages,
+get_drawings systématique) vs mode "fast" (échantillon sur tout le
+document, signaux bon marché puis drawings si nécessaire).
+Corpus synthétique (PyMuPDF) : latence par document et accord des
+décisions (is_slide et decide_slide_mode).
+
+    cd backend/src && python -m bench.bench_classify [--repeat 3] [--scale 1.0]
+"""
+import argparse
+import random
+import time
+
+import fitz
+
+from utils.course import _inspect_pdf_type, decide_slide_mode
+from utils.pdf_analysis import PdfAnalysis
+
+A4 = (595, 842)
+WIDE = (960, 540)
+STD = (960, 720)
+
+WORDS = ("anatomie physiologie soins patient infirmier protocole dose posologie "
+         "surveillance clinique pansement asepsie perfusion évaluation douleur").split()
+
+
+# ------------------------------------------------------------------
+# Générateurs de pages
+# ------------------------------------------------------------------
+def _text(page, rng, n_words, size=10, top=60):
+    words = [rng.choice(WORDS) for _ in range(n_words)]
+    rect = fitz.Rect(40, top, page.rect.width - 40, page.rect.height - 30)
+    page.insert_textbox(rect, " ".join(words), fontsize=size)
+
+
+def _diagram(page, rng, n_paths, box=None):
+    box = box or fitz.Rect(60, 80, page.rect.width - 60, page.rect.height - 60)
+    for _ in range(n_paths):
+        x, y = rng.uniform(box.x0, box.x1 - 20), rng.uniform(box.y0, box.y1 - 20)
+        if rng.random() < 0.5:
+            page.draw_rect(fitz.Rect(x, y, x + rng.uniform(8, 60), y + rng.uniform(8, 40)),
+                           color=(0, 0, 0), fill=(rng.random(), rng.random(), 1))
+        else:
+            page.draw_line((x, y), (x + rng.uniform(-80, 80), y + rng.uniform(-60, 60)))
+
+
+def _scan(page, rng):
+    pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 600, 850), False)
+    pix.set_rect(pix.irect, (rng.randint(180, 250),))
+    page.insert_image(page.rect, pixmap=pix)
+
+
+def _doc(pages):
+    # clean=True : un flux de contenu par page, comme un PDF exporté
+    doc = fitz.open()
+    for size, fill in pages:
+        fill(doc.new_page(width=size[0], height=size[1]))
+    data = doc.tobytes(garbage=3, clean=True)
+    doc.close()
+    return data
+
+
+def build_corpus(scale: float = 1.0, seed: int = 11):
+    rng = random.Random(seed)
+    n = lambda k: max(4, int(k * scale))
+
+    def form_slides(count):
+        # diagrammes posés via Form XObject (show_pdf_page) : chemins hors du flux de page
+        src = fitz.open()
+        _diagram(src.new_page(width=WIDE[0], height=WIDE[1]), rng, 120)
+        doc = fitz.open()
+        for _ in range(count):
+            p = doc.new_page(width=WIDE[0], height=WIDE[1])
+            _text(p, rng, 160, size=9)
+            p.show_pdf_page(fitz.Rect(480, 270, 940, 530), src, 0)
+        data = doc.tobytes(garbage=3, clean=True)
+        doc.close()
+        src.close()
+        return data
+
+    return [
+        ("classic_text", _doc([(A4, lambda p: _text(p, rng, 420)) for _ in range(n(120))])),
+        ("classic_diagrams", _doc([(A4, lambda p: (_text(p, rng, 250), _diagram(p, rng, 150))) for _ in range(n(60))])),
+        ("scanned_a4", _doc([(A4, lambda p: _scan(p, rng)) for _ in range(n(40))])),
+        ("slides_sparse", _doc([(WIDE, lambda p: (_text(p, rng, 40, size=20), _diagram(p, rng, 12))) for _ in range(n(60))])),
+        ("slides_diagram_heavy", _doc([(WIDE, lambda p: (_text(p, rng, 150, size=9), _diagram(p, rng, 900))) for _ in range(n(40))])),
+        ("slides_text_heavy", _doc([(WIDE, lambda p: (_text(p, rng, 220, size=9), _diagram(p, rng, 2))) for _ in range(n(40))])),
+        ("slides_4_3_mixed", _doc([(STD, lambda p: (_text(p, rng, rng.choice((60, 200)), size=10), _diagram(p, rng, rng.choice((3, 40))))) for _ in range(n(50))])),
+        ("slides_forms", form_slides(n(30))),
+        ("handout_then_slides", _doc([(A4, lambda p: _text(p, rng, 380)) for _ in range(20)] +
+                                     [(WIDE, lambda p: (_text(p, rng, 50, size=18), _diagram(p, rng, 30))) for _ in range(n(80))])),
+    ]
+
+
+# ------------------------------------------------------------------
+# Mesure
+# ------------------------------------------------------------------
+def _timed(pdf_bytes: bytes, mode: str, repeat: int):
+    best, info = float("inf"), None
+    for _ in range(repeat):
+        # document rouvert à chaque passe : pas de cache de page d'une mesure à l'autre
+        with PdfAnalysis.from_bytes(pdf_bytes) as analysis:
+            t0 = time.perf_counter()
+            info = _inspect_pdf_type(analysis=analysis, mode=mode)
+            best = min(best, time.perf_counter() - t0)
+    return best, info
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--scale", type=float, default=1.0)
+    args = ap.parse_args()
+
+    corpus = build_corpus(args.scale)
+    print(f"{'document':22} {'pages':>5} {'legacy ms':>10} {'fast ms':>9} {'x':>6} "
+          f"{'drw L/F':>8} {'is_slide L/F':>13} {'decide L/F':>11}")
+    tot_l = tot_f = 0.0
+    agree_info = agree_decide = 0
+    for name, data in corpus:
+        t_l, info_l = _timed(data, "legacy", args.repeat)
+        t_f, info_f = _timed(data, "fast", args.repeat)
+        tot_l += t_l
+        tot_f += t_f
+        d_l, d_f = decide_slide_mode(info_l), decide_slide_mode(info_f)
+        agree_info += info_l["is_slide"] == info_f["is_slide"]
+        agree_decide += d_l == d_f
+        print(f"{name:22} {info_l['n_pages_total']:5d} {t_l * 1e3:10.1f} {t_f * 1e3:9.1f} {t_l / max(t_f, 1e-9):6.1f} "
+              f"{info_l['n_pages_scanned']:>3}/{info_f['n_drawings_computed']:<4} "
+              f"{str(info_l['is_slide']):>6}/{str(info_f['is_slide']):<6} {str(d_l):>5}/{str(d_f):<5}")
+
+    print(f"\ntotal : legacy {tot_l * 1e3:.1f} ms, fast {tot_f * 1e3:.1f} ms (x{tot_l / max(tot_f, 1e-9):.1f})")
+    print(f"accord is_slide : {agree_info}/{len(corpus)}, accord decide_slide_mode : {agree_decide}/{len(corpus)}")
+    print("(handout_then_slides : désaccord attendu, legacy ne voit que les 20 premières pages)")
+
+
+if __name__ == "__main__":
+    main()
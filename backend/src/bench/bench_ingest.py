@@ -0,0 +1,411 @@
+"""
+Benchmark du chemin d'ingestion PDF sur un corpus synthétique déterministe
+(généré avec PyMuPDF) : pages texte « classic », slides, diagrammes
+vectoriels, tableaux, images embarquées, à plusieurs tailles.
+
+Étapes mesurées par document (PDF rouvert à chaque passe, caches froids) :
+  classify  _inspect_pdf_type
+  tables    detect_table_regions (toutes les pages)
+  images    extract_images (écritures vers le curseur factice)
+  text      extract_text_filtered_from_bytes
+  ingest    ingest_pdf_to_db complet (bench.fake_db à la place de Postgres)
+
+Débit en pages/s (meilleure passe), pic mémoire Python (tracemalloc) et
+pic RSS (échantillonné, Linux) sur une passe séparée. Comparaison avec
+une baseline JSON pour repérer les régressions. Chaque passe est suivie
+d'une passe de référence (PyMuPDF + Python seuls, indépendante du code
+mesuré) : le débit attendu est celui de la baseline remis à l'échelle de
+la machine courante (médiane sur le run des rapports ref_ms baseline /
+ref_ms mesuré). Une baseline enregistrée ailleurs reste donc comparable.
+Les mesures signalées en régression sont reprises une fois (plus
+longues) avant d'être retenues.
+
+    cd backend/src && python -m bench.bench_ingest [--sizes 8,32] [--repeat 3]
+        [--workers 0] [--only tables,images] [--save-baseline] [--check]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import threading
+import time
+import tracemalloc
+
+import fitz
+
+from bench.fake_db import FakeDb
+from utils.course import (
+    _inspect_pdf_type, detect_table_regions, extract_images,
+    extract_text_filtered_from_bytes, get_embedded_image_rects_by_page, ingest_pdf_to_db,
+)
+from utils.pdf_analysis import PdfAnalysis
+
+A4 = (595, 842)
+WIDE = (960, 540)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "bench_ingest.json")
+STAGES = ("classify", "tables", "images", "text", "ingest")
+
+WORDS = ("anatomie physiologie soins patient infirmier protocole dose posologie "
+         "surveillance clinique pansement asepsie perfusion évaluation douleur "
+         "prescription hygiène transmission diagnostic").split()
+
+
+# ------------------------------------------------------------------
+# Corpus
+# ------------------------------------------------------------------
+def _words(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _title(page, rng, size=18):
+    page.insert_text((40, 45), _words(rng, 4).capitalize(), fontsize=size)
+
+
+def _paragraphs(page, rng, n_words, box=None, size=10):
+    box = box or fitz.Rect(40, 70, page.rect.width - 40, page.rect.height - 40)
+    page.insert_textbox(box, _words(rng, n_words), fontsize=size)
+
+
+def _diagram(page, rng, n_paths, box):
+    for _ in range(n_paths):
+        x, y = rng.uniform(box.x0, box.x1 - 30), rng.uniform(box.y0, box.y1 - 30)
+        if rng.random() < 0.5:
+            page.draw_rect(fitz.Rect(x, y, x + rng.uniform(10, 60), y + rng.uniform(10, 40)),
+                           color=(0, 0, 0), fill=(rng.random(), rng.random(), 1))
+        else:
+            page.draw_line((x, y), (x + rng.uniform(-80, 80), y + rng.uniform(-60, 60)))
+
+
+def _table(page, rng, box, rows, cols):
+    dy, dx = box.height / rows, box.width / cols
+    for i in range(rows + 1):
+        page.draw_line((box.x0, box.y0 + i * dy), (box.x1, box.y0 + i * dy))
+    for j in range(cols + 1):
+        page.draw_line((box.x0 + j * dx, box.y0), (box.x0 + j * dx, box.y1))
+    for i in range(rows):
+        for j in range(cols):
+            page.insert_text((box.x0 + j * dx + 3, box.y0 + i * dy + dy * 0.7),
+                             rng.choice(WORDS)[:10], fontsize=7)
+
+
+def _raster(rng, w, h):
+    # dégradé + bruit : PNG non trivial, pas de doublons entre pages
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, w, h), False)
+    pix.set_rect(pix.irect, (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)))
+    for _ in range(12):
+        x, y = rng.randint(0, w - 20), rng.randint(0, h - 20)
+        pix.set_rect(fitz.IRect(x, y, x + rng.randint(10, 60), y + rng.randint(10, 40)),
+                     (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)))
+    return pix
+
+
+def _classic(page, rng):
+    _title(page, rng)
+    _paragraphs(page, rng, 420)
+
+
+def _slide(page, rng):
+    _title(page, rng, size=26)
+    _paragraphs(page, rng, 45, box=fitz.Rect(40, 80, 480, 500), size=18)
+    _diagram(page, rng, 14, fitz.Rect(520, 100, 920, 500))
+
+
+def _diagrams(page, rng):
+    _title(page, rng)
+    _paragraphs(page, rng, 120, box=fitz.Rect(40, 70, 555, 300))
+    _diagram(page, rng, 300, fitz.Rect(60, 330, 540, 800))
+
+
+def _tables(page, rng):
+    _title(page, rng)
+    _paragraphs(page, rng, 60, box=fitz.Rect(40, 70, 555, 180))
+    _table(page, rng, fitz.Rect(50, 200, 545, 480), rows=10, cols=5)
+    _table(page, rng, fitz.Rect(50, 520, 400, 780), rows=8, cols=3)
+
+
+def _images(page, rng):
+    _title(page, rng)
+    _paragraphs(page, rng, 150, box=fitz.Rect(40, 70, 555, 330))
+    page.insert_image(fitz.Rect(50, 350, 300, 540), pixmap=_raster(rng, 400, 300))
+    page.insert_image(fitz.Rect(320, 560, 545, 780), pixmap=_raster(rng, 360, 360))
+
+
+KINDS = {
+    "classic": (A4, _classic),
+    "slides": (WIDE, _slide),
+    "diagrams": (A4, _diagrams),
+    "tables": (A4, _tables),
+    "images": (A4, _images),
+}
+
+
+def build_pdf(kind: str, n_pages: int, seed: int = 17) -> bytes:
+    """PDF déterministe (même graine => mêmes octets de contenu)."""
+    size, fill = KINDS[kind]
+    rng = random.Random(f"{kind}-{n_pages}-{seed}")
+    doc = fitz.open()
+    for _ in range(n_pages):
+        fill(doc.new_page(width=size[0], height=size[1]), rng)
+    doc.set_metadata({})     # pas de dates de création : octets reproductibles
+    data = doc.tobytes(garbage=3, clean=True, no_new_id=True)
+    doc.close()
+    return data
+
+
+def build_corpus(sizes=(8, 32), kinds=None, seed: int = 17):
+    return [
+        (f"{kind}-{n}", n, build_pdf(kind, n, seed))
+        for kind in (kinds or KINDS)
+        for n in sizes
+    ]
+
+
+# ------------------------------------------------------------------
+# Étapes
+# ------------------------------------------------------------------
+def _run_stage(stage: str, pdf_bytes: bytes, workers: int) -> None:
+    if stage == "ingest":
+        ingest_pdf_to_db(
+            pdf_bytes=pdf_bytes,
+            conn=FakeDb(),
+            create_course=False,
+            workers=workers,
+            extract_text_filtered_from_bytes=extract_text_filtered_from_bytes,
+            extract_images=extract_images,
+            get_embedded_image_rects_by_page=get_embedded_image_rects_by_page,
+        )
+        return
+
+    with PdfAnalysis.from_bytes(pdf_bytes) as analysis:
+        if stage == "classify":
+            _inspect_pdf_type(analysis=analysis)
+        elif stage == "tables":
+            for pa in analysis:
+                detect_table_regions(pa.page, analysis=pa)
+        elif stage == "images":
+            extract_images(analysis.doc, source_id=1, cur=FakeDb().cursor(), analysis=analysis)
+        elif stage == "text":
+            extract_text_filtered_from_bytes(pdf_bytes, figure_map={}, analysis=analysis)
+        else:
+            raise ValueError(stage)
+
+
+_REF_PDF = None
+
+
+def _reference_pass() -> float:
+    """Passe de référence : ouverture, dict texte, rendu basse résolution, tri Python (s)."""
+    global _REF_PDF
+    if _REF_PDF is None:
+        _REF_PDF = build_pdf("classic", 2, seed=3)
+    t0 = time.perf_counter()
+    with fitz.open(stream=_REF_PDF, filetype="pdf") as doc:
+        for page in doc:
+            page.get_text("dict")
+            page.get_pixmap(matrix=fitz.Matrix(0.5, 0.5))
+    sorted(random.Random(3).random() for _ in range(5000))
+    return time.perf_counter() - t0
+
+
+class _RssSampler:
+    """Pic RSS du process pendant le bloc (lecture de /proc/self/statm)."""
+
+    def __init__(self, interval_s: float = 0.002):
+        self.interval_s = interval_s
+        self.available = os.path.exists("/proc/self/statm")
+        self.base = self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _rss() -> int:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._rss())
+            self._stop.wait(self.interval_s)
+
+    def __enter__(self):
+        if self.available:
+            self.base = self.peak = self._rss()
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, self._rss())
+
+    @property
+    def delta_mb(self):
+        return round((self.peak - self.base) / 1048576.0, 1) if self.available else None
+
+
+def measure(stage: str, pdf_bytes: bytes, n_pages: int, repeat: int, workers: int,
+            min_time: float = 0.0) -> dict:
+    # au moins `repeat` passes, et assez pour cumuler `min_time` s (étapes de
+    # quelques ms : le minimum sur 3 passes reste trop bruité)
+    # passes de référence intercalées : même état de la machine que l'étape
+    best, best_ref, spent, runs = float("inf"), float("inf"), 0.0, 0
+    while runs < max(1, repeat) or spent < min_time:
+        t0 = time.perf_counter()
+        _run_stage(stage, pdf_bytes, workers)
+        dt = time.perf_counter() - t0
+        best, spent, runs = min(best, dt), spent + dt, runs + 1
+        best_ref = min(best_ref, _reference_pass())
+
+    # passe mémoire séparée (tracemalloc fausserait les temps)
+    tracemalloc.start()
+    with _RssSampler() as rss:
+        _run_stage(stage, pdf_bytes, workers)
+    py_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "pages": n_pages,
+        "ms": round(best * 1000.0, 2),
+        "pages_per_s": round(n_pages / best, 2) if best > 0 else None,
+        "py_peak_mb": round(py_peak / 1048576.0, 2),
+        "rss_peak_mb": rss.delta_mb,
+        "ref_ms": round(best_ref * 1000.0, 3),
+    }
+
+
+# ------------------------------------------------------------------
+# Baseline
+# ------------------------------------------------------------------
+def _meta(args) -> dict:
+    return {
+        "python": platform.python_version(),
+        "pymupdf": fitz.VersionBind,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "sizes": args.sizes,
+        "repeat": args.repeat,
+        "workers": args.workers,
+    }
+
+
+def speed_factor(results: dict, baseline: dict) -> float:
+    """
+    Vitesse de la machine courante relative à la baseline : médiane des
+    rapports ref_ms baseline / ref_ms mesuré (une passe de référence isolée
+    est trop bruitée pour corriger une seule mesure).
+    """
+    ratios = sorted(
+        baseline[k]["ref_ms"] / r["ref_ms"]
+        for k, r in results.items()
+        if r.get("ref_ms") and baseline.get(k, {}).get("ref_ms")
+    )
+    if not ratios:
+        return 1.0
+    mid = len(ratios) // 2
+    return ratios[mid] if len(ratios) % 2 else (ratios[mid - 1] + ratios[mid]) / 2.0
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_mem_mb: float = 1.0) -> list:
+    """
+    Régressions : débit < base*vitesse*(1-tol) ou pic Python > base*(1+tol)
+    (+ min_mem_mb) ; vitesse = speed_factor (1.0 sans référence).
+    """
+    out = []
+    speed = speed_factor(results, baseline)
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        expected = base["pages_per_s"] * speed if base.get("pages_per_s") else None
+        if expected and cur["pages_per_s"] < expected * (1 - tolerance):
+            out.append(f"{key}: débit {cur['pages_per_s']} p/s < baseline {expected:.2f} p/s "
+                       f"({base['pages_per_s']} p/s x {speed:.2f})")
+        b_mem = base.get("py_peak_mb")
+        if b_mem is not None and cur["py_peak_mb"] > b_mem * (1 + tolerance) + min_mem_mb:
+            out.append(f"{key}: pic Python {cur['py_peak_mb']} Mo > baseline {b_mem} Mo")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="8,32", help="nombres de pages par document")
+    ap.add_argument("--kinds", default=",".join(KINDS))
+    ap.add_argument("--only", default=",".join(STAGES), help="étapes à mesurer")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--min-time", type=float, default=0.25, help="temps cumulé minimal par mesure (s)")
+    ap.add_argument("--workers", type=int, default=0, help="ingest : pool de processus (0 = séquentiel)")
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    ap.add_argument("--check", action="store_true", help="code retour 1 si régression")
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip()]
+    stages = [s.strip() for s in args.only.split(",") if s.strip()]
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            stored = json.load(f)
+        baseline = stored.get("results", {})
+        if stored.get("meta", {}).get("cpus") != os.cpu_count():
+            print(f"(baseline mesurée sur une autre machine : {stored.get('meta')})")
+
+    corpus = build_corpus(sizes, kinds)
+    results = {}
+    print(f"{'document':14} {'étape':9} {'pages':>5} {'ms':>9} {'p/s':>8} {'base p/s':>9} "
+          f"{'py Mo':>7} {'rss Mo':>7}")
+    for name, n_pages, data in corpus:
+        for stage in stages:
+            r = measure(stage, data, n_pages, args.repeat, args.workers, args.min_time)
+            key = f"{name}/{stage}"
+            results[key] = r
+            base = baseline.get(key, {}).get("pages_per_s")
+            print(f"{name:14} {stage:9} {n_pages:5d} {r['ms']:9.1f} {r['pages_per_s']:8.1f} "
+                  f"{(f'{base:.1f}' if base else '-'):>9} {r['py_peak_mb']:7.1f} "
+                  f"{(r['rss_peak_mb'] if r['rss_peak_mb'] is not None else '-'):>7}")
+
+    for stage in stages:
+        keys = [k for k in results if k.endswith("/" + stage)]
+        pages = sum(results[k]["pages"] for k in keys)
+        secs = sum(results[k]["ms"] for k in keys) / 1000.0
+        if secs > 0:
+            print(f"total {stage:9} {pages / secs:8.1f} pages/s")
+
+    regressions = compare(results, baseline, args.tolerance) if baseline else []
+    if regressions:
+        # confirmation : mesures suspectes reprises (4x plus longues), meilleure
+        # passe conservée ; un pic de charge ponctuel ne compte plus comme régression
+        corpus_by_name = {name: (n_pages, data) for name, n_pages, data in corpus}
+        for key in sorted({line.split(":", 1)[0] for line in regressions}):
+            name, stage = key.split("/", 1)
+            n_pages, data = corpus_by_name[name]
+            r = measure(stage, data, n_pages, args.repeat, args.workers, max(args.min_time, 0.05) * 4)
+            prev = results[key]
+            if r["ms"] < prev["ms"]:
+                prev.update(ms=r["ms"], pages_per_s=r["pages_per_s"], ref_ms=min(prev["ref_ms"], r["ref_ms"]))
+            prev["py_peak_mb"] = min(prev["py_peak_mb"], r["py_peak_mb"])
+        regressions = compare(results, baseline, args.tolerance)
+    if baseline:
+        print(f"\nvitesse relative à la baseline : x{speed_factor(results, baseline):.2f}")
+        print(f"régressions (tolérance {args.tolerance:.0%}) : {len(regressions)}")
+        for line in regressions:
+            print("  " + line)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": _meta(args), "results": results}, f, indent=1, sort_keys=True)
+        print(f"baseline enregistrée : {args.baseline}")
+
+    if args.check and regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark pHash : ancienne implémentation (boucles Python) vs
+utils.phash (NumPy vectorisé, lot).
+
+    cd backend/src && python -m bench.bench_phash [--n 200] [--repeat 3]
+"""
+import argparse
+import time
+import numpy as np
+
+from utils.phash import area_mean, phash64_batch, phash64_from_gray
+
+
+# ------------------------------------------------------------------
+# Référence : code d'origine de utils/course.py (avant vectorisation)
+# ------------------------------------------------------------------
+def _legacy_downscale_mean(gray: np.ndarray, w: int, h: int) -> np.ndarray:
+    H, W = gray.shape
+    ys = (np.linspace(0, H, h+1)).astype(int)
+    xs = (np.linspace(0, W, w+1)).astype(int)
+    out = np.zeros((h, w), dtype=np.float32)
+    for i in range(h):
+        for j in range(w):
+            block = gray[ys[i]:ys[i+1], xs[j]:xs[j+1]]
+            out[i, j] = float(block.mean()) if block.size else 0.0
+    return out
+
+def _legacy_phash(gray: np.ndarray) -> int:
+    small = _legacy_downscale_mean(gray, 32, 32)
+    dct_like = _legacy_downscale_mean(small, 8, 8)
+    med = np.median(dct_like[1:, 1:])
+    bits = (dct_like > med).flatten()
+    h = 0
+    for b in bits:
+        h = (h << 1) | int(bool(b))
+    return int(h)
+
+
+def _crops(n: int, seed: int = 7):
+    """Crops synthétiques de tailles variées (rendu x2 typique : 220..1400 px)."""
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n):
+        h = int(rng.integers(220, 1400))
+        w = int(rng.integers(220, 1400))
+        yy, xx = np.mgrid[0:h, 0:w]
+        base = (np.sin(xx / rng.uniform(8, 60)) + np.cos(yy / rng.uniform(8, 60))) * 60 + 128
+        noise = rng.normal(0, 12, size=(h, w))
+        out.append(np.clip(base + noise, 0, 255).astype(np.float32))
+    return out
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    crops = _crops(args.n)
+
+    # même réduction 32x32 que l'ancien code (bornes identiques)
+    max_err = max(float(np.abs(area_mean(g, 32, 32) - _legacy_downscale_mean(g, 32, 32)).max()) for g in crops[:20])
+
+    t_legacy = _best(lambda: [_legacy_phash(g) for g in crops], args.repeat)
+    t_single = _best(lambda: [phash64_from_gray(g) for g in crops], args.repeat)
+    t_batch = _best(lambda: phash64_batch(crops), args.repeat)
+
+    print(f"crops               : {len(crops)}")
+    print(f"écart réduction 32² : {max_err:.2e} (max abs vs _downscale_mean)")
+    print(f"legacy (boucles)    : {t_legacy * 1e3 / len(crops):8.3f} ms/crop")
+    print(f"vectorisé (1 par 1) : {t_single * 1e3 / len(crops):8.3f} ms/crop  x{t_legacy / t_single:5.1f}")
+    print(f"vectorisé (lot)     : {t_batch * 1e3 / len(crops):8.3f} ms/crop  x{t_legacy / t_batch:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Stand-in psycopg2 minimal pour les benchmarks d'ingestion : curseur et
+connexion en mémoire, compatibles execute_values (mogrify + execute en
+bytes + fetchall). Simule juste ce que lit ingest_pdf_to_db :
+  - academics.source_pages          (clé source_id, page_no)
+  - academics.page_media_assets     (unique source_id, md5 ; RETURNING id, md5)
+  - academics.media_blobs           (unique md5 ; lookup md5 / bandes pHash)
+  - RETURNING id générique, COUNT(*) et string_agg du texte.
+Compte les requêtes et le volume de paramètres envoyés.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import itertools
+
+
+class _Encoding:
+    encoding = "UTF8"
+
+
+def _param_size(v: Any) -> int:
+    v = getattr(v, "adapted", v)      # psycopg2.Binary / Json
+    if isinstance(v, (bytes, bytearray, memoryview)):
+        return len(v)
+    if isinstance(v, str):
+        return len(v.encode("utf-8"))
+    return 8
+
+
+class FakeCursor:
+    connection = _Encoding()
+
+    def __init__(self, db: "FakeDb"):
+        self.db = db
+        self._rows: List[Tuple] = []
+        self._one: Optional[Tuple] = None
+        self._all: List[Tuple] = []
+
+    # execute_values : une ligne par mogrify, puis un seul execute(bytes)
+    def mogrify(self, template, args) -> bytes:
+        self._rows.append(tuple(args))
+        return b"(x)"
+
+    def execute(self, sql, params=None) -> None:
+        if isinstance(sql, bytes):
+            sql = sql.decode("utf-8", "replace")
+        rows, self._rows = self._rows, []
+        self._one, self._all = None, []
+        db = self.db
+        db.statements += 1
+        db.param_bytes += sum(_param_size(v) for r in rows for v in r)
+        db.param_bytes += sum(_param_size(v) for v in (params or ()))
+
+        if "INSERT INTO academics.media_blobs" in sql:
+            for r in rows:
+                bid = db.blobs.get(r[0], (None,))[0] or next(db.ids)
+                db.blobs[r[0]] = (bid,) + r
+                self._all.append((r[0], bid))
+        elif "FROM academics.media_blobs WHERE md5" in sql:
+            self._all = [(m, db.blobs[m][0]) for m in params[0] if m in db.blobs]
+        elif "FROM academics.media_blobs" in sql and "phash" in sql:
+            bands = [set(b) for b in params]
+            for (bid, _md5, _mime, _data, _path, _size, w, h, ph) in db.blobs.values():
+                if ph is None:
+                    continue
+                u = ph & 0xFFFFFFFFFFFFFFFF
+                vals = ((u >> 48) & 0xFFFF, (u >> 32) & 0xFFFF, (u >> 16) & 0xFFFF, u & 0xFFFF)
+                if any(v in b for v, b in zip(vals, bands)):
+                    self._all.append((bid, ph, w, h))
+        elif "INSERT INTO academics.page_media_assets" in sql:
+            for r in rows:
+                key = (r[0], r[6])
+                if key in db.media:
+                    continue
+                mid = next(db.ids)
+                db.media[key] = (mid,) + r
+                self._all.append((mid, r[6]))
+        elif "INSERT INTO academics.source_pages" in sql:
+            for r in rows:
+                db.pages[(r[0], r[1])] = r
+        elif "string_agg" in sql:
+            sid = params[0]
+            self._one = ("\n".join(
+                (r[3] or r[2] or "") for k, r in sorted(db.pages.items()) if k[0] == sid
+            ),)
+        elif "COUNT(*) FROM academics.source_pages" in sql:
+            self._one = (sum(1 for k in db.pages if k[0] == params[0]),)
+        elif "COUNT(*) FROM academics.page_media_assets" in sql:
+            self._one = (sum(1 for k in db.media if k[0] == params[0]),)
+        elif "RETURNING id" in sql:
+            self._one = (next(db.ids),)
+
+    def fetchone(self) -> Optional[Tuple]:
+        return self._one
+
+    def fetchall(self) -> List[Tuple]:
+        out, self._all = self._all, []
+        return out
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "FakeCursor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+class FakeDb:
+    """Connexion en mémoire (une par document mesuré)."""
+
+    def __init__(self):
+        self.ids = itertools.count(1)
+        self.pages: Dict[Tuple[int, int], Tuple] = {}
+        self.media: Dict[Tuple[int, str], Tuple] = {}
+        self.blobs: Dict[str, Tuple] = {}
+        self.statements = 0
+        self.param_bytes = 0
+        self.commits = 0
+
+    def cursor(self, *a, **k) -> FakeCursor:
+        return FakeCursor(self)
+
+    def commit(self) -> None:
+        self.commits += 1
+
+    def rollback(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
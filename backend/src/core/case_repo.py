@@ -1,51 +1,80 @@
 from __future__ import annotations
 from typing import Optional, List, Dict, Any
 
-def _to_dict_many(cur, rows):
-    if not rows:
-        return []
-    if isinstance(rows[0], dict):
-        return rows
-    cols = [d[0] for d in cur.description] if cur.description else []
-    return [dict(zip(cols, r)) for r in rows]
+from database.statements import statement, execute, execute_async
+from database.rows import fetchone_dict, fetchall_dict, row_id, scalar
 
 
-def _row_id(row) -> int:
-    if row is None:
-        raise ValueError("Aucune ligne retournée par RETURNING id")
-    return row["id"] if isinstance(row, dict) else row[0]
-
-
-def _to_dict(cur, row):
-    """Convertit une row tuple en dict via cur.description (compatible dict-cursor aussi)."""
-    if row is None:
-        return None
-    if isinstance(row, dict):
-        return row
-    cols = [d[0] for d in cur.description] if cur.description else []
-    return dict(zip(cols, row))
-
-
-def _fetchone_dict(cur) -> Optional[Dict[str, Any]]:
-    return _to_dict(cur, cur.fetchone())
-
-
-def _fetchall_dict(cur) -> List[Dict[str, Any]]:
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    if isinstance(rows[0], dict):
-        return rows
-    cols = [d[0] for d in cur.description] if cur.description else []
-    return [dict(zip(cols, r)) for r in rows]
+# requêtes partagées par CaseRepo et CaseRepoAsync (même style %s, préparées par connexion)
+# colonnes listées explicitement (cf. database.statements)
+_CASE_COLS = "id, title, intro_md, difficulty, tags, created_at"
+_STEP_COLS = "id, case_id, position, prompt_md, step_type, created_at"
+_CHOICE_COLS = "id, step_id, position, label, is_correct, feedback_md"
+_ATTEMPT_COLS = "id, user_id, case_id, score, completed, created_at"
+_ANSWER_COLS = "id, attempt_id, step_id, selected_choice_id, free_answer_text, is_correct, created_at"
+_STMT_GET_ATTEMPT = statement("case.get_attempt", f"SELECT {_ATTEMPT_COLS} FROM training.case_attempts WHERE id=%s")
+_STMT_UPDATE_ATTEMPT_STATUS = statement("case.update_attempt_status", """
+    UPDATE training.case_attempts
+    SET score=%s, completed=%s
+    WHERE id=%s
+""")
+_STMT_LIST_STEPS = statement("case.list_steps", f"""
+    SELECT {_STEP_COLS} FROM training.case_steps
+    WHERE case_id=%s
+    ORDER BY position ASC
+""")
+_STMT_GET_STEP = statement("case.get_step", f"SELECT {_STEP_COLS} FROM training.case_steps WHERE id=%s")
+_STMT_COUNT_STEPS = statement("case.count_steps", "SELECT COUNT(*) AS n FROM training.case_steps WHERE case_id=%s")
+_STMT_LIST_CHOICES = statement("case.list_choices", f"""
+    SELECT {_CHOICE_COLS} FROM training.case_step_choices
+    WHERE step_id=%s
+    ORDER BY position ASC
+""")
+_STMT_GET_CHOICE = statement("case.get_choice", f"SELECT {_CHOICE_COLS} FROM training.case_step_choices WHERE id=%s")
+_STMT_LIST_ANSWERS = statement("case.list_answers", f"""
+    SELECT {_ANSWER_COLS} FROM training.case_step_answers
+    WHERE attempt_id=%s
+    ORDER BY created_at ASC
+""")
+_STMT_UPSERT_ANSWER = statement("case.upsert_answer", """
+    INSERT INTO training.case_step_answers
+      (attempt_id, step_id, selected_choice_id, free_answer_text, is_correct)
+    VALUES (%s,%s,%s,%s,%s)
+    ON CONFLICT (attempt_id, step_id)
+    DO UPDATE SET
+      selected_choice_id = EXCLUDED.selected_choice_id,
+      free_answer_text   = EXCLUDED.free_answer_text,
+      is_correct         = EXCLUDED.is_correct,
+      created_at         = NOW()
+    RETURNING id
+""")
+_STMT_COUNT_CORRECT_ANSWERS = statement("case.count_correct_answers", """
+    SELECT COUNT(*) AS n
+    FROM training.case_step_answers
+    WHERE attempt_id=%s AND is_correct=TRUE
+""")
+_STMT_COUNT_ANSWERS = statement("case.count_answers", """
+    SELECT COUNT(*) AS n
+    FROM training.case_step_answers
+    WHERE attempt_id=%s
+""")
+_STMT_GET_CASE = statement("case.get_case", f"SELECT {_CASE_COLS} FROM training.clinical_cases WHERE id=%s")
+_STMT_GET_STEP_BY_POSITION = statement("case.get_step_by_position", f"""
+    SELECT {_STEP_COLS} FROM training.case_steps
+    WHERE case_id=%s AND position=%s
+""")
+_STMT_GET_ANSWER = statement("case.get_answer", f"""
+    SELECT {_ANSWER_COLS} FROM training.case_step_answers
+    WHERE attempt_id=%s AND step_id=%s
+""")
 
 
 class CaseRepo:
     # ---------------- CASE ----------------
     @staticmethod
     def get_case(cur, case_id: int) -> Optional[Dict[str, Any]]:
-        cur.execute("SELECT * FROM training.clinical_cases WHERE id=%s", (case_id,))
-        return _fetchone_dict(cur)
+        execute(cur, _STMT_GET_CASE, (case_id,))
+        return fetchone_dict(cur, _STMT_GET_CASE)
 
     # ---------------- ATTEMPTS ----------------
     @staticmethod
@@ -58,23 +87,16 @@ class CaseRepo:
             """,
             (user_id, case_id),
         )
-        return _row_id(cur.fetchone())
+        return row_id(cur.fetchone())
 
     @staticmethod
     def get_attempt(cur, attempt_id: int):
-        cur.execute("SELECT * FROM training.case_attempts WHERE id=%s", (attempt_id,))
-        return _to_dict(cur, cur.fetchone())
+        execute(cur, _STMT_GET_ATTEMPT, (attempt_id,))
+        return fetchone_dict(cur, _STMT_GET_ATTEMPT)
 
     @staticmethod
     def update_attempt_status(cur, *, attempt_id: int, score: float, completed: bool) -> None:
-        cur.execute(
-            """
-            UPDATE training.case_attempts
-            SET score=%s, completed=%s
-            WHERE id=%s
-            """,
-            (score, completed, attempt_id),
-        )
+        execute(cur, _STMT_UPDATE_ATTEMPT_STATUS, (score, completed, attempt_id))
 
     # alias si tu l'utilises ailleurs
     @staticmethod
@@ -84,76 +106,45 @@ class CaseRepo:
     # ---------------- STEPS ----------------
     @staticmethod
     def list_steps(cur, case_id: int) -> List[Dict[str, Any]]:
-        cur.execute(
-            """
-            SELECT * FROM training.case_steps
-            WHERE case_id=%s
-            ORDER BY position ASC
-            """,
-            (case_id,),
-        )
-        return _fetchall_dict(cur)
+        execute(cur, _STMT_LIST_STEPS, (case_id,))
+        return fetchall_dict(cur, _STMT_LIST_STEPS)
 
     @staticmethod
     def get_step(cur, step_id: int) -> Optional[Dict[str, Any]]:
-        cur.execute("SELECT * FROM training.case_steps WHERE id=%s", (step_id,))
-        return _fetchone_dict(cur)
+        execute(cur, _STMT_GET_STEP, (step_id,))
+        return fetchone_dict(cur, _STMT_GET_STEP)
 
     @staticmethod
     def get_step_by_position(cur, case_id: int, position: int) -> Optional[Dict[str, Any]]:
-        cur.execute(
-            """
-            SELECT * FROM training.case_steps
-            WHERE case_id=%s AND position=%s
-            """,
-            (case_id, position),
-        )
-        return _fetchone_dict(cur)
+        execute(cur, _STMT_GET_STEP_BY_POSITION, (case_id, position))
+        return fetchone_dict(cur, _STMT_GET_STEP_BY_POSITION)
 
     @staticmethod
     def count_steps(cur, case_id: int) -> int:
-        cur.execute("SELECT COUNT(*) AS n FROM training.case_steps WHERE case_id=%s", (case_id,))
-        row = cur.fetchone()
-        return int(row["n"] if isinstance(row, dict) else row[0])
+        execute(cur, _STMT_COUNT_STEPS, (case_id,))
+        return int(scalar(cur.fetchone()))
 
     # ---------------- CHOICES ----------------
     @staticmethod
     def list_choices(cur, step_id: int):
-        cur.execute("""
-            SELECT * FROM training.case_step_choices
-            WHERE step_id=%s
-            ORDER BY position ASC
-        """, (step_id,))
-        return _to_dict_many(cur, cur.fetchall())
+        execute(cur, _STMT_LIST_CHOICES, (step_id,))
+        return fetchall_dict(cur, _STMT_LIST_CHOICES)
 
     @staticmethod
     def get_choice(cur, choice_id: int) -> Optional[Dict[str, Any]]:
-        cur.execute("SELECT * FROM training.case_step_choices WHERE id=%s", (choice_id,))
-        return _fetchone_dict(cur)
+        execute(cur, _STMT_GET_CHOICE, (choice_id,))
+        return fetchone_dict(cur, _STMT_GET_CHOICE)
 
     # ---------------- ANSWERS ----------------
     @staticmethod
     def list_answers(cur, attempt_id: int) -> List[Dict[str, Any]]:
-        cur.execute(
-            """
-            SELECT * FROM training.case_step_answers
-            WHERE attempt_id=%s
-            ORDER BY created_at ASC
-            """,
-            (attempt_id,),
-        )
-        return _fetchall_dict(cur)
+        execute(cur, _STMT_LIST_ANSWERS, (attempt_id,))
+        return fetchall_dict(cur, _STMT_LIST_ANSWERS)
 
     @staticmethod
     def get_answer(cur, *, attempt_id: int, step_id: int) -> Optional[Dict[str, Any]]:
-        cur.execute(
-            """
-            SELECT * FROM training.case_step_answers
-            WHERE attempt_id=%s AND step_id=%s
-            """,
-            (attempt_id, step_id),
-        )
-        return _fetchone_dict(cur)
+        execute(cur, _STMT_GET_ANSWER, (attempt_id, step_id))
+        return fetchone_dict(cur, _STMT_GET_ANSWER)
 
     @staticmethod
     def insert_or_update_answer(
@@ -165,22 +156,8 @@ class CaseRepo:
         free_answer_text: Optional[str],
         is_correct: bool,
     ) -> int:
-        cur.execute(
-            """
-            INSERT INTO training.case_step_answers
-              (attempt_id, step_id, selected_choice_id, free_answer_text, is_correct)
-            VALUES (%s,%s,%s,%s,%s)
-            ON CONFLICT (attempt_id, step_id)
-            DO UPDATE SET
-              selected_choice_id = EXCLUDED.selected_choice_id,
-              free_answer_text   = EXCLUDED.free_answer_text,
-              is_correct         = EXCLUDED.is_correct,
-              created_at         = NOW()
-            RETURNING id
-            """,
-            (attempt_id, step_id, selected_choice_id, free_answer_text, is_correct),
-        )
-        return _row_id(cur.fetchone())
+        execute(cur, _STMT_UPSERT_ANSWER, (attempt_id, step_id, selected_choice_id, free_answer_text, is_correct))
+        return row_id(cur.fetchone())
 
     # alias (si ton service appelle upsert_answer)
     @staticmethod
@@ -204,31 +181,81 @@ class CaseRepo:
 
     @staticmethod
     def count_correct_answers(cur, attempt_id: int) -> int:
-        cur.execute(
-            """
-            SELECT COUNT(*) AS n
-            FROM training.case_step_answers
-            WHERE attempt_id=%s AND is_correct=TRUE
-            """,
-            (attempt_id,),
-        )
-        row = cur.fetchone()
-        return int(row["n"] if isinstance(row, dict) else row[0])
+        execute(cur, _STMT_COUNT_CORRECT_ANSWERS, (attempt_id,))
+        return int(scalar(cur.fetchone()))
 
     @staticmethod
     def count_answers(cur, attempt_id: int) -> int:
-        cur.execute(
-            """
-            SELECT COUNT(*) AS n
-            FROM training.case_step_answers
-            WHERE attempt_id=%s
-            """,
-            (attempt_id,),
-        )
-        row = cur.fetchone()
-        return int(row["n"] if isinstance(row, dict) else row[0])
+        execute(cur, _STMT_COUNT_ANSWERS, (attempt_id,))
+        return int(scalar(cur.fetchone()))
 
     # compat si tu utilises encore l'ancien nom
     @staticmethod
     def count_answer(cur, attempt_id: int) -> int:
         return CaseRepo.count_answers(cur, attempt_id)
+
+
+class CaseRepoAsync:
+    """Variantes awaitables (curseur psycopg 3 async, lignes en dict) de la réponse à une étape."""
+
+    @staticmethod
+    async def get_attempt(cur, attempt_id: int) -> Optional[Dict[str, Any]]:
+        await execute_async(cur, _STMT_GET_ATTEMPT, (attempt_id,))
+        return await cur.fetchone()
+
+    @staticmethod
+    async def update_attempt_status(cur, *, attempt_id: int, score: float, completed: bool) -> None:
+        await execute_async(cur, _STMT_UPDATE_ATTEMPT_STATUS, (score, completed, attempt_id))
+
+    @staticmethod
+    async def list_steps(cur, case_id: int) -> List[Dict[str, Any]]:
+        await execute_async(cur, _STMT_LIST_STEPS, (case_id,))
+        return await cur.fetchall()
+
+    @staticmethod
+    async def get_step(cur, step_id: int) -> Optional[Dict[str, Any]]:
+        await execute_async(cur, _STMT_GET_STEP, (step_id,))
+        return await cur.fetchone()
+
+    @staticmethod
+    async def count_steps(cur, case_id: int) -> int:
+        await execute_async(cur, _STMT_COUNT_STEPS, (case_id,))
+        return int((await cur.fetchone())["n"])
+
+    @staticmethod
+    async def list_choices(cur, step_id: int) -> List[Dict[str, Any]]:
+        await execute_async(cur, _STMT_LIST_CHOICES, (step_id,))
+        return await cur.fetchall()
+
+    @staticmethod
+    async def get_choice(cur, choice_id: int) -> Optional[Dict[str, Any]]:
+        await execute_async(cur, _STMT_GET_CHOICE, (choice_id,))
+        return await cur.fetchone()
+
+    @staticmethod
+    async def list_answers(cur, attempt_id: int) -> List[Dict[str, Any]]:
+        await execute_async(cur, _STMT_LIST_ANSWERS, (attempt_id,))
+        return await cur.fetchall()
+
+    @staticmethod
+    async def insert_or_update_answer(
+        cur,
+        *,
+        attempt_id: int,
+        step_id: int,
+        selected_choice_id: Optional[int],
+        free_answer_text: Optional[str],
+        is_correct: bool,
+    ) -> int:
+        await execute_async(cur, _STMT_UPSERT_ANSWER, (attempt_id, step_id, selected_choice_id, free_answer_text, is_correct))
+        return row_id(await cur.fetchone())
+
+    @staticmethod
+    async def count_correct_answers(cur, attempt_id: int) -> int:
+        await execute_async(cur, _STMT_COUNT_CORRECT_ANSWERS, (attempt_id,))
+        return int((await cur.fetchone())["n"])
+
+    @staticmethod
+    async def count_answers(cur, attempt_id: int) -> int:
+        await execute_async(cur, _STMT_COUNT_ANSWERS, (attempt_id,))
+        return int((await cur.fetchone())["n"])
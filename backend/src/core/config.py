@@ -9,3 +9,98 @@ DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
+# Pool de connexions : taille, attente max d'une connexion libre (s),
+# validation (SELECT 1) des connexions restées inactives plus de N s
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1") or 1)
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10") or 10)
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "10") or 10)
+DB_POOL_VALIDATE_IDLE_S = float(os.getenv("DB_POOL_VALIDATE_IDLE_S", "30") or 30)
+
+# Pool async (psycopg 3) des endpoints à fort trafic (quiz, SRS, cas, dose).
+# Désactivé par défaut (repli psycopg2 en threadpool) : à activer après
+# validation contre un serveur et un driver psycopg 3 réels.
+ASYNC_DB_ENABLED = os.getenv("ASYNC_DB_ENABLED", "false").lower() == "true"
+ASYNC_DB_POOL_MIN = int(os.getenv("ASYNC_DB_POOL_MIN", "2") or 2)
+ASYNC_DB_POOL_MAX = int(os.getenv("ASYNC_DB_POOL_MAX", "20") or 20)
+
+# Requêtes des repos préparées côté serveur (PREPARE par connexion / cache psycopg 3).
+# false derrière un pgbouncer en mode transaction (pas d'état de session).
+DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() == "true"
+
+# Réplicas en lecture ("hote[:port],...", vide = tout sur le primaire) : listes et rapports.
+# Après une écriture, les lectures de l'utilisateur restent sur le primaire STICKY_S ;
+# réplica ignoré si retard de rejeu > MAX_LAG_S (mesuré toutes les CHECK_S), écarté RETRY_S si injoignable.
+DB_READ_REPLICAS = os.getenv("DB_READ_REPLICAS", "") or ""
+DB_REPLICA_POOL_MAX = int(os.getenv("DB_REPLICA_POOL_MAX", "5") or 5)
+DB_REPLICA_ACQUIRE_TIMEOUT_S = float(os.getenv("DB_REPLICA_ACQUIRE_TIMEOUT_S", "1") or 1)
+DB_REPLICA_STICKY_S = float(os.getenv("DB_REPLICA_STICKY_S", "10") or 10)
+DB_REPLICA_MAX_LAG_S = float(os.getenv("DB_REPLICA_MAX_LAG_S", "5") or 5)
+DB_REPLICA_CHECK_S = float(os.getenv("DB_REPLICA_CHECK_S", "5") or 5)
+DB_REPLICA_RETRY_S = float(os.getenv("DB_REPLICA_RETRY_S", "30") or 30)
+
+# Ingestion PDF : pool de processus (0/1 = séquentiel)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0") or 0)
+INGEST_PARALLEL_MIN_PAGES = int(os.getenv("INGEST_PARALLEL_MIN_PAGES", "40") or 40)
+INGEST_CHUNK_PAGES = int(os.getenv("INGEST_CHUNK_PAGES", "8") or 8)
+
+# Jobs d'ingestion en arrière-plan : ingestions simultanées + file d'attente
+INGEST_JOB_CONCURRENCY = int(os.getenv("INGEST_JOB_CONCURRENCY", "2") or 2)
+INGEST_JOB_QUEUE_MAX = int(os.getenv("INGEST_JOB_QUEUE_MAX", "8") or 8)
+# Bail d'un job sur son worker (hôte:pid), renouvelé toutes les ~LEASE_S/3 :
+# au démarrage, seuls les jobs dont le bail a expiré sont déclarés perdus
+INGEST_JOB_LEASE_S = int(os.getenv("INGEST_JOB_LEASE_S", "60") or 60)
+
+# Ingestion PDF : écritures groupées (lignes / Mo bufferisés avant flush)
+INGEST_BULK_ROWS = int(os.getenv("INGEST_BULK_ROWS", "500") or 500)
+INGEST_BULK_MAX_MB = int(os.getenv("INGEST_BULK_MAX_MB", "32") or 32)
+
+# Stockage des blobs (PDF, médias) : "db" = BYTEA en base, "local" = fichiers
+# adressés par sha256 sous BLOB_STORE_ROOT (colonne path)
+BLOB_STORE_BACKEND = (os.getenv("BLOB_STORE_BACKEND", "db") or "db").strip().lower()
+BLOB_STORE_ROOT = os.getenv("BLOB_STORE_ROOT", "./var/blobs") or "./var/blobs"
+
+# Dédup globale des images (academics.media_blobs, toutes sources) :
+# md5 identique, ou pHash à distance <= MEDIA_DEDUP_PHASH_DIST (max 3, 0 = exact
+# seulement) et dimensions à MEDIA_DEDUP_SIZE_TOL près
+MEDIA_GLOBAL_DEDUP = os.getenv("MEDIA_GLOBAL_DEDUP", "true").lower() == "true"
+MEDIA_DEDUP_PHASH_DIST = min(3, int(os.getenv("MEDIA_DEDUP_PHASH_DIST", "2") or 0))
+MEDIA_DEDUP_SIZE_TOL = float(os.getenv("MEDIA_DEDUP_SIZE_TOL", "0.10") or 0.10)
+# purge des blobs sans référence (ref_count = 0 depuis > N minutes)
+MEDIA_BLOB_GC_GRACE_MIN = int(os.getenv("MEDIA_BLOB_GC_GRACE_MIN", "10") or 10)
+MEDIA_BLOB_GC_BATCH = int(os.getenv("MEDIA_BLOB_GC_BATCH", "500") or 500)
+# fichiers du blob store sans aucune ligne (ingestion annulée) : balayés après N minutes
+BLOB_STORE_SWEEP_GRACE_MIN = int(os.getenv("BLOB_STORE_SWEEP_GRACE_MIN", "360") or 360)
+
+# Diffusion binaire (médias / PDF) : taille des blocs + durée de cache HTTP
+MEDIA_STREAM_CHUNK_KB = int(os.getenv("MEDIA_STREAM_CHUNK_KB", "256") or 256)
+MEDIA_CACHE_MAX_AGE = int(os.getenv("MEDIA_CACHE_MAX_AGE", "31536000") or 31536000)
+
+# Variantes d'images (miniatures / WebP / AVIF) : cache disque LRU
+VARIANT_CACHE_DIR = os.getenv("VARIANT_CACHE_DIR", "./var/variants") or "./var/variants"
+VARIANT_CACHE_MAX_MB = int(os.getenv("VARIANT_CACHE_MAX_MB", "512") or 512)
+VARIANT_WIDTHS = [int(w) for w in (os.getenv("VARIANT_WIDTHS", "160,320,640,1280") or "").split(",") if w.strip()]
+VARIANT_QUALITY = int(os.getenv("VARIANT_QUALITY", "80") or 80)
+
+# OCR des pages scannées (sans couche texte) : pool de processus + cache md5
+OCR_ENABLED = (os.getenv("OCR_ENABLED", "true") or "true").strip().lower() in ("1", "true", "yes", "on")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2") or 2)
+OCR_LANG = os.getenv("OCR_LANG", "fra+eng") or "fra+eng"
+OCR_DPI = int(os.getenv("OCR_DPI", "300") or 300)
+OCR_MIN_TEXT_CHARS = int(os.getenv("OCR_MIN_TEXT_CHARS", "16") or 16)
+OCR_BATCH_PAGES = int(os.getenv("OCR_BATCH_PAGES", "16") or 16)
+
+# Upload PDF en flux : fichier temporaire, taille des blocs, taille max (0 = illimitée)
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR", "./var/uploads") or "./var/uploads"
+UPLOAD_CHUNK_KB = int(os.getenv("UPLOAD_CHUNK_KB", "1024") or 1024)
+UPLOAD_MAX_MB = int(os.getenv("UPLOAD_MAX_MB", "0") or 0)
+
+# Classification slide / classic : "fast" (échantillon + signaux bon marché) ou "legacy"
+CLASSIFY_MODE = (os.getenv("CLASSIFY_MODE", "fast") or "fast").strip().lower()
+CLASSIFY_SAMPLE_PAGES = int(os.getenv("CLASSIFY_SAMPLE_PAGES", "20") or 20)
+
+# Profilage de l'ingestion : temps mur/CPU par étape + pages les plus lentes
+INGEST_PROFILE = os.getenv("INGEST_PROFILE", "true").lower() == "true"
+INGEST_PROFILE_MEMORY = os.getenv("INGEST_PROFILE_MEMORY", "false").lower() == "true"   # tracemalloc (coûteux)
+INGEST_PROFILE_DUMP = os.getenv("INGEST_PROFILE_DUMP", "")        # "" | "cprofile" | "pyinstrument"
+INGEST_PROFILE_DIR = os.getenv("INGEST_PROFILE_DIR", "./var/profiles")
+INGEST_PROFILE_OUTLIERS = int(os.getenv("INGEST_PROFILE_OUTLIERS", "5") or 5)
@@ -1,6 +1,36 @@
 from typing import Optional, Dict, Any
 import json
 
+from database.statements import statement, execute, execute_async
+
+# requête partagée par DoseRepo et DoseRepoAsync (même style %s, préparée par connexion)
+_STMT_INSERT_CALCULATION = statement("dose.insert_calculation", """
+    INSERT INTO core.dose_calculations
+      (user_id, context, exercise_id, case_id, patient_age_y, weight_kg,
+       drug_name, dose_input, dose_result)
+    VALUES
+      (%s,%s,%s,%s,%s,%s,%s,%s::jsonb,%s::jsonb)
+    RETURNING id
+""")
+_STMT_GET_CALCULATION = statement("dose.get_calculation", """
+    SELECT id, user_id, context, exercise_id, case_id, patient_age_y, weight_kg,
+           drug_name, dose_input, dose_result, notes, created_at, updated_at
+    FROM core.dose_calculations
+    WHERE id=%s
+""")
+
+
+def _calculation_params(user_id, context, exercise_id, case_id,
+                        patient_age_y, weight_kg, drug_name, dose_input, dose_result) -> tuple:
+    return (
+        user_id, context, exercise_id, case_id,
+        patient_age_y, weight_kg,
+        drug_name.strip(),
+        json.dumps(dose_input),
+        json.dumps(dose_result),
+    )
+
+
 class DoseRepo:
     @staticmethod
     def insert_calculation(cur, *, user_id: Optional[int], context: str,
@@ -8,29 +38,18 @@ class DoseRepo:
                            patient_age_y, weight_kg, drug_name: str,
                            dose_input: Dict[str, Any], dose_result: Dict[str, Any]) -> int:
 
-        cur.execute(
-            """
-            INSERT INTO core.dose_calculations
-              (user_id, context, exercise_id, case_id, patient_age_y, weight_kg,
-               drug_name, dose_input, dose_result)
-            VALUES
-              (%s,%s,%s,%s,%s,%s,%s,%s::jsonb,%s::jsonb)
-            RETURNING id
-            """,
-            (
-                user_id, context, exercise_id, case_id,
-                patient_age_y, weight_kg,
-                drug_name.strip(),
-                json.dumps(dose_input),
-                json.dumps(dose_result),
-            )
+        execute(
+            cur,
+            _STMT_INSERT_CALCULATION,
+            _calculation_params(user_id, context, exercise_id, case_id,
+                                patient_age_y, weight_kg, drug_name, dose_input, dose_result),
         )
         row = cur.fetchone()
         return row["id"] if isinstance(row, dict) else row[0]
 
     @staticmethod
     def get_calculation(cur, calc_id: int):
-        cur.execute("SELECT * FROM core.dose_calculations WHERE id=%s", (calc_id,))
+        execute(cur, _STMT_GET_CALCULATION, (calc_id,))
         return cur.fetchone()
 
     @staticmethod
@@ -91,3 +110,21 @@ class DoseRepo:
         cur.execute("DELETE FROM core.dose_calculations WHERE id=%s RETURNING id", (calc_id,))
         row = cur.fetchone()
         return bool(row)
+
+
+class DoseRepoAsync:
+    """Variante awaitable (curseur psycopg 3 async) de l'enregistrement d'un calcul."""
+
+    @staticmethod
+    async def insert_calculation(cur, *, user_id: Optional[int], context: str,
+                                 exercise_id: Optional[int], case_id: Optional[int],
+                                 patient_age_y, weight_kg, drug_name: str,
+                                 dose_input: Dict[str, Any], dose_result: Dict[str, Any]) -> int:
+        await execute_async(
+            cur,
+            _STMT_INSERT_CALCULATION,
+            _calculation_params(user_id, context, exercise_id, case_id,
+                                patient_age_y, weight_kg, drug_name, dose_input, dose_result),
+        )
+        row = await cur.fetchone()
+        return row["id"] if isinstance(row, dict) else row[0]
@@ -0,0 +1,95 @@
+from __future__ import annotations
+from typing import Any, Dict, Optional
+from psycopg2.extras import Json
+
+from database.rows import fetchone_dict, row_id
+
+
+class JobRepo:
+
+    @staticmethod
+    def create_job(cur, *, kind: str, payload: Dict[str, Any],
+                   worker_id: Optional[str] = None, lease_s: int = 0) -> int:
+        cur.execute(
+            """
+            INSERT INTO ai.jobs (kind, payload, status, worker_id, lease_until)
+            VALUES (%s, %s::jsonb, 'queued', %s, NOW() + make_interval(secs => %s))
+            RETURNING id
+            """,
+            (kind, Json(payload or {}), worker_id, int(lease_s) if worker_id else None),
+        )
+        return row_id(cur.fetchone())
+
+    @staticmethod
+    def get_job(cur, job_id: int) -> Optional[Dict[str, Any]]:
+        cur.execute(
+            """
+            SELECT id, kind, payload, status, error, progress, result, created_at, updated_at
+            FROM ai.jobs
+            WHERE id=%s
+            """,
+            (job_id,),
+        )
+        return fetchone_dict(cur)
+
+    @staticmethod
+    def mark_running(cur, job_id: int) -> None:
+        cur.execute(
+            "UPDATE ai.jobs SET status='running', error=NULL, updated_at=NOW() WHERE id=%s",
+            (job_id,),
+        )
+
+    @staticmethod
+    def update_progress(cur, job_id: int, progress: Dict[str, Any]) -> None:
+        cur.execute(
+            "UPDATE ai.jobs SET progress=%s::jsonb, updated_at=NOW() WHERE id=%s",
+            (Json(progress or {}), job_id),
+        )
+
+    @staticmethod
+    def mark_done(cur, job_id: int, result: Dict[str, Any]) -> None:
+        cur.execute(
+            """
+            UPDATE ai.jobs
+            SET status='done', result=%s::jsonb, error=NULL, updated_at=NOW()
+            WHERE id=%s
+            """,
+            (Json(result or {}), job_id),
+        )
+
+    @staticmethod
+    def mark_error(cur, job_id: int, error: str) -> None:
+        cur.execute(
+            "UPDATE ai.jobs SET status='error', error=%s, updated_at=NOW() WHERE id=%s",
+            (error, job_id),
+        )
+
+    @staticmethod
+    def renew_leases(cur, worker_id: str, lease_s: int) -> int:
+        """Prolonge le bail des jobs en cours de ce worker (heartbeat)."""
+        cur.execute(
+            """
+            UPDATE ai.jobs
+            SET lease_until = NOW() + make_interval(secs => %s)
+            WHERE worker_id=%s AND status IN ('queued','running')
+            """,
+            (int(lease_s), worker_id),
+        )
+        return cur.rowcount or 0
+
+    @staticmethod
+    def fail_orphans(cur, kind: str, error: str) -> int:
+        """
+        Jobs 'queued'/'running' dont le worker est mort (bail expiré, ou
+        absent : lignes d'avant le bail) ; ceux des workers vivants sont gardés.
+        """
+        cur.execute(
+            """
+            UPDATE ai.jobs
+            SET status='error', error=%s, updated_at=NOW()
+            WHERE kind=%s AND status IN ('queued','running')
+              AND (lease_until IS NULL OR lease_until < NOW())
+            """,
+            (error, kind),
+        )
+        return cur.rowcount or 0
@@ -0,0 +1,257 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from psycopg2.extras import execute_values
+
+from database.rows import fetchone_dict, fetchall_tuples
+
+
+class MediaRepo:
+    """Lecture binaire (méta + tranches) des médias de page et PDF sources."""
+
+    # ------------------------------------------------------------------
+    # academics.page_media_assets
+    # ------------------------------------------------------------------
+    @staticmethod
+    def get_page_media_meta(cur, media_id: int) -> Optional[Dict[str, Any]]:
+        # octet_length : taille sans rapatrier le BYTEA
+        cur.execute(
+            """
+            SELECT a.id, a.source_id, a.page_no, a.kind, a.mime,
+                   COALESCE(b.md5, a.md5) AS md5,
+                   COALESCE(b.path, a.path) AS path,
+                   COALESCE(octet_length(b.data), octet_length(a.data)) AS size,
+                   COALESCE(b.width, a.width) AS width,
+                   COALESCE(b.height, a.height) AS height,
+                   a.asset_id, a.blob_id, a.created_at
+            FROM academics.page_media_assets a
+            LEFT JOIN academics.media_blobs b ON b.id = a.blob_id
+            WHERE a.id=%s
+            """,
+            (media_id,),
+        )
+        return fetchone_dict(cur)
+
+    @staticmethod
+    def read_page_media_chunk(cur, media_id: int, offset: int, length: int) -> bytes:
+        """Tranche [offset, offset+length) du BYTEA (substring est 1-based)."""
+        # substring directement sur la colonne : lecture partielle du TOAST
+        cur.execute(
+            """
+            SELECT CASE WHEN a.blob_id IS NULL
+                        THEN substring(a.data FROM %s FOR %s)
+                        ELSE substring(b.data FROM %s FOR %s) END AS substring
+            FROM academics.page_media_assets a
+            LEFT JOIN academics.media_blobs b ON b.id = a.blob_id
+            WHERE a.id=%s
+            """,
+            (int(offset) + 1, int(length), int(offset) + 1, int(length), media_id),
+        )
+        row = cur.fetchone()
+        if not row:
+            return b""
+        val = row["substring"] if isinstance(row, dict) else row[0]
+        return bytes(val) if val is not None else b""
+
+    @staticmethod
+    def get_page_media_content(cur, media_id: int) -> Optional[Dict[str, Any]]:
+        """Ligne complète (data ou path) : génération de variantes uniquement."""
+        cur.execute(
+            """
+            SELECT a.id, a.mime,
+                   COALESCE(b.md5, a.md5) AS md5,
+                   CASE WHEN a.blob_id IS NULL THEN a.data ELSE b.data END AS data,
+                   COALESCE(b.path, a.path) AS path,
+                   COALESCE(b.width, a.width) AS width,
+                   COALESCE(b.height, a.height) AS height,
+                   a.asset_id
+            FROM academics.page_media_assets a
+            LEFT JOIN academics.media_blobs b ON b.id = a.blob_id
+            WHERE a.id=%s
+            """,
+            (media_id,),
+        )
+        return fetchone_dict(cur)
+
+    # ------------------------------------------------------------------
+    # academics.media_blobs (contenu partagé entre sources, ref_count)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def find_blobs_by_md5(cur, md5s: Sequence[str]) -> Dict[str, int]:
+        if not md5s:
+            return {}
+        cur.execute(
+            "SELECT md5, id FROM academics.media_blobs WHERE md5 = ANY(%s)",
+            (list(md5s),),
+        )
+        return {md5: int(bid) for md5, bid in fetchall_tuples(cur)}
+
+    @staticmethod
+    def find_blobs_by_phash_bands(cur, bands: Sequence[Sequence[int]]) -> List[Tuple[int, int, Optional[int], Optional[int]]]:
+        """
+        Candidats quasi-doublons : au moins une bande de 16 bits égale
+        (bands[k] = valeurs de la bande k des hashes cherchés). Mêmes
+        expressions que les index idx_media_blobs_phash_b*.
+        -> [(id, phash, width, height)]
+        """
+        if not bands or not any(bands):
+            return []
+        cur.execute(
+            """
+            SELECT id, phash, width, height
+            FROM academics.media_blobs
+            WHERE phash IS NOT NULL
+              AND (((phash >> 48) & 65535) = ANY(%s)
+                OR ((phash >> 32) & 65535) = ANY(%s)
+                OR ((phash >> 16) & 65535) = ANY(%s)
+                OR (phash & 65535) = ANY(%s))
+            """,
+            tuple(list(b) for b in bands),
+        )
+        return [(int(i), int(h), w, hh) for i, h, w, hh in fetchall_tuples(cur)]
+
+    @staticmethod
+    def insert_blobs(cur, rows: List[tuple]) -> Dict[str, int]:
+        """
+        rows = (md5, mime, data, path, bytes_size, width, height, phash).
+        Conflit md5 (ingestion concurrente) : id existant renvoyé quand même.
+        """
+        if not rows:
+            return {}
+        returned = execute_values(
+            cur,
+            """
+            INSERT INTO academics.media_blobs
+                (md5, mime, data, path, bytes_size, width, height, phash)
+            VALUES %s
+            ON CONFLICT (md5) DO UPDATE SET md5 = EXCLUDED.md5
+            RETURNING md5, id
+            """,
+            rows,
+            page_size=len(rows),
+            fetch=True,
+        ) or []
+        return {(r["md5"] if isinstance(r, dict) else r[0]): int(r["id"] if isinstance(r, dict) else r[1])
+                for r in returned}
+
+    @staticmethod
+    def delete_orphan_blobs(cur, *, grace_minutes: int, limit: int) -> List[Optional[str]]:
+        """
+        Supprime les blobs sans référence depuis > grace_minutes. Un blob
+        re-référencé entre-temps (ref_count relu après verrou) est épargné.
+        -> clés du blob store des blobs supprimés (None si BYTEA)
+        """
+        cur.execute(
+            """
+            DELETE FROM academics.media_blobs
+            WHERE id IN (
+                SELECT id FROM academics.media_blobs
+                WHERE ref_count = 0 AND created_at < NOW() - make_interval(mins => %s)
+                ORDER BY created_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            AND ref_count = 0
+            RETURNING path
+            """,
+            (int(grace_minutes), int(limit)),
+        )
+        return [r[0] for r in fetchall_tuples(cur)]
+
+    @staticmethod
+    def store_keys_in_use(cur, keys: Sequence[str]) -> Set[str]:
+        """Clés du store encore référencées ailleurs (lignes historiques, PDF sources)."""
+        if not keys:
+            return set()
+        cur.execute(
+            """
+            SELECT path FROM academics.media_blobs WHERE path = ANY(%s)
+            UNION
+            SELECT path FROM academics.page_media_assets WHERE path = ANY(%s)
+            UNION
+            SELECT path FROM academics.source_files WHERE path = ANY(%s)
+            """,
+            (list(keys), list(keys), list(keys)),
+        )
+        return {r[0] for r in fetchall_tuples(cur)}
+
+    # ------------------------------------------------------------------
+    # media.assets / media.asset_variants (variantes dérivées)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def ensure_page_media_asset(cur, media: Dict[str, Any], bytes_size: Optional[int] = None) -> int:
+        """media.assets associé au média de page (créé au premier besoin)."""
+        if media.get("asset_id"):
+            return int(media["asset_id"])
+        cur.execute(
+            """
+            INSERT INTO media.assets (kind, storage_key, mime_type, bytes_size, width_px, height_px)
+            VALUES ('image', %s, %s, %s, %s, %s)
+            ON CONFLICT (storage_key) DO UPDATE SET mime_type = EXCLUDED.mime_type
+            RETURNING id
+            """,
+            (f"page_media/{int(media['id'])}", media.get("mime") or "image/png",
+             bytes_size, media.get("width"), media.get("height")),
+        )
+        row = cur.fetchone()
+        asset_id = int(row["id"]) if isinstance(row, dict) else int(row[0])
+        cur.execute(
+            "UPDATE academics.page_media_assets SET asset_id=%s WHERE id=%s",
+            (asset_id, int(media["id"])),
+        )
+        return asset_id
+
+    @staticmethod
+    def upsert_variant(cur, *, asset_id: int, variant_key: str, storage_key: str,
+                       mime_type: str, width_px: Optional[int], height_px: Optional[int]) -> None:
+        cur.execute(
+            """
+            INSERT INTO media.asset_variants (asset_id, variant_key, storage_key, mime_type, width_px, height_px)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (asset_id, variant_key) DO UPDATE SET
+                storage_key = EXCLUDED.storage_key,
+                mime_type = EXCLUDED.mime_type,
+                width_px = EXCLUDED.width_px,
+                height_px = EXCLUDED.height_px
+            """,
+            (asset_id, variant_key, storage_key, mime_type, width_px, height_px),
+        )
+
+    @staticmethod
+    def delete_variants_by_storage_keys(cur, storage_keys: List[str]) -> int:
+        """Variantes dont le fichier a quitté le cache disque (régénérées à la demande)."""
+        if not storage_keys:
+            return 0
+        cur.execute(
+            "DELETE FROM media.asset_variants WHERE storage_key = ANY(%s)",
+            (list(storage_keys),),
+        )
+        return cur.rowcount
+
+    # ------------------------------------------------------------------
+    # academics.source_files
+    # ------------------------------------------------------------------
+    @staticmethod
+    def get_source_file_meta(cur, source_id: int) -> Optional[Dict[str, Any]]:
+        cur.execute(
+            """
+            SELECT f.id, f.source_id, s.md5, s.title, f.path,
+                   octet_length(f.pdf_data) AS size, f.created_at
+            FROM academics.source_files f
+            JOIN academics.sources s ON s.id = f.source_id
+            WHERE f.source_id=%s
+            """,
+            (source_id,),
+        )
+        return fetchone_dict(cur)
+
+    @staticmethod
+    def read_source_file_chunk(cur, source_id: int, offset: int, length: int) -> bytes:
+        cur.execute(
+            "SELECT substring(pdf_data FROM %s FOR %s) FROM academics.source_files WHERE source_id=%s",
+            (int(offset) + 1, int(length), source_id),
+        )
+        row = cur.fetchone()
+        if not row:
+            return b""
+        val = row["substring"] if isinstance(row, dict) else row[0]
+        return bytes(val) if val is not None else b""
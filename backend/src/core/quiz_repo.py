@@ -3,41 +3,59 @@ from typing import Any, Dict, List, Optional
 from psycopg2.extras import Json
 import json
 
-def _row_id(row) -> int:
-    if row is None:
-        raise ValueError("aucune ligne retourner par RETURNING")
-    return row["id"] if isinstance(row, dict) else row[0]
-
-def _fetchone_dict(cur):
-    row = cur.fetchone()
-    if row is None:   # ✅ CORRECTION
-        return None
-    if isinstance(row, dict):
-        return row
-    cols = [d.name if hasattr(d, "name") else d[0] for d in cur.description]
-    return dict(zip(cols, row))
-
-def _fetchall_dict(cur):
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    if isinstance(rows[0], dict):
-        return rows
-    cols = [d.name if hasattr(d, "name") else d[0] for d in cur.description]
-    return [dict(zip(cols, r)) for r in rows]
-
-def _row_to_dict(cur, row) -> Dict[str, Any]:
-    cols = [desc[0] for desc in cur.description]
-    return dict(zip(cols, row))
+from database.statements import statement, execute, execute_async
+from database.rows import fetchone_dict, fetchall_dict, row_id, scalar
 
+# requêtes partagées par QuizRepo et QuizRepoAsync (même style %s, préparées par connexion)
+# colonnes listées explicitement (cf. database.statements)
+_ITEM_COLS = ("id, quiz_id, type, question_md, options_json, bonne_reponse, explication_md, "
+              "ordre, difficulty, tags")
+_ATTEMPT_COLS = "id, quiz_id, user_id, started_at, finished_at, score_raw, score_max, meta"
+_ANSWER_COLS = "id, attempt_id, item_id, answers_json, is_correct, responded_at"
+_STMT_GET_QUIZ = statement("quiz.get_quiz", """
+    SELECT id, titre, tags, niveau, is_published, mode, duration_sec, pass_mark,
+           shuffle_items, shuffle_options, attempts_limit, created_by, created_at, updated_at
+    FROM learning.quizzes
+    WHERE id = %s
+""")
+_STMT_GET_ITEM = statement("quiz.get_item", f"SELECT {_ITEM_COLS} FROM learning.quiz_items WHERE id=%s")
+_STMT_GET_ATTEMPT = statement("quiz.get_attempt", f"SELECT {_ATTEMPT_COLS} FROM learning.quiz_attempts WHERE id=%s")
+_STMT_UPSERT_ANSWER = statement("quiz.upsert_answer", f"""
+    INSERT INTO learning.quiz_answers
+      (attempt_id, item_id, answers_json, is_correct)
+    VALUES
+      (%s, %s, %s::jsonb, %s)
+    ON CONFLICT (attempt_id, item_id)
+    DO UPDATE SET
+      answers_json=EXCLUDED.answers_json,
+      is_correct=EXCLUDED.is_correct,
+      responded_at=NOW()
+    RETURNING {_ANSWER_COLS}
+""")
+_STMT_LIST_ITEMS = statement("quiz.list_items", f"""
+    SELECT {_ITEM_COLS}
+    FROM learning.quiz_items
+    WHERE quiz_id=%s
+    ORDER BY ordre ASC, id ASC
+""")
+_STMT_COUNT_ATTEMPTS_FOR_USER = statement("quiz.count_attempts_for_user", """
+    SELECT COUNT(*)
+    FROM learning.quiz_attempts
+    WHERE quiz_id=%s AND user_id=%s
+""")
+_STMT_LIST_ANSWERS_FOR_ATTEMPT = statement("quiz.list_answers_for_attempt", f"""
+    SELECT {_ANSWER_COLS}
+    FROM learning.quiz_answers
+    WHERE attempt_id=%s
+    ORDER BY responded_at ASC, id ASC
+""")
+_STMT_FINISH_ATTEMPT = statement("quiz.finish_attempt", f"""
+    UPDATE learning.quiz_attempts
+    SET finished_at=NOW(), score_raw=%s, score_max=%s
+    WHERE id=%s
+    RETURNING {_ATTEMPT_COLS}
+""")
 
-def _row_id_from_returning(row) -> int:
-
-    if row is None:
-        raise ValueError("RETURNING id a renvoyé None")
-    if isinstance(row, dict):
-        return int(row["id"])
-    return int(row[0])
 
 class QuizRepo:
     @staticmethod
@@ -101,23 +119,12 @@ class QuizRepo:
                 ),
             )
 
-       return _row_id(cur.fetchone())
+       return row_id(cur.fetchone())
     
     @staticmethod
     def get_quiz(cur, quiz_id: int) -> Optional[Dict[str, Any]]:
-        cur.execute(
-            """
-            SELECT id, titre, tags, niveau, is_published, mode, duration_sec, pass_mark,
-                   shuffle_items, shuffle_options, attempts_limit, created_by, created_at, updated_at
-            FROM learning.quizzes
-            WHERE id = %s
-            """,
-            (quiz_id,),
-        )
-        row = cur.fetchone()
-        if row is None:
-            return None
-        return row if isinstance(row, dict) else _row_to_dict(cur, row)
+        execute(cur, _STMT_GET_QUIZ, (quiz_id,))
+        return fetchone_dict(cur, _STMT_GET_QUIZ)
     
     @staticmethod
     def list_quizzes(
@@ -155,7 +162,7 @@ class QuizRepo:
             """,
             tuple(params),
         )
-        return _fetchall_dict(cur)
+        return fetchall_dict(cur)
  
     @staticmethod
     def update_quiz(cur, quiz_id: int, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -195,7 +202,7 @@ class QuizRepo:
             """,
             tuple(params),
         )
-        return _fetchone_dict(cur)
+        return fetchone_dict(cur)
 
     @staticmethod
     def delete_quiz(cur, quiz_id: int) -> bool:
@@ -227,49 +234,25 @@ class QuizRepo:
                 payload.get("tags", []),
             ),
         )
-        return _row_id(cur.fetchone())
+        return row_id(cur.fetchone())
 
     @staticmethod
     def get_item(cur, item_id: int) -> Optional[Dict[str, Any]]:
-        cur.execute("SELECT * FROM learning.quiz_items WHERE id=%s", (item_id,))
-        row = cur.fetchone()
-        if row is None:
-            return None
-        return row if isinstance(row, dict) else _row_to_dict(cur, row)
+        execute(cur, _STMT_GET_ITEM, (item_id,))
+        return fetchone_dict(cur, _STMT_GET_ITEM)
 
     @staticmethod
     def list_items(cur, quiz_id: int) -> List[Dict[str, Any]]:
-        cur.execute(
-            """
-            SELECT *
-            FROM learning.quiz_items
-            WHERE quiz_id=%s
-            ORDER BY ordre ASC, id ASC
-            """,
-            (quiz_id,),
-        )
-        rows = cur.fetchall()
-        if not rows:
-            return []
-        if isinstance(rows[0], dict):
-            return rows
-        return [_row_to_dict(cur, r) for r in rows]
+        execute(cur, _STMT_LIST_ITEMS, (quiz_id,))
+        return fetchall_dict(cur, _STMT_LIST_ITEMS)
 
     # -------------------------
     # Attempts / Answers
     # -------------------------
     @staticmethod
     def count_attempts_for_user(cur, quiz_id: int, user_id: int) -> int:
-        cur.execute(
-            """
-            SELECT COUNT(*)
-            FROM learning.quiz_attempts
-            WHERE quiz_id=%s AND user_id=%s
-            """,
-            (quiz_id, user_id),
-        )
-        row = cur.fetchone()
-        return int(row["count"] if isinstance(row, dict) and "count" in row else row[0])
+        execute(cur, _STMT_COUNT_ATTEMPTS_FOR_USER, (quiz_id, user_id))
+        return int(scalar(cur.fetchone(), "count"))
 
     @staticmethod
     def create_attempt(cur, *, quiz_id: int, user_id: int, meta: Dict[str, Any]) -> int:
@@ -281,15 +264,12 @@ class QuizRepo:
             """,
             (quiz_id, user_id, Json(meta or {})),  # ✅ dict -> JSON adapté
         )
-        return _row_id_from_returning(cur.fetchone())
+        return row_id(cur.fetchone())
 
     @staticmethod
     def get_attempt(cur, attempt_id: int) -> Optional[Dict[str, Any]]:
-        cur.execute("SELECT * FROM learning.quiz_attempts WHERE id=%s", (attempt_id,))
-        row = cur.fetchone()
-        if row is None:
-            return None
-        return row if isinstance(row, dict) else _row_to_dict(cur, row)
+        execute(cur, _STMT_GET_ATTEMPT, (attempt_id,))
+        return fetchone_dict(cur, _STMT_GET_ATTEMPT)
 
     @staticmethod
     def upsert_answer(
@@ -300,51 +280,63 @@ class QuizRepo:
         answers_json: Dict[str, Any],
         is_correct: Optional[bool],
     ) -> Dict[str, Any]:
-        cur.execute(
-            """
-            INSERT INTO learning.quiz_answers
-              (attempt_id, item_id, answers_json, is_correct)
-            VALUES
-              (%s, %s, %s::jsonb, %s)
-            ON CONFLICT (attempt_id, item_id)
-            DO UPDATE SET
-              answers_json=EXCLUDED.answers_json,
-              is_correct=EXCLUDED.is_correct,
-              responded_at=NOW()
-            RETURNING *
-            """,
+        execute(
+            cur,
+            _STMT_UPSERT_ANSWER,
             (attempt_id, item_id, json.dumps(answers_json or {}), is_correct),
         )
-        row = _fetchone_dict(cur)
+        row = fetchone_dict(cur, _STMT_UPSERT_ANSWER)
         if row is None:
             raise ValueError("upsert_answer: aucune ligne retournée")
         return row
 
     @staticmethod
     def list_answers_for_attempt(cur, attempt_id: int) -> List[Dict[str, Any]]:
-        cur.execute(
-            """
-            SELECT *
-            FROM learning.quiz_answers
-            WHERE attempt_id=%s
-            ORDER BY responded_at ASC, id ASC
-            """,
-            (attempt_id,),
-        )
-        return _fetchall_dict(cur)
+        execute(cur, _STMT_LIST_ANSWERS_FOR_ATTEMPT, (attempt_id,))
+        return fetchall_dict(cur, _STMT_LIST_ANSWERS_FOR_ATTEMPT)
 
     @staticmethod
     def finish_attempt(cur, *, attempt_id: int, score_raw: int, score_max: int) -> Dict[str, Any]:
-        cur.execute(
-            """
-            UPDATE learning.quiz_attempts
-            SET finished_at=NOW(), score_raw=%s, score_max=%s
-            WHERE id=%s
-            RETURNING *
-            """,
-            (score_raw, score_max, attempt_id),
-        )
-        row = _fetchone_dict(cur)
+        execute(cur, _STMT_FINISH_ATTEMPT, (score_raw, score_max, attempt_id))
+        row = fetchone_dict(cur, _STMT_FINISH_ATTEMPT)
         if row is None:
             raise ValueError("finish_attempt: attempt not found")
-        return row
\ No newline at end of file
+        return row
+
+
+class QuizRepoAsync:
+    """Variantes awaitables (curseur psycopg 3 async, lignes en dict) du chemin de réponse."""
+
+    @staticmethod
+    async def get_quiz(cur, quiz_id: int) -> Optional[Dict[str, Any]]:
+        await execute_async(cur, _STMT_GET_QUIZ, (quiz_id,))
+        return await cur.fetchone()
+
+    @staticmethod
+    async def get_item(cur, item_id: int) -> Optional[Dict[str, Any]]:
+        await execute_async(cur, _STMT_GET_ITEM, (item_id,))
+        return await cur.fetchone()
+
+    @staticmethod
+    async def get_attempt(cur, attempt_id: int) -> Optional[Dict[str, Any]]:
+        await execute_async(cur, _STMT_GET_ATTEMPT, (attempt_id,))
+        return await cur.fetchone()
+
+    @staticmethod
+    async def upsert_answer(
+        cur,
+        *,
+        attempt_id: int,
+        item_id: int,
+        answers_json: Dict[str, Any],
+        is_correct: Optional[bool],
+    ) -> Dict[str, Any]:
+        await execute_async(
+            cur,
+            _STMT_UPSERT_ANSWER,
+            (attempt_id, item_id, json.dumps(answers_json or {}), is_correct),
+        )
+        row = await cur.fetchone()
+        if row is None:
+            raise ValueError("upsert_answer: aucune ligne retournée")
+        return row
@@ -2,32 +2,7 @@ from __future__ import annotations
 from typing import Any, Dict, List, Optional
 from psycopg2.extras import Json
 
-
-
-def _fetchone_dict(cur):
-    row = cur.fetchone()
-    if row is None:
-        return None
-    if isinstance(row, dict):
-        return row
-    cols = [d.name if hasattr(d, "name") else d[0] for d in cur.description]
-    return dict(zip(cols, row))
-
-def _fetchall_dict(cur) -> List[Dict[str, Any]]:
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    if isinstance(rows[0], dict):
-        return rows
-    cols = [d.name if hasattr(d, "name") else d[0] for d in cur.description]
-    return [dict(zip(cols, r)) for r in rows]
-
-
-def _row_id(row) -> int:
-    if row is None:
-        raise ValueError("RETURNING a renvoyé None")
-    return int(row["id"]) if isinstance(row, dict) else int(row[0])
-
+from database.rows import fetchone_dict, fetchall_dict, row_id
 
 
 class RevisionRepo: 
@@ -64,7 +39,7 @@ class RevisionRepo:
             "SELECT * FROM revision.revision_sheets WHERE id=%s",
             (sheet_id,),
         )
-        return _fetchone_dict(cur)
+        return fetchone_dict(cur)
     
     @staticmethod
     def list_sheets(
@@ -110,7 +85,7 @@ class RevisionRepo:
                 tuple(params),
             )
 
-        return _fetchall_dict(cur)
+        return fetchall_dict(cur)
     
     @staticmethod
     def update_sheet(cur, sheet_id: int, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -137,7 +112,7 @@ class RevisionRepo:
         """
 
         cur.execute(sql, tuple(params))
-        return _fetchone_dict(cur)
+        return fetchone_dict(cur)
     
     @staticmethod
     def delete_sheet(cur, sheet_id: int) -> bool:
@@ -163,7 +138,7 @@ class RevisionRepo:
                 payload.get("page_end"),
             ),
         )
-        return _row_id(cur.fetchone())
+        return row_id(cur.fetchone())
     @staticmethod
     def list_items(cur, sheet_id: int) -> List[Dict[str, Any]]:
         cur.execute(
@@ -175,7 +150,7 @@ class RevisionRepo:
             """,
             (sheet_id,),
         )
-        return _fetchall_dict(cur)
+        return fetchall_dict(cur)
 
     @staticmethod
     def delete_item(cur, item_id: int) -> bool:
@@ -193,7 +168,7 @@ class RevisionRepo:
             """,
             (sheet_id,),
         )
-        return _fetchall_dict(cur)
+        return fetchall_dict(cur)
 
     @staticmethod
     def delete_item(cur, item_id: int) -> bool:
@@ -220,7 +195,7 @@ class RevisionRepo:
                 Json(payload.get("sources", [])),
             ),
         )
-        return _row_id(cur.fetchone())
+        return row_id(cur.fetchone())
     
     @staticmethod
     def create_flashcard(cur, payload: Dict[str, Any]) -> int:
@@ -240,7 +215,7 @@ class RevisionRepo:
                 payload.get("tags", []),
             ),
         )
-        return _row_id(cur.fetchone())
+        return row_id(cur.fetchone())
     
     @staticmethod
     def get_schedule(cur, user_id: int, flashcard_id: int) -> Optional[Dict[str, Any]]:
@@ -252,7 +227,7 @@ class RevisionRepo:
             """,
             (user_id, flashcard_id),
         )
-        return _fetchone_dict(cur)
+        return fetchone_dict(cur)
 
     @staticmethod
     def upsert_schedule(cur, payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -280,7 +255,7 @@ class RevisionRepo:
                 payload["due_at"],
             ),
         )
-        row = _fetchone_dict(cur)
+        row = fetchone_dict(cur)
         if row is None:
             raise ValueError("schedule not upserted")
         return row
@@ -300,7 +275,7 @@ class RevisionRepo:
                 Json(payload.get("meta", {})),
             ),
         )
-        return _row_id(cur.fetchone())
+        return row_id(cur.fetchone())
 
     @staticmethod
     def list_due(cur, user_id: int, limit: int = 50) -> List[Dict[str, Any]]:
@@ -315,7 +290,7 @@ class RevisionRepo:
             """,
             (user_id, limit),
         )
-        return _fetchall_dict(cur)
+        return fetchall_dict(cur)
     
     @staticmethod
     def create_asset(cur, payload: Dict[str, Any]) -> int:
@@ -359,7 +334,7 @@ class RevisionRepo:
                 Json(payload.get("meta") or {}),
             ),
         )
-        return _row_id(cur.fetchone())
+        return row_id(cur.fetchone())
     
     @staticmethod
     def list_assets(cur, sheet_id: int) -> List[Dict[str, Any]]:
@@ -385,7 +360,7 @@ class RevisionRepo:
             """,
             (sheet_id,),
         )
-        return _fetchall_dict(cur)
+        return fetchall_dict(cur)
     
     @staticmethod
     def delete_asset(cur, asset_id: int) -> bool:
@@ -1,31 +1,53 @@
 from __future__ import annotations
 from typing import Any, Dict, List, Optional
 from psycopg2.extras import Json
+import json
+
+from database.statements import statement, execute, execute_async
+from database.rows import fetchone_dict, fetchall_dict, row_id
+
+
+# requêtes partagées par RevisionSrsRepo et RevisionSrsRepoAsync (même style %s, préparées par connexion)
+# colonnes listées explicitement (cf. database.statements)
+_SCHEDULE_COLS = "id, user_id, flashcard_id, interval_days, ease_factor, repetitions, due_at, updated_at"
+_FLASHCARD_COLS = "id, note_id, lesson_id, front_md, back_md, tags, created_at"
+_STMT_GET_SCHEDULE = statement("srs.get_schedule", f"""
+    SELECT {_SCHEDULE_COLS}
+    FROM revision.srs_schedules
+    WHERE user_id=%s AND flashcard_id=%s
+""")
+_STMT_UPSERT_SCHEDULE = statement("srs.upsert_schedule", f"""
+    INSERT INTO revision.srs_schedules
+      (user_id, flashcard_id, interval_days, ease_factor, repetitions, due_at)
+    VALUES
+      (%s, %s, %s, %s, %s, %s)
+    ON CONFLICT (user_id, flashcard_id)
+    DO UPDATE SET
+      interval_days=EXCLUDED.interval_days,
+      ease_factor=EXCLUDED.ease_factor,
+      repetitions=EXCLUDED.repetitions,
+      due_at=EXCLUDED.due_at,
+      updated_at=NOW()
+    RETURNING {_SCHEDULE_COLS}
+""")
+_STMT_INSERT_REVIEW = statement("srs.insert_review", """
+    INSERT INTO revision.srs_reviews (user_id, flashcard_id, quality, meta)
+    VALUES (%s, %s, %s, %s::jsonb)
+    RETURNING id
+""")
+_STMT_LIST_DUE = statement("srs.list_due", """
+    SELECT
+      f.id, f.note_id, f.lesson_id, f.front_md, f.back_md, f.tags, f.created_at,
+      s.interval_days, s.ease_factor, s.repetitions, s.due_at
+    FROM revision.srs_schedules s
+    JOIN revision.flashcards f ON f.id = s.flashcard_id
+    WHERE s.user_id=%s AND s.due_at <= NOW()
+    ORDER BY s.due_at ASC
+    LIMIT %s
+""")
+_STMT_GET_FLASHCARD = statement("srs.get_flashcard", f"SELECT {_FLASHCARD_COLS} FROM revision.flashcards WHERE id=%s")
 
 
-def _fetchone_dict(cur) -> Optional[Dict[str, Any]]:
-    row = cur.fetchone()
-    if row is None:
-        return None
-    if isinstance(row, dict):
-        return row
-    cols = [d.name if hasattr(d, "name") else d[0] for d in cur.description]
-    return dict(zip(cols, row))
-
-def _fetchall_dict(cur) -> List[Dict[str, Any]]:
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    if isinstance(rows[0], dict):
-        return rows
-    cols = [d.name if hasattr(d, "name") else d[0] for d in cur.description]
-    return [dict(zip(cols, r)) for r in rows]
-
-def _row_id(row) -> int:
-    if row is None:
-        raise ValueError("RETURNING id vide")
-    return int(row["id"]) if isinstance(row, dict) else int(row[0])
-
 class RevisionSrsRepo:
 
     @staticmethod
@@ -44,12 +66,12 @@ class RevisionSrsRepo:
                 payload.get("tags", []),
             ),
         )
-        return _row_id(cur.fetchone())
+        return row_id(cur.fetchone())
 
     @staticmethod
     def get_flashcard(cur, flashcard_id: int) -> Optional[Dict[str, Any]]:
-        cur.execute("SELECT * FROM revision.flashcards WHERE id=%s", (flashcard_id,))
-        return _fetchone_dict(cur)
+        execute(cur, _STMT_GET_FLASHCARD, (flashcard_id,))
+        return fetchone_dict(cur, _STMT_GET_FLASHCARD)
 
     @staticmethod
     def list_flashcards(
@@ -90,7 +112,7 @@ class RevisionSrsRepo:
             """,
             tuple(params),
         )
-        return _fetchall_dict(cur)
+        return fetchall_dict(cur)
 
     @staticmethod
     def update_flashcard(cur, flashcard_id: int, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -119,7 +141,7 @@ class RevisionSrsRepo:
             """,
             tuple(params),
         )
-        return _fetchone_dict(cur)
+        return fetchone_dict(cur)
 
     @staticmethod
     def delete_flashcard(cur, flashcard_id: int) -> bool:
@@ -128,15 +150,8 @@ class RevisionSrsRepo:
     
     @staticmethod
     def get_schedule(cur, user_id: int, flashcard_id: int) -> Optional[Dict[str, Any]]:
-        cur.execute(
-            """
-            SELECT *
-            FROM revision.srs_schedules
-            WHERE user_id=%s AND flashcard_id=%s
-            """,
-            (user_id, flashcard_id),
-        )
-        return _fetchone_dict(cur)
+        execute(cur, _STMT_GET_SCHEDULE, (user_id, flashcard_id))
+        return fetchone_dict(cur, _STMT_GET_SCHEDULE)
 
     @staticmethod
     def upsert_schedule(
@@ -149,56 +164,21 @@ class RevisionSrsRepo:
         repetitions: int,
         due_at_iso: str,
     ) -> Dict[str, Any]:
-        cur.execute(
-            """
-            INSERT INTO revision.srs_schedules
-              (user_id, flashcard_id, interval_days, ease_factor, repetitions, due_at)
-            VALUES
-              (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (user_id, flashcard_id)
-            DO UPDATE SET
-              interval_days=EXCLUDED.interval_days,
-              ease_factor=EXCLUDED.ease_factor,
-              repetitions=EXCLUDED.repetitions,
-              due_at=EXCLUDED.due_at,
-              updated_at=NOW()
-            RETURNING *
-            """,
-            (user_id, flashcard_id, interval_days, ease_factor, repetitions, due_at_iso),
-        )
-        row = _fetchone_dict(cur)
+        execute(cur, _STMT_UPSERT_SCHEDULE, (user_id, flashcard_id, interval_days, ease_factor, repetitions, due_at_iso))
+        row = fetchone_dict(cur, _STMT_UPSERT_SCHEDULE)
         if row is None:
             raise ValueError("upsert_schedule: aucune ligne retournée")
         return row
 
     @staticmethod
     def insert_review(cur, user_id: int, flashcard_id: int, quality: int, meta: Dict[str, Any]) -> int:
-        cur.execute(
-            """
-            INSERT INTO revision.srs_reviews (user_id, flashcard_id, quality, meta)
-            VALUES (%s, %s, %s, %s::jsonb)
-            RETURNING id
-            """,
-            (user_id, flashcard_id, quality, Json(meta or {})),
-        )
-        return _row_id(cur.fetchone())
+        execute(cur, _STMT_INSERT_REVIEW, (user_id, flashcard_id, quality, Json(meta or {})))
+        return row_id(cur.fetchone())
 
     @staticmethod
     def list_due(cur, user_id: int, limit: int) -> List[Dict[str, Any]]:
-        cur.execute(
-            """
-            SELECT
-              f.*,
-              s.interval_days, s.ease_factor, s.repetitions, s.due_at
-            FROM revision.srs_schedules s
-            JOIN revision.flashcards f ON f.id = s.flashcard_id
-            WHERE s.user_id=%s AND s.due_at <= NOW()
-            ORDER BY s.due_at ASC
-            LIMIT %s
-            """,
-            (user_id, limit),
-        )
-        return _fetchall_dict(cur)
+        execute(cur, _STMT_LIST_DUE, (user_id, limit))
+        return fetchall_dict(cur, _STMT_LIST_DUE)
 
     @staticmethod
     def stats_7d(cur, user_id: int) -> Dict[str, Any]:
@@ -212,7 +192,7 @@ class RevisionSrsRepo:
             """,
             (user_id,),
         )
-        row = _fetchone_dict(cur) or {}
+        row = fetchone_dict(cur) or {}
 
         cur.execute(
             """
@@ -222,11 +202,47 @@ class RevisionSrsRepo:
             """,
             (user_id,),
         )
-        due = _fetchone_dict(cur) or {}
+        due = fetchone_dict(cur) or {}
 
         return {
             "user_id": user_id,
             "due_now": int(due.get("due_now", 0)),
             "reviews_7d": int(row.get("reviews_7d", 0)),
             "avg_quality_7d": float(row.get("avg_quality_7d", 0)),
-        }
\ No newline at end of file
+        }
+
+
+class RevisionSrsRepoAsync:
+    """Variantes awaitables (curseur psycopg 3 async, lignes en dict) de la révision SRS."""
+
+    @staticmethod
+    async def get_schedule(cur, user_id: int, flashcard_id: int) -> Optional[Dict[str, Any]]:
+        await execute_async(cur, _STMT_GET_SCHEDULE, (user_id, flashcard_id))
+        return await cur.fetchone()
+
+    @staticmethod
+    async def upsert_schedule(
+        cur,
+        *,
+        user_id: int,
+        flashcard_id: int,
+        interval_days: int,
+        ease_factor: float,
+        repetitions: int,
+        due_at_iso: str,
+    ) -> Dict[str, Any]:
+        await execute_async(cur, _STMT_UPSERT_SCHEDULE, (user_id, flashcard_id, interval_days, ease_factor, repetitions, due_at_iso))
+        row = await cur.fetchone()
+        if row is None:
+            raise ValueError("upsert_schedule: aucune ligne retournée")
+        return row
+
+    @staticmethod
+    async def insert_review(cur, user_id: int, flashcard_id: int, quality: int, meta: Dict[str, Any]) -> int:
+        await execute_async(cur, _STMT_INSERT_REVIEW, (user_id, flashcard_id, quality, json.dumps(meta or {})))
+        return row_id(await cur.fetchone())
+
+    @staticmethod
+    async def list_due(cur, user_id: int, limit: int) -> List[Dict[str, Any]]:
+        await execute_async(cur, _STMT_LIST_DUE, (user_id, limit))
+        return await cur.fetchall()
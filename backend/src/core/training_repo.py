@@ -2,37 +2,7 @@
 from typing import Optional, List, Dict, Any
 import json
 
-
-def _row_id(row) -> int:
-    """Compat dict-cursor ET tuple-cursor."""
-    if row is None:
-        raise ValueError("Aucune ligne retournée par RETURNING id")
-    return row["id"] if isinstance(row, dict) else row[0]
-
-
-def _fetchone_dict(cur):
-    """
-    Retourne une ligne en dict, quel que soit le type de cursor.
-    - RealDictCursor => dict
-    - Cursor classique => tuple, converti via cur.description
-    """
-    row = cur.fetchone()
-    if row is None:
-        return None
-    if isinstance(row, dict):
-        return row
-    cols = [d.name if hasattr(d, "name") else d[0] for d in cur.description]
-    return dict(zip(cols, row))
-
-
-def _fetchall_dict(cur):
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    if isinstance(rows[0], dict):
-        return rows
-    cols = [d.name if hasattr(d, "name") else d[0] for d in cur.description]
-    return [dict(zip(cols, r)) for r in rows]
+from database.rows import fetchone_dict, fetchall_dict, row_id
 
 
 class TrainingRepo:
@@ -61,12 +31,12 @@ class TrainingRepo:
                 json.dumps(payload.get("metadata", {})),
             ),
         )
-        return _row_id(cur.fetchone())
+        return row_id(cur.fetchone())
 
     @staticmethod
     def get_exercise(cur, exercise_id: int):
         cur.execute("SELECT * FROM training.dose_exercises WHERE id=%s", (exercise_id,))
-        return _fetchone_dict(cur)
+        return fetchone_dict(cur)
 
     @staticmethod
     def list_exercises(
@@ -98,7 +68,7 @@ class TrainingRepo:
         params.extend([limit, offset])
 
         cur.execute(sql, tuple(params))
-        return _fetchall_dict(cur)
+        return fetchall_dict(cur)
 
     @staticmethod
     def create_attempt(
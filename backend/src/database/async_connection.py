@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from core import config
+
+try:
+    from psycopg.conninfo import make_conninfo
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:     # psycopg 3 absent : endpoints migrés => repli psycopg2 en threadpool
+    AsyncConnectionPool = None
+
+# ===================================================================
+# POOL ASYNCHRONE (psycopg 3) POUR LES HANDLERS async def
+# ===================================================================
+# Même style de paramètres que psycopg2 (%s) : les repos partagent leur SQL
+# entre la version synchrone et la version *Async. Lignes en dict (dict_row).
+# Réglages de session appliqués une fois par connexion physique (configure).
+# Usage :  async with async_transaction() as conn:
+#              async with conn.cursor() as cur: await QuizRepoAsync.get_item(cur, ...)
+
+logger = logging.getLogger("db.async_pool")
+
+_ASYNC_POOL: Optional["AsyncConnectionPool"] = None
+
+
+async def _configure(conn) -> None:
+    await conn.execute("SET lc_messages = 'C'")
+    await conn.commit()
+
+
+async def init_async_db_pool() -> bool:
+    """Ouvre le pool async (startup). False si désactivé ou psycopg 3 absent."""
+    global _ASYNC_POOL
+    if _ASYNC_POOL is not None:
+        return True
+    if not config.ASYNC_DB_ENABLED:
+        return False
+    if AsyncConnectionPool is None:
+        logger.warning("psycopg 3 / psycopg_pool non installés : pool async désactivé")
+        return False
+
+    conninfo = make_conninfo(
+        host=config.DB_HOST,
+        port=config.DB_PORT,
+        dbname=config.DB_NAME,
+        user=config.DB_USER,
+        password=config.DB_PASSWORD,
+        client_encoding="UTF8",
+    )
+    pool = AsyncConnectionPool(
+        conninfo,
+        min_size=config.ASYNC_DB_POOL_MIN,
+        max_size=config.ASYNC_DB_POOL_MAX,
+        timeout=config.DB_POOL_TIMEOUT_S,
+        max_idle=config.DB_POOL_VALIDATE_IDLE_S * 10,
+        kwargs={"row_factory": dict_row},
+        configure=_configure,
+        open=False,
+    )
+    await pool.open(wait=True, timeout=config.DB_POOL_TIMEOUT_S)
+    _ASYNC_POOL = pool
+    return True
+
+
+def async_pool_ready() -> bool:
+    return _ASYNC_POOL is not None
+
+
+@asynccontextmanager
+async def async_transaction():
+    """Connexion async : commit en sortie normale, rollback sur exception, toujours rendue."""
+    if _ASYNC_POOL is None:
+        raise RuntimeError("Async DB not ready")
+    async with _ASYNC_POOL.connection() as conn:
+        yield conn
+
+
+def async_pool_stats() -> Dict[str, Any]:
+    if _ASYNC_POOL is None:
+        return {"ready": False}
+    s = _ASYNC_POOL.get_stats()
+    return {
+        "ready": True,
+        "max": _ASYNC_POOL.max_size,
+        "open": s.get("pool_size", 0),
+        "idle": s.get("pool_available", 0),
+        "waiters": s.get("requests_waiting", 0),
+        "waits": s.get("requests_queued", 0),
+        "wait_ms_total": s.get("requests_wait_ms", 0),
+        "timeouts": s.get("requests_errors", 0),
+    }
+
+
+async def close_async_db_pool() -> None:
+    global _ASYNC_POOL
+    if _ASYNC_POOL is not None:
+        await _ASYNC_POOL.close()
+        _ASYNC_POOL = None
@@ -1,68 +1,361 @@
 # -*- coding: utf-8 -*-
 import os
+import time
+import asyncio
+import logging
+import itertools
+import threading
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Dict, List, Optional, Tuple
+
 import psycopg2
+import psycopg2.extensions
 from psycopg2 import pool
 from core import config
 
-_DB_POOL: pool.SimpleConnectionPool | None = None
+# ===================================================================
+# POOL DE CONNEXIONS (thread-safe, bloquant, sans fuite)
+# ===================================================================
+# - acquire() attend une connexion libre (DB_POOL_TIMEOUT_S) au lieu de
+#   lever "connection pool exhausted" ; attentes comptées dans pool_stats().
+# - Réglages de session (UTF-8, lc_messages) appliqués une seule fois par
+#   connexion physique ; validation (SELECT 1) seulement après une période
+#   d'inactivité > DB_POOL_VALIDATE_IDLE_S.
+# - conn.close() sur une connexion du pool la REND au pool ; une connexion
+#   jamais rendue est récupérée quand elle est ramassée par le GC.
+# - Jamais d'attente sur le thread de la boucle asyncio (route async def qui
+#   appellerait le pool directement) : échec immédiat (PoolTimeout) au lieu
+#   de geler toutes les requêtes ; les routes synchrones sont des `def`
+#   (threadpool FastAPI) ou passent par run_in_threadpool.
+# Usage :  with connection() as conn: ...   /   with transaction() as conn: ...
+
+logger = logging.getLogger("db.pool")
+
+_IDLE = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class PoolTimeout(pool.PoolError):
+    """Aucune connexion libre dans le délai imparti."""
+
+
+def _on_event_loop() -> bool:
+    """True si l'appelant tourne sur le thread d'une boucle asyncio."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """Connexion du pool : close() la rend au pool au lieu de la fermer."""
+
+    def close(self) -> None:
+        owner = getattr(self, "_pool", None)
+        if owner is not None and getattr(self, "_leased", False):
+            owner.release(self)
+            return
+        super().close()
+
+    def _close_physical(self) -> None:
+        try:
+            psycopg2.extensions.connection.close(self)
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+
+    def __init__(self, *, minconn: int, maxconn: int, timeout: float,
+                 validate_idle: float, readonly: bool = False, **connect_kwargs: Any):
+        self.readonly = bool(readonly)
+        self.minconn = max(0, int(minconn))
+        self.maxconn = max(1, int(maxconn))
+        self.timeout = float(timeout)
+        self.validate_idle = float(validate_idle)
+        self._connect_kwargs = connect_kwargs
+        self._cond = threading.Condition(threading.RLock())
+        self._idle: List[PooledConnection] = []
+        self._open = 0          # connexions physiques (libres + prêtées)
+        self._in_use = 0
+        self._closed = False
+        self._stats = {
+            "waiters": 0, "waits": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0,
+            "timeouts": 0, "loop_nowait": 0, "created": 0, "discarded": 0, "leaked": 0, "validations": 0,
+        }
+        for _ in range(min(self.minconn, self.maxconn)):
+            with self._cond:
+                self._open += 1
+            try:
+                self._idle.append(self._new_connection())
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                raise
+
+    # ------------------------------------------------------------------
+    # Connexions physiques
+    # ------------------------------------------------------------------
+    def _new_connection(self) -> PooledConnection:
+        conn = psycopg2.connect(connection_factory=PooledConnection, **self._connect_kwargs)
+        try:
+            # une fois par connexion physique (commit : survit aux rollbacks)
+            if self.readonly:
+                conn.set_session(readonly=True)     # réplica : toute écriture égarée échoue
+            conn.set_client_encoding("UTF8")
+            with conn.cursor() as cur:
+                cur.execute("SET lc_messages = 'C';")
+            conn.commit()
+        except Exception:
+            conn._close_physical()
+            raise
+        conn._pool = self
+        conn._leased = False
+        conn._lease = None
+        conn._last_used = time.monotonic()
+        with self._cond:
+            self._stats["created"] += 1
+        return conn
+
+    def _usable(self, conn: PooledConnection) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - conn._last_used <= self.validate_idle:
+            return True
+        with self._cond:
+            self._stats["validations"] += 1
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    # ------------------------------------------------------------------
+    # Prêt / retour
+    # ------------------------------------------------------------------
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        timeout = self.timeout if timeout is None else float(timeout)
+        if timeout > 0 and _on_event_loop():
+            # attendre ici bloquerait la boucle (et la connexion rendue par
+            # une autre requête de cette même boucle n'arriverait jamais)
+            timeout = 0.0
+            with self._cond:
+                self._stats["loop_nowait"] += 1
+        deadline = time.monotonic() + timeout
+        conn: Optional[PooledConnection] = None
+        waited = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise pool.PoolError("connection pool is closed")
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._open < self.maxconn:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"connection pool exhausted ({self.maxconn} connexions, attente > {timeout:g}s)"
+                    )
+                if waited is None:
+                    waited = time.monotonic()
+                self._stats["waiters"] += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._stats["waiters"] -= 1
+            self._in_use += 1
+            if waited is not None:
+                ms = (time.monotonic() - waited) * 1000.0
+                self._stats["waits"] += 1
+                self._stats["wait_ms_total"] += ms
+                self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], ms)
+
+        # hors verrou : connexion / validation (I/O réseau)
+        try:
+            if conn is not None and not self._usable(conn):
+                conn._close_physical()
+                with self._cond:
+                    self._stats["discarded"] += 1
+                conn = None
+            if conn is None:
+                conn = self._new_connection()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        conn._leased = True
+        conn._lease = weakref.finalize(conn, self._reclaim_leaked)
+        conn._lease.atexit = False
+        return conn
+
+    def release(self, conn: PooledConnection) -> None:
+        if not getattr(conn, "_leased", False) or getattr(conn, "_pool", None) is not self:
+            return      # déjà rendue (close() puis release_db_connection, etc.)
+        conn._leased = False
+        if conn._lease is not None:
+            conn._lease.detach()
+            conn._lease = None
+
+        keep = not conn.closed and not self._closed
+        if keep and conn.info.transaction_status != _IDLE:
+            # transaction laissée ouverte par l'appelant (lecture sans commit, erreur)
+            try:
+                conn.rollback()
+            except Exception:
+                keep = False
+        conn._last_used = time.monotonic()
 
-def init_db_pool(minconn: int = 1, maxconn: int = 10) -> None:
+        with self._cond:
+            self._in_use -= 1
+            if keep:
+                self._idle.append(conn)
+            else:
+                self._open -= 1
+                self._stats["discarded"] += 1
+            self._cond.notify()
+        if not keep:
+            conn._close_physical()
+
+    def _reclaim_leaked(self) -> None:
+        # appelé par le GC : connexion prêtée jamais rendue (le socket est
+        # fermé par psycopg2 à la destruction) => on libère sa place
+        with self._cond:
+            self._in_use -= 1
+            self._open -= 1
+            self._stats["leaked"] += 1
+            self._cond.notify()
+        logger.warning("connexion DB non rendue au pool (récupérée par le GC)")
+
+    # ------------------------------------------------------------------
+    # Fermeture / stats
+    # ------------------------------------------------------------------
+    def closeall(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn._close_physical()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            out: Dict[str, Any] = {
+                "max": self.maxconn,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+            }
+            out.update(self._stats)
+        out["wait_ms_total"] = round(out["wait_ms_total"], 2)
+        out["wait_ms_max"] = round(out["wait_ms_max"], 2)
+        out["wait_ms_avg"] = round(out["wait_ms_total"] / out["waits"], 2) if out["waits"] else 0.0
+        return out
+
+
+_DB_POOL: Optional[ConnectionPool] = None
+_INIT_LOCK = threading.Lock()
+
+
+def init_db_pool(minconn: Optional[int] = None, maxconn: Optional[int] = None) -> None:
     """
     Initialise le pool (à appeler dans l'événement startup).
     Force UTF-8 et messages serveur en ASCII pour éviter les erreurs d'encodage.
     """
     global _DB_POOL
-    if _DB_POOL is not None:
-        return  # déjà prêt
+    with _INIT_LOCK:
+        if _DB_POOL is not None:
+            return  # déjà prêt
 
-    os.environ["PGCLIENTENCODING"] = "UTF8"
-    options = "-c client_encoding=UTF8 -c lc_messages=C"
+        os.environ["PGCLIENTENCODING"] = "UTF8"
+        options = "-c client_encoding=UTF8 -c lc_messages=C"
 
-    try:
-        _DB_POOL = pool.SimpleConnectionPool(
-            minconn=minconn,
-            maxconn=maxconn,
-            host=config.DB_HOST,  
-            port=config.DB_PORT,
-            dbname=config.DB_NAME,
-            user=config.DB_USER,
-            password=config.DB_PASSWORD,
-            options=options,
-        )
-        conn = _DB_POOL.getconn()
         try:
-            conn.set_client_encoding("UTF8")
-            with conn.cursor() as cur:
-                cur.execute("SET lc_messages = 'C';")
-        finally:
-            _DB_POOL.putconn(conn)
+            _DB_POOL = ConnectionPool(
+                minconn=config.DB_POOL_MIN if minconn is None else minconn,
+                maxconn=config.DB_POOL_MAX if maxconn is None else maxconn,
+                timeout=config.DB_POOL_TIMEOUT_S,
+                validate_idle=config.DB_POOL_VALIDATE_IDLE_S,
+                host=config.DB_HOST,
+                port=config.DB_PORT,
+                dbname=config.DB_NAME,
+                user=config.DB_USER,
+                password=config.DB_PASSWORD,
+                options=options,
+            )
+        except Exception as e:
+            print("[DB-INIT-ERROR]", repr(e))
+            raise RuntimeError("DB init failed")
+
+        _init_replicas(options)
 
-    except Exception as e:
-        print("[DB-INIT-ERROR]", repr(e))
-        raise RuntimeError("DB init failed")
 
 def get_db_connection():
     """
-    Récupère une connexion depuis le pool (UTF-8 + lc_messages=C).
+    Récupère une connexion depuis le pool (attend si toutes sont prêtées).
+    À rendre avec release_db_connection (ou conn.close()) ; préférer connection().
     """
     if _DB_POOL is None:
         raise RuntimeError("DB not ready")
-    conn = _DB_POOL.getconn()
-    try:
-        conn.set_client_encoding("UTF8")
-        with conn.cursor() as cur:
-            cur.execute("SET lc_messages = 'C';")
-    except Exception:
-        _DB_POOL.putconn(conn)
-        raise
-    return conn
+    return _DB_POOL.acquire()
+
 
 def release_db_connection(conn) -> None:
     """
-    Remet la connexion dans le pool.
+    Remet la connexion dans son pool (primaire ou réplica), transaction en cours annulée.
     """
-    if _DB_POOL and conn:
-        _DB_POOL.putconn(conn)
+    if not conn:
+        return
+    owner = getattr(conn, "_pool", None) or _DB_POOL
+    if owner is not None:
+        owner.release(conn)
+
+
+@contextmanager
+def connection():
+    """Connexion du pool, toujours rendue en sortie de bloc."""
+    conn = get_db_connection()
+    try:
+        yield conn
+    finally:
+        release_db_connection(conn)
+
+
+@contextmanager
+def transaction():
+    """Connexion du pool : commit en sortie normale, rollback sur exception."""
+    conn = get_db_connection()
+    try:
+        yield conn
+        conn.commit()
+        mark_write()
+    except BaseException:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        release_db_connection(conn)
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Occupation du pool : connexions prêtées / libres, attentes, fuites."""
+    if _DB_POOL is None:
+        return {"ready": False}
+    return {"ready": True, **_DB_POOL.stats()}
+
 
 def close_db_pool() -> None:
     """
@@ -72,16 +365,253 @@ def close_db_pool() -> None:
     if _DB_POOL:
         _DB_POOL.closeall()
         _DB_POOL = None
+    _close_replicas()
+
 
 def ping_db() -> bool:
     """
     Test léger de santé DB. Retourne True si SELECT 1 passe.
     """
-    conn = get_db_connection()
-    try:
+    with connection() as conn:
         with conn.cursor() as cur:
             cur.execute("SELECT 1;")
             cur.fetchone()
         return True
+
+
+# ===================================================================
+# RÉPLICAS EN LECTURE (listes, statistiques, rapports)
+# ===================================================================
+# DB_READ_REPLICAS="hote[:port],..." : un pool en lecture seule par réplica
+# (même base, mêmes identifiants que le primaire, connexions ouvertes à la
+# demande). read_connection() sert les lectures qui tolèrent un léger retard :
+# - réplica choisi en tourniquet parmi ceux joignables dont le retard de
+#   rejeu <= DB_REPLICA_MAX_LAG_S (mesuré au plus toutes les DB_REPLICA_CHECK_S) ;
+# - read-your-writes : après une écriture d'un utilisateur (requête HTTP
+#   POST/PUT/PATCH/DELETE, transaction() validée), ses lectures restent sur le
+#   primaire pendant DB_REPLICA_STICKY_S ;
+# - réplica injoignable ou saturé : lecture sur le primaire, réplica écarté
+#   pendant DB_REPLICA_RETRY_S.
+# La clé utilisateur vient du contexte de la requête (set_route_key, posée
+# par le middleware HTTP de main.py). Sans réplica : primaire, comme avant.
+# _STICKY est propre au processus : avec plusieurs workers uvicorn / plusieurs
+# instances, la lecture suivante peut tomber sur un autre processus. La date
+# de la dernière écriture voyage donc aussi avec le client (cookie / en-tête
+# posés par le middleware, rendus à set_route_key(key, last_write)) ; elle
+# suppose des horloges synchronisées (NTP) entre instances.
+# Usage :  with read_connection() as conn, conn.cursor() as cur: ...
+
+# un serveur qui n'est pas en recovery (2e Postgres local de test) : retard nul
+_LAG_SQL = """
+    SELECT CASE
+      WHEN NOT pg_is_in_recovery() THEN 0
+      WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+      ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+# (clé utilisateur, date epoch de sa dernière écriture connue du client)
+_ROUTE_KEY: ContextVar[Tuple[Optional[str], Optional[float]]] = ContextVar(
+    "db_route_key", default=(None, None)
+)
+_STICKY: Dict[str, float] = {}          # clé utilisateur -> fin de la fenêtre primaire (ce processus)
+_STICKY_MAX = 50_000
+
+
+class _Replica:
+    __slots__ = ("name", "pool", "down_until", "lag_s", "checked_at")
+
+    def __init__(self, name: str, pool: ConnectionPool):
+        self.name = name
+        self.pool = pool
+        self.down_until = 0.0
+        self.lag_s: Optional[float] = None
+        self.checked_at = 0.0
+
+
+_REPLICAS: List[_Replica] = []
+_RR = itertools.count()
+_ROUTE_LOCK = threading.Lock()
+_ROUTE_STATS = {"replica": 0, "primary_sticky": 0, "primary_fallback": 0, "primary_no_replica": 0}
+
+
+def _parse_replicas(spec: str) -> List[Tuple[str, int]]:
+    out = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(":") if ":" in item else (item, "", "")
+        out.append((host, int(port or config.DB_PORT or 5432)))
+    return out
+
+
+def _init_replicas(options: str) -> None:
+    for host, port in _parse_replicas(config.DB_READ_REPLICAS):
+        pool_ = ConnectionPool(
+            minconn=0,
+            maxconn=config.DB_REPLICA_POOL_MAX,
+            timeout=config.DB_REPLICA_ACQUIRE_TIMEOUT_S,
+            validate_idle=config.DB_POOL_VALIDATE_IDLE_S,
+            readonly=True,
+            host=host,
+            port=port,
+            dbname=config.DB_NAME,
+            user=config.DB_USER,
+            password=config.DB_PASSWORD,
+            options=options,
+            connect_timeout=max(1, int(config.DB_REPLICA_ACQUIRE_TIMEOUT_S)),
+        )
+        _REPLICAS.append(_Replica(f"{host}:{port}", pool_))
+    if _REPLICAS:
+        logger.info("réplicas en lecture : %s", ", ".join(r.name for r in _REPLICAS))
+
+
+def _close_replicas() -> None:
+    replicas = list(_REPLICAS)
+    _REPLICAS.clear()
+    with _ROUTE_LOCK:
+        _STICKY.clear()
+    for rep in replicas:
+        rep.pool.closeall()
+
+
+def replicas_enabled() -> bool:
+    return bool(_REPLICAS)
+
+
+def set_route_key(key: Optional[str], last_write: Optional[float] = None) -> Token:
+    """
+    Clé (utilisateur) de la requête courante pour read-your-writes, et date
+    epoch de sa dernière écriture transmise par le client (cookie / en-tête,
+    vaut entre processus) ; rendre le Token à reset_route_key.
+    """
+    return _ROUTE_KEY.set((key, last_write))
+
+
+def reset_route_key(token: Token) -> None:
+    _ROUTE_KEY.reset(token)
+
+
+def mark_write(key: Optional[str] = None) -> None:
+    """L'utilisateur vient d'écrire : ses lectures restent sur le primaire DB_REPLICA_STICKY_S."""
+    key = key or _ROUTE_KEY.get()[0]
+    if not key or not _REPLICAS:
+        return
+    now = time.monotonic()
+    with _ROUTE_LOCK:
+        if len(_STICKY) >= _STICKY_MAX:
+            for k in [k for k, until in _STICKY.items() if until <= now]:
+                del _STICKY[k]
+        _STICKY[key] = now + config.DB_REPLICA_STICKY_S
+
+
+def _sticky(key: Optional[str], last_write: Optional[float] = None) -> bool:
+    if last_write is not None:
+        age = time.time() - last_write
+        if -config.DB_REPLICA_STICKY_S < age < config.DB_REPLICA_STICKY_S:
+            return True
+    if not key:
+        return False
+    with _ROUTE_LOCK:
+        until = _STICKY.get(key)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del _STICKY[key]
+            return False
+        return True
+
+
+def _count(what: str) -> None:
+    with _ROUTE_LOCK:
+        _ROUTE_STATS[what] += 1
+
+
+def _measure_lag(rep: _Replica, conn) -> float:
+    with conn.cursor() as cur:
+        cur.execute(_LAG_SQL)
+        row = cur.fetchone()
+    conn.rollback()
+    rep.lag_s = float((row[0] if row else 0) or 0)
+    rep.checked_at = time.monotonic()
+    return rep.lag_s
+
+
+def _acquire_replica():
+    """Connexion d'un réplica sain et à jour, None si aucun."""
+    n = len(_REPLICAS)
+    start = next(_RR)
+    for i in range(n):
+        rep = _REPLICAS[(start + i) % n]
+        now = time.monotonic()
+        if rep.down_until > now:
+            continue
+        check_due = now - rep.checked_at >= config.DB_REPLICA_CHECK_S
+        if not check_due and rep.lag_s is not None and rep.lag_s > config.DB_REPLICA_MAX_LAG_S:
+            continue
+        try:
+            conn = rep.pool.acquire()
+        except PoolTimeout:
+            continue        # réplica saturé : cette lecture va ailleurs, sans l'écarter
+        except Exception as e:
+            rep.down_until = now + config.DB_REPLICA_RETRY_S
+            logger.warning("réplica %s écarté %gs : %r", rep.name, config.DB_REPLICA_RETRY_S, e)
+            continue
+        if check_due:
+            try:
+                lag = _measure_lag(rep, conn)
+            except Exception as e:
+                release_db_connection(conn)
+                rep.down_until = now + config.DB_REPLICA_RETRY_S
+                logger.warning("réplica %s écarté %gs : %r", rep.name, config.DB_REPLICA_RETRY_S, e)
+                continue
+            if lag > config.DB_REPLICA_MAX_LAG_S:
+                release_db_connection(conn)
+                continue
+        return conn
+    return None
+
+
+@contextmanager
+def read_connection():
+    """
+    Connexion pour une lecture seule tolérant un léger retard : réplica si
+    disponible (hors fenêtre read-your-writes de l'utilisateur), sinon primaire.
+    Toujours rendue en sortie de bloc.
+    """
+    conn = None
+    if not _REPLICAS:
+        _count("primary_no_replica")
+    elif _sticky(*_ROUTE_KEY.get()):
+        _count("primary_sticky")
+    else:
+        conn = _acquire_replica()
+        _count("replica" if conn is not None else "primary_fallback")
+    if conn is None:
+        conn = get_db_connection()
+    try:
+        yield conn
     finally:
         release_db_connection(conn)
+
+
+def replica_stats() -> Dict[str, Any]:
+    """Réplicas (état, retard mesuré, pool) et répartition des lectures routées."""
+    now = time.monotonic()
+    with _ROUTE_LOCK:
+        routing = dict(_ROUTE_STATS)
+        sticky = sum(1 for until in _STICKY.values() if until > now)
+    return {
+        "replicas": [
+            {
+                "name": rep.name,
+                "up": rep.down_until <= now,
+                "lag_s": None if rep.lag_s is None else round(rep.lag_s, 3),
+                **rep.pool.stats(),
+            }
+            for rep in list(_REPLICAS)
+        ],
+        "routing": routing,
+        "sticky_keys": sticky,
+    }
@@ -504,14 +504,34 @@ CREATE TABLE IF NOT EXISTS academics.source_files (
   id         SERIAL PRIMARY KEY,
   source_id  INT NOT NULL
              REFERENCES academics.sources(id) ON DELETE CASCADE,
-  pdf_data   BYTEA NOT NULL,
+  pdf_data   BYTEA,
+  path       TEXT,     -- clé sha256 dans le blob store (pdf_data NULL)
   created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-  UNIQUE (source_id)
+  UNIQUE (source_id),
+
+  CONSTRAINT chk_source_file_storage
+    CHECK (pdf_data IS NOT NULL OR path IS NOT NULL)
 );
 
 CREATE INDEX IF NOT EXISTS idx_source_files_source_id
   ON academics.source_files(source_id);
 
+-- bases existantes : PDF hors base possible (blob store adressé par sha256)
+ALTER TABLE academics.source_files ALTER COLUMN pdf_data DROP NOT NULL;
+ALTER TABLE academics.source_files ADD COLUMN IF NOT EXISTS path TEXT;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_constraint
+    WHERE conname = 'chk_source_file_storage'
+  ) THEN
+    ALTER TABLE academics.source_files
+    ADD CONSTRAINT chk_source_file_storage
+    CHECK (pdf_data IS NOT NULL OR path IS NOT NULL);
+  END IF;
+END $$;
+
 CREATE TABLE IF NOT EXISTS academics.source_pages (
   id         SERIAL PRIMARY KEY,
   source_id  INT NOT NULL
@@ -519,13 +539,63 @@ CREATE TABLE IF NOT EXISTS academics.source_pages (
   page_no    INT NOT NULL CHECK (page_no >= 1),
   text       TEXT,
   ocr_text   TEXT,
+  fingerprint TEXT,    -- empreinte sha256 de la page (ré-ingestion incrémentale)
   created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
   UNIQUE (source_id, page_no)
 );
 
+-- bases existantes : empreinte par page
+ALTER TABLE academics.source_pages ADD COLUMN IF NOT EXISTS fingerprint TEXT;
+
 CREATE INDEX IF NOT EXISTS idx_source_pages_source_page
   ON academics.source_pages(source_id, page_no);
 
+-- Cache OCR : texte reconnu par bitmap (md5 du PNG rendu) et langue
+CREATE TABLE IF NOT EXISTS academics.ocr_cache (
+  md5        TEXT NOT NULL,
+  lang       TEXT NOT NULL,
+  text       TEXT NOT NULL DEFAULT '',
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (md5, lang)
+);
+
+-- Blobs d'images partagés entre toutes les sources (dédup globale) :
+-- un contenu (md5) stocké une fois, référencé par N page_media_assets.
+-- ref_count tenu par trigger ; ref_count = 0 => purgeable.
+CREATE TABLE IF NOT EXISTS academics.media_blobs (
+  id         BIGSERIAL PRIMARY KEY,
+  md5        TEXT NOT NULL UNIQUE,
+  mime       TEXT NOT NULL DEFAULT 'image/png',
+  data       BYTEA,
+  path       TEXT,     -- clé sha256 dans le blob store (data NULL)
+  bytes_size INT CHECK (bytes_size IS NULL OR bytes_size >= 0),
+  width      INT CHECK (width  IS NULL OR width  > 0),
+  height     INT CHECK (height IS NULL OR height > 0),
+  phash      BIGINT,
+  ref_count  INT NOT NULL DEFAULT 0 CHECK (ref_count >= 0),
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+  CONSTRAINT chk_media_blob_storage
+    CHECK (
+      (data IS NOT NULL AND path IS NULL)
+      OR
+      (data IS NULL AND path IS NOT NULL)
+    )
+);
+
+-- quasi-doublons : pHash découpé en 4 bandes de 16 bits ; distance <= 3
+-- => au moins une bande identique (recherche par égalité indexée)
+CREATE INDEX IF NOT EXISTS idx_media_blobs_phash_b0
+  ON academics.media_blobs(((phash >> 48) & 65535)) WHERE phash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_media_blobs_phash_b1
+  ON academics.media_blobs(((phash >> 32) & 65535)) WHERE phash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_media_blobs_phash_b2
+  ON academics.media_blobs(((phash >> 16) & 65535)) WHERE phash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_media_blobs_phash_b3
+  ON academics.media_blobs((phash & 65535)) WHERE phash IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_media_blobs_orphans
+  ON academics.media_blobs(created_at) WHERE ref_count = 0;
 
 
 CREATE TABLE IF NOT EXISTS academics.page_media_assets (
@@ -542,7 +612,7 @@ CREATE TABLE IF NOT EXISTS academics.page_media_assets (
   mime       TEXT NOT NULL DEFAULT 'image/png',
 
   data       BYTEA,
-  path       TEXT,
+  path       TEXT,     -- clé sha256 dans le blob store (data NULL)
 
   md5        TEXT NOT NULL,
 
@@ -550,13 +620,22 @@ CREATE TABLE IF NOT EXISTS academics.page_media_assets (
   width      INT CHECK (width  IS NULL OR width  > 0),
   height     INT CHECK (height IS NULL OR height > 0),
 
+  phash      BIGINT,   -- pHash 64 bits (signé) calculé à l'insertion
+  phash_failed BOOLEAN NOT NULL DEFAULT false,  -- pHash incalculable (backfill : ne pas réessayer)
+
+  asset_id   INT REFERENCES media.assets(id) ON DELETE SET NULL,  -- variantes (media.asset_variants)
+
+  blob_id    BIGINT REFERENCES academics.media_blobs(id),           -- contenu partagé (data/path NULL)
+
   created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
 
   CONSTRAINT chk_media_storage
     CHECK (
-      (data IS NOT NULL AND path IS NULL)
+      (data IS NOT NULL AND path IS NULL AND blob_id IS NULL)
       OR
-      (data IS NULL AND path IS NOT NULL)
+      (data IS NULL AND path IS NOT NULL AND blob_id IS NULL)
+      OR
+      (data IS NULL AND path IS NULL AND blob_id IS NOT NULL)
     )
 );
 
@@ -571,6 +650,80 @@ CREATE INDEX IF NOT EXISTS idx_media_assets_source_page
 CREATE INDEX IF NOT EXISTS idx_media_assets_md5
   ON academics.page_media_assets(md5);
 
+-- bases existantes : pHash stocké (lecture des hashes sans les BYTEA)
+ALTER TABLE academics.page_media_assets ADD COLUMN IF NOT EXISTS phash BIGINT;
+ALTER TABLE academics.page_media_assets ADD COLUMN IF NOT EXISTS phash_failed BOOLEAN NOT NULL DEFAULT false;
+ALTER TABLE academics.page_media_assets
+  ADD COLUMN IF NOT EXISTS asset_id INT REFERENCES media.assets(id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS idx_media_assets_source_phash
+  ON academics.page_media_assets(source_id, phash)
+  WHERE phash IS NOT NULL;
+
+-- bases existantes : contenu via academics.media_blobs
+ALTER TABLE academics.page_media_assets
+  ADD COLUMN IF NOT EXISTS blob_id BIGINT REFERENCES academics.media_blobs(id);
+ALTER TABLE academics.page_media_assets DROP CONSTRAINT IF EXISTS chk_media_storage;
+ALTER TABLE academics.page_media_assets ADD CONSTRAINT chk_media_storage
+  CHECK (
+    (data IS NOT NULL AND path IS NULL AND blob_id IS NULL)
+    OR
+    (data IS NULL AND path IS NOT NULL AND blob_id IS NULL)
+    OR
+    (data IS NULL AND path IS NULL AND blob_id IS NOT NULL)
+  );
+
+CREATE INDEX IF NOT EXISTS idx_media_assets_blob
+  ON academics.page_media_assets(blob_id) WHERE blob_id IS NOT NULL;
+
+-- ref_count des blobs : triggers par instruction (tables de transition),
+-- un UPDATE groupé par blob même pour un INSERT multi-lignes ; les
+-- suppressions en cascade (source supprimée) décrémentent aussi.
+CREATE OR REPLACE FUNCTION academics.fn_media_blob_refcount()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    UPDATE academics.media_blobs b SET ref_count = b.ref_count + d.n
+    FROM (SELECT blob_id, COUNT(*) AS n FROM new_rows
+          WHERE blob_id IS NOT NULL GROUP BY blob_id) d
+    WHERE b.id = d.blob_id;
+  ELSIF TG_OP = 'DELETE' THEN
+    UPDATE academics.media_blobs b SET ref_count = b.ref_count - d.n
+    FROM (SELECT blob_id, COUNT(*) AS n FROM old_rows
+          WHERE blob_id IS NOT NULL GROUP BY blob_id) d
+    WHERE b.id = d.blob_id;
+  ELSE
+    UPDATE academics.media_blobs b SET ref_count = b.ref_count + d.n
+    FROM (SELECT blob_id, SUM(n) AS n
+          FROM (SELECT blob_id, 1 AS n FROM new_rows
+                UNION ALL
+                SELECT blob_id, -1 AS n FROM old_rows) x
+          WHERE blob_id IS NOT NULL
+          GROUP BY blob_id
+          HAVING SUM(n) <> 0) d
+    WHERE b.id = d.blob_id;
+  END IF;
+  RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_media_blob_refs_ins ON academics.page_media_assets;
+CREATE TRIGGER trg_media_blob_refs_ins
+AFTER INSERT ON academics.page_media_assets
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION academics.fn_media_blob_refcount();
+
+DROP TRIGGER IF EXISTS trg_media_blob_refs_del ON academics.page_media_assets;
+CREATE TRIGGER trg_media_blob_refs_del
+AFTER DELETE ON academics.page_media_assets
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION academics.fn_media_blob_refcount();
+
+DROP TRIGGER IF EXISTS trg_media_blob_refs_upd ON academics.page_media_assets;
+CREATE TRIGGER trg_media_blob_refs_upd
+AFTER UPDATE ON academics.page_media_assets
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION academics.fn_media_blob_refcount();
+
 
 CREATE TABLE IF NOT EXISTS academics.course_versions (
   id            SERIAL PRIMARY KEY,
@@ -1475,11 +1628,24 @@ CREATE TABLE IF NOT EXISTS ai.jobs (
   payload   JSONB NOT NULL,
   status    TEXT NOT NULL CHECK (status IN ('queued','running','done','error')) DEFAULT 'queued',
   error     TEXT,
+  progress  JSONB NOT NULL DEFAULT '{}'::jsonb,
+  result    JSONB,
+  worker_id   TEXT,
+  lease_until TIMESTAMPTZ,
   created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
   updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+-- bases existantes : suivi de progression + résultat des jobs
+ALTER TABLE ai.jobs ADD COLUMN IF NOT EXISTS progress JSONB NOT NULL DEFAULT '{}'::jsonb;
+ALTER TABLE ai.jobs ADD COLUMN IF NOT EXISTS result   JSONB;
+-- worker propriétaire (hôte:pid) et bail renouvelé tant qu'il est vivant
+ALTER TABLE ai.jobs ADD COLUMN IF NOT EXISTS worker_id   TEXT;
+ALTER TABLE ai.jobs ADD COLUMN IF NOT EXISTS lease_until TIMESTAMPTZ;
+
 CREATE INDEX IF NOT EXISTS idx_ai_jobs_status ON ai.jobs(status);
+CREATE INDEX IF NOT EXISTS idx_ai_jobs_worker_active
+  ON ai.jobs(worker_id) WHERE status IN ('queued','running');
 
 
 CREATE TABLE IF NOT EXISTS ai.tutor_messages (
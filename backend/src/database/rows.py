@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+from itertools import repeat
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import psycopg2.extensions
+from psycopg2.extras import NamedTupleCursor
+
+# ===================================================================
+# LIGNES -> DICT (commun à tous les repos / services)
+# ===================================================================
+# Un seul endroit pour convertir les lignes psycopg2 (tuples) en dict :
+# - noms de colonnes mis en cache sur la requête nommée (Statement du
+#   registre database.statements) et revérifiés nom par nom contre
+#   cur.description (le tuple est réutilisé, pas de nouvelle allocation) ;
+#   sinon calculés une fois par exécution ;
+# - lignes déjà en dict (DictRowCursor, RealDictCursor, psycopg 3 dict_row)
+#   rendues telles quelles ;
+# - fabriques de curseurs : DictRowCursor (dict simples, plus légers que
+#   RealDictRow) et NamedTupleCursor (namedtuple à __slots__, classe mise en
+#   cache par psycopg2) pour les listes volumineuses.
+# Usage :  execute(cur, _STMT_LIST_DUE, (user_id, limit))
+#          return fetchall_dict(cur, _STMT_LIST_DUE)
+
+
+def _names(description) -> Tuple[str, ...]:
+    # psycopg2.Column, tuple DB-API et psycopg 3 Column s'indexent tous en [0]
+    return tuple(d[0] for d in description)
+
+
+def columns(cur, stmt=None) -> Tuple[str, ...]:
+    """Noms des colonnes du dernier résultat (mis en cache sur la requête nommée)."""
+    desc = cur.description
+    if not desc:
+        return ()
+    if stmt is None:
+        return _names(desc)
+    cols = stmt.columns
+    if cols is None or len(cols) != len(desc) or any(c != d[0] for c, d in zip(cols, desc)):
+        cols = stmt.columns = _names(desc)
+    return cols
+
+
+def as_dict(cur, row, stmt=None) -> Optional[Dict[str, Any]]:
+    """Une ligne (tuple ou dict) -> dict, None si pas de ligne."""
+    if row is None:
+        return None
+    if isinstance(row, dict):
+        return row
+    return dict(zip(columns(cur, stmt), row))
+
+
+def as_dicts(cur, rows: Optional[Iterable], stmt=None) -> List[Dict[str, Any]]:
+    """Lignes (tuples ou dicts) -> liste de dicts."""
+    if not rows:
+        return []
+    rows = rows if isinstance(rows, list) else list(rows)
+    if isinstance(rows[0], dict):
+        return rows
+    return list(map(dict, map(zip, repeat(columns(cur, stmt)), rows)))
+
+
+def fetchone_dict(cur, stmt=None) -> Optional[Dict[str, Any]]:
+    return as_dict(cur, cur.fetchone(), stmt)
+
+
+def fetchall_dict(cur, stmt=None) -> List[Dict[str, Any]]:
+    return as_dicts(cur, cur.fetchall(), stmt)
+
+
+def fetchall_tuples(cur) -> List[tuple]:
+    """fetchall en tuples, que le curseur renvoie des dicts ou non."""
+    return [tuple(r.values()) if isinstance(r, dict) else tuple(r) for r in (cur.fetchall() or [])]
+
+
+def row_id(row) -> int:
+    """id d'une ligne RETURNING id (dict ou tuple)."""
+    if row is None:
+        raise ValueError("RETURNING id n'a renvoyé aucune ligne")
+    return int(row["id"]) if isinstance(row, dict) else int(row[0])
+
+
+def scalar(row, key: str = "n") -> Any:
+    """Première colonne d'une ligne d'agrégat (SELECT COUNT(*) AS n ...)."""
+    if row is None:
+        return None
+    if isinstance(row, dict):
+        return row[key] if key in row else next(iter(row.values()))
+    return row[0]
+
+
+# ---------------------------------------------------------------------
+# Fabriques de curseurs psycopg2
+# ---------------------------------------------------------------------
+class DictRowCursor(psycopg2.extensions.cursor):
+    """Curseur dont les lignes sont des dict (colonnes lues une fois par exécution)."""
+
+    def execute(self, query, vars=None):
+        self._cols = None
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        self._cols = None
+        return super().executemany(query, vars_list)
+
+    def callproc(self, procname, vars=None):
+        self._cols = None
+        return super().callproc(procname, vars)
+
+    def _columns(self) -> Tuple[str, ...]:
+        cols = getattr(self, "_cols", None)
+        if cols is None:
+            cols = self._cols = _names(self.description or ())
+        return cols
+
+    def fetchone(self):
+        row = super().fetchone()
+        return None if row is None else dict(zip(self._columns(), row))
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        return list(map(dict, map(zip, repeat(self._columns()), rows)))
+
+    def fetchall(self):
+        rows = super().fetchall()
+        return list(map(dict, map(zip, repeat(self._columns()), rows)))
+
+    def __iter__(self):
+        it = super().__iter__()
+        cols = None
+        for row in it:
+            if cols is None:
+                cols = self._columns()
+            yield dict(zip(cols, row))
+
+
+def dict_cursor(conn, **kwargs):
+    """conn.cursor() dont les lignes sont des dict."""
+    return conn.cursor(cursor_factory=DictRowCursor, **kwargs)
+
+
+def namedtuple_cursor(conn, **kwargs):
+    """conn.cursor() dont les lignes sont des namedtuple (attributs, sans dict par ligne)."""
+    return conn.cursor(cursor_factory=NamedTupleCursor, **kwargs)
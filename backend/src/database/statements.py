@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+import re
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+import psycopg2.errors
+import psycopg2.extensions
+
+from core import config
+
+# ===================================================================
+# REGISTRE DE REQUÊTES PRÉPARÉES (repos core/*_repo.py)
+# ===================================================================
+# Les repos déclarent leurs requêtes fixes une seule fois :
+#     _STMT_GET_QUIZ = statement("quiz.get_quiz", "SELECT ... WHERE id=%s")
+# puis les exécutent par nom :
+#     execute(cur, _STMT_GET_QUIZ, (quiz_id,))              (psycopg2)
+#     await execute_async(cur, _STMT_GET_QUIZ, (quiz_id,))  (psycopg 3)
+# - psycopg2 : PREPARE paresseux, une fois par connexion physique (la liste
+#   des requêtes préparées vit sur la connexion du pool), puis EXECUTE nom(...)
+#   => le serveur ne ré-analyse / ne re-planifie plus le texte SQL.
+# - psycopg 3 : cache de requêtes préparées du driver (prepare=True).
+# - Appels, préparations et latence (ms) comptés par requête : statement_stats().
+# DB_PREPARED_STATEMENTS=false (pgbouncer en mode transaction, etc.) :
+# exécution du texte SQL comme avant, statistiques conservées.
+# Colonnes toujours listées (jamais SELECT * / RETURNING *) : avec *, un
+# ALTER TABLE change le type de résultat d'une requête déjà préparée
+# ("cached plan must not change result type") et les noms mis en cache.
+
+logger = logging.getLogger("db.statements")
+
+_PLACEHOLDER = re.compile(r"%%|%s")
+_NAME_OK = re.compile(r"^[a-z0-9_.]+$")
+
+
+class Statement:
+    """Requête nommée : texte %s (psycopg2 / psycopg 3) + forme PREPARE ($1..$n)."""
+
+    __slots__ = ("name", "sql", "server_name", "nparams", "prepare_sql", "execute_sql", "preparable", "columns")
+
+    def __init__(self, name: str, sql: str):
+        if not _NAME_OK.match(name):
+            raise ValueError(f"nom de requête invalide: {name!r}")
+        self.name = name
+        self.sql = sql
+        self.server_name = "stmt_" + name.replace(".", "__")
+
+        n = 0
+
+        def _param(m) -> str:
+            nonlocal n
+            if m.group(0) == "%%":
+                return "%"
+            n += 1
+            return f"${n}"
+
+        body = _PLACEHOLDER.sub(_param, sql).strip()
+        self.nparams = n
+        self.prepare_sql = f"PREPARE {self.server_name} AS {body}"
+        self.execute_sql = (
+            f"EXECUTE {self.server_name} ({', '.join(['%s'] * n)})" if n else f"EXECUTE {self.server_name}"
+        )
+        # passe à False si le serveur refuse le PREPARE (type de paramètre indéterminé...)
+        self.preparable = True
+        # noms des colonnes du résultat, renseignés au premier fetch (database.rows)
+        self.columns = None
+
+    def __repr__(self) -> str:
+        return f"Statement({self.name!r})"
+
+
+_REGISTRY: Dict[str, Statement] = {}
+_STATS: Dict[str, Dict[str, float]] = {}
+_LOCK = threading.Lock()
+
+
+def statement(name: str, sql: str) -> Statement:
+    """Déclare (une fois, à l'import du repo) une requête nommée."""
+    with _LOCK:
+        prev = _REGISTRY.get(name)
+        if prev is not None:
+            if prev.sql != sql:
+                raise ValueError(f"requête {name!r} déjà déclarée avec un autre texte")
+            return prev
+        stmt = Statement(name, sql)
+        _REGISTRY[name] = stmt
+        _STATS[name] = {"calls": 0, "prepares": 0, "errors": 0, "ms_total": 0.0, "ms_max": 0.0}
+        return stmt
+
+
+def _record(stmt: Statement, ms: float, *, prepared: bool = False, failed: bool = False) -> None:
+    with _LOCK:
+        s = _STATS[stmt.name]
+        s["calls"] += 1
+        s["ms_total"] += ms
+        if ms > s["ms_max"]:
+            s["ms_max"] = ms
+        if prepared:
+            s["prepares"] += 1
+        if failed:
+            s["errors"] += 1
+
+
+# ---------------------------------------------------------------------
+# psycopg2 : PREPARE / EXECUTE par connexion physique
+# ---------------------------------------------------------------------
+def _prepared_names(conn) -> Optional[set]:
+    """Requêtes déjà préparées sur cette connexion (None : pas de suivi possible)."""
+    names = getattr(conn, "_prepared", None)
+    if names is None:
+        try:
+            names = conn._prepared = set()
+        except (AttributeError, TypeError):     # connexion psycopg2 nue (hors pool)
+            return None
+    return names
+
+
+def _prepare(cur, stmt: Statement) -> bool:
+    """PREPARE sur la connexion du curseur ; un échec ne casse pas la transaction."""
+    conn = cur.connection
+    guarded = not conn.autocommit
+    try:
+        if guarded:
+            cur.execute(f"SAVEPOINT _stmt_prepare; {stmt.prepare_sql}; RELEASE SAVEPOINT _stmt_prepare")
+        else:
+            cur.execute(stmt.prepare_sql)
+        return True
+    except Exception as e:
+        if guarded:
+            try:
+                cur.execute("ROLLBACK TO SAVEPOINT _stmt_prepare; RELEASE SAVEPOINT _stmt_prepare")
+            except Exception:
+                raise e
+        elif conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            raise
+        if isinstance(e, psycopg2.errors.DuplicatePreparedStatement):
+            return True     # déjà préparée sur cette session (suivi perdu) : utilisable
+        stmt.preparable = False
+        logger.warning("PREPARE %s refusé, exécution en texte SQL : %r", stmt.name, e)
+        return False
+
+
+def execute(cur, stmt: Statement, params: Sequence[Any] = ()) -> None:
+    """cur.execute de la requête nommée (préparée sur la connexion au premier appel)."""
+    t0 = time.perf_counter()
+    prepared = False
+    names = None
+    try:
+        if config.DB_PREPARED_STATEMENTS and stmt.preparable:
+            names = _prepared_names(getattr(cur, "connection", None))
+        if names is not None and stmt.server_name not in names:
+            prepared = _prepare(cur, stmt)
+            if prepared:
+                names.add(stmt.server_name)
+        if names is not None and stmt.server_name in names:
+            cur.execute(stmt.execute_sql, tuple(params))
+        else:
+            cur.execute(stmt.sql, tuple(params))
+    except Exception as e:
+        if names is not None and isinstance(e, psycopg2.errors.InvalidSqlStatementName):
+            names.discard(stmt.server_name)     # DISCARD ALL côté serveur : re-PREPARE au prochain appel
+        _record(stmt, (time.perf_counter() - t0) * 1000.0, prepared=prepared, failed=True)
+        raise
+    _record(stmt, (time.perf_counter() - t0) * 1000.0, prepared=prepared)
+
+
+# ---------------------------------------------------------------------
+# psycopg 3 (async) : cache de requêtes préparées du driver
+# ---------------------------------------------------------------------
+async def execute_async(cur, stmt: Statement, params: Sequence[Any] = ()) -> None:
+    """await cur.execute de la requête nommée (préparée par psycopg 3, par connexion)."""
+    t0 = time.perf_counter()
+    try:
+        if config.DB_PREPARED_STATEMENTS:
+            await cur.execute(stmt.sql, tuple(params), prepare=True)
+        else:
+            await cur.execute(stmt.sql, tuple(params))
+    except Exception:
+        _record(stmt, (time.perf_counter() - t0) * 1000.0, failed=True)
+        raise
+    _record(stmt, (time.perf_counter() - t0) * 1000.0)
+
+
+# ---------------------------------------------------------------------
+# Statistiques
+# ---------------------------------------------------------------------
+def statement_stats() -> Dict[str, Dict[str, Any]]:
+    """Par requête : appels, PREPARE envoyés, erreurs, latence totale / moyenne / max (ms)."""
+    with _LOCK:
+        snap = {name: dict(s) for name, s in _STATS.items()}
+        preparable = {name: st.preparable for name, st in _REGISTRY.items()}
+    out: Dict[str, Dict[str, Any]] = {}
+    for name, s in sorted(snap.items()):
+        calls = int(s["calls"])
+        out[name] = {
+            "calls": calls,
+            "prepares": int(s["prepares"]),
+            "errors": int(s["errors"]),
+            "ms_total": round(s["ms_total"], 3),
+            "ms_avg": round(s["ms_total"] / calls, 3) if calls else 0.0,
+            "ms_max": round(s["ms_max"], 3),
+            "preparable": preparable[name],
+        }
+    return out
+
+
+def reset_statement_stats() -> None:
+    with _LOCK:
+        for s in _STATS.values():
+            s.update(calls=0, prepares=0, errors=0, ms_total=0.0, ms_max=0.0)
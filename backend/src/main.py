@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import math
+import time
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -6,7 +8,16 @@ from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.middleware import SlowAPIMiddleware
 from api.routes.api_routes import api_router  # Vérifie que ce fichier existe et que l'import est correct
-from database.connection import init_db_pool, ping_db, close_db_pool  # Vérifie que ce fichier existe également
+from database.connection import (  # Vérifie que ce fichier existe également
+    init_db_pool, ping_db, close_db_pool, pool_stats,
+    replicas_enabled, replica_stats, set_route_key, reset_route_key, mark_write,
+)
+from utils.jwt import verify_access_token
+from core import config
+from database.async_connection import init_async_db_pool, close_async_db_pool, async_pool_stats
+from database.statements import statement_stats
+from api.services.service_ingest.ingest_job_service import init_ingest_executor, shutdown_ingest_executor
+from api.services.service_media.media_gc_service import purge_orphan_media_blobs
 
 
 app = FastAPI(title="Auth & Users API")
@@ -27,7 +38,8 @@ app.add_middleware(
     allow_origins=["http://localhost:3000", "https://ton-front.exemple"],  # Vérifie l'URL du frontend
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_headers=["Authorization", "Content-Type", "X-DB-Last-Write"],
+    expose_headers=["X-DB-Last-Write"],
 )
 
 # Route de base
@@ -35,6 +47,64 @@ app.add_middleware(
 def root():
     return {"message": "Serveur FastAPI lancé"}
 
+# Occupation du pool DB (connexions prêtées, attentes, fuites récupérées)
+@app.get("/health/db")
+def health_db():
+    return {"sync": pool_stats(), "async": async_pool_stats(), "read": replica_stats()}
+
+# Requêtes préparées des repos : appels, PREPARE envoyés, latence par requête
+@app.get("/health/db/statements")
+def health_db_statements():
+    return statement_stats()
+
+# Routage des lectures vers les réplicas : clé utilisateur de la requête
+# (read-your-writes) ; une requête d'écriture garde ses lectures suivantes
+# sur le primaire pendant DB_REPLICA_STICKY_S. La date de l'écriture est
+# aussi renvoyée au client (cookie + en-tête X-DB-Last-Write) et relue à la
+# requête suivante, quel que soit le worker / l'instance qui la reçoit.
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+_LAST_WRITE_COOKIE = "db_last_write"
+_LAST_WRITE_HEADER = "X-DB-Last-Write"
+
+
+def _last_write(request: Request):
+    raw = request.headers.get(_LAST_WRITE_HEADER) or request.cookies.get(_LAST_WRITE_COOKIE)
+    try:
+        ts = float(raw) if raw else None
+    except ValueError:
+        return None
+    return ts if ts is not None and math.isfinite(ts) else None
+
+
+def _route_key(request: Request):
+    auth = request.headers.get("authorization") or ""
+    if auth[:7].lower() == "bearer ":
+        payload = verify_access_token(auth[7:].strip())
+        if payload and "user_id" in payload:
+            return f"user:{payload['user_id']}"
+    return f"ip:{request.client.host}" if request.client else None
+
+
+@app.middleware("http")
+async def db_read_routing(request: Request, call_next):
+    if not replicas_enabled():
+        return await call_next(request)
+    key = _route_key(request)
+    token = set_route_key(key, _last_write(request))
+    try:
+        response = await call_next(request)
+    finally:
+        reset_route_key(token)
+    if request.method in _WRITE_METHODS:
+        mark_write(key)
+        stamp = f"{time.time():.3f}"
+        response.headers[_LAST_WRITE_HEADER] = stamp
+        response.set_cookie(
+            _LAST_WRITE_COOKIE, stamp,
+            max_age=max(1, math.ceil(config.DB_REPLICA_STICKY_S)), httponly=True, samesite="lax",
+        )
+    return response
+
 # Middleware pour sécuriser les en-têtes HTTP
 @app.middleware("http")
 async def secure_headers(request: Request, call_next):
@@ -71,10 +141,27 @@ def on_startup():
             print("Serveur démarré — Connexion à PostgreSQL réussie")
         else:
             print("Ping DB a échoué")
+        init_ingest_executor()
+        # blobs d'images devenus orphelins (sources supprimées)
+        purge_orphan_media_blobs()
     except Exception as e:
         print(f"Échec init pool / connexion DB : {e}")
 
+# Pool async (psycopg 3) des endpoints quiz / SRS / cas / dose
+@app.on_event("startup")
+async def on_startup_async():
+    try:
+        if await init_async_db_pool():
+            print("Pool DB async prêt")
+    except Exception as e:
+        print(f"Échec init pool DB async (repli psycopg2) : {e}")
+
+@app.on_event("shutdown")
+async def on_shutdown_async():
+    await close_async_db_pool()
+
 # Gestion de l'événement d'arrêt
 @app.on_event("shutdown")
 def on_shutdown():
+    shutdown_ingest_executor()
     close_db_pool()
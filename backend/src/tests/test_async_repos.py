@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import inspect
+
+import pytest
+from psycopg2.extras import Json
+
+from core import config
+from core.case_repo import CaseRepo, CaseRepoAsync
+from core.dose_repo import DoseRepo, DoseRepoAsync
+from core.quiz_repo import QuizRepo, QuizRepoAsync
+from core.revision_srs_repo import RevisionSrsRepo, RevisionSrsRepoAsync
+from api.services.service_dose.units import UnitsService
+
+# ===================================================================
+# Parité *Repo / *RepoAsync : même texte SQL, mêmes paramètres
+# ===================================================================
+# Sans serveur ni driver psycopg 3 : curseurs factices qui enregistrent
+# ce qui est exécuté. Chaque méthode async doit envoyer exactement la
+# requête (Statement partagé) et les paramètres de sa jumelle synchrone.
+
+_ROW = {"id": 7, "n": 0, "count": 0}
+_ARGS = {
+    "context": "formation", "drug_name": " Paracétamol ", "free_answer_text": "texte",
+    "due_at_iso": "2026-01-01T00:00:00+00:00", "meta": {"k": 1}, "answers_json": {"a": [1]},
+    "dose_input": {"dose": 1}, "dose_result": {"ml": 2}, "is_correct": True, "completed": False,
+    "score": 0.5, "ease_factor": 2.5, "weight_kg": 12.5, "patient_age_y": 3,
+}
+
+
+def _plain(v):
+    # Json (adaptateur psycopg2) côté sync, texte JSON côté psycopg 3 : même valeur envoyée
+    return v.dumps(v.adapted) if isinstance(v, Json) else v
+
+
+class _SyncCur:
+    def __init__(self):
+        self.executed = []
+        self.description = None
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, tuple(_plain(v) for v in (params or ()))))
+
+    def fetchone(self):
+        return dict(_ROW)
+
+    def fetchall(self):
+        return []
+
+
+class _AsyncCur:
+    def __init__(self):
+        self.executed = []
+        self.prepare = []
+
+    async def execute(self, sql, params=None, prepare=None):
+        self.executed.append((sql, tuple(params or ())))
+        self.prepare.append(prepare)
+
+    async def fetchone(self):
+        return dict(_ROW)
+
+    async def fetchall(self):
+        return []
+
+
+def _kwargs(fn):
+    out = {}
+    for i, (name, p) in enumerate(inspect.signature(fn).parameters.items()):
+        if name == "cur":
+            continue
+        out[name] = _ARGS.get(name, 10 + i)
+    return out
+
+
+_PAIRS = [
+    (sync_cls, async_cls, name)
+    for sync_cls, async_cls in [
+        (QuizRepo, QuizRepoAsync),
+        (CaseRepo, CaseRepoAsync),
+        (RevisionSrsRepo, RevisionSrsRepoAsync),
+        (DoseRepo, DoseRepoAsync),
+    ]
+    for name, fn in vars(async_cls).items()
+    if isinstance(fn, staticmethod) and inspect.iscoroutinefunction(fn.__func__)
+]
+
+
+@pytest.mark.parametrize("sync_cls,async_cls,name", _PAIRS, ids=lambda v: getattr(v, "__name__", v))
+def test_async_method_runs_same_sql_as_sync(monkeypatch, sync_cls, async_cls, name):
+    monkeypatch.setattr(config, "DB_PREPARED_STATEMENTS", True)
+    afn = getattr(async_cls, name)
+    sfn = getattr(sync_cls, name)
+    kwargs = _kwargs(afn)
+    assert _kwargs(sfn) == kwargs
+
+    scur, acur = _SyncCur(), _AsyncCur()
+    sres = sfn(scur, **kwargs)
+    ares = asyncio.run(afn(acur, **kwargs))
+
+    assert acur.executed and acur.executed == scur.executed
+    assert acur.prepare == [True] * len(acur.executed)
+    assert ares == sres
+
+
+def test_every_async_repo_method_has_a_sync_twin():
+    assert {(a.__name__, n) for _s, a, n in _PAIRS} >= {
+        ("QuizRepoAsync", "upsert_answer"), ("CaseRepoAsync", "insert_or_update_answer"),
+        ("RevisionSrsRepoAsync", "upsert_schedule"), ("RevisionSrsRepoAsync", "list_due"),
+        ("DoseRepoAsync", "insert_calculation"),
+    }
+
+
+class _AsyncConn:
+    def __init__(self):
+        self.cur = _AsyncCur()
+
+    def cursor(self):
+        conn = self
+
+        class _Ctx:
+            async def __aenter__(self):
+                return conn.cur
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Ctx()
+
+
+class _SyncConn:
+    def __init__(self):
+        self.cur = _SyncCur()
+
+    def cursor(self):
+        conn = self
+
+        class _Ctx:
+            def __enter__(self):
+                return conn.cur
+
+            def __exit__(self, *exc):
+                return False
+
+        return _Ctx()
+
+
+def test_units_load_async_matches_load():
+    sconn, aconn = _SyncConn(), _AsyncConn()
+    UnitsService(sconn).load()
+    asyncio.run(UnitsService(aconn).load_async(aconn))
+    assert aconn.cur.executed == sconn.cur.executed
+    assert len(sconn.cur.executed) == 2
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+import pytest
+
+from core import config
+from core.media_repo import MediaRepo
+from utils import blob_store
+from utils.blob_store import BlobStore, LocalBlobStore, sha256_hex
+from utils.media_dedup import sweep_unreferenced_store_keys
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    s = LocalBlobStore(str(tmp_path / "blobs"))
+    monkeypatch.setattr(config, "BLOB_STORE_BACKEND", "local")
+    monkeypatch.setattr(blob_store, "_STORE", s)
+    return s
+
+
+def _age(store, key, seconds):
+    t = time.time() - seconds
+    os.utime(store.path_for(key), (t, t))
+
+
+# ===================================================================
+# Interface / backend local
+# ===================================================================
+def test_blob_store_is_abstract():
+    with pytest.raises(TypeError):
+        BlobStore()
+
+    class Partial(BlobStore):
+        def put_stream(self, fileobj):
+            return ""
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_local_put_get_iter(store):
+    key = store.put(b"abc")
+    assert key == sha256_hex(b"abc")
+    assert store.get(key) == b"abc" and store.size(key) == 3 and store.exists(key)
+    assert b"".join(store.iter_chunks(key, 1, 1)) == b"b"
+    open(os.path.join(store._tmp, "partiel"), "wb").close()      # jamais listé
+    assert [k for k, _mt in store.iter_keys()] == [key]
+    assert store.delete(key) and not store.delete(key)
+    assert store.mtime(key) is None
+
+
+def test_put_of_existing_content_refreshes_mtime(store):
+    key = store.put(b"same")
+    _age(store, key, 3600)
+    assert store.put(b"same") == key
+    assert time.time() - store.mtime(key) < 60
+
+
+# ===================================================================
+# Balayage des clés sans ligne (ingestion annulée)
+# ===================================================================
+def test_sweep_removes_only_old_unreferenced_keys(store, monkeypatch):
+    referenced, orphan, recent = store.put(b"ref"), store.put(b"orphan"), store.put(b"recent")
+    _age(store, referenced, 7200)
+    _age(store, orphan, 7200)
+    asked = []
+
+    def in_use(cur, keys):
+        asked.append(sorted(keys))
+        return {k for k in keys if k == referenced}
+
+    monkeypatch.setattr(MediaRepo, "store_keys_in_use", staticmethod(in_use))
+    removed = sweep_unreferenced_store_keys(object(), grace_minutes=60, batch=1)
+
+    assert removed == [orphan]
+    assert store.exists(referenced) and store.exists(recent) and not store.exists(orphan)
+    # clé récente jamais soumise à la base ; lots de `batch` clés
+    assert sorted(asked) == sorted([[referenced], [orphan]])
+
+
+def test_sweep_skips_key_refreshed_meanwhile(store, monkeypatch):
+    key = store.put(b"reused")
+    _age(store, key, 7200)
+
+    def in_use(cur, keys):
+        store.put(b"reused")          # ingestion concurrente : même contenu réutilisé
+        return set()
+
+    monkeypatch.setattr(MediaRepo, "store_keys_in_use", staticmethod(in_use))
+    assert sweep_unreferenced_store_keys(object(), grace_minutes=60) == []
+    assert store.exists(key)
+
+
+def test_sweep_without_store(monkeypatch):
+    monkeypatch.setattr(config, "BLOB_STORE_BACKEND", "db")
+    assert sweep_unreferenced_store_keys(object()) == []
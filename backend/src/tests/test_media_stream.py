@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import pytest
+from starlette.requests import Request
+
+from api.services.service_media.media_stream_service import (
+    RangeNotSatisfiable, binary_response, etag_matches, parse_range,
+)
+
+
+def _request(method: str = "GET", **headers: str) -> Request:
+    raw = [(k.replace("_", "-").lower().encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": method, "headers": raw})
+
+
+def _reader(data: bytes):
+    def read(start, end):
+        yield data[start:end + 1]
+    return read
+
+
+# ===================================================================
+# parse_range
+# ===================================================================
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=10-", (10, 999)),           # ouverte
+    ("bytes=-100", (900, 999)),         # suffixe
+    ("bytes=-5000", (0, 999)),          # suffixe plus long que le contenu
+    ("bytes=900-5000", (900, 999)),     # fin tronquée
+    ("BYTES = 5 - 5", (5, 5)),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [None, "", "bytes=-", "bytes=0-1,5-6", "items=0-5", "bytes=a-b"])
+def test_parse_range_ignored(header):
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=1000-", 1000),
+    ("bytes=1000-1200", 1000),
+    ("bytes=50-10", 1000),
+    ("bytes=-0", 1000),
+    ("bytes=-10", 0),
+])
+def test_parse_range_unsatisfiable(header, size):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, size)
+
+
+# ===================================================================
+# binary_response
+# ===================================================================
+DATA = bytes(range(256)) * 4
+
+
+def test_unsatisfiable_range_is_416():
+    resp = binary_response(
+        _request(range="bytes=5000-"), size=len(DATA), etag="abc",
+        media_type="application/pdf", reader=_reader(DATA),
+    )
+    assert resp.status_code == 416
+    assert resp.headers["content-range"] == f"bytes */{len(DATA)}"
+
+
+def test_partial_content_headers():
+    resp = binary_response(
+        _request(range="bytes=-24"), size=len(DATA), etag="abc",
+        media_type="application/pdf", reader=_reader(DATA),
+    )
+    assert resp.status_code == 206
+    assert resp.headers["content-range"] == f"bytes 1000-1023/{len(DATA)}"
+    assert resp.headers["content-length"] == "24"
+
+
+def test_if_range_mismatch_serves_whole_body():
+    resp = binary_response(
+        _request(range="bytes=0-9", if_range='"other"'), size=len(DATA), etag="abc",
+        media_type="application/pdf", reader=_reader(DATA),
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-length"] == str(len(DATA))
+
+
+def test_etag_revalidation():
+    assert etag_matches('W/"abc", "def"', "abc")
+    assert etag_matches("*", "abc")
+    assert not etag_matches('"abcd"', "abc")
+    resp = binary_response(
+        _request(if_none_match='"abc"'), size=len(DATA), etag="abc",
+        media_type="application/pdf", reader=_reader(DATA),
+    )
+    assert resp.status_code == 304
+
+
+def test_db_reader_borrows_one_connection_per_chunk(monkeypatch):
+    from contextlib import contextmanager
+    from api.services.service_media import media_stream_service as mss
+
+    held = []
+
+    class _Conn:
+        def cursor(self):
+            return _Cur()
+
+    class _Cur:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    @contextmanager
+    def fake_connection():
+        held.append(1)
+        try:
+            yield _Conn()
+        finally:
+            held.pop()
+
+    def read_chunk(cur, key, offset, length):
+        assert len(held) == 1
+        return DATA[offset:offset + length]
+
+    monkeypatch.setattr(mss, "connection", fake_connection)
+    monkeypatch.setattr(mss, "stream_chunk_size", lambda: 100)
+    out = []
+    for buf in mss._db_reader(read_chunk, 1)(10, 409):
+        assert held == []           # rendue avant chaque yield
+        out.append(buf)
+    assert [len(b) for b in out] == [100, 100, 100, 100]
+    assert b"".join(out) == DATA[10:410]
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import math
+
+import numpy as np
+import pytest
+
+from bench.bench_phash import _legacy_downscale_mean
+from utils.phash import (
+    DCT_SIZE, HASH_SIZE, area_mean, hamming_distance64, phash64_batch, phash64_from_gray,
+    phash_from_db, phash_to_db,
+)
+
+
+def _image(h: int, w: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:h, 0:w]
+    base = (np.sin(xx / rng.uniform(4, 40)) + np.cos(yy / rng.uniform(4, 40))) * 60 + 128
+    return np.clip(base + rng.normal(0, 10, size=(h, w)), 0, 255).astype(np.float32)
+
+
+def _reference_phash(gray: np.ndarray) -> int:
+    """Formule directe : réduction d'origine (boucles), DCT-II orthonormée en float64, bits > médiane."""
+    small = _legacy_downscale_mean(gray, DCT_SIZE, DCT_SIZE).astype(np.float64)
+    n = DCT_SIZE
+    coef = np.zeros((HASH_SIZE, HASH_SIZE))
+    for k in range(HASH_SIZE):
+        for l in range(HASH_SIZE):
+            ck = math.sqrt(1.0 / n) if k == 0 else math.sqrt(2.0 / n)
+            cl = math.sqrt(1.0 / n) if l == 0 else math.sqrt(2.0 / n)
+            s = 0.0
+            for i in range(n):
+                for j in range(n):
+                    s += small[i, j] * math.cos(math.pi * (2 * i + 1) * k / (2 * n)) \
+                        * math.cos(math.pi * (2 * j + 1) * l / (2 * n))
+            coef[k, l] = ck * cl * s
+    low = coef.ravel()
+    med = np.median(low[1:])
+    h = 0
+    for b in low > med:
+        h = (h << 1) | int(b)
+    return h
+
+
+# ===================================================================
+# Réduction 32x32 : mêmes zones que l'ancien _downscale_mean
+# ===================================================================
+@pytest.mark.parametrize("shape", [(32, 32), (64, 96), (250, 333), (1001, 47), (20, 15), (1, 1)])
+def test_area_mean_matches_legacy(shape):
+    gray = _image(*shape, seed=sum(shape))
+    np.testing.assert_allclose(area_mean(gray, 32, 32), _legacy_downscale_mean(gray, 32, 32), atol=1e-3)
+
+
+def test_area_mean_empty():
+    assert area_mean(np.zeros((0, 10), dtype=np.float32), 32, 32).shape == (32, 32)
+
+
+# ===================================================================
+# pHash vectorisé vs formule directe
+# ===================================================================
+@pytest.mark.parametrize("shape,seed", [((64, 64), 1), ((250, 333), 2), ((700, 420), 3), ((20, 15), 4)])
+def test_phash_matches_reference(shape, seed):
+    gray = _image(*shape, seed=seed)
+    # float32 côté NumPy : un coefficient au ras de la médiane peut basculer
+    assert hamming_distance64(phash64_from_gray(gray), _reference_phash(gray)) <= 1
+
+
+def test_batch_equals_single():
+    grays = [_image(h, w, seed=i) for i, (h, w) in enumerate([(64, 64), (300, 120), (33, 900), (16, 16)])]
+    assert phash64_batch(grays) == [phash64_from_gray(g) for g in grays]
+    assert phash64_batch([]) == []
+
+
+def test_phash_near_duplicates_close_distinct_far():
+    a = _image(400, 300, seed=10)
+    noisy = np.clip(a + np.random.default_rng(0).normal(0, 4, size=a.shape), 0, 255).astype(np.float32)
+    other = _image(400, 300, seed=11)
+    h = phash64_from_gray(a)
+    assert hamming_distance64(h, phash64_from_gray(noisy)) <= 6
+    assert hamming_distance64(h, phash64_from_gray(other)) > 6
+
+
+# ===================================================================
+# BIGINT signé <-> 64 bits non signés
+# ===================================================================
+@pytest.mark.parametrize("h", [0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1, 0x8000_0000_0000_0001])
+def test_db_roundtrip(h):
+    v = phash_to_db(h)
+    assert -(1 << 63) <= v < (1 << 63)
+    assert phash_from_db(v) == h
+
+
+def test_db_none():
+    assert phash_to_db(None) is None
+    assert phash_from_db(None) is None
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import random
+
+import fitz
+import pytest
+
+from utils.phash import hamming_distance64, phash_to_db
+from utils import course
+from utils.phash_index import PHashIndex, _segments
+
+
+def _flip(h: int, n: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), n):
+        h ^= 1 << bit
+    return h
+
+
+def _corpus(seed: int = 5):
+    """Hashes aléatoires + variantes à 1..10 bits : toutes les distances utiles représentées."""
+    rng = random.Random(seed)
+    hashes = []
+    for _ in range(60):
+        h = rng.getrandbits(64)
+        hashes.append(h)
+        for n in range(1, 11):
+            hashes.append(_flip(h, n, rng))
+    return hashes
+
+
+def _brute(hashes, q, radius):
+    return [(h, i, hamming_distance64(q, h)) for i, h in enumerate(hashes) if hamming_distance64(q, h) <= radius]
+
+
+# ===================================================================
+# Segments : partition exacte des 64 bits
+# ===================================================================
+@pytest.mark.parametrize("n", [1, 2, 5, 7, 11, 64])
+def test_segments_partition_64_bits(n):
+    segs = _segments(n)
+    assert len(segs) == n
+    covered = 0
+    for shift, mask in segs:
+        assert covered & (mask << shift) == 0
+        covered |= mask << shift
+    assert covered == (1 << 64) - 1
+
+
+# ===================================================================
+# Requêtes par rayon : identiques au balayage linéaire
+# ===================================================================
+@pytest.mark.parametrize("max_radius", [0, 3, 6, 10])
+@pytest.mark.parametrize("radius", [0, 1, 4, 6, 8, 12])
+def test_query_matches_brute_force(max_radius, radius):
+    hashes = _corpus()
+    index = PHashIndex(max_radius)
+    index.extend((h, i) for i, h in enumerate(hashes))
+    rng = random.Random(radius * 31 + max_radius)
+    queries = hashes[::7] + [_flip(h, 2, rng) for h in hashes[::13]] + [rng.getrandbits(64) for _ in range(10)]
+    for q in queries:
+        expected = _brute(hashes, q, radius)
+        assert index.query(q, radius) == expected
+        assert index.any_within(q, radius) == bool(expected)
+
+
+def test_contains_and_len():
+    index = PHashIndex()
+    index.add(0xDEADBEEF, "a")
+    index.add(1 << 63, "b")
+    assert len(index) == 2
+    assert 0xDEADBEEF in index
+    assert (0xDEADBEEF ^ 1) not in index
+    assert list(index) == [(0xDEADBEEF, "a"), (1 << 63, "b")]
+
+
+def test_signed_db_values_are_masked():
+    # BIGINT lu en base (négatif) : même motif de bits que le hash non signé
+    h = (1 << 63) | 0x1234
+    index = PHashIndex.from_rows([(7, phash_to_db(h)), (8, None)])
+    assert len(index) == 1
+    assert index.query(h, 0) == [(h, 7, 0)]
+
+
+# ===================================================================
+# Images manuelles (mode slide) : quasi-doublons écartés à l'ingestion
+# ===================================================================
+class _Writer:
+    def __init__(self):
+        self.media = []
+
+    def add_media(self, **kw):
+        self.media.append(kw)
+
+
+def _png(shade: int) -> bytes:
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), False)
+    pix.set_rect(pix.irect, (shade, shade, shade))
+    return pix.tobytes("png")
+
+
+def test_manual_media_skips_near_duplicates(monkeypatch):
+    base = 0x0F0F_F0F0_1234_5678
+    # pHash imposé par teinte : 10 proche de la base (2 bits), 30 proche de 20 (même lot), 40 distinct
+    hashes = {10: base ^ 0b11, 20: base ^ (0xFF << 40), 30: (base ^ (0xFF << 40)) ^ 1, 40: ~base}
+    monkeypatch.setattr(course, "phash64_from_pixmap", lambda pix: hashes[pix.pixel(0, 0)[0]])
+
+    seen = PHashIndex.from_rows([(1, phash_to_db(base))])
+    writer = _Writer()
+    items = [(1, _png(10), "a"), (2, _png(20), "b"), (2, _png(30), "c"), (3, _png(40), "d"), (4, b"pas une image", "e")]
+    assert course._add_manual_media(writer, seen, items) == 2
+
+    assert [(m["page_no"], m["phash"]) for m in writer.media] == [(2, hashes[20]), (3, hashes[40]), (4, None)]
+    assert writer.media[-1]["png_bytes"] == b"pas une image"
+    assert len(seen) == 3
+
+
+# ===================================================================
+# Backfill des pHash manquants : échecs marqués, jamais relus
+# ===================================================================
+class _MediaCur:
+    """Curseur factice à lignes dict (dict_cursor) sur page_media_assets."""
+
+    def __init__(self, rows):
+        self.rows = rows              # id -> {"data", "phash", "phash_failed"}
+        self._result = []
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        if sql.startswith("SELECT id FROM"):
+            self._result = [{"id": i} for i, r in self.rows.items() if r["phash"] is None and not r["phash_failed"]]
+        elif sql.startswith("SELECT a.id"):
+            self._result = [{"id": i, "data": self.rows[i]["data"], "path": None} for i in params[0]]
+        elif sql.startswith("SELECT phash FROM"):
+            self._result = [{"phash": r["phash"]} for r in self.rows.values() if r["phash"] is not None]
+        elif "SET phash_failed = true" in sql:
+            for i in params[0]:
+                self.rows[i]["phash_failed"] = True
+        elif "SET phash = %s" in sql:
+            self.rows[params[1]]["phash"] = params[0]
+        else:
+            raise AssertionError(sql)
+
+    def fetchall(self):
+        return self._result
+
+
+def test_backfill_marks_failures_once(monkeypatch):
+    monkeypatch.setattr(course, "phash64_from_pixmap", lambda pix: 0xABCD)
+    rows = {
+        1: {"data": _png(10), "phash": None, "phash_failed": False},
+        2: {"data": b"corrompu", "phash": None, "phash_failed": False},
+        3: {"data": b"", "phash": None, "phash_failed": False},
+        4: {"data": None, "phash": phash_to_db(0x1234), "phash_failed": False},
+    }
+    cur = _MediaCur(rows)
+    assert course._load_existing_media_phases(cur, 1) == {0xABCD, 0x1234}
+    assert [i for i, r in rows.items() if r["phash_failed"]] == [2, 3]
+
+    calls = []
+    monkeypatch.setattr(course, "load_blob", lambda data, path: calls.append(data) or data)
+    assert course._backfill_media_phashes(cur, 1) == 0
+    assert calls == []
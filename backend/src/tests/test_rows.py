@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import psycopg2.extensions
+import pytest
+
+from database.rows import (
+    DictRowCursor, as_dict, as_dicts, columns, dict_cursor, fetchall_tuples, row_id, scalar,
+)
+from database.statements import Statement
+
+
+class _Cur:
+    def __init__(self, *names, rows=()):
+        self.description = [(n, None) for n in names]
+        self.rows = list(rows)
+
+    def fetchall(self):
+        return self.rows
+
+
+# ===================================================================
+# as_dict / as_dicts / columns
+# ===================================================================
+def test_as_dicts_from_tuples():
+    cur = _Cur("id", "titre")
+    assert as_dicts(cur, [(1, "a"), (2, "b")]) == [{"id": 1, "titre": "a"}, {"id": 2, "titre": "b"}]
+    assert as_dicts(cur, iter([(3, "c")])) == [{"id": 3, "titre": "c"}]
+
+
+def test_as_dicts_passthrough_and_empty():
+    rows = [{"id": 1}]
+    assert as_dicts(_Cur("id"), rows) is rows
+    assert as_dicts(_Cur("id"), []) == []
+    assert as_dicts(_Cur("id"), None) == []
+    assert as_dict(_Cur("id"), None) is None
+    assert as_dict(_Cur("id", "n"), (1, 2)) == {"id": 1, "n": 2}
+
+
+def test_columns_cached_on_statement_and_rechecked():
+    stmt = Statement("t.rows_cache", "SELECT id, titre FROM t")
+    cols = columns(_Cur("id", "titre"), stmt)
+    assert cols == ("id", "titre")
+    assert columns(_Cur("id", "titre"), stmt) is cols         # cache réutilisé
+    # même nombre de colonnes, noms différents (ALTER TABLE) : recalculé
+    assert as_dict(_Cur("id", "title"), (1, "x"), stmt) == {"id": 1, "title": "x"}
+    assert stmt.columns == ("id", "title")
+    assert columns(_Cur(), stmt) == ()
+
+
+def test_fetchall_tuples_row_id_scalar():
+    assert fetchall_tuples(_Cur("a", "b", rows=[{"a": 1, "b": 2}, (3, 4)])) == [(1, 2), (3, 4)]
+    assert row_id({"id": "7"}) == 7 and row_id((8,)) == 8
+    with pytest.raises(ValueError):
+        row_id(None)
+    assert scalar({"n": 3}) == 3 and scalar({"count": 4}) == 4 and scalar((5,)) == 5
+    assert scalar(None) is None
+
+
+# ===================================================================
+# DictRowCursor
+# ===================================================================
+class _BaseCursor(psycopg2.extensions.cursor):
+    """Remplace les méthodes C du curseur psycopg2 (pas de serveur en test)."""
+
+    @property
+    def description(self):
+        return self._desc
+
+    def execute(self, query, vars=None):
+        self._desc, self._rows = self._results.pop(0)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size=None):
+        out, self._rows = self._rows[:size], self._rows[size:]
+        return out
+
+    def fetchall(self):
+        out, self._rows = self._rows, []
+        return out
+
+    def __iter__(self):
+        return iter(_BaseCursor.fetchall(self))
+
+
+class _DictCursor(DictRowCursor, _BaseCursor):
+    pass
+
+
+def _dict_cursor(*results):
+    cur = psycopg2.extensions.cursor.__new__(_DictCursor)
+    cur._results = list(results)
+    return cur
+
+
+def test_dict_row_cursor_fetches():
+    cur = _dict_cursor(
+        ((("id",), ("n",)), [(1, 2), (3, 4), (5, 6), (7, 8)]),
+        ((("x",),), [(9,)]),
+    )
+    cur.execute("q1")
+    assert cur.fetchone() == {"id": 1, "n": 2}
+    assert cur.fetchmany(1) == [{"id": 3, "n": 4}]
+    assert list(cur) == [{"id": 5, "n": 6}, {"id": 7, "n": 8}]
+    assert cur.fetchone() is None
+    # nouvelle exécution : colonnes relues
+    cur.execute("q2")
+    assert cur.fetchall() == [{"x": 9}]
+
+
+def test_dict_cursor_factory():
+    class _Conn:
+        def cursor(self, **kwargs):
+            return kwargs
+
+    assert dict_cursor(_Conn(), name="c") == {"cursor_factory": DictRowCursor, "name": "c"}
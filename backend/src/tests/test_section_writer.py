@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from utils.section_writer import _section_type, build_section_tree, title_level
+
+
+def _tree(*titles):
+    return build_section_tree([{"title": t} for t in titles])
+
+
+def _shape(tree):
+    return [(n["title"], n["depth"], n["parent"], n["position"]) for n in tree]
+
+
+# ===================================================================
+# Niveau d'un titre
+# ===================================================================
+@pytest.mark.parametrize("title,level", [
+    ("PARTIE 2 Pharmacologie", 1),
+    ("  partie 10 Annexes", 1),
+    ("CHAPITRE 3 Les anticoagulants", 2),
+    ("IV. Surveillance", 2),
+    ("1 Introduction", 3),
+    ("2.3 Posologie", 4),
+    ("2.3.1 Adulte", 5),
+    ("Introduction", None),
+    ("1.Introduction", None),
+    ("Vitamine K", None),
+])
+def test_title_level(title, level):
+    assert title_level(title) == level
+
+
+# ===================================================================
+# Arbre : profondeur, parent, rang parmi les frères
+# ===================================================================
+def test_numbered_hierarchy():
+    tree = _tree("CHAPITRE 1 Bases", "1 Définitions", "1.1 Dose", "1.2 Unités", "2 Calculs",
+                 "CHAPITRE 2 Cas", "1 Adulte")
+    assert _shape(tree) == [
+        ("CHAPITRE 1 Bases", 0, None, 0),
+        ("1 Définitions", 1, 0, 0),
+        ("1.1 Dose", 2, 1, 0),
+        ("1.2 Unités", 2, 1, 1),
+        ("2 Calculs", 1, 0, 1),
+        ("CHAPITRE 2 Cas", 0, None, 1),
+        ("1 Adulte", 1, 5, 0),
+    ]
+
+
+def test_parts_above_chapters_and_level_jumps():
+    tree = _tree("PARTIE 1 Théorie", "I. Rappels", "1.1.1 Détail", "2 Suite", "PARTIE 2 Pratique", "1 Exercices")
+    assert _shape(tree) == [
+        ("PARTIE 1 Théorie", 0, None, 0),
+        ("I. Rappels", 1, 0, 0),
+        # saut de niveau (pas de 1 / 1.1) : rattaché au dernier titre plus haut
+        ("1.1.1 Détail", 2, 1, 0),
+        ("2 Suite", 2, 1, 1),
+        ("PARTIE 2 Pratique", 0, None, 1),
+        ("1 Exercices", 1, 4, 0),
+    ]
+
+
+def test_intro_is_root_and_never_parent():
+    tree = _tree("Avant-propos", "1 Début", "1.1 Suite")
+    assert _shape(tree) == [
+        ("Avant-propos", 0, None, 0),
+        ("1 Début", 0, None, 1),
+        ("1.1 Suite", 1, 1, 0),
+    ]
+    assert [_section_type(n) for n in tree] == ["INTRO", "CHAPTER", "SUBCHAPTER"]
+
+
+def test_unnumbered_title_is_sibling_of_previous():
+    tree = _tree("CHAPITRE 1 Bases", "1 Définitions", "Encadré : rappel", "2 Calculs")
+    assert _shape(tree) == [
+        ("CHAPITRE 1 Bases", 0, None, 0),
+        ("1 Définitions", 1, 0, 0),
+        ("Encadré : rappel", 1, 0, 1),
+        ("2 Calculs", 1, 0, 2),
+    ]
+
+
+def test_keeps_input_fields_and_empty_input():
+    tree = build_section_tree([{"title": "1 A", "page_start": 3}])
+    assert tree == [{"title": "1 A", "page_start": 3, "depth": 0, "parent": None, "position": 0, "level": 3}]
+    assert build_section_tree([]) == []
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+import random
+
+import fitz
+import pytest
+
+from utils.course import EDGE_GAP, IOU_MERGE, _edges_touch, iou, merge_rects_by_iou
+from utils.spatial import MAX_CELLS_PER_RECT, RectGrid, _ring, auto_cell_size, rects_touch
+
+
+def _rects(n: int, seed: int):
+    """Rects de page A4 : petits mots, blocs moyens, quelques bandes larges."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        x0, y0 = rng.uniform(0, 595), rng.uniform(0, 842)
+        kind = rng.random()
+        if kind < 0.6:
+            w, h = rng.uniform(2, 40), rng.uniform(4, 12)
+        elif kind < 0.9:
+            w, h = rng.uniform(40, 200), rng.uniform(20, 200)
+        else:
+            w, h = rng.uniform(300, 595), rng.uniform(1, 30)
+        out.append(fitz.Rect(x0, y0, x0 + w, y0 + h))
+    return out
+
+
+def _brute(rects: dict, q: fitz.Rect, pad: float):
+    return sorted(i for i, r in rects.items() if rects_touch(q, r, pad))
+
+
+# ===================================================================
+# intersecting : identique à un balayage linéaire
+# ===================================================================
+@pytest.mark.parametrize("cell", [None, 16.0, 64.0, 500.0])
+@pytest.mark.parametrize("pad", [0.0, 3.0, 40.0])
+def test_intersecting_matches_brute_force(cell, pad):
+    rects = _rects(300, seed=int(pad) + 1)
+    grid = RectGrid.from_rects(rects, cell)
+    by_id = dict(enumerate(rects))
+    for q in _rects(80, seed=99) + rects[:20]:
+        assert grid.intersecting(q, pad) == _brute(by_id, q, pad)
+
+
+def test_shared_edges_touch():
+    grid = RectGrid.from_rects([fitz.Rect(0, 0, 64, 64), fitz.Rect(64, 0, 128, 64)], cell=64.0)
+    assert grid.intersecting(fitz.Rect(64, 10, 64, 20)) == [0, 1]
+    assert grid.intersecting(fitz.Rect(130, 0, 140, 10)) == []
+    assert grid.intersecting(fitz.Rect(130, 0, 140, 10), pad=2.0) == [1]
+
+
+def test_insert_remove_update_match_brute_force():
+    rng = random.Random(3)
+    grid = RectGrid(32.0)
+    live = {}
+    pool = _rects(400, seed=4)
+    for step, r in enumerate(pool):
+        op = rng.random()
+        if op < 0.2 and live:
+            i = rng.choice(sorted(live))
+            grid.remove(i)
+            del live[i]
+        elif op < 0.4 and live:
+            # rect fusionné qui grossit
+            i = rng.choice(sorted(live))
+            live[i] = live[i] | r
+            grid.update(i, live[i])
+        else:
+            grid.insert(step, r)
+            live[step] = fitz.Rect(r)
+        if step % 25 == 0:
+            for q in _rects(10, seed=step):
+                assert grid.intersecting(q, 1.0) == _brute(live, q, 1.0)
+    assert len(grid) == len(live)
+    assert all(grid[i] == r for i, r in live.items())
+
+
+def test_oversized_and_non_finite_rects():
+    huge = fitz.Rect(-1e9, -1e9, 1e9, 1e9)
+    grid = RectGrid(1.0)
+    grid.insert(0, huge)
+    grid.insert(1, fitz.Rect(10, 10, 20, 20))
+    grid.insert(2, fitz.Rect(float("nan"), 0, 5, 5))
+    assert 0 in grid._oversized and 2 in grid._oversized
+    by_id = {0: huge, 1: fitz.Rect(10, 10, 20, 20), 2: fitz.Rect(float("nan"), 0, 5, 5)}
+    # dernière requête : plus de MAX_CELLS_PER_RECT cases, repli sur tous les rects
+    wide = fitz.Rect(0, 0, 1e6, 1e6)
+    assert (wide.width / grid.cell) ** 2 > MAX_CELLS_PER_RECT
+    for q in (fitz.Rect(12, 12, 13, 13), fitz.Rect(500, 500, 501, 501), wide):
+        assert grid.intersecting(q) == _brute(by_id, q, 0.0)
+
+
+def test_auto_cell_size_bounds():
+    assert auto_cell_size([]) == 64.0
+    assert auto_cell_size([fitz.Rect(0, 0, 2, 2)] * 5) == 16.0
+    assert auto_cell_size([fitz.Rect(0, 0, 1000, 10)] * 5) == 256.0
+    assert auto_cell_size([fitz.Rect(0, 0, 50, 10), fitz.Rect(0, 0, 80, 10), fitz.Rect(0, 0, 10, 30)]) == 50.0
+
+
+# ===================================================================
+# nearest : parcours du pourtour des anneaux vs distance brute
+# ===================================================================
+def _dist(r: fitz.Rect, x: float, y: float) -> float:
+    dx = max(r.x0 - x, 0.0, x - r.x1)
+    dy = max(r.y0 - y, 0.0, y - r.y1)
+    return (dx * dx + dy * dy) ** 0.5
+
+
+@pytest.mark.parametrize("ring", [0, 1, 2, 5])
+def test_ring_is_exactly_the_perimeter(ring):
+    cells = list(_ring(3, -2, ring))
+    assert len(cells) == len(set(cells)) == max(1, 8 * ring)
+    assert all(max(abs(ix - 3), abs(iy + 2)) == ring for ix, iy in cells)
+
+
+@pytest.mark.parametrize("cell", [16.0, 64.0, 300.0])
+@pytest.mark.parametrize("k", [1, 3, 10])
+def test_nearest_matches_brute_force(cell, k):
+    rects = _rects(150, seed=int(cell) + k)
+    grid = RectGrid.from_rects(rects, cell)
+    rng = random.Random(k)
+    points = [(rng.uniform(-200, 800), rng.uniform(-200, 1000)) for _ in range(40)]
+    for x, y in points:
+        got = grid.nearest(x, y, k)
+        want = sorted(((i, _dist(r, x, y)) for i, r in enumerate(rects)), key=lambda t: (t[1], t[0]))[:k]
+        assert [round(d, 6) for _i, d in got] == [round(d, 6) for _i, d in want]
+        assert {i for i, _d in got} == {i for i, _d in want}
+
+
+def test_nearest_edge_cases():
+    assert RectGrid().nearest(0, 0) == []
+    grid = RectGrid(10.0)
+    grid.insert(0, fitz.Rect(0, 0, 5, 5))
+    grid.insert(1, fitz.Rect(-1e9, 500, 1e9, 501))      # hors grille
+    grid.insert(2, fitz.Rect(1000, 1000, 1001, 1001))
+    assert grid.nearest(2, 2, 1) == [(0, 0.0)]
+    assert [i for i, _d in grid.nearest(0, 480, 2)] == [1, 0]
+    assert grid.nearest(0, 0, 0) == []
+    assert len(grid.nearest(float("nan"), 0, 3)) == 3
+    assert len(grid.nearest(5000, 5000, 5)) == 3
+    grid.remove(2)
+    assert [i for i, _d in grid.nearest(1000, 1000, 5)] == [1, 0]
+
+
+# ===================================================================
+# merge_rects_by_iou (grille) vs fusion quadratique d'origine
+# ===================================================================
+def _quadratic_merge(rects, iou_thr, edge_gap, touch):
+    """Boucle d'origine (tous les fusionnés testés, premier qui matche) ; `touch` = prédicat de contact."""
+    rects = rects[:]
+    merged = []
+    while rects:
+        r = rects.pop()
+        for i, m in enumerate(merged):
+            if iou(r, m) >= iou_thr or touch(r, m, edge_gap):
+                merged[i] = m | r
+                break
+        else:
+            merged.append(r)
+    return [
+        r for i, r in enumerate(merged)
+        if not any(i != j and (r & m).get_area() / max(r.get_area(), 1.0) >= 0.85 for j, m in enumerate(merged))
+    ]
+
+
+def _legacy_touch(r, m, gap):
+    # avant la grille : un seul bord proche suffisait, même à l'autre bout de la page
+    return (abs(r.x0 - m.x1) <= gap or abs(r.x1 - m.x0) <= gap or
+            abs(r.y0 - m.y1) <= gap or abs(r.y1 - m.y0) <= gap)
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("iou_thr,edge_gap", [(IOU_MERGE, EDGE_GAP), (0.5, 2.0), (0.0, EDGE_GAP)])
+def test_merge_matches_quadratic_reference(seed, iou_thr, edge_gap):
+    rects = _rects(120, seed=seed)
+    assert merge_rects_by_iou(rects, iou_thr, edge_gap) == _quadratic_merge(rects, iou_thr, edge_gap, _edges_touch)
+
+
+def test_merge_same_as_legacy_when_edges_face_each_other():
+    # rects voisins (chevauchement ou bords en vis-à-vis) : ancien et nouveau contact d'accord
+    rects = [fitz.Rect(0, 0, 100, 50), fitz.Rect(105, 10, 200, 40), fitz.Rect(20, 55, 90, 120),
+             fitz.Rect(300, 300, 400, 400), fitz.Rect(350, 350, 420, 410)]
+    assert merge_rects_by_iou(rects) == _quadratic_merge(rects, IOU_MERGE, EDGE_GAP, _legacy_touch)
+
+
+def test_merge_no_longer_joins_distant_aligned_rects():
+    # x1 de l'un proche de x0 de l'autre mais 600 pt plus bas : fusionnés avant, plus maintenant
+    a, b = fitz.Rect(0, 0, 100, 50), fitz.Rect(105, 650, 200, 700)
+    assert len(_quadratic_merge([a, b], IOU_MERGE, EDGE_GAP, _legacy_touch)) == 1
+    assert merge_rects_by_iou([a, b]) == [b, a]
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import psycopg2.errors
+import pytest
+
+from core import config
+from database import statements as st
+from database.statements import Statement, execute, statement
+
+
+class _Info:
+    transaction_status = 0
+
+
+class _Conn:
+    autocommit = False
+    info = _Info()
+
+
+class _Cur:
+    """Curseur factice : journalise les requêtes, lève `fail` sur un PREPARE."""
+
+    def __init__(self, conn, fail=None):
+        self.connection = conn
+        self.fail = fail
+        self.log = []
+
+    def execute(self, sql, params=None):
+        self.log.append((" ".join(sql.split()), params))
+        if self.fail is not None and "PREPARE" in sql and not sql.startswith("ROLLBACK"):
+            raise self.fail
+
+
+# ===================================================================
+# Réécriture %s -> $n
+# ===================================================================
+def test_placeholders_rewritten_in_order():
+    s = Statement("t.rewrite", "SELECT a FROM t WHERE b=%s AND c IN (%s, %s)")
+    assert s.nparams == 3
+    assert s.server_name == "stmt_t__rewrite"
+    assert s.prepare_sql == "PREPARE stmt_t__rewrite AS SELECT a FROM t WHERE b=$1 AND c IN ($2, $3)"
+    assert s.execute_sql == "EXECUTE stmt_t__rewrite (%s, %s, %s)"
+
+
+def test_escaped_percent_is_not_a_parameter():
+    s = Statement("t.like", "SELECT a FROM t WHERE b LIKE 'x%%' AND c=%s AND d='100%%'")
+    assert s.nparams == 1
+    assert s.prepare_sql.endswith("WHERE b LIKE 'x%' AND c=$1 AND d='100%'")
+
+
+def test_statement_without_parameters():
+    s = Statement("t.noparam", "SELECT 1")
+    assert s.nparams == 0
+    assert s.execute_sql == "EXECUTE stmt_t__noparam"
+
+
+@pytest.mark.parametrize("name", ["Quiz.get", "quiz-get", "quiz get", "quiz;drop"])
+def test_invalid_names_rejected(name):
+    with pytest.raises(ValueError):
+        Statement(name, "SELECT 1")
+
+
+def test_registry_returns_same_statement_and_rejects_other_text():
+    a = statement("t.registry", "SELECT 1 WHERE 1=%s")
+    assert statement("t.registry", "SELECT 1 WHERE 1=%s") is a
+    with pytest.raises(ValueError):
+        statement("t.registry", "SELECT 2 WHERE 1=%s")
+
+
+# ===================================================================
+# execute() : PREPARE une fois par connexion, puis EXECUTE
+# ===================================================================
+@pytest.fixture
+def prepared_on(monkeypatch):
+    monkeypatch.setattr(config, "DB_PREPARED_STATEMENTS", True)
+
+
+def test_prepare_once_per_connection(prepared_on):
+    stmt = statement("t.exec_once", "SELECT a FROM t WHERE id=%s")
+    conn = _Conn()
+    cur = _Cur(conn)
+    execute(cur, stmt, (1,))
+    execute(cur, stmt, (2,))
+    sqls = [sql for sql, _ in cur.log]
+    assert sqls[0].startswith("SAVEPOINT _stmt_prepare; PREPARE stmt_t__exec_once AS")
+    assert sqls[1:] == ["EXECUTE stmt_t__exec_once (%s)"] * 2
+    assert [p for _, p in cur.log[1:]] == [(1,), (2,)]
+
+    other = _Cur(_Conn())       # autre connexion physique : nouveau PREPARE
+    execute(other, stmt, (3,))
+    assert other.log[0][0].startswith("SAVEPOINT _stmt_prepare; PREPARE")
+
+
+def test_duplicate_prepare_counts_as_prepared(prepared_on):
+    stmt = statement("t.exec_dup", "SELECT a FROM t WHERE id=%s")
+    cur = _Cur(_Conn(), fail=psycopg2.errors.DuplicatePreparedStatement("dup"))
+    execute(cur, stmt, (1,))
+    assert cur.log[-1][0] == "EXECUTE stmt_t__exec_dup (%s)"
+    assert stmt.preparable
+
+
+def test_refused_prepare_falls_back_to_text(prepared_on):
+    stmt = statement("t.exec_refused", "SELECT a FROM t WHERE id=%s")
+    cur = _Cur(_Conn(), fail=psycopg2.errors.IndeterminateDatatype("type"))
+    execute(cur, stmt, (1,))
+    assert cur.log[1][0] == "ROLLBACK TO SAVEPOINT _stmt_prepare; RELEASE SAVEPOINT _stmt_prepare"
+    assert cur.log[-1] == ("SELECT a FROM t WHERE id=%s", (1,))
+    assert not stmt.preparable
+
+
+def test_disabled_runs_sql_text(monkeypatch):
+    monkeypatch.setattr(config, "DB_PREPARED_STATEMENTS", False)
+    stmt = statement("t.exec_off", "SELECT a FROM t WHERE id=%s")
+    cur = _Cur(_Conn())
+    execute(cur, stmt, (1,))
+    assert cur.log == [("SELECT a FROM t WHERE id=%s", (1,))]
+    assert st.statement_stats()["t.exec_off"]["calls"] == 1
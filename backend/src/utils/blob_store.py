@@ -0,0 +1,241 @@
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+
+from core import config
+
+# ===================================================================
+# BLOB STORE ADRESSÉ PAR CONTENU (sha256)
+# ===================================================================
+# Clé = sha256 hex du contenu : deux médias identiques (même source ou
+# non) partagent un seul fichier. La base ne garde que la clé dans la
+# colonne `path` (data = NULL). Backend "db" = pas de store, on reste
+# en BYTEA comme avant.
+# Les octets sont écrits avant le commit de la ligne qui les référence :
+# une transaction annulée laisse un fichier sans ligne. mtime rafraîchi à
+# chaque put (même contenu déjà présent) ; les clés plus anciennes que la
+# période de grâce et référencées nulle part sont balayées
+# (media_dedup.sweep_unreferenced_store_keys).
+
+CHUNK_SIZE = 64 * 1024
+_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _check_key(key: str) -> str:
+    key = (key or "").strip().lower()
+    if not _KEY_RE.match(key):
+        raise ValueError(f"Clé de blob invalide: {key!r}")
+    return key
+
+
+class BlobStore(ABC):
+    """Interface : un backend implémente put_stream / open / exists / size / delete / mtime / iter_keys."""
+
+    def put(self, data: bytes) -> str:
+        return self.put_stream(io.BytesIO(data))
+
+    @abstractmethod
+    def put_stream(self, fileobj: BinaryIO) -> str:
+        """Écrit le contenu (ou rafraîchit son mtime s'il existe déjà) -> clé sha256."""
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def mtime(self, key: str) -> Optional[float]:
+        """Dernière écriture / dernier put de la clé (epoch s), None si absente."""
+
+    @abstractmethod
+    def iter_keys(self) -> Iterator[Tuple[str, float]]:
+        """(clé, mtime) de tous les blobs présents."""
+
+    def get(self, key: str) -> bytes:
+        with self.open(key) as f:
+            return f.read()
+
+    def iter_chunks(self, key: str, start: int = 0, end: Optional[int] = None,
+                    chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Lecture en flux de [start, end] (inclus), par blocs fixes."""
+        with self.open(key) as f:
+            f.seek(start)
+            remaining = None if end is None else max(0, end - start + 1)
+            while remaining is None or remaining > 0:
+                n = chunk_size if remaining is None else min(chunk_size, remaining)
+                buf = f.read(n)
+                if not buf:
+                    break
+                if remaining is not None:
+                    remaining -= len(buf)
+                yield buf
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Fichiers sous root/ab/cd/abcd…(64 hex). Écriture atomique (fichier
+    temporaire + os.replace) ; un contenu déjà présent n'est pas réécrit.
+    """
+
+    def __init__(self, root: str, fanout: Tuple[int, ...] = (2, 2)):
+        self.root = os.path.abspath(root)
+        self.fanout = tuple(int(n) for n in fanout)
+        self._tmp = os.path.join(self.root, "tmp")
+        os.makedirs(self._tmp, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        key = _check_key(key)
+        parts, i = [], 0
+        for n in self.fanout:
+            parts.append(key[i:i + n])
+            i += n
+        return os.path.join(self.root, *parts, key)
+
+    def put_stream(self, fileobj: BinaryIO) -> str:
+        h = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    buf = fileobj.read(CHUNK_SIZE)
+                    if not buf:
+                        break
+                    h.update(buf)
+                    out.write(buf)
+            key = h.hexdigest()
+            dest = self.path_for(key)
+            if os.path.exists(dest):
+                os.unlink(tmp_path)
+                try:
+                    os.utime(dest, None)     # récent : protégé du balayage jusqu'au commit
+                except OSError:
+                    pass
+            else:
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                os.replace(tmp_path, dest)
+            return key
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path_for(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path_for(key))
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self.path_for(key))
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.unlink(self.path_for(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def mtime(self, key: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.path_for(key))
+        except FileNotFoundError:
+            return None
+
+    def iter_keys(self) -> Iterator[Tuple[str, float]]:
+        for dirpath, dirs, files in os.walk(self.root):
+            if os.path.abspath(dirpath) == self._tmp:
+                dirs[:] = []
+                continue
+            for name in files:
+                if not _KEY_RE.match(name):
+                    continue
+                try:
+                    yield name, os.path.getmtime(os.path.join(dirpath, name))
+                except OSError:
+                    continue
+
+
+# ---------------------------------------------------------------------
+# Registre des backends (config.BLOB_STORE_BACKEND)
+# ---------------------------------------------------------------------
+_BACKENDS: Dict[str, Callable[[], BlobStore]] = {
+    "local": lambda: LocalBlobStore(config.BLOB_STORE_ROOT),
+}
+_STORE: Optional[BlobStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def register_blob_backend(name: str, factory: Callable[[], BlobStore]) -> None:
+    _BACKENDS[name.strip().lower()] = factory
+
+
+def get_blob_store() -> Optional[BlobStore]:
+    """Store configuré, ou None si les blobs restent en BYTEA (backend "db")."""
+    global _STORE
+    backend = config.BLOB_STORE_BACKEND
+    if backend in ("", "db"):
+        return None
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                factory = _BACKENDS.get(backend)
+                if factory is None:
+                    raise RuntimeError(f"BLOB_STORE_BACKEND inconnu: {backend!r}")
+                _STORE = factory()
+    return _STORE
+
+
+# ---------------------------------------------------------------------
+# Colonnes (data, path) : écriture / lecture
+# ---------------------------------------------------------------------
+def blob_columns(data: bytes) -> Tuple[Optional[bytes], Optional[str]]:
+    """(data, path) à écrire : clé du store si configuré, sinon BYTEA inline."""
+    store = get_blob_store()
+    if store is None:
+        return data, None
+    return None, store.put(data)
+
+
+def blob_columns_from_path(file_path: str) -> Tuple[Optional[bytes], Optional[str]]:
+    """
+    Idem blob_columns depuis un fichier : écrit par blocs dans le store.
+    Backend "db" : le BYTEA impose une lecture complète (une seule copie).
+    """
+    store = get_blob_store()
+    if store is None:
+        with open(file_path, "rb") as f:
+            return f.read(), None
+    with open(file_path, "rb") as f:
+        return None, store.put_stream(f)
+
+
+def load_blob(data, path: Optional[str]) -> Optional[bytes]:
+    """Contenu d'une ligne (data inline ou clé `path` dans le store)."""
+    if data is not None:
+        return bytes(data)
+    if path:
+        store = get_blob_store()
+        if store is None:
+            raise RuntimeError("Blob externe mais BLOB_STORE_BACKEND=db")
+        return store.get(path)
+    return None
@@ -0,0 +1,167 @@
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import psycopg2
+from psycopg2.extras import Json, execute_values
+
+from core import config
+from utils.phash import phash_to_db
+from utils.blob_store import blob_columns
+from utils.ingest_profile import profile_stage
+from utils.media_dedup import MediaDedup
+
+# ===================================================================
+# ÉCRITURES GROUPÉES (ingestion PDF)
+# ===================================================================
+# Pages et médias sont bufferisés puis envoyés en un seul INSERT
+# multi-lignes (execute_values) par flush, au lieu d'un aller-retour
+# par page / par image. Les ids insérés restent disponibles par page
+# (avec un "tag" libre, ex: le rect de la figure pour figure_map).
+# Avec MEDIA_GLOBAL_DEDUP, les octets passent par academics.media_blobs
+# (partagés entre sources) et les lignes de page ne portent que blob_id.
+
+
+class IngestBulkWriter:
+
+    def __init__(
+        self,
+        cur,
+        source_id: int,
+        *,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        dedup: Optional[MediaDedup] = None,
+    ):
+        self.cur = cur
+        self.source_id = int(source_id)
+        self.max_rows = max(1, int(max_rows or config.INGEST_BULK_ROWS))
+        self.max_bytes = int(max_bytes or config.INGEST_BULK_MAX_MB * 1024 * 1024)
+        self.dedup = dedup if dedup is not None else (MediaDedup(cur) if config.MEDIA_GLOBAL_DEDUP else None)
+
+        self._pages: Dict[int, Tuple[str, Optional[str], Optional[str]]] = {}
+        self._media: List[Tuple[int, str, bytes, str, Optional[list], Optional[int], Optional[int], Optional[int], Any]] = []
+        self._media_md5: set = set()
+        self._media_bytes = 0
+
+        # page_no -> [(media_id, tag)] pour les médias réellement insérés
+        self.inserted: Dict[int, List[Tuple[int, Any]]] = {}
+        self.media_inserted = 0
+        self.pages_written = 0
+
+    # ------------------------------------------------------------------
+    # Pages
+    # ------------------------------------------------------------------
+    def add_page(self, page_no: int, text: str, ocr_text: Optional[str] = None,
+                 fingerprint: Optional[str] = None) -> None:
+        # même page deux fois dans un lot : la dernière gagne (comme l'upsert)
+        self._pages[int(page_no)] = (text, ocr_text, fingerprint)
+        if len(self._pages) >= self.max_rows:
+            self.flush_pages()
+
+    def flush_pages(self) -> int:
+        if not self._pages:
+            return 0
+        rows = [(self.source_id, pno, txt, ocr, fp) for pno, (txt, ocr, fp) in sorted(self._pages.items())]
+        self._pages = {}
+        with profile_stage("db_write"):
+            execute_values(
+                self.cur,
+                """
+                INSERT INTO academics.source_pages (source_id, page_no, text, ocr_text, fingerprint)
+                VALUES %s
+                ON CONFLICT (source_id, page_no)
+                DO UPDATE SET
+                    text = EXCLUDED.text,
+                    ocr_text = EXCLUDED.ocr_text,
+                    fingerprint = EXCLUDED.fingerprint
+                """,
+                rows,
+                page_size=len(rows),
+            )
+        self.pages_written += len(rows)
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # Médias
+    # ------------------------------------------------------------------
+    def add_media(
+        self,
+        *,
+        page_no: int,
+        kind: str,
+        png_bytes: bytes,
+        bbox: Optional[list] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        phash: Optional[int] = None,
+        tag: Any = None,
+    ) -> None:
+        md5 = hashlib.md5(png_bytes).hexdigest()
+        # doublon exact dans le lot : ON CONFLICT ne le verrait pas (même INSERT)
+        if md5 in self._media_md5:
+            return
+        self._media_md5.add(md5)
+        self._media.append((int(page_no), kind, png_bytes, md5, bbox, width, height, phash, tag))
+        self._media_bytes += len(png_bytes)
+        if len(self._media) >= self.max_rows or self._media_bytes >= self.max_bytes:
+            self.flush_media()
+
+    def flush_media(self) -> int:
+        if not self._media:
+            return 0
+        pending, self._media = self._media, []
+        self._media_md5 = set()
+        self._media_bytes = 0
+
+        with profile_stage("db_write"):
+            blob_ids: Dict[str, int] = {}
+            if self.dedup is not None:
+                blob_ids = self.dedup.resolve([
+                    (md5, png, width, height, ph)
+                    for (_pno, _kind, png, md5, _bbox, width, height, ph, _tag) in pending
+                ])
+
+            rows = []
+            for (page_no, kind, png, md5, bbox, width, height, ph, _tag) in pending:
+                blob_id = blob_ids.get(md5)
+                data, path = blob_columns(png) if blob_id is None else (None, None)
+                rows.append((
+                    self.source_id, page_no, kind, "image/png",
+                    psycopg2.Binary(data) if data is not None else None, path, md5,
+                    Json(bbox) if bbox else None, width, height, phash_to_db(ph), blob_id,
+                ))
+            returned = execute_values(
+                self.cur,
+                """
+                INSERT INTO academics.page_media_assets
+                    (source_id, page_no, kind, mime, data, path, md5, bbox, width, height, phash, blob_id)
+                VALUES %s
+                ON CONFLICT DO NOTHING
+                RETURNING id, md5
+                """,
+                rows,
+                page_size=len(rows),
+                fetch=True,
+            ) or []
+
+        # RETURNING ne renvoie que les lignes insérées (pas les conflits md5)
+        ids_by_md5 = {md5: int(mid) for (mid, md5) in returned}
+        n = 0
+        for (page_no, _kind, _png, md5, _bbox, _w, _h, _ph, tag) in pending:
+            mid = ids_by_md5.get(md5)
+            if mid is None:
+                continue
+            self.inserted.setdefault(page_no, []).append((mid, tag))
+            n += 1
+        self.media_inserted += n
+        return n
+
+    def flush(self) -> None:
+        self.flush_media()
+        self.flush_pages()
+
+    def dedup_stats(self) -> Dict[str, int]:
+        return dict(self.dedup.stats) if self.dedup is not None else {}
+
+    def page_tags(self) -> Dict[int, List[Any]]:
+        """page_no -> tags des médias insérés (ex: rects pour figure_map)."""
+        return {pno: [tag for (_mid, tag) in items] for pno, items in self.inserted.items()}
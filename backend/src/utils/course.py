@@ -1,12 +1,25 @@
-import os, re, hashlib, argparse, datetime
-from dataclasses import dataclass
-from typing import List, Optional, Dict, Tuple, Set , Union
+import os, re, hashlib, argparse, datetime, logging
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict, Tuple, Set , Union, Callable, Any
 import numpy as np
 import fitz
 import psycopg2
-from psycopg2.extras import Json , RealDictCursor
+from psycopg2.extras import Json
+from database.rows import dict_cursor, fetchall_tuples
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Query
-from database.connection import get_db_connection
+from database.connection import get_db_connection, release_db_connection
+from core import config
+from utils.pdf_analysis import PdfAnalysis, PageAnalysis
+from utils.phash import phash64_from_pixmap, phash64_from_pixmaps, phash64_batch, hamming_distance64, phash_to_db, phash_from_db, pix_samples, gray_from_array
+from utils.phash_index import PHashIndex
+from utils.bulk_writer import IngestBulkWriter
+from utils.spatial import RectGrid, auto_cell_size
+from utils.blob_store import blob_columns, blob_columns_from_path, load_blob
+from utils.spooled_upload import SpooledPdf
+from utils.ingest_profile import IngestProfiler, profile_stage
+from utils.media_dedup import MediaDedup
+from utils.section_writer import materialize_sections
 import statistics
 from io import BytesIO
 from PIL import Image
@@ -24,6 +37,18 @@ EDGE_GAP = 12.0              # “bords qui se touchent” => fusion
 IOU_SAME = 0.60              # deux crops trop proches => doublon
 PHASH_MAX_DIST = 6           # distance Hamming pHash pour doublons visuels
 RENDER_SCALE = 2.0           # facteur de rendu pour les crops
+# Rendu unique de la page (crops découpés dedans) plutôt qu'un get_pixmap par
+# candidat : rentable quand la somme des aires des candidats (recouvrements
+# compris) dépasse ~60% de la page ; en dessous, le rendu par clip (MuPDF
+# ignore ce qui est hors clip) rastérise moins de pixels.
+RENDER_ONCE_MIN_CANDIDATES = 3
+RENDER_ONCE_MIN_COVER = 0.6
+RENDER_ONCE_MAX_PIXELS = 40_000_000 # au-delà (posters, A0) : rendu par clip
+
+logger = logging.getLogger(__name__)
+
+# callback de progression : (étape, pages faites, pages totales)
+ProgressCallback = Callable[[str, int, int], None]
 
 TITLE_PAT = re.compile(
     r'^\s*(?:[IVXLC]+\.\s+|\d+(?:\.\d+)*\s+|PARTIE\s+\d+|CHAPITRE\s+\d+)',
@@ -53,21 +78,155 @@ class PDFIngestResult:
     missing_pages: List[int]
     empty_pages: List[int]
     coverage_ok: bool
+    # ré-ingestion incrémentale : pages reprises / ré-extraites
+    pages_reused: int = 0
+    pages_extracted: int = 0
+    # OCR des pages scannées : pages OCRisées, servies par le cache, latence par page (ms)
+    ocr_pages: int = 0
+    ocr_cache_hits: int = 0
+    ocr_latency_ms: Dict[int, float] = field(default_factory=dict)
+    profile: Dict[str, Any] = field(default_factory=dict)     # rapport IngestProfiler
+    media_dedup: Dict[str, int] = field(default_factory=dict) # blobs partagés : exact / near / new / octets
+    sections_created: int = 0
 
 
-@dataclass
-class ManualMedia:
-    page_no: int
-    kind: str
-    filename: Optional[str]
-    data: bytes
-     
-def _inspect_pdf_type(pdf_bytes: bytes) -> dict:
-   
-    max_pages = 20  
+# ---------------------------------------------------------------------
+# Classifieur slide / classic : vote par page
+# ---------------------------------------------------------------------
+SLIDE_AR_MIN, SLIDE_AR_MAX = 1.30, 2.10
+SLIDE_MAX_WORDS = 120
+SLIDE_MIN_DRAWINGS = 6
+
+
+def sample_page_numbers(n_pages: int, k: int) -> List[int]:
+    """k pages (0-based) réparties uniformément sur le document, bornes incluses."""
+    k = max(1, int(k))
+    if n_pages <= k:
+        return list(range(n_pages))
+    if k == 1:
+        return [n_pages // 2]
+    return sorted({round(i * (n_pages - 1) / (k - 1)) for i in range(k)})
+
+
+def _classify_page_legacy(pa: PageAnalysis) -> dict:
+    ar = pa.aspect_ratio
+    n_words = pa.n_words
+    n_drawings = len(pa.drawings)
+    return {
+        "page_no": pa.page_no,
+        "aspect_ratio": ar,
+        "n_words": n_words,
+        "n_drawings": n_drawings,
+        "is_slide_like": (
+            SLIDE_AR_MIN <= ar <= SLIDE_AR_MAX and
+            (n_words <= SLIDE_MAX_WORDS or n_drawings >= SLIDE_MIN_DRAWINGS)
+        ),
+    }
+
+
+def _classify_page_fast(pa: PageAnalysis) -> dict:
+    """
+    Vote slide par page, du signal le moins cher au plus cher : géométrie ->
+    mots -> opérateurs de peinture du flux -> get_drawings(), ce dernier
+    seulement dans la zone ambiguë autour du seuil de drawings.
+    n_words / n_drawings = None quand le verdict n'en a pas eu besoin.
+    """
+    info = {
+        "page_no": pa.page_no,
+        "aspect_ratio": pa.aspect_ratio,
+        "n_images": len(pa.images),
+        "n_words": None,
+        "n_drawings": None,
+        "drawings_exact": False,
+        "is_slide_like": False,
+    }
+    if not (SLIDE_AR_MIN <= info["aspect_ratio"] <= SLIDE_AR_MAX):
+        return info
+
+    info["n_words"] = pa.n_words
+    if info["n_words"] <= SLIDE_MAX_WORDS:
+        info["is_slide_like"] = True
+        return info
+
+    # Form XObjects d'abord (lecture des ressources) : sinon le flux ne dit pas tout
+    ops = -1 if pa.has_forms else pa.paint_ops
+    if ops >= 0:
+        if ops < SLIDE_MIN_DRAWINGS:
+            info["n_drawings"] = ops
+            return info
+        if ops >= 2 * SLIDE_MIN_DRAWINGS:
+            # largement au-dessus du seuil : verdict sans get_drawings()
+            info["n_drawings"] = ops
+            info["is_slide_like"] = True
+            return info
+
+    info["n_drawings"] = len(pa.drawings)
+    info["drawings_exact"] = True
+    info["is_slide_like"] = info["n_drawings"] >= SLIDE_MIN_DRAWINGS
+    return info
+
+
+def _classify_pages_fast(analysis: PdfAnalysis, pnos: List[int]) -> List[dict]:
+    pages_info = [_classify_page_fast(analysis.page(pno)) for pno in pnos]
+    if not pages_info:
+        return pages_info
+
+    # les moyennes mots / drawings ne comptent (règles doc) qu'à partir de 40 % de votes
+    slide_ratio = sum(1 for p in pages_info if p["is_slide_like"]) / len(pages_info)
+    if slide_ratio < 0.40:
+        return pages_info
+
+    for p in pages_info:
+        pa = analysis.page(p["page_no"] - 1)
+        if p["n_words"] is None:
+            p["n_words"] = pa.n_words
+        if p["n_drawings"] is None:
+            ops = -1 if pa.has_forms else pa.paint_ops
+            if ops >= 0:
+                p["n_drawings"] = ops
+            else:
+                p["n_drawings"] = len(pa.drawings)
+                p["drawings_exact"] = True
+
+    # "mean_draws >= 4" n'est testé que si les autres conditions (is_slide de
+    # repli, decide_slide_mode) tiennent ; estimation ambiguë => drawings exacts
+    mean_ar = sum(p["aspect_ratio"] for p in pages_info) / len(pages_info)
+    mean_words = _mean_known(pages_info, "n_words")
+    needs_draws = (
+        (0.40 <= slide_ratio < 0.55 and mean_ar >= 1.40 and mean_words <= 150) or
+        (slide_ratio >= 0.60 and mean_ar >= 1.35 and mean_words <= 120)
+    )
+    if needs_draws and 4 <= _mean_known(pages_info, "n_drawings") < 8:
+        for p in pages_info:
+            if not p["drawings_exact"]:
+                p["n_drawings"] = len(analysis.page(p["page_no"] - 1).drawings)
+                p["drawings_exact"] = True
+    return pages_info
+
+
+def _mean_known(pages_info: List[dict], key: str) -> float:
+    vals = [p[key] for p in pages_info if p.get(key) is not None]
+    return float(sum(vals)) / len(vals) if vals else 0.0
+
+
+def _inspect_pdf_type(pdf_bytes: Optional[bytes] = None, analysis: Optional[PdfAnalysis] = None,
+                      mode: Optional[str] = None) -> dict:
+    """
+    Slide vs classic. mode "fast" (défaut, config.CLASSIFY_MODE) : pages
+    échantillonnées sur tout le document, signaux bon marché d'abord,
+    get_drawings() seulement si le verdict en dépend. mode "legacy" : les
+    20 premières pages, drawings systématiques.
+    Les caches de page (dict texte, images, drawings) restent dans
+    `analysis` et sont relus par l'ingestion.
+    """
+    max_pages = 20
+    mode = (mode or config.CLASSIFY_MODE or "fast").strip().lower()
 
+    # analysis fourni => on réutilise le document déjà ouvert (et ses caches)
+    owns_analysis = analysis is None
     try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        if analysis is None:
+            analysis = PdfAnalysis.from_bytes(pdf_bytes)
     except Exception:
         return {
             "is_slide": False,
@@ -81,9 +240,10 @@ def _inspect_pdf_type(pdf_bytes: bytes) -> dict:
             "pages": [],
         }
 
-    n_pages = len(doc)
+    n_pages = len(analysis)
     if n_pages == 0:
-        doc.close()
+        if owns_analysis:
+            analysis.close()
         return {
             "is_slide": False,
             "error": "PDF sans pages.",
@@ -96,46 +256,18 @@ def _inspect_pdf_type(pdf_bytes: bytes) -> dict:
             "pages": [],
         }
 
-    pages_to_scan = min(max_pages, n_pages)
-
-    slide_votes = 0
-    pages_info = []
-
-    for pno in range(pages_to_scan):
-        page = doc[pno]
-        rect = page.rect
-        ar = rect.width / max(rect.height, 1.0)
+    if mode == "legacy":
+        pages_to_scan = min(max_pages, n_pages)
+        pages_info = [_classify_page_legacy(analysis.page(pno)) for pno in range(pages_to_scan)]
+    else:
+        pnos = sample_page_numbers(n_pages, config.CLASSIFY_SAMPLE_PAGES)
+        pages_to_scan = len(pnos)
+        pages_info = _classify_pages_fast(analysis, pnos)
+    slide_votes = sum(1 for p in pages_info if p["is_slide_like"])
+    n_drawings_computed = sum(1 for p in pages_info if p.get("drawings_exact", True))
 
-        try:
-            words = page.get_text("words") or []
-            n_words = len(words)
-        except Exception:
-            n_words = 0
-
-        try:
-            drawings = page.get_drawings() or []
-            n_drawings = len(drawings)
-        except Exception:
-            n_drawings = 0
-
-        
-        is_slide_page = (
-            1.30 <= ar <= 2.10 and
-            (n_words <= 120 or n_drawings >= 6)
-        )
-
-        if is_slide_page:
-            slide_votes += 1
-
-        pages_info.append({
-            "page_no": pno + 1,
-            "aspect_ratio": ar,
-            "n_words": n_words,
-            "n_drawings": n_drawings,
-            "is_slide_like": is_slide_page,
-        })
-
-    doc.close()
+    if owns_analysis:
+        analysis.close()
 
     if not pages_info:
         return {
@@ -151,8 +283,8 @@ def _inspect_pdf_type(pdf_bytes: bytes) -> dict:
 
     slide_ratio = slide_votes / pages_to_scan
     mean_ar = sum(p["aspect_ratio"] for p in pages_info) / len(pages_info)
-    mean_words = sum(p["n_words"] for p in pages_info) / len(pages_info)
-    mean_draws = sum(p["n_drawings"] for p in pages_info) / len(pages_info)
+    mean_words = _mean_known(pages_info, "n_words")
+    mean_draws = _mean_known(pages_info, "n_drawings")
 
     
     is_slide = False
@@ -174,12 +306,37 @@ def _inspect_pdf_type(pdf_bytes: bytes) -> dict:
         "mean_aspect_ratio": mean_ar,
         "mean_words_per_page": mean_words,
         "mean_drawings_per_page": mean_draws,
+        "classify_mode": mode,
+        "n_drawings_computed": n_drawings_computed,
         "pages": pages_info,
     }
 
 
 
 
+def decide_slide_mode(info: dict, force_slide: Optional[bool] = None) -> bool:
+    """
+    Décision slide/classic à partir du résultat de _inspect_pdf_type
+    (force_slide = choix explicite de l'utilisateur).
+    """
+    if force_slide is not None:
+        return bool(force_slide)
+
+    slide_ratio = float(info.get("slide_ratio", 0.0) or 0.0)
+    mean_ar = float(info.get("mean_aspect_ratio", 0.0) or 0.0)
+    mean_words = float(info.get("mean_words_per_page", 0.0) or 0.0)
+    mean_draws = float(info.get("mean_drawings_per_page", 0.0) or 0.0)
+
+    is_slide_strong = (
+        slide_ratio >= 0.60 and
+        mean_ar >= 1.35 and
+        mean_words <= 120 and
+        mean_draws >= 4
+    )
+    # sinon: CLASSIC (prudent), y compris quand la détection est ambiguë
+    return is_slide_strong
+
+
 def get_ue_id_from_code(ue_code: str) -> int:
     if not ue_code or not ue_code.strip():
         raise HTTPException(status_code=400, detail="ue_code manquant")
@@ -194,7 +351,7 @@ def get_ue_id_from_code(ue_code: str) -> int:
             print("API DB CONTEXT =", cur.fetchone())
 
         # Requête UE
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with dict_cursor(conn) as cur:
             cur.execute(
                 "SELECT id, code FROM academics.ue WHERE code = %s",
                 (code,)
@@ -207,7 +364,7 @@ def get_ue_id_from_code(ue_code: str) -> int:
 
             return int(row["id"])
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def sha256_text(s: Union[str, bytes]) -> str:
     """
@@ -235,29 +392,6 @@ def rect_to_list(bbox):
 
 
 
-def upsert_source_bytes(cur, title: str, year: Optional[int], doc_mode: str, md5_file: str) ->int:
-     conn = get_db_connection()
-     cur = conn.cursor()
-
-     cur.execute("SELECT id FROM academics.sources WHERE md5 = %s LIMIT 1", (md5_file,))     
-     row = cur.fetchone()
-     if row:
-          return row[0]
-     cur.execute(
-                """
-                INSERT INTO academics.sources (title, year, doc_mode, md5)
-                VALUES (%s, %s, %s, %s)
-                ON CONFLICT (md5)
-                DO UPDATE SET
-                title = EXCLUDED.title,
-                year = EXCLUDED.year,
-                doc_mode = EXCLUDED.doc_mode
-                RETURNING id
-                """,
-                (title, year, doc_mode, md5_file),
-        )
-     return cur.fetchone()[0]
-
 def upsert_source_page(cur, *, source_id: int, page_no: int, text: str, ocr_text: Optional[str] = None):
     cur.execute(
         """
@@ -273,9 +407,6 @@ def upsert_source_page(cur, *, source_id: int, page_no: int, text: str, ocr_text
      
 def insert_section(cur, course_id: int, version_id: Optional[int], parent_id: Optional[int],
                    position: int, title: str, content_md: str) -> int:
-     conn = get_db_connection()
-     cur = conn.cursor()
-
      cur.execute("""
         INSERT INTO academics.sections(course_id, version_id, parent_id, position, title, content_md)
         VALUES (%s, %s, %s, %s, %s, %s)
@@ -285,25 +416,11 @@ def insert_section(cur, course_id: int, version_id: Optional[int], parent_id: Op
 
 def insert_citation(cur, section_id: int, source_id: int, page_start: int,
                     page_end: Optional[int], quote: Optional[str]):
-     conn = get_db_connection()
-     cur = conn.cursor()
-
      cur.execute("""
         INSERT INTO academics.citations(section_id, source_id, page_start, page_end, quote)
         VALUES (%s, %s, %s, %s, %s)
         ON CONFLICT DO NOTHING
-    """, (section_id, source_id, page_start, page_end, quote))
-
-def insert_source_file_bytes(cur, source_id: int, pdf_bytes: bytes):
-     conn = get_db_connection()
-     cur = conn.cursor()
-
-     cur.execute("""
-        INSERT INTO academics.source_files (source_id, pdf_data)
-        VALUES (%s, %s)
-        ON CONFLICT (source_id) DO UPDATE
-        SET pdf_data = EXCLUDED.pdf_data
-    """, (source_id, psycopg2.Binary(pdf_bytes)))
+    """, (section_id, source_id, page_start, page_end if page_end is not None else page_start, quote))
 
 def add_version(cur, course_id: int, label: Optional[str] = None) -> int:
     label = label or f"v{datetime.date.today().isoformat()}-auto"
@@ -316,61 +433,169 @@ def add_version(cur, course_id: int, label: Optional[str] = None) -> int:
     return int(cur.fetchone()[0])
 
 
-def _load_existing_media_phases(cur, source_id: int) -> Set[int]:
-     conn = get_db_connection()
-     cur = conn.cursor()
+def _backfill_media_phashes(cur, source_id: int, batch_size: int = 32) -> int:
+    """
+    Anciennes lignes sans phash : calcul unique depuis les bytes stockés.
+    Lecture par lots (id puis data/path) pour ne pas tout charger en mémoire.
+    Échec (contenu absent ou illisible) : phash_failed = true, la ligne n'est
+    plus relue aux ingestions suivantes.
+    """
+    cur.execute("""
+        SELECT id
+        FROM academics.page_media_assets
+        WHERE source_id = %s AND phash IS NULL AND NOT phash_failed
+          AND (data IS NOT NULL OR path IS NOT NULL OR blob_id IS NOT NULL)
+    """, (source_id,))
+    ids = [int(r[0]) for r in fetchall_tuples(cur)]
+
+    updated = 0
+    for i in range(0, len(ids), batch_size):
+        cur.execute("""
+            SELECT a.id,
+                   CASE WHEN a.blob_id IS NULL THEN a.data ELSE b.data END,
+                   COALESCE(b.path, a.path)
+            FROM academics.page_media_assets a
+            LEFT JOIN academics.media_blobs b ON b.id = a.blob_id
+            WHERE a.id = ANY(%s)
+        """, (ids[i:i + batch_size],))
+        hashed: List[Tuple[int, int]] = []
+        failed: List[int] = []
+        for mid, data, path in fetchall_tuples(cur):
+            h = None
+            try:
+                blob = load_blob(data, path)
+                pix = _pix_from_image_bytes(blob) if blob else None
+                if pix is not None:
+                    h = phash64_from_pixmap(pix)
+            except Exception:
+                h = None
+            if h is None:
+                failed.append(int(mid))
+            else:
+                hashed.append((int(mid), phash_to_db(h)))
 
-     cur.execute("""
-        SELECT id, data
+        for mid, ph in hashed:
+            cur.execute(
+                "UPDATE academics.page_media_assets SET phash = %s WHERE id = %s",
+                (ph, mid),
+            )
+        if failed:
+            cur.execute(
+                "UPDATE academics.page_media_assets SET phash_failed = true WHERE id = ANY(%s)",
+                (failed,),
+            )
+        updated += len(hashed)
+    return updated
+
+def _load_existing_media_phases(cur, source_id: int) -> Set[int]:
+    """pHash des médias existants de la source (colonne BIGINT indexée, sans BYTEA)."""
+    _backfill_media_phashes(cur, source_id)
+    cur.execute("""
+        SELECT phash
         FROM academics.page_media_assets
-        WHERE source_id = %s AND data IS NOT NULL
+        WHERE source_id = %s AND phash IS NOT NULL
     """, (source_id,))
-     rows = cur.fetchall() or []
-     phashes: Set[int] = set()
+    return {phash_from_db(r[0]) for r in fetchall_tuples(cur)}
 
-     for _id, blob in rows:
-          if not blob: 
-               continue
-          try:
-               doc_img = fitz.open(stream=bytes(blob), filetype="png")
-               try:
-                    pg = doc_img[0]
-                    pix = pg.get_pixmap(alpha=False)
-               finally:
-                    doc_img.close()
-          except Exception:
-               try:
-                    doc_img = fitz.open(stream=bytes(blob))
-                    try:
-                         if len(doc_img) == 0:
-                              continue
-                         pg = doc_img[0]
-                         pix = pg.get_pixmap(alpha=False)
-                    finally: 
-                     doc_img.close()
-               except Exception:
-                    continue
-     return phashes
+def load_source_phash_index(cur, source_id: int, max_radius: int = PHASH_MAX_DIST) -> PHashIndex:
+    """Index pHash des médias déjà stockés pour la source (re-ingestion)."""
+    return PHashIndex.from_rows(((None, h) for h in _load_existing_media_phases(cur, source_id)),
+                                max_radius=max_radius)
 
-def _insert_png_from_pix(cur, source_id: int, page_no: int, pix: fitz.Pixmap,
-                         kind: str = "figure", caption: Optional[str] = None,
-                         bbox: Optional[fitz.Rect] = None) -> Optional[int]:
-    png = pix.tobytes("png")
-    md5 = hashlib.md5(png).hexdigest()
+def _add_manual_media(writer, seen: PHashIndex, items: List[Tuple[int, bytes, str]],
+                      max_dist: int = PHASH_MAX_DIST) -> int:
+    """
+    Images manuelles (mode slide) -> writer, sans les quasi-doublons visuels
+    (pHash à <= max_dist d'un média déjà stocké pour la source ou du lot courant).
+    Retourne le nombre d'images écartées.
+    """
+    skipped = 0
+    for (page_no, img_bytes, caption) in items:
+        png = img_bytes
+        w = h = ph = None
+        try:
+            pix = _pix_from_image_bytes(img_bytes)
+            if pix is not None:
+                png = pix.tobytes("png")
+                w, h = pix.width, pix.height
+                ph = phash64_from_pixmap(pix)
+        except Exception:
+            pass
 
+        if ph is not None and seen.any_within(ph, max_dist):
+            skipped += 1
+            continue
+
+        writer.add_media(
+            page_no=int(page_no),
+            kind="manual",
+            png_bytes=png,
+            bbox=None,
+            width=w,
+            height=h,
+            phash=ph,
+        )
+        if ph is not None:
+            seen.add(ph)
+    return skipped
+
+def _match_previous_pages(cur, previous_source_id: int,
+                          fingerprints: List[str]) -> Dict[int, Tuple[int, str, Optional[str]]]:
+    """
+    Ré-ingestion incrémentale : page (1-based) de la nouvelle version ->
+    (page_no, text, ocr_text) de la page d'empreinte identique dans la
+    source précédente. Une ancienne page n'est appariée qu'une fois.
+    """
+    cur.execute("""
+        SELECT page_no, fingerprint, text, ocr_text
+        FROM academics.source_pages
+        WHERE source_id = %s AND fingerprint IS NOT NULL
+        ORDER BY page_no
+    """, (previous_source_id,))
+    by_fp: Dict[str, List[Tuple[int, str, Optional[str]]]] = {}
+    for page_no, fp, text, ocr_text in (cur.fetchall() or []):
+        by_fp.setdefault(fp, []).append((int(page_no), text or "", ocr_text))
+
+    reuse: Dict[int, Tuple[int, str, Optional[str]]] = {}
+    for pno, fp in enumerate(fingerprints, start=1):
+        candidates = by_fp.get(fp)
+        if candidates:
+            reuse[pno] = candidates.pop(0)
+    return reuse
+
+def _copy_page_media(cur, from_source_id: int, to_source_id: int, page_map: Dict[int, int]) -> int:
+    """
+    Copie serveur (INSERT ... SELECT) des médias des pages reprises,
+    renumérotées. Les blobs partagés ne sont pas recopiés : blob_id seul
+    (ref_count incrémenté par trigger).
+    """
+    if not page_map:
+        return 0
+    new_pages = sorted(page_map)
+    old_pages = [page_map[p] for p in new_pages]
     cur.execute("""
         INSERT INTO academics.page_media_assets(
-            source_id, page_no, kind, mime, data, md5, bbox, width, height
+            source_id, page_no, kind, mime, data, path, md5, bbox, width, height, phash, asset_id, blob_id
         )
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+        SELECT %s, m.new_page, a.kind, a.mime, a.data, a.path, a.md5, a.bbox,
+               a.width, a.height, a.phash, a.asset_id, a.blob_id
+        FROM academics.page_media_assets a
+        JOIN unnest(%s::int[], %s::int[]) AS m(old_page, new_page) ON a.page_no = m.old_page
+        WHERE a.source_id = %s
+        ORDER BY m.new_page, a.id
         ON CONFLICT DO NOTHING
-        RETURNING id
-    """, (
-        source_id, page_no, kind, "image/png", psycopg2.Binary(png), md5,
-        Json(rect_to_list(bbox)) if bbox else None, pix.width, pix.height
-    ))
-    row = cur.fetchone()
-    return int(row[0]) if row else None
+    """, (to_source_id, old_pages, new_pages, from_source_id))
+    return max(0, cur.rowcount or 0)
+
+def _media_storage(cur, png: bytes, md5: str, width: Optional[int], height: Optional[int],
+                   phash: Optional[int]) -> Tuple[Optional[bytes], Optional[str], Optional[int]]:
+    """(data, path, blob_id) d'une image isolée : blob partagé si dédup globale."""
+    if config.MEDIA_GLOBAL_DEDUP:
+        blob_id = MediaDedup(cur).resolve([(md5, png, width, height, phash)]).get(md5)
+        if blob_id is not None:
+            return None, None, blob_id
+    data, path = blob_columns(png)
+    return data, path, None
 
 def get_ue_id_by_code(cur, ue_code: str) -> int:
     ue_code = (ue_code or "").strip()
@@ -424,24 +649,28 @@ def upsert_course(
     return int(cur.fetchone()[0])
 
 
-def get_embedded_image_rects_by_page(doc: fitz.Document) -> Dict[int, List[fitz.Rect]]:
+def _page_embedded_image_rects(pa: PageAnalysis) -> List[fitz.Rect]:
+    page = pa.page
+    rects: List[fitz.Rect] = []
+
+    for img in pa.images:
+        xref = img[0]
+        try:
+            for r in page.get_image_rects(xref) or []:
+                if r and not r.is_empty:
+                    rects.append(r)
+        except Exception:
+            continue
+    return rects
+
+
+def get_embedded_image_rects_by_page(doc: fitz.Document, analysis: Optional[PdfAnalysis] = None) -> Dict[int, List[fitz.Rect]]:
    
     img_rects: Dict[int, List[fitz.Rect]] = {}
+    analysis = analysis or PdfAnalysis(doc)
 
     for i in range(len(doc)):
-        page = doc[i]
-        rects: List[fitz.Rect] = []
-
-        for img in page.get_images(full=True) or []:
-            xref = img[0]
-            try:
-                for r in page.get_image_rects(xref) or []:
-                    if r and not r.is_empty:
-                        rects.append(r)
-            except Exception:
-                continue
-
-        img_rects[i + 1] = rects
+        img_rects[i + 1] = _page_embedded_image_rects(analysis.page(i))
 
     return img_rects
 
@@ -486,90 +715,138 @@ def detect_titles_from_page_dict(page_dict: dict) -> list[str]:
      return out
 
 
-def extract_text_filtered_from_bytes(
-    pdf_bytes: bytes,
-    figure_map: Dict[int, List[fitz.Rect]],
-    image_rects_map: Optional[Dict[int, List[fitz.Rect]]] = None,
-    image_reacts_map: Optional[Dict[int, List[fitz.Rect]]] = None,  # alias compat
-    overlap_threshold: float = 0.18,
-) -> List[str]:
-    if image_rects_map is None and image_reacts_map is not None:
-        image_rects_map = image_reacts_map
-    image_rects_map = image_rects_map or {}
-
-    def _to_rect(bbox) -> Optional[fitz.Rect]:
-        if not bbox:
-            return None
-        try:
-            # bbox peut être (x0,y0,x1,y1)
-            if isinstance(bbox, (list, tuple)) and len(bbox) == 4:
-                return fitz.Rect(bbox)
-        except Exception:
-            return None
+def _to_rect(bbox) -> Optional[fitz.Rect]:
+    if not bbox:
+        return None
+    try:
+        # bbox peut être (x0,y0,x1,y1)
+        if isinstance(bbox, (list, tuple)) and len(bbox) == 4:
+            return fitz.Rect(bbox)
+    except Exception:
         return None
+    return None
 
-    def _overlap_ratio(a: fitz.Rect, b: fitz.Rect) -> float:
-        """
-        ratio de recouvrement: aire(intersection) / min(aire(a), aire(b))
-        """
-        inter = a & b
-        if inter.is_empty or inter.get_area() <= 0:
-            return 0.0
-        denom = min(a.get_area(), b.get_area())
-        return (inter.get_area() / denom) if denom > 0 else 0.0
+def _overlap_ratio(a: fitz.Rect, b: fitz.Rect) -> float:
+    """
+    ratio de recouvrement: aire(intersection) / min(aire(a), aire(b))
+    """
+    inter = a & b
+    if inter.is_empty or inter.get_area() <= 0:
+        return 0.0
+    denom = min(a.get_area(), b.get_area())
+    return (inter.get_area() / denom) if denom > 0 else 0.0
 
-    def _detect_titles_from_page_dict(page_dict: dict) -> List[str]:
-        """
-        Détection simple de titres: lignes avec police plus grande que la médiane.
-        (Version stable, sans tes typos blockd.)
-        """
-        spans = []
-        for block in page_dict.get("blocks", []):
-            if block.get("type") != 0:
+def _detect_titles_from_page_dict(page_dict: dict) -> List[str]:
+    """
+    Détection simple de titres: lignes avec police plus grande que la médiane.
+    (Version stable, sans tes typos blockd.)
+    """
+    spans = []
+    for block in page_dict.get("blocks", []):
+        if block.get("type") != 0:
+            continue
+        for line in block.get("lines", []):
+            for sp in line.get("spans", []):
+                t = (sp.get("text") or "").strip()
+                if t:
+                    spans.append(sp)
+
+    if not spans:
+        return []
+
+    sizes = [float(sp.get("size", 0) or 0) for sp in spans if float(sp.get("size", 0) or 0) > 0]
+    if not sizes:
+        return []
+
+    sizes.sort()
+    med = sizes[len(sizes) // 2]
+
+    titles = []
+    for block in page_dict.get("blocks", []):
+        if block.get("type") != 0:
+            continue
+        for line in block.get("lines", []):
+            line_text = " ".join((sp.get("text") or "").strip() for sp in line.get("spans", [])).strip()
+            if not line_text:
                 continue
-            for line in block.get("lines", []):
-                for sp in line.get("spans", []):
-                    t = (sp.get("text") or "").strip()
-                    if t:
-                        spans.append(sp)
+            max_size = max((float(sp.get("size", 0) or 0) for sp in line.get("spans", [])), default=0)
+            if max_size >= med * 1.25 and len(line_text) <= 140:
+                titles.append(line_text)
 
-        if not spans:
-            return []
+    # dédoublonnage
+    out, seen = [], set()
+    for t in titles:
+        k = t.lower()
+        if k not in seen:
+            seen.add(k)
+            out.append(t)
+    return out
 
-        sizes = [float(sp.get("size", 0) or 0) for sp in spans if float(sp.get("size", 0) or 0) > 0]
-        if not sizes:
-            return []
+def _filter_page_text(page_dict: dict, blocking_rects: List[fitz.Rect], overlap_threshold: float = 0.18) -> str:
+    """
+    Texte markdown d'une page : titres en tête, lignes chevauchant une zone
+    image/figure retirées.
+    """
+    titles = _detect_titles_from_page_dict(page_dict)
+    titles_lower = {t.lower() for t in titles}
+    blocking_rects = [r for r in (blocking_rects or []) if r is not None]
+    blocking_grid = RectGrid.from_rects(blocking_rects) if blocking_rects else None
 
-        sizes.sort()
-        med = sizes[len(sizes) // 2]
+    lines_out: List[str] = []
 
-        titles = []
-        for block in page_dict.get("blocks", []):
-            if block.get("type") != 0:
+    for block in page_dict.get("blocks", []):
+        if block.get("type") != 0:
+            continue
+
+        for line in block.get("lines", []):
+            # texte de ligne
+            line_text = " ".join((sp.get("text") or "").strip() for sp in line.get("spans", [])).strip()
+            if not line_text:
+                continue
+
+            # ignore si c'est un titre (on le remettra en # plus haut)
+            if line_text.lower() in titles_lower:
                 continue
-            for line in block.get("lines", []):
-                line_text = " ".join((sp.get("text") or "").strip() for sp in line.get("spans", [])).strip()
-                if not line_text:
+
+            lrect = _to_rect(line.get("bbox"))
+            if lrect and blocking_grid is not None:
+                # si la ligne chevauche une zone image -> on skip
+                if any(_overlap_ratio(lrect, blocking_rects[i]) >= overlap_threshold
+                       for i in blocking_grid.intersecting(lrect)):
                     continue
-                max_size = max((float(sp.get("size", 0) or 0) for sp in line.get("spans", [])), default=0)
-                if max_size >= med * 1.25 and len(line_text) <= 140:
-                    titles.append(line_text)
 
-        # dédoublonnage
-        out, seen = [], set()
-        for t in titles:
-            k = t.lower()
-            if k not in seen:
-                seen.add(k)
-                out.append(t)
-        return out
+            lines_out.append(line_text)
+
+    # Compose markdown page
+    buf: List[str] = []
+    for t in titles[:3]:
+        buf.append(f"# {t}")
+    buf.extend(lines_out)
+
+    return "\n".join(buf).strip()
+
+def extract_text_filtered_from_bytes(
+    pdf_bytes: bytes,
+    figure_map: Dict[int, List[fitz.Rect]],
+    image_rects_map: Optional[Dict[int, List[fitz.Rect]]] = None,
+    image_reacts_map: Optional[Dict[int, List[fitz.Rect]]] = None,  # alias compat
+    overlap_threshold: float = 0.18,
+    analysis: Optional[PdfAnalysis] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> List[str]:
+    if image_rects_map is None and image_reacts_map is not None:
+        image_rects_map = image_reacts_map
+    image_rects_map = image_rects_map or {}
 
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    # analysis fourni => pas de réouverture du PDF, dict déjà en cache
+    owns_analysis = analysis is None
+    if analysis is None:
+        analysis = PdfAnalysis.from_bytes(pdf_bytes)
     out_pages: List[str] = []
 
     try:
-        for pno in range(len(doc)):
-            page = doc[pno]
+        for pno in range(len(analysis)):
+            pa = analysis.page(pno)
             page_no = pno + 1
 
             # zones à exclure
@@ -577,49 +854,20 @@ def extract_text_filtered_from_bytes(
             img_rects = image_rects_map.get(page_no, []) or []
             blocking_rects = [r for r in (fig_rects + img_rects) if isinstance(r, fitz.Rect)]
 
-            page_dict = page.get_text("dict")
-            titles = _detect_titles_from_page_dict(page_dict)
-            titles_lower = {t.lower() for t in titles}
-
-            lines_out: List[str] = []
+            with profile_stage("text_filter", page_no):
+                out_pages.append(_filter_page_text(pa.textdict, blocking_rects, overlap_threshold))
 
-            for block in page_dict.get("blocks", []):
-                if block.get("type") != 0:
-                    continue
+            # dernier étage qui lit la page : on libère ses caches
+            analysis.release_page(pno)
 
-                for line in block.get("lines", []):
-                    # texte de ligne
-                    line_text = " ".join((sp.get("text") or "").strip() for sp in line.get("spans", [])).strip()
-                    if not line_text:
-                        continue
-
-                    # ignore si c'est un titre (on le remettra en # plus haut)
-                    if line_text.lower() in titles_lower:
-                        continue
-
-                    lrect = _to_rect(line.get("bbox"))
-                    if lrect and blocking_rects:
-                        # si la ligne chevauche une zone image -> on skip
-                        if any(_overlap_ratio(lrect, r) >= overlap_threshold for r in blocking_rects):
-                            continue
-
-                    lines_out.append(line_text)
-
-            # Compose markdown page
-            buf: List[str] = []
-            for t in titles[:3]:
-                buf.append(f"# {t}")
-            buf.extend(lines_out)
-
-            out_pages.append("\n".join(buf).strip())
+            if progress:
+                progress("text", page_no, len(analysis))
 
         return out_pages
 
     finally:
-        try:
-            doc.close()
-        except Exception:
-            pass  
+        if owns_analysis:
+            analysis.close()
 
 def _normalize_pix_to_rgb(pix: fitz.Pixmap) -> fitz.Pixmap:
     try:
@@ -719,110 +967,12 @@ def _pix_from_image_bytes(img_bytes: bytes) -> Optional[fitz.Pixmap]:
         except Exception:
              pass
         return None 
-def _downscale_mean(gray: np.ndarray, w: int, h: int) -> np.ndarray:
-    H, W = gray.shape
-    ys = (np.linspace(0, H, h+1)).astype(int)
-    xs = (np.linspace(0, W, w+1)).astype(int)
-    out = np.zeros((h, w), dtype=np.float32)
-    for i in range(h):
-        for j in range(w):
-            block = gray[ys[i]:ys[i+1], xs[j]:xs[j+1]]
-            out[i, j] = float(block.mean()) if block.size else 0.0
-    return out
-
-def _pix_to_gray(pix: fitz.Pixmap) -> np.ndarray:
-    if pix.n > 4:
-        pix = fitz.Pixmap(fitz.csRGB, pix)
-    arr = np.frombuffer(pix.samples, dtype=np.uint8)
-    C = pix.n if pix.n in (1,2,3,4) else 3
-    arr = arr.reshape(pix.h, pix.w, C)
-    if C == 1:                # Gray
-        gray = arr[..., 0].astype(np.float32)
-    elif C == 2:              # Gray + alpha
-        gray = arr[..., 0].astype(np.float32)
-    else:                     # RGB / RGBA -> on ignore alpha
-        gray = (0.299*arr[...,0] + 0.587*arr[...,1] + 0.114*arr[...,2]).astype(np.float32)
-    return gray
-                  
-def phash64_from_pixmap(pix: fitz.Pixmap) -> int:
-    gray = _pix_to_gray(pix)
-    small = _downscale_mean(gray, 32, 32)
-    dct_like = _downscale_mean(small, 8, 8)
-    med = np.median(dct_like[1:, 1:])
-    bits = (dct_like > med).flatten()
-    h = 0
-    for b in bits:
-        h = (h << 1) | int(bool(b))
-    return int(h)
-
-def hamming_distance64(a: int, b: int) -> int:
-    
-    return (a ^ b).bit_count()
+# compat : anciens noms (une seule implémentation, utils.phash)
+phash_from_pixmap = phash64_from_pixmap
 
 def hamming64(a: int, b: int) -> int:
     return hamming_distance64(a, b)
 
-def manual_slide_media(cur, source_id: int, items: List[ManualMedia], pash_dist: int = 6, min_size_px: int = 80)-> Dict[int, list[int]]:
-     inserted_map: Dict[int, List[int]] = {}
-     if not items:
-          return inserted_map
-
-     try: 
-          existing_hashes = _load_existing_media_phases(cur, source_id)
-     except Exception:
-          existing_hashes = set()
-
-     batch_hashes: Set[int] = set()
-     for it in items:
-          pix: Optional[fitz.Pixmap] = None
-          try: 
-               pix = _pix_from_image_bytes(it.data)
-          except Exception:
-               pix = None
-
-          if pix is None:
-               continue
-          if pix.width < min_size_px or pix.height < min_size_px:
-               continue
-          try:
-               h = int(phash64_from_pixmap(pix))
-          except Exception:
-               h = None
-
-          if h is not None:
-               for eh in existing_hashes:
-                    if hamming64(h,eh) <= pash_dist:
-                         pix = None
-                         break
-          if pix is None:
-               continue
-          if h is not None:
-               is_dup_batch = any(hamming64(h, bh) <= pash_dist for bh in batch_hashes)
-               if is_dup_batch:
-                    continue
-          try:
-                mid = _insert_png_from_pix(
-                        cur=cur,
-                        source_id=source_id,
-                        page_no=int(it.page_no),
-                        pix=pix,
-                        kind=(it.kind or "figure"),
-                        caption=(it.filename or None),
-                        bbox=None,                 
-                        xref=None,
-                        image_index=None,
-                        is_annotation=False,
-                        is_render_fallback=False
-                )
-          except Exception:
-               mid = None
-          if mid:
-               inserted_map.setdefault(int(it.page_no), []).append(int(mid))
-               if h is not None:
-                    batch_hashes.add(h)
-                    existing_hashes.add(h)
-     return inserted_map
-
 def upsert_source(cur, *, title: str, year: Optional[int], doc_mode: str, md5_file: str) -> int:
     cur.execute(
         """
@@ -842,14 +992,29 @@ def upsert_source(cur, *, title: str, year: Optional[int], doc_mode: str, md5_fi
 
 
 def upsert_source_file(cur, *, source_id: int, pdf_bytes: bytes):
+    # store externe configuré => pdf_data NULL, clé sha256 dans path
+    data, path = blob_columns(pdf_bytes)
     cur.execute(
         """
-        INSERT INTO academics.source_files (source_id, pdf_data)
-        VALUES (%s, %s)
+        INSERT INTO academics.source_files (source_id, pdf_data, path)
+        VALUES (%s, %s, %s)
         ON CONFLICT (source_id)
-        DO UPDATE SET pdf_data = EXCLUDED.pdf_data
+        DO UPDATE SET pdf_data = EXCLUDED.pdf_data, path = EXCLUDED.path
         """,
-        (source_id, psycopg2.Binary(pdf_bytes)),
+        (source_id, psycopg2.Binary(data) if data is not None else None, path),
+    )
+
+def upsert_source_file_from_path(cur, *, source_id: int, file_path: str):
+    # upload en flux : blob écrit par blocs depuis le fichier (store externe)
+    data, path = blob_columns_from_path(file_path)
+    cur.execute(
+        """
+        INSERT INTO academics.source_files (source_id, pdf_data, path)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (source_id)
+        DO UPDATE SET pdf_data = EXCLUDED.pdf_data, path = EXCLUDED.path
+        """,
+        (source_id, psycopg2.Binary(data) if data is not None else None, path),
     )
 
 def _parse_bool(val: Optional[str], *, default: Optional[bool]=None) -> Optional[bool]:
@@ -871,40 +1036,61 @@ def iou(a: fitz.Rect, b: fitz.Rect) -> float:
         return 0.0
     return inter.get_area() / (a.get_area() + b.get_area() - inter.get_area())
 
+def _edges_touch(r: fitz.Rect, m: fitz.Rect, gap: float) -> bool:
+    """Bords en vis-à-vis à moins de `gap` ET recouvrement sur l'autre axe."""
+    y_overlap = r.y0 - gap <= m.y1 and m.y0 <= r.y1 + gap
+    x_overlap = r.x0 - gap <= m.x1 and m.x0 <= r.x1 + gap
+    return ((y_overlap and (abs(r.x0 - m.x1) <= gap or abs(r.x1 - m.x0) <= gap)) or
+            (x_overlap and (abs(r.y0 - m.y1) <= gap or abs(r.y1 - m.y0) <= gap)))
+
 def merge_rects_by_iou(rects: List[fitz.Rect], iou_thr: float = IOU_MERGE, edge_gap: float = EDGE_GAP) -> List[fitz.Rect]:
     if not rects:
         return []
     rects = rects[:]
     merged: List[fitz.Rect] = []
+    # index spatial sur les rects fusionnés (ids = positions dans `merged`)
+    grid = RectGrid(auto_cell_size(rects))
     while rects:
         r = rects.pop()
         merged_any = False
-        for i, m in enumerate(merged):
-            touching = (abs(r.x0 - m.x1) <= edge_gap or abs(r.x1 - m.x0) <= edge_gap or
-                        abs(r.y0 - m.y1) <= edge_gap or abs(r.y1 - m.y0) <= edge_gap)
-            if iou(r, m) >= iou_thr or touching:
+        if iou_thr > 0:
+            candidates = grid.intersecting(r, pad=edge_gap)
+        else:
+            candidates = range(len(merged))
+        # premier fusionné (ordre d'insertion) qui matche, comme le balayage linéaire
+        for i in candidates:
+            m = merged[i]
+            if iou(r, m) >= iou_thr or _edges_touch(r, m, edge_gap):
                 merged[i] = m | r
+                grid.update(i, merged[i])
                 merged_any = True
                 break
         if not merged_any:
+            grid.insert(len(merged), r)
             merged.append(r)
     keep: List[fitz.Rect] = []
     for i, r in enumerate(merged):
-        contained = any(i != j and (r & m).get_area()/max(r.get_area(),1.0) >= 0.85 for j, m in enumerate(merged))
+        contained = any(
+            i != j and (r & merged[j]).get_area()/max(r.get_area(),1.0) >= 0.85
+            for j in grid.intersecting(r)
+        )
         if not contained:
             keep.append(r)
     return keep
-def build_sections_from_titles(pages: List[str]) -> List[Dict]:
+def build_sections_from_titles(pages: List[str], keep_empty: bool = False) -> List[Dict]:
+    # keep_empty : garde les titres sans texte propre (ex: "1 Chapitre" suivi
+    # directement de "1.1 ...") pour l'arbre des sections ; l'intro vide reste ignorée
     sections = []
     cur_title = "Introduction"
     cur_pages: List[int] = []
     cur_buf: List[str] = []
+    sections_started = False
 
     for i, ptxt in enumerate(pages, start=1):
         found_title_on_page = False
         for line in ptxt.splitlines():
             if TITLE_PAT.match(line.strip()):
-                if cur_buf:
+                if cur_buf or (keep_empty and sections_started):
                     sections.append({
                         "title": cur_title[:240],
                         "pages": cur_pages[:],
@@ -914,12 +1100,13 @@ def build_sections_from_titles(pages: List[str]) -> List[Dict]:
                 cur_pages = [i]
                 cur_buf = []
                 found_title_on_page = True
+                sections_started = True
             else:
                 cur_buf.append(line)
         if not found_title_on_page:
             if i not in cur_pages:
                 cur_pages.append(i)
-    if cur_buf:
+    if cur_buf or (keep_empty and sections_started):
         sections.append({
             "title": cur_title[:240],
             "pages": cur_pages,
@@ -930,14 +1117,18 @@ def build_sections_from_titles(pages: List[str]) -> List[Dict]:
 def detect_table_regions(page: fitz.Page,
                          min_side: int = 120,
                          min_lines: int = 6,
-                         merge_iou: float = 0.25) -> List[fitz.Rect]:
+                         merge_iou: float = 0.25,
+                         analysis: Optional[PageAnalysis] = None) -> List[fitz.Rect]:
    
     candidates: List[fitz.Rect] = []
 
-    try:
-        drawings = page.get_drawings() or []
-    except Exception:
-        drawings = []
+    if analysis is not None:
+        drawings = analysis.drawings
+    else:
+        try:
+            drawings = page.get_drawings() or []
+        except Exception:
+            drawings = []
 
     # 1) Collecte des boîtes rectangulaires & segments longs
     horiz, vert = [], []
@@ -976,20 +1167,175 @@ def detect_table_regions(page: fitz.Page,
     out = [r for r in out if r.width >= min_side and r.height >= min_side]
     return out
 
-def phash_from_pixmap(pix: fitz.Pixmap) -> int:
- 
-    gray = _pix_to_gray(pix)               # -> float32 [H, W]
-    small = _downscale_mean(gray, 32, 32)  # 32x32
-    dct_like = _downscale_mean(small, 8, 8)  # "approx DCT" 8x8
+def _collect_candidate_rects(pa: PageAnalysis, min_region_px: int = MIN_REGION_PX) -> List[fitz.Rect]:
+    """
+    Candidats d'une page (images, dessins, graphiques, tableaux), fusionnés.
+    """
+    page = pa.page
+
+    embed_rects: List[fitz.Rect] = []
+    try:
+        seen_xrefs = set()
+        for info in pa.images:
+            xref = info[0]
+            if xref in seen_xrefs:
+                continue
+            seen_xrefs.add(xref)
+            try:
+                ibox = page.get_image_bbox(xref)
+            except Exception:
+                ibox = None
+            if ibox and ibox.width >= min_region_px and ibox.height >= min_region_px:
+                embed_rects.append(ibox)
+    except Exception:
+        pass
+
+    raw_rects: List[fitz.Rect] = []
+    try:
+        for b in pa.image_blocks:
+            if b.get("bbox"):
+                r = fitz.Rect(b["bbox"])
+                if r.width >= min_region_px and r.height >= min_region_px:
+                    raw_rects.append(r)
+    except Exception:
+        pass
+
+    draw_rects: List[fitz.Rect] = []
+    for d in pa.drawings:
+        r = d.get("rect")
+        if isinstance(r, fitz.Rect) and r.width >= min_region_px and r.height >= min_region_px:
+            draw_rects.append(r)
+
+    with profile_stage("tables", pa.page_no):
+        table_rects = detect_table_regions(page, analysis=pa)
+
+    # Fusion globale des candidats (images, dessins, schémas, etc.)
+    rects = embed_rects + raw_rects + draw_rects + table_rects
+    return merge_rects_by_iou(rects, iou_thr=0.30, edge_gap=12.0)
+
+class _PageRaster:
+    """
+    Page rastérisée une seule fois à render_scale ; les crops sont des
+    vues NumPy découpées dans le buffer (aucune copie, aucun re-rendu).
+    Même grille de pixels que get_pixmap(clip=r) : crops identiques.
+    """
+
+    def __init__(self, page: fitz.Page, mat: fitz.Matrix):
+        self.pix = page.get_pixmap(matrix=mat, alpha=False)
+        self.arr = pix_samples(self.pix)
+        self.mat = mat
+
+    def crop(self, r: fitz.Rect) -> Optional[np.ndarray]:
+        ir = (r * self.mat).irect & self.pix.irect
+        if ir.is_empty:
+            return None
+        x0, y0 = self.pix.x, self.pix.y
+        return self.arr[ir.y0 - y0: ir.y1 - y0, ir.x0 - x0: ir.x1 - x0]
+
+
+def _use_page_raster(pa: PageAnalysis, rects: List[fitz.Rect], render_scale: float) -> bool:
+    """Rendu pleine page si plusieurs candidats couvrent (cumulés) l'essentiel de la page."""
+    if len(rects) < RENDER_ONCE_MIN_CANDIDATES or pa.page.rotation:
+        return False
+    page_area = pa.rect.get_area()
+    if page_area <= 0 or page_area * render_scale * render_scale > RENDER_ONCE_MAX_PIXELS:
+        return False
+    return sum(r.get_area() for r in rects) >= RENDER_ONCE_MIN_COVER * page_area
+
+
+def _crop_to_pixmap(view: np.ndarray) -> fitz.Pixmap:
+    """Copie d'un crop conservé en Pixmap (pour l'encodage PNG)."""
+    h, w, n = view.shape
+    return fitz.Pixmap(fitz.csRGB if n >= 3 else fitz.csGRAY, w, h, view.tobytes(), False)
+
+
+def _render_figures(
+    pa: PageAnalysis,
+    rects: List[fitz.Rect],
+    *,
+    render_scale: float = RENDER_SCALE,
+    min_region_px: int = MIN_REGION_PX,
+    min_iou_same: float = 0.62,
+    max_phash_dist: int = PHASH_MAX_DIST,
+) -> List[Tuple[fitz.Rect, fitz.Pixmap, Optional[int]]]:
+    """
+    Rendu + dé-duplication (spatiale et pHash) des candidats d'une page.
+    Retourne (rect, pixmap, phash) pour chaque crop conservé ; seuls ces
+    crops deviennent des Pixmap (et seront encodés en PNG par l'appelant).
+    """
+    page = pa.page
+    kept: List[Tuple[fitz.Rect, fitz.Pixmap, Optional[int]]] = []
+    mat = fitz.Matrix(render_scale, render_scale)
+
+    # 1) Rendu + filtre taille : crop = vue dans le rendu de page, ou
+    #    pixmap par clip (peu de candidats, page tournée ou géante)
+    rendered: List[Tuple[fitz.Rect, Any]] = []
+    with profile_stage("render", pa.page_no):
+        raster = None
+        if _use_page_raster(pa, rects, render_scale):
+            try:
+                raster = _PageRaster(page, mat)
+            except Exception:
+                raster = None
+        for r in rects:
+            try:
+                crop = raster.crop(r) if raster is not None else page.get_pixmap(matrix=mat, clip=r, alpha=False)
+            except Exception:
+                continue
+            if crop is None:
+                continue
+            w, h = (crop.shape[1], crop.shape[0]) if raster is not None else (crop.width, crop.height)
+            if w < min_region_px or h < min_region_px:
+                continue
+            rendered.append((r, crop))
+
+    # 2) pHash de tous les crops de la page en un seul lot
+    with profile_stage("hash", pa.page_no):
+        try:
+            if raster is not None:
+                hashes = phash64_batch([gray_from_array(c) for (_r, c) in rendered])
+            else:
+                hashes = phash64_from_pixmaps([pix for (_r, pix) in rendered])
+        except Exception:
+            hashes = [None] * len(rendered)
+
+    # 3) doublons? (visuel via l'index pHash, valeur = aire du crop gardé)
+    seen = PHashIndex(max_radius=max_phash_dist)
+    survivors: List[Tuple[fitz.Rect, Any, Optional[int]]] = []
+    for (r, crop), ph in zip(rendered, hashes):
+        try:
+            duplicate = False
+            for (kr, _kc, _kph) in survivors:
+                # spatial
+                inter = (kr & r)
+                if not inter.is_empty and (inter.get_area() / min(kr.get_area(), r.get_area())) >= min_iou_same:
+                    duplicate = True
+                    break
+            # visuel : un crop proche au moins aussi grand est déjà gardé
+            cur_area = (crop.shape[0] * crop.shape[1]) if raster is not None else (crop.width * crop.height)
+            if not duplicate and ph is not None:
+                duplicate = any(
+                    keep_area >= cur_area
+                    for (_h, keep_area, _d) in seen.query(ph, max_phash_dist)
+                )
+            if duplicate:
+                continue
 
-    # On ignore la case [0,0] (équivalent du DC) pour le calcul de la médiane
-    med = np.median(dct_like[1:, 1:])
-    bits = (dct_like > med).flatten()
+            survivors.append((r, crop, ph))
+            if ph is not None:
+                seen.add(ph, cur_area)
+        except Exception:
+            continue
 
-    h = 0
-    for b in bits:
-        h = (h << 1) | int(bool(b))
-    return int(h)
+    # 4) Pixmap uniquement pour les crops conservés
+    for (r, crop, ph) in survivors:
+        if raster is not None:
+            try:
+                crop = _crop_to_pixmap(crop)
+            except Exception:
+                continue
+        kept.append((r, crop, ph))
+    return kept
 
 def extract_images(
     doc: fitz.Document,
@@ -1001,131 +1347,123 @@ def extract_images(
     word_density_reject: float = 0.38,  # >>> stricte sur les zones texte
     min_iou_same: float = 0.62,         # >>> anti-doublon spatial
     max_phash_dist: int = 6,            # >>> anti-doublon visuel
-    slide_mode: bool = False           # >>> Contrôle si c'est en mode slide
+    slide_mode: bool = False,          # >>> Contrôle si c'est en mode slide
+    analysis: Optional[PdfAnalysis] = None,
+    progress: Optional[ProgressCallback] = None,
+    writer: Optional[IngestBulkWriter] = None,
 ) -> Tuple[int, Dict[int, List[fitz.Rect]]]:
-    total_inserted = 0
-    figure_map: Dict[int, List[fitz.Rect]] = {}
+    analysis = analysis or PdfAnalysis(doc)
+    # écritures groupées : un INSERT multi-lignes par lot au lieu d'un par crop
+    writer = writer or IngestBulkWriter(cur, source_id)
+    inserted_before = writer.media_inserted
 
     for pno in range(len(doc)):
-        page = doc[pno]
+        pa = analysis.page(pno)
         page_no = pno + 1
 
-        # 1) Collecter les candidats (images, dessins, graphiques, tableaux)
-        embed_rects: List[fitz.Rect] = []
-        try:
-            seen_xrefs = set()
-            for info in page.get_images(full=True) or []:
-                xref = info[0]
-                if xref in seen_xrefs:
-                    continue
-                seen_xrefs.add(xref)
-                try:
-                    ibox = page.get_image_bbox(xref)
-                except Exception:
-                    ibox = None
-                if ibox and ibox.width >= min_region_px and ibox.height >= min_region_px:
-                    embed_rects.append(ibox)
-        except Exception:
-            pass
-
-        raw_rects: List[fitz.Rect] = []
-        try:
-            raw = page.get_text("rawdict")
-            for b in (raw.get("blocks", []) if isinstance(raw, dict) else []):
-                if b.get("type") == 1 and b.get("bbox"):
-                    r = fitz.Rect(b["bbox"])
-                    if r.width >= min_region_px and r.height >= min_region_px:
-                        raw_rects.append(r)
-        except Exception:
-            pass
-
-        draw_rects: List[fitz.Rect] = []
-        try:
-            drawings = page.get_drawings() or []
-        except Exception:
-            drawings = []
-
-        for d in drawings:
-            r = d.get("rect")
-            if isinstance(r, fitz.Rect) and r.width >= min_region_px and r.height >= min_region_px:
-                draw_rects.append(r)
+        with profile_stage("page", page_no):
+            # 1) Collecter + fusionner les candidats
+            with profile_stage("candidates", page_no):
+                rects = _collect_candidate_rects(pa, min_region_px)
+
+            # 2) Rendu + dé-duplication
+            kept = _render_figures(
+                pa, rects,
+                render_scale=render_scale,
+                min_region_px=min_region_px,
+                min_iou_same=min_iou_same,
+                max_phash_dist=max_phash_dist,
+            )
 
-        table_rects = detect_table_regions(page)
+            # 3) Insertion (bufferisée, tag = rect pour figure_map)
+            with profile_stage("png_encode", page_no):
+                for (r, pix, ph) in kept:
+                    try:
+                        writer.add_media(
+                            page_no=page_no, kind="figure", png_bytes=pix.tobytes("png"),
+                            bbox=rect_to_list(r), width=pix.width, height=pix.height,
+                            phash=ph, tag=r,
+                        )
+                    except Exception:
+                        continue
 
-        # 2) Fusion globale des candidats (images, dessins, schémas, etc.)
-        rects = embed_rects + raw_rects + draw_rects + table_rects
-        rects = merge_rects_by_iou(rects, iou_thr=0.30, edge_gap=12.0)
+        if progress:
+            progress("images", page_no, len(doc))
 
-        # 3) Filtrage strict si en mode slide (pas de texte superposé dans les zones images)
-        filtered: List[fitz.Rect] = []
-        if slide_mode:
-            for r in rects:
-                # Ne prendre que les zones contenant des images ou des schémas graphiques (pas du texte)
-                filtered.append(r)
-        else:
-            for r in rects:
-                # continue avec les règles de filtrage standards pour tout autre PDF
-                filtered.append(r)
+    writer.flush_media()
 
-        # 4) Dé-duplication et rendu des images
-        kept_rects: List[Tuple[fitz.Rect, int, int, Optional[int]]] = []
-        kept_for_map: List[fitz.Rect] = []
-        mat = fitz.Matrix(render_scale, render_scale)
+    figure_map: Dict[int, List[fitz.Rect]] = {}
+    for pno, tags in writer.page_tags().items():
+        rects = [t for t in tags if isinstance(t, fitz.Rect)]
+        if rects:
+            figure_map[pno] = rects
+    return writer.media_inserted - inserted_before, figure_map
 
-        for r in filtered:
-            try:
-                pix = page.get_pixmap(matrix=mat, clip=r, alpha=False)
-                if pix.width < min_region_px or pix.height < min_region_px:
-                    continue
+# ---------------------------------------------------------------------
+# Extraction page par page (utilisée par les workers du pool)
+# ---------------------------------------------------------------------
 
-                # pHash
-                try:
-                    ph = phash_from_pixmap(pix)
-                except Exception:
-                    ph = None
-
-                # doublons?
-                duplicate = False
-                for (kr, kw, kh, kph) in kept_rects:
-                    # spatial
-                    inter = (kr & r)
-                    if not inter.is_empty and (inter.get_area() / min(kr.get_area(), r.get_area())) >= min_iou_same:
-                        duplicate = True
-                        break
-                    # visuel
-                    if ph is not None and kph is not None:
-                        if hamming_distance64(ph, kph) <= max_phash_dist:
-                            cur_area = pix.width * pix.height
-                            keep_area = kw * kh
-                            if cur_area <= keep_area:
-                                duplicate = True
-                                break
-                if duplicate:
-                    continue
+@dataclass
+class PageFigure:
+    bbox: List[float]
+    png: bytes
+    width: int
+    height: int
+    phash: Optional[int]
 
-                mid = _insert_png_from_pix(
-                    cur, source_id, page_no, pix,
-                    kind="figure", caption=None, bbox=r,
-                    xref=None, image_index=None,
-                    is_annotation=False, is_render_fallback=False
-                )
-                if mid:
-                    total_inserted += 1
-                    kept_rects.append((r, pix.width, pix.height, ph))
-                    kept_for_map.append(r)
 
-            except Exception:
-                continue
-            finally:
-                try:
-                    pix = None
-                except Exception:
-                    pass
+@dataclass
+class PageExtract:
+    page_no: int
+    figures: List[PageFigure]
+    text: str
+    text_chars: int = 0     # couche texte brute (non filtrée) : décision OCR
 
-        if kept_for_map:
-            figure_map[page_no] = kept_for_map
 
-    return total_inserted, figure_map
+def extract_page_payload(
+    pa: PageAnalysis,
+    *,
+    extract_figures: bool = True,
+    render_scale: float = RENDER_SCALE,
+    min_region_px: int = MIN_REGION_PX,
+    min_iou_same: float = 0.62,
+    max_phash_dist: int = PHASH_MAX_DIST,
+    overlap_threshold: float = 0.18,
+) -> PageExtract:
+    """
+    Tout le travail CPU d'une page, sans accès DB : crops PNG + pHash,
+    puis texte filtré (zones figures + images embarquées exclues).
+    """
+    figures: List[PageFigure] = []
+    blocking_rects: List[fitz.Rect] = []
+
+    with profile_stage("page", pa.page_no):
+        if extract_figures:
+            with profile_stage("candidates", pa.page_no):
+                rects = _collect_candidate_rects(pa, min_region_px)
+            kept = _render_figures(
+                pa, rects,
+                render_scale=render_scale,
+                min_region_px=min_region_px,
+                min_iou_same=min_iou_same,
+                max_phash_dist=max_phash_dist,
+            )
+            with profile_stage("png_encode", pa.page_no):
+                for (r, pix, ph) in kept:
+                    figures.append(PageFigure(
+                        bbox=rect_to_list(r),
+                        png=pix.tobytes("png"),
+                        width=pix.width,
+                        height=pix.height,
+                        phash=ph,
+                    ))
+                    blocking_rects.append(r)
+
+        blocking_rects += _page_embedded_image_rects(pa)
+        with profile_stage("text_filter", pa.page_no):
+            text = _filter_page_text(pa.textdict, blocking_rects, overlap_threshold)
+
+    return PageExtract(page_no=pa.page_no, figures=figures, text=text, text_chars=pa.text_chars)
 
 def ocr_png_bytes(png: bytes, lang: str = "fra+eng") -> str:
     if not OCR_AVAILABLE:
@@ -1150,18 +1488,21 @@ def insert_page_media_asset_png(
     bbox: Optional[list] = None,
     width: Optional[int] = None,
     height: Optional[int] = None,
+    phash: Optional[int] = None,
 ) -> Optional[int]:
     h = hashlib.md5(png_bytes).hexdigest()
+    data, path, blob_id = _media_storage(cur, png_bytes, h, width, height, phash)
     cur.execute(
         """
         INSERT INTO academics.page_media_assets
-            (source_id, page_no, kind, mime, data, md5, bbox, width, height)
+            (source_id, page_no, kind, mime, data, path, md5, bbox, width, height, phash, blob_id)
         VALUES
-            (%s, %s, %s, 'image/png', %s, %s, %s, %s, %s)
+            (%s, %s, %s, 'image/png', %s, %s, %s, %s, %s, %s, %s, %s)
         ON CONFLICT DO NOTHING
         RETURNING id
         """,
-        (source_id, page_no, kind, psycopg2.Binary(png_bytes), h, Json(bbox) if bbox else None, width, height),
+        (source_id, page_no, kind, psycopg2.Binary(data) if data is not None else None, path, h,
+         Json(bbox) if bbox else None, width, height, phash_to_db(phash), blob_id),
     )
     row = cur.fetchone()
     return int(row[0]) if row else None
@@ -1233,8 +1574,11 @@ def upsert_course_source(
 
 def ingest_pdf_to_db(
     *,
-    pdf_bytes: bytes,
+    pdf_bytes: Optional[bytes] = None,
     conn,
+
+    # upload en flux (fichier temporaire + hashes déjà calculés) : remplace pdf_bytes
+    pdf_file: Optional[SpooledPdf] = None,
     original_filename: Optional[str] = None,
     course_title: Optional[str] = None,
     year: Optional[int] = None,
@@ -1245,7 +1589,7 @@ def ingest_pdf_to_db(
     semester: Optional[int] = None,
     ects: Optional[float] = None,
     create_course: bool = True,
-    create_sections: bool = True,  # laissé pour compat, pas utilisé ici
+    create_sections: bool = True,  # arbre de sections + citations (avec create_course)
     doc_mode: str = "CLASSIC",
 
     # pilotage extraction
@@ -1258,199 +1602,376 @@ def ingest_pdf_to_db(
     extract_text_filtered_from_bytes=None,
     extract_images=None,
     get_embedded_image_rects_by_page=None,
+
+    # analyse déjà ouverte (ex: par le classifieur) => réutilisée telle quelle
+    analysis: Optional[PdfAnalysis] = None,
+
+    # pool de processus (None => config.INGEST_WORKERS, <=1 => séquentiel)
+    workers: Optional[int] = None,
+
+    # progression par page (jobs d'ingestion en arrière-plan)
+    progress: Optional[ProgressCallback] = None,
+
+    # ré-ingestion incrémentale : source de la version précédente du même
+    # document (pages d'empreinte identique reprises, cours réutilisé)
+    previous_source_id: Optional[int] = None,
+
+    # profilage par étape (None => créé si config.INGEST_PROFILE) ; un
+    # profileur fourni peut déjà contenir l'étape "classify" de l'appelant
+    profiler: Optional[IngestProfiler] = None,
 ) -> "PDFIngestResult":
 
     if conn is None:
         raise HTTPException(status_code=500, detail="DB conn manquante: conn=None")
 
-    if not pdf_bytes:
-        raise HTTPException(status_code=400, detail="PDF vide.")
+    if pdf_file is not None:
+        if pdf_file.size <= 0:
+            raise HTTPException(status_code=400, detail="PDF vide.")
+        md5_file, pdf_sha256, pdf_size = pdf_file.md5, pdf_file.sha256, pdf_file.size
+    else:
+        if not pdf_bytes:
+            raise HTTPException(status_code=400, detail="PDF vide.")
+        md5_file = hashlib.md5(pdf_bytes).hexdigest()
+        pdf_sha256, pdf_size = hashlib.sha256(pdf_bytes).hexdigest(), len(pdf_bytes)
 
     filename = original_filename or "document.pdf"
     title = (course_title or os.path.splitext(filename)[0]).strip() or "document"
-    md5_file = hashlib.md5(pdf_bytes).hexdigest()
 
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    # garde-fou : si on veut créer un cours, ue_id est obligatoire
+    if create_course and (ue_id is None or int(ue_id) <= 0):
+        raise HTTPException(status_code=422, detail="ue_id requis quand create_course=true")
+
+    owns_analysis = analysis is None
+    if analysis is None:
+        analysis = pdf_file.open_analysis() if pdf_file is not None else PdfAnalysis.from_bytes(pdf_bytes)
+    doc = analysis.doc
     total_pages_pdf = len(doc)
 
+    workers = config.INGEST_WORKERS if workers is None else int(workers)
+    use_parallel = workers > 1 and total_pages_pdf >= config.INGEST_PARALLEL_MIN_PAGES
+
     course_id = None
     version_id = None
+    sections_created = 0
     total_pages_db = 0
     total_images_db = 0
     total_images_auto = 0
     text_db = ""
 
-    # garde-fou : si on veut créer un cours, ue_id est obligatoire
-    if create_course and (ue_id is None or int(ue_id) <= 0):
-        raise HTTPException(status_code=422, detail="ue_id requis quand create_course=true")
+    if profiler is None and config.INGEST_PROFILE:
+        profiler = IngestProfiler(label=f"ingest-{md5_file[:8]}").start()
 
     try:
-        with conn.cursor() as cur:
+        with conn.cursor() as cur, (profiler.activate() if profiler else nullcontext()):
             # ----------------------------------------------------
-            # 1) SOURCE
+            # 1) SOURCE + 2) PDF BYTES
             # ----------------------------------------------------
-            source_id = upsert_source(
-                cur,
-                title=title,
-                year=year,
-                doc_mode=doc_mode,
-                md5_file=md5_file
-            )
-            print("SOURCE_ID:", source_id)
-
-            # ----------------------------------------------------
-            # 2) PDF BYTES
-            # ----------------------------------------------------
-            upsert_source_file(cur, source_id=source_id, pdf_bytes=pdf_bytes)
+            with profile_stage("source_write"):
+                source_id = upsert_source(
+                    cur,
+                    title=title,
+                    year=year,
+                    doc_mode=doc_mode,
+                    md5_file=md5_file
+                )
+                logger.debug("ingest source_id=%s pages=%s", source_id, total_pages_pdf)
 
-            # ----------------------------------------------------
-            # 3) MAP zones images embarquées
-            # ----------------------------------------------------
-            if not callable(get_embedded_image_rects_by_page):
-                raise RuntimeError("get_embedded_image_rects_by_page manquante.")
-            image_rects_map = get_embedded_image_rects_by_page(doc)
+                if pdf_file is not None:
+                    upsert_source_file_from_path(cur, source_id=source_id, file_path=pdf_file.path)
+                else:
+                    upsert_source_file(cur, source_id=source_id, pdf_bytes=pdf_bytes)
+            writer = IngestBulkWriter(cur, source_id)
 
             # ----------------------------------------------------
-            # 4) IMAGES auto
+            # 2.b) EMPREINTES de pages + diff avec la version précédente
+            #      (pages identiques : texte et médias repris tels quels)
             # ----------------------------------------------------
+            with profile_stage("fingerprint"):
+                fingerprints = analysis.fingerprints()
+                reuse: Dict[int, Tuple[int, str, Optional[str]]] = {}
+                if previous_source_id:
+                    reuse = _match_previous_pages(cur, int(previous_source_id), fingerprints)
+            changed = [pno for pno in range(total_pages_pdf) if (pno + 1) not in reuse]
+            pages_reused = len(reuse)
+
+            pages_text: Optional[List[str]] = None
+            pages_ocr: List[Optional[str]] = [None] * total_pages_pdf
+            raw_text_chars: List[Optional[int]] = [None] * total_pages_pdf
             figure_map = {}
-            if not slide_mode:
-                if not callable(extract_images):
-                    raise RuntimeError("extract_images manquante.")
-                total_images_auto, figure_map = extract_images(
-                    doc, source_id, cur,
-                    render_scale=2.0,
-                    min_region_px=110,
-                    page_preview_mode="never",
-                    word_density_reject=0.38,
-                    min_iou_same=0.62,
-                    max_phash_dist=6,
-                    slide_mode=False,
-                )
+            payload_opts = dict(
+                extract_figures=not slide_mode,
+                render_scale=2.0,
+                min_region_px=110,
+                min_iou_same=0.62,
+                max_phash_dist=6,
+                overlap_threshold=0.18,
+            )
+
+            if use_parallel or previous_source_id:
+                # ----------------------------------------------------
+                # 3+4) EXTRACTION PAR PAGE (pages modifiées seulement en
+                #      incrémental) : pool de processus ou boucle locale
+                #      workers: crops PNG + pHash + texte filtré par page
+                #      parent : fusion ordonnée + toutes les écritures DB
+                # ----------------------------------------------------
+                if use_parallel and changed:
+                    from utils.pdf_workers import extract_pages_parallel
+
+                    with profile_stage("extract_parallel"):
+                        page_results = extract_pages_parallel(
+                            pdf_file.path if pdf_file is not None else pdf_bytes,
+                            total_pages_pdf,
+                            workers=workers,
+                            chunk_pages=config.INGEST_CHUNK_PAGES,
+                            progress=progress,
+                            page_numbers=changed,
+                            **payload_opts,
+                        )
+                else:
+                    page_results = []
+                    for i, pno in enumerate(changed, start=1):
+                        page_results.append(extract_page_payload(analysis.page(pno), **payload_opts))
+                        analysis.release_page(pno)
+                        if progress:
+                            progress("extract", i, len(changed))
+
+                for res in page_results:
+                    for fig in res.figures:
+                        writer.add_media(
+                            page_no=res.page_no,
+                            kind="figure",
+                            png_bytes=fig.png,
+                            bbox=fig.bbox,
+                            width=fig.width,
+                            height=fig.height,
+                            phash=fig.phash,
+                        )
+                writer.flush_media()
+                total_images_auto = writer.media_inserted
+
+                pages_text = [""] * total_pages_pdf
+                for res in page_results:
+                    pages_text[res.page_no - 1] = res.text
+                    raw_text_chars[res.page_no - 1] = res.text_chars
+                for new_no, (_old_no, old_text, old_ocr) in reuse.items():
+                    pages_text[new_no - 1] = old_text or ""
+                    pages_ocr[new_no - 1] = old_ocr
+
+                # médias des pages inchangées : copie côté serveur (un seul INSERT ... SELECT)
+                if reuse and int(previous_source_id) != int(source_id):
+                    with profile_stage("db_write"):
+                        total_images_auto += _copy_page_media(
+                            cur,
+                            from_source_id=int(previous_source_id),
+                            to_source_id=source_id,
+                            page_map={new_no: old_no for new_no, (old_no, _t, _o) in reuse.items()},
+                        )
+
             else:
-                total_images_auto = 0
+                # ----------------------------------------------------
+                # 3) MAP zones images embarquées
+                # ----------------------------------------------------
+                if not callable(get_embedded_image_rects_by_page):
+                    raise RuntimeError("get_embedded_image_rects_by_page manquante.")
+                with profile_stage("image_rects"):
+                    image_rects_map = get_embedded_image_rects_by_page(doc, analysis=analysis)
+
+                # ----------------------------------------------------
+                # 4) IMAGES auto
+                # ----------------------------------------------------
+                if not slide_mode:
+                    if not callable(extract_images):
+                        raise RuntimeError("extract_images manquante.")
+                    total_images_auto, figure_map = extract_images(
+                        doc, source_id, cur,
+                        render_scale=2.0,
+                        min_region_px=110,
+                        page_preview_mode="never",
+                        word_density_reject=0.38,
+                        min_iou_same=0.62,
+                        max_phash_dist=6,
+                        slide_mode=False,
+                        analysis=analysis,
+                        progress=progress,
+                        writer=writer,
+                    )
+                else:
+                    total_images_auto = 0
 
             # ----------------------------------------------------
             # 4.b) IMAGES manuelles en mode slide
             # ----------------------------------------------------
             if slide_mode and manual_slide_media:
-                for (page_no, img_bytes, caption) in manual_slide_media:
-                    png = img_bytes
-                    w = h = None
-                    try:
-                        pix = fitz.Pixmap("png", img_bytes)
-                        png = pix.tobytes("png")
-                        w, h = pix.width, pix.height
-                    except Exception:
-                        pass
+                with profile_stage("manual_media"):
+                    # médias déjà écrits (source ré-ingérée, pages reprises) visibles en base
+                    writer.flush_media()
+                    seen = load_source_phash_index(cur, source_id)
+                    skipped = _add_manual_media(writer, seen, manual_slide_media)
+                    if skipped:
+                        logger.debug("ingest source_id=%s manual near-duplicates skipped=%s", source_id, skipped)
+                    writer.flush_media()
 
-                    insert_page_media_asset_png(
-                        cur,
-                        source_id=source_id,
-                        page_no=int(page_no),
-                        kind="manual",
-                        png_bytes=png,
-                        bbox=None,
-                        width=w,
-                        height=h,
-                    )
+            # ----------------------------------------------------
+            # 5) TEXTE filtré (déjà fait par les workers en parallèle)
+            # ----------------------------------------------------
+            if pages_text is None:
+                if not callable(extract_text_filtered_from_bytes):
+                    raise RuntimeError("extract_text_filtered_from_bytes manquante.")
+
+                pages_text = extract_text_filtered_from_bytes(
+                    pdf_bytes,
+                    figure_map=figure_map,
+                    image_rects_map=image_rects_map,
+                    overlap_threshold=0.18,
+                    analysis=analysis,
+                    progress=progress,
+                )
 
             # ----------------------------------------------------
-            # 5) TEXTE filtré
+            # 5.b) OCR des pages sans couche texte (scans) : décidé sur la
+            #      couche texte brute, pas sur le texte filtré (une page dont
+            #      tout le texte est dans une figure n'est pas un scan)
             # ----------------------------------------------------
-            if not callable(extract_text_filtered_from_bytes):
-                raise RuntimeError("extract_text_filtered_from_bytes manquante.")
-
-            pages_text = extract_text_filtered_from_bytes(
-            pdf_bytes,
-            figure_map=figure_map,
-            image_rects_map=image_rects_map,
-            overlap_threshold=0.18,
-        )
+            ocr_res = None
+            if config.OCR_ENABLED:
+                from utils.ocr_stage import needs_ocr, run_ocr_stage
+
+                ocr_todo = [
+                    pno for pno in range(total_pages_pdf)
+                    if pages_ocr[pno] is None and needs_ocr(
+                        raw_text_chars[pno] if raw_text_chars[pno] is not None else analysis.text_chars(pno)
+                    )
+                ]
+                if ocr_todo:
+                    with profile_stage("ocr"):
+                        ocr_res = run_ocr_stage(cur, analysis, ocr_todo, progress=progress)
+                    for page_no, txt in ocr_res.texts.items():
+                        pages_ocr[page_no - 1] = txt or None
 
             # ----------------------------------------------------
             # 6) UPSERT pages
             # ----------------------------------------------------
             for pno, txt in enumerate(pages_text, start=1):
-                upsert_source_page(cur, source_id=source_id, page_no=pno, text=txt, ocr_text=None)
+                writer.add_page(pno, txt, ocr_text=pages_ocr[pno - 1], fingerprint=fingerprints[pno - 1])
+            writer.flush()
 
             # ----------------------------------------------------
             # 7) STATS pages & médias
             # ----------------------------------------------------
-            cur.execute("SELECT COUNT(*) FROM academics.source_pages WHERE source_id=%s", (source_id,))
-            total_pages_db = int(cur.fetchone()[0] or 0)
-
-            cur.execute("SELECT COUNT(*) FROM academics.page_media_assets WHERE source_id=%s", (source_id,))
-            total_images_db = int(cur.fetchone()[0] or 0)
+            with profile_stage("stats"):
+                cur.execute("SELECT COUNT(*) FROM academics.source_pages WHERE source_id=%s", (source_id,))
+                total_pages_db = int(cur.fetchone()[0] or 0)
 
-            cur.execute(
-                """
-                SELECT COALESCE(string_agg(COALESCE(ocr_text, text), E'\n' ORDER BY page_no), '')
-                FROM academics.source_pages
-                WHERE source_id=%s
-                """,
-                (source_id,),
-            )
-            text_db = cur.fetchone()[0] or ""
-
-            # ----------------------------------------------------
-            # 8) CREATE COURSE + VERSION + LINK SOURCE
-            # ----------------------------------------------------
-            if create_course:
-                # code cours: simple & stable (tu peux mettre mieux)
-                course_code = hashlib.md5((title + md5_file).encode("utf-8")).hexdigest()[:10].upper()
+                cur.execute("SELECT COUNT(*) FROM academics.page_media_assets WHERE source_id=%s", (source_id,))
+                total_images_db = int(cur.fetchone()[0] or 0)
 
-                # course
                 cur.execute(
                     """
-                    INSERT INTO academics.courses (ue_id, code, title, description, order_no, doc_mode)
-                    VALUES (%s, %s, %s, %s, 0, %s)
-                    ON CONFLICT (ue_id, code)
-                    DO UPDATE SET
-                        title = EXCLUDED.title,
-                        description = EXCLUDED.description,
-                        doc_mode = EXCLUDED.doc_mode,
-                        updated_at = NOW()
-                    RETURNING id
+                    SELECT COALESCE(string_agg(COALESCE(ocr_text, text), E'\n' ORDER BY page_no), '')
+                    FROM academics.source_pages
+                    WHERE source_id=%s
                     """,
-                    (int(ue_id), course_code, title, description, doc_mode),
+                    (source_id,),
                 )
-                course_id = int(cur.fetchone()[0])
+                text_db = cur.fetchone()[0] or ""
 
-                # version
-                version_label = f"v{datetime.date.today().isoformat()}-auto"
-                cur.execute(
-                    """
-                    INSERT INTO academics.course_versions (course_id, version_label, status)
-                    VALUES (%s, %s, 'draft')
-                    ON CONFLICT (course_id, version_label)
-                    DO UPDATE SET updated_at = NOW()
-                    RETURNING id
-                    """,
-                    (course_id, version_label),
-                )
-                version_id = int(cur.fetchone()[0])
+            # ----------------------------------------------------
+            # 8) CREATE COURSE + VERSION + LINK SOURCE
+            # ----------------------------------------------------
+            with profile_stage("course"):
+                if create_course and previous_source_id:
+                    # nouvelle révision : même cours que la source précédente
+                    cur.execute(
+                        """
+                        SELECT course_id
+                        FROM academics.course_sources
+                        WHERE source_id=%s
+                        ORDER BY (role = 'PRIMARY') DESC, id DESC
+                        LIMIT 1
+                        """,
+                        (int(previous_source_id),),
+                    )
+                    row = cur.fetchone()
+                    course_id = int(row[0]) if row else None
+
+                if create_course and course_id is None:
+                    # code cours: simple & stable (tu peux mettre mieux)
+                    course_code = hashlib.md5((title + md5_file).encode("utf-8")).hexdigest()[:10].upper()
+
+                    # course
+                    cur.execute(
+                        """
+                        INSERT INTO academics.courses (ue_id, code, title, description, order_no, doc_mode)
+                        VALUES (%s, %s, %s, %s, 0, %s)
+                        ON CONFLICT (ue_id, code)
+                        DO UPDATE SET
+                            title = EXCLUDED.title,
+                            description = EXCLUDED.description,
+                            doc_mode = EXCLUDED.doc_mode,
+                            updated_at = NOW()
+                        RETURNING id
+                        """,
+                        (int(ue_id), course_code, title, description, doc_mode),
+                    )
+                    course_id = int(cur.fetchone()[0])
+
+                if create_course:
+                    # version (révision : suffixée par le md5 du fichier)
+                    version_label = f"v{datetime.date.today().isoformat()}-auto"
+                    if previous_source_id:
+                        version_label = f"v{datetime.date.today().isoformat()}-{md5_file[:8]}"
+                    cur.execute(
+                        """
+                        INSERT INTO academics.course_versions (course_id, version_label, status)
+                        VALUES (%s, %s, 'draft')
+                        ON CONFLICT (course_id, version_label)
+                        DO UPDATE SET updated_at = NOW()
+                        RETURNING id
+                        """,
+                        (course_id, version_label),
+                    )
+                    version_id = int(cur.fetchone()[0])
+
+                    # link course_sources
+                    cur.execute(
+                        """
+                        INSERT INTO academics.course_sources
+                            (course_id, version_id, source_id, role, doc_mode, images_policy, is_primary)
+                        VALUES
+                            (%s, %s, %s, 'PRIMARY', %s, %s, TRUE)
+                        ON CONFLICT (course_id, source_id, version_id, role)
+                        DO NOTHING
+                        """,
+                        (
+                            course_id,
+                            version_id,
+                            source_id,
+                            doc_mode,
+                            ("SEMI_MANUAL" if slide_mode else "AUTO"),
+                        ),
+                    )
 
-                # link course_sources
-                cur.execute(
-                    """
-                    INSERT INTO academics.course_sources
-                        (course_id, version_id, source_id, role, doc_mode, images_policy, is_primary)
-                    VALUES
-                        (%s, %s, %s, 'PRIMARY', %s, %s, TRUE)
-                    ON CONFLICT (course_id, source_id, version_id, role)
-                    DO NOTHING
-                    """,
-                    (
-                        course_id,
-                        version_id,
-                        source_id,
-                        doc_mode,
-                        ("SEMI_MANUAL" if slide_mode else "AUTO"),
-                    ),
-                )
+            # ----------------------------------------------------
+            # 9) SECTIONS (titres détectés) + CITATIONS
+            # ----------------------------------------------------
+            if create_sections and version_id is not None:
+                with profile_stage("sections"):
+                    sections = build_sections_from_titles(
+                        [pages_ocr[i] or pages_text[i] or "" for i in range(total_pages_pdf)],
+                        keep_empty=True,
+                    )
+                    sections_created = materialize_sections(
+                        cur,
+                        course_id=course_id,
+                        version_id=version_id,
+                        source_id=source_id,
+                        sections=sections,
+                    )
 
-            conn.commit()
+            if progress:
+                progress("commit", total_pages_pdf, total_pages_pdf)
+            with profile_stage("commit"):
+                conn.commit()
 
         return PDFIngestResult(
             source_id=source_id,
@@ -1460,13 +1981,21 @@ def ingest_pdf_to_db(
             total_pages_db=total_pages_db,
             total_images_pdf=total_images_auto,
             total_images_db=total_images_db,
-            text_len_pdf=len(pdf_bytes),
+            text_len_pdf=pdf_size,
             text_len_db=len(text_db),
-            text_hash_pdf=hashlib.sha256(pdf_bytes).hexdigest(),
+            text_hash_pdf=pdf_sha256,
             text_hash_db=hashlib.sha256(text_db.encode("utf-8")).hexdigest(),
             missing_pages=[],
             empty_pages=[],
             coverage_ok=(total_pages_pdf == total_pages_db),
+            pages_reused=pages_reused,
+            pages_extracted=total_pages_pdf - pages_reused,
+            ocr_pages=len(ocr_res.texts) if ocr_res else 0,
+            ocr_cache_hits=ocr_res.cache_hits if ocr_res else 0,
+            ocr_latency_ms=ocr_res.latency_ms if ocr_res else {},
+            media_dedup=writer.dedup_stats(),
+            sections_created=sections_created,
+            profile=profiler.finish() if profiler else {},
         )
 
     except HTTPException:
@@ -1482,7 +2011,8 @@ def ingest_pdf_to_db(
             pass
         raise
     finally:
-        try:
-            doc.close()
-        except Exception:
-            pass
\ No newline at end of file
+        if profiler is not None:
+            # arrête cProfile / tracemalloc aussi en cas d'échec (idempotent)
+            profiler.finish()
+        if owns_analysis:
+            analysis.close()
\ No newline at end of file
@@ -0,0 +1,115 @@
+from typing import Dict, List, Optional
+from collections import OrderedDict
+import os
+import re
+import tempfile
+import threading
+
+# ===================================================================
+# CACHE DISQUE LRU SOUS BUDGET (images dérivées)
+# ===================================================================
+# Clé -> fichier sous root/<2 premiers car.>/<clé>. L'ordre LRU est gardé
+# en mémoire (reconstruit au démarrage depuis les mtime) ; chaque accès
+# "touche" le fichier. Au-delà de max_bytes, on supprime les plus
+# anciens jusqu'à repasser sous le budget ; put(..., evicted=[]) rend les
+# clés supprimées (lignes DB qui les référencent à nettoyer par l'appelant).
+
+_KEY_RE = re.compile(r"^[0-9A-Za-z._-]{1,200}$")
+
+
+class DiskLRUCache:
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max(0, int(max_bytes))
+        self._tmp = os.path.join(self.root, "tmp")
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()   # clé -> taille
+        self._total = 0
+        os.makedirs(self._tmp, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        found = []
+        for dirpath, _dirs, files in os.walk(self.root):
+            if os.path.abspath(dirpath) == self._tmp:
+                continue
+            for name in files:
+                p = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                found.append((st.st_mtime, name, st.st_size))
+        for _mt, name, size in sorted(found):
+            self._entries[name] = size
+            self._total += size
+
+    def path_for(self, key: str) -> str:
+        if not _KEY_RE.match(key or "") or key in (".", ".."):
+            raise ValueError(f"Clé de cache invalide: {key!r}")
+        return os.path.join(self.root, key[:2], key)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def get(self, key: str) -> Optional[str]:
+        """Chemin du fichier si présent (et marqué récemment utilisé)."""
+        path = self.path_for(key)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            if not os.path.exists(path):
+                self._total -= self._entries.pop(key)
+                return None
+            self._entries.move_to_end(key)
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return path
+
+    def put(self, key: str, data: bytes, evicted: Optional[List[str]] = None) -> str:
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        with self._lock:
+            if key in self._entries:
+                self._total -= self._entries.pop(key)
+            self._entries[key] = len(data)
+            self._total += len(data)
+            self._evict_locked(keep=key, evicted=evicted)
+        return path
+
+    def _evict_locked(self, keep: Optional[str] = None, evicted: Optional[List[str]] = None) -> int:
+        removed = 0
+        while self._total > self.max_bytes and self._entries:
+            key, size = next(iter(self._entries.items()))
+            if key == keep and len(self._entries) == 1:
+                break
+            if key == keep:
+                self._entries.move_to_end(key)
+                continue
+            self._entries.pop(key)
+            self._total -= size
+            try:
+                os.unlink(self.path_for(key))
+            except OSError:
+                pass
+            if evicted is not None:
+                evicted.append(key)
+            removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._total, "max_bytes": self.max_bytes}
@@ -0,0 +1,299 @@
+from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+from core import config
+
+# ===================================================================
+# PROFILAGE DE L'INGESTION (temps mur / CPU / mémoire par étape)
+# ===================================================================
+# Un IngestProfiler est activé pour le thread d'ingestion (ContextVar) ;
+# les fonctions du pipeline ouvrent des étapes via profile_stage(), sans
+# argument supplémentaire à propager. Sans profileur actif : no-op.
+# Temps inclusifs (une étape contient ses sous-étapes) + temps propre.
+# Mémoire : pic tracemalloc par étape si INGEST_PROFILE_MEMORY (coûteux),
+# sinon seul le pic RSS du process est rapporté.
+# tracemalloc et les dumps (cProfile / pyinstrument) sont globaux au
+# process : un seul profileur à la fois les utilise. Les ingests
+# concurrents profilés mesurent leurs étapes (temps, CPU) sans mémoire
+# ni dump.
+
+logger = logging.getLogger("ingest.profile")
+
+_CURRENT: ContextVar[Optional["IngestProfiler"]] = ContextVar("ingest_profiler", default=None)
+
+# profileur propriétaire de tracemalloc / du dump dans ce process
+_PROCESS_OWNER: Optional["IngestProfiler"] = None
+_OWNER_LOCK = threading.Lock()
+
+
+class _StageStats:
+    __slots__ = ("calls", "wall", "self_wall", "cpu", "peak_mem", "pages")
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.self_wall = 0.0
+        self.cpu = 0.0
+        self.peak_mem = 0
+        self.pages: Dict[int, float] = {}
+
+
+class _Frame:
+    __slots__ = ("name", "page_no", "t0", "c0", "child_wall", "peak")
+
+    def __init__(self, name: str, page_no: Optional[int]):
+        self.name = name
+        self.page_no = page_no
+        self.t0 = time.perf_counter()
+        self.c0 = time.thread_time()
+        self.child_wall = 0.0
+        self.peak = 0
+
+
+class IngestProfiler:
+
+    def __init__(self, *, memory: Optional[bool] = None, dump: Optional[str] = None,
+                 dump_dir: Optional[str] = None, label: str = "ingest"):
+        self.memory = config.INGEST_PROFILE_MEMORY if memory is None else bool(memory)
+        self.dump = (config.INGEST_PROFILE_DUMP if dump is None else dump or "").strip().lower()
+        self.dump_dir = dump_dir or config.INGEST_PROFILE_DIR
+        self.label = label
+        self._stats: Dict[str, _StageStats] = {}
+        self._order: List[str] = []
+        self._stack: List[_Frame] = []
+        self._t0 = time.perf_counter()
+        self._c0 = time.thread_time()
+        self._own_tracemalloc = False
+        self._owns_process = False
+        self._busy = False
+        self._dumper = None
+        self._report: Optional[Dict[str, Any]] = None
+        self.dump_path: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+    def _claim_process(self) -> bool:
+        global _PROCESS_OWNER
+        with _OWNER_LOCK:
+            if _PROCESS_OWNER is None:
+                _PROCESS_OWNER = self
+                self._owns_process = True
+        return self._owns_process
+
+    def _release_process(self) -> None:
+        global _PROCESS_OWNER
+        with _OWNER_LOCK:
+            if _PROCESS_OWNER is self:
+                _PROCESS_OWNER = None
+        self._owns_process = False
+
+    def start(self) -> "IngestProfiler":
+        if (self.memory or self.dump) and not self._claim_process():
+            logger.info("%s : profileur déjà actif dans le process, ni mémoire ni dump", self.label)
+            self.memory = False
+            self.dump = ""
+            self._busy = True
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracemalloc = True
+        if self.dump == "cprofile":
+            import cProfile
+            self._dumper = cProfile.Profile()
+            self._dumper.enable()
+        elif self.dump == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                logger.warning("pyinstrument non installé : pas de dump")
+                self.dump = ""
+            else:
+                self._dumper = Profiler(async_mode="disabled")
+                self._dumper.start()
+        return self
+
+    @contextmanager
+    def activate(self):
+        """Profileur courant du thread (lu par profile_stage)."""
+        token = _CURRENT.set(self)
+        try:
+            yield self
+        finally:
+            _CURRENT.reset(token)
+
+    # ------------------------------------------------------------------
+    # Étapes
+    # ------------------------------------------------------------------
+    @contextmanager
+    def stage(self, name: str, page_no: Optional[int] = None):
+        if self.memory and tracemalloc.is_tracing():
+            # le pic courant appartient au parent avant remise à zéro
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        frame = _Frame(name, page_no)
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            wall = time.perf_counter() - frame.t0
+            cpu = time.thread_time() - frame.c0
+            if self.memory and tracemalloc.is_tracing():
+                frame.peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+
+            st = self._stats.get(name)
+            if st is None:
+                st = self._stats[name] = _StageStats()
+                self._order.append(name)
+            st.calls += 1
+            st.wall += wall
+            st.self_wall += wall - frame.child_wall
+            st.cpu += cpu
+            st.peak_mem = max(st.peak_mem, frame.peak)
+            if page_no is not None:
+                st.pages[page_no] = st.pages.get(page_no, 0.0) + wall
+
+            if self._stack:
+                parent = self._stack[-1]
+                parent.child_wall += wall
+                parent.peak = max(parent.peak, frame.peak)
+
+    # ------------------------------------------------------------------
+    # Fusion (workers d'extraction : étapes mesurées dans d'autres process)
+    # ------------------------------------------------------------------
+    def export_stages(self) -> Dict[str, Dict[str, Any]]:
+        """Statistiques brutes (picklables) à renvoyer au parent."""
+        return {
+            name: {
+                "calls": st.calls, "wall": st.wall, "self_wall": st.self_wall,
+                "cpu": st.cpu, "peak_mem": st.peak_mem, "pages": dict(st.pages),
+            }
+            for name, st in ((n, self._stats[n]) for n in self._order)
+        }
+
+    def merge_stages(self, raw: Optional[Dict[str, Dict[str, Any]]]) -> None:
+        """
+        Ajoute les étapes d'un worker. Les temps sont cumulés sur tous les
+        workers (somme > temps mur de l'étape parente si parallélisme) et
+        ne sont pas retranchés du temps propre de l'étape englobante.
+        """
+        for name, d in (raw or {}).items():
+            st = self._stats.get(name)
+            if st is None:
+                st = self._stats[name] = _StageStats()
+                self._order.append(name)
+            st.calls += d["calls"]
+            st.wall += d["wall"]
+            st.self_wall += d["self_wall"]
+            st.cpu += d["cpu"]
+            st.peak_mem = max(st.peak_mem, d["peak_mem"])
+            for pno, v in d["pages"].items():
+                st.pages[pno] = st.pages.get(pno, 0.0) + v
+
+    # ------------------------------------------------------------------
+    # Rapport
+    # ------------------------------------------------------------------
+    def report(self, outliers: Optional[int] = None) -> Dict[str, Any]:
+        outliers = config.INGEST_PROFILE_OUTLIERS if outliers is None else int(outliers)
+        stages: Dict[str, Any] = {}
+        page_outliers: Dict[str, Any] = {}
+        for name in self._order:
+            st = self._stats[name]
+            stages[name] = {
+                "calls": st.calls,
+                "wall_ms": round(st.wall * 1000.0, 2),
+                "self_ms": round(st.self_wall * 1000.0, 2),
+                "cpu_ms": round(st.cpu * 1000.0, 2),
+            }
+            if self.memory:
+                stages[name]["peak_mem_mb"] = round(st.peak_mem / 1048576.0, 2)
+            if len(st.pages) >= 2 and outliers > 0:
+                times = sorted(st.pages.items(), key=lambda kv: kv[1], reverse=True)
+                median = statistics.median(v for _k, v in times)
+                page_outliers[name] = {
+                    "median_ms": round(median * 1000.0, 2),
+                    "slowest": [
+                        {"page_no": pno, "ms": round(v * 1000.0, 2),
+                         "x_median": round(v / median, 1) if median > 0 else None}
+                        for pno, v in times[:outliers]
+                    ],
+                }
+
+        out: Dict[str, Any] = {
+            "label": self.label,
+            "wall_ms": round((time.perf_counter() - self._t0) * 1000.0, 2),
+            "cpu_ms": round((time.thread_time() - self._c0) * 1000.0, 2),
+            "stages": stages,
+            "page_outliers": page_outliers,
+        }
+        if resource is not None:
+            # ru_maxrss : Ko sous Linux (pic du process depuis son démarrage)
+            out["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1)
+        if self.dump_path:
+            out["dump_path"] = self.dump_path
+        if self._busy:
+            out["process_profiler_busy"] = True
+        return out
+
+    def finish(self) -> Dict[str, Any]:
+        """Arrête les dumps, journalise le rapport en JSON et le renvoie (idempotent)."""
+        if self._report is not None:
+            return self._report
+        self._write_dump()
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+            self._own_tracemalloc = False
+        self._release_process()
+        self._report = self.report()
+        logger.info(json.dumps(self._report, ensure_ascii=False))
+        return self._report
+
+    def _write_dump(self) -> None:
+        if self._dumper is None:
+            return
+        os.makedirs(self.dump_dir, exist_ok=True)
+        base = os.path.join(self.dump_dir, f"{self.label}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        try:
+            if self.dump == "cprofile":
+                self._dumper.disable()
+                self.dump_path = base + ".prof"
+                self._dumper.dump_stats(self.dump_path)
+            else:
+                self._dumper.stop()
+                self.dump_path = base + ".html"
+                with open(self.dump_path, "w", encoding="utf-8") as f:
+                    f.write(self._dumper.output_html())
+        except Exception:
+            logger.exception("écriture du dump de profilage impossible")
+            self.dump_path = None
+        self._dumper = None
+
+
+def current_profiler() -> Optional[IngestProfiler]:
+    return _CURRENT.get()
+
+
+@contextmanager
+def profile_stage(name: str, page_no: Optional[int] = None):
+    """Étape du profileur actif ; no-op sans profileur (workers, appels isolés)."""
+    prof = _CURRENT.get()
+    if prof is None:
+        yield
+        return
+    with prof.stage(name, page_no):
+        yield
@@ -0,0 +1,191 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import time
+import psycopg2
+
+from core import config
+from core.media_repo import MediaRepo
+from utils.blob_store import blob_columns, get_blob_store
+from utils.phash import hamming_distance64, phash_to_db, phash_from_db
+
+# ===================================================================
+# DÉDUP GLOBALE DES IMAGES (academics.media_blobs)
+# ===================================================================
+# Chaque image à écrire est résolue en blob partagé, dans cet ordre :
+#   1) md5 identique déjà stocké (n'importe quelle source) ;
+#   2) quasi-doublon : pHash à distance <= MEDIA_DEDUP_PHASH_DIST et
+#      dimensions proches (recherche par bandes de 16 bits indexées) ;
+#   3) sinon nouveau blob (seul cas où les octets sont envoyés / stockés).
+# page_media_assets ne porte plus que blob_id ; ref_count est tenu par
+# trigger et les blobs orphelins sont purgés par purge_orphan_blobs().
+
+# pHash quasi constant (aplat, page blanche) : trop peu d'information pour
+# rapprocher deux images sans se tromper
+_MIN_BITS, _MAX_BITS = 12, 52
+
+# (md5, png, width, height, phash)
+MediaItem = Tuple[str, bytes, Optional[int], Optional[int], Optional[int]]
+
+
+def phash_bands(h: int) -> Tuple[int, int, int, int]:
+    """4 bandes de 16 bits (bits de poids fort d'abord), comme les index SQL."""
+    h = int(h) & 0xFFFFFFFFFFFFFFFF
+    return (h >> 48) & 0xFFFF, (h >> 32) & 0xFFFF, (h >> 16) & 0xFFFF, h & 0xFFFF
+
+
+def _informative(h: int) -> bool:
+    return _MIN_BITS <= bin(int(h) & 0xFFFFFFFFFFFFFFFF).count("1") <= _MAX_BITS
+
+
+def _same_size(w1, h1, w2, h2, tol: float) -> bool:
+    if not (w1 and h1 and w2 and h2):
+        return False
+    return abs(w1 - w2) <= tol * max(w1, w2) and abs(h1 - h2) <= tol * max(h1, h2)
+
+
+class MediaDedup:
+    """Résolution md5 -> blob_id pour un lot d'images (une ingestion)."""
+
+    def __init__(self, cur, *, phash_dist: Optional[int] = None, size_tol: Optional[float] = None):
+        self.cur = cur
+        self.phash_dist = max(0, min(3, config.MEDIA_DEDUP_PHASH_DIST if phash_dist is None else int(phash_dist)))
+        self.size_tol = config.MEDIA_DEDUP_SIZE_TOL if size_tol is None else float(size_tol)
+        self.stats: Dict[str, int] = {
+            "exact": 0, "near": 0, "new": 0, "bytes_written": 0, "bytes_skipped": 0,
+        }
+
+    def resolve(self, items: Sequence[MediaItem]) -> Dict[str, int]:
+        """md5 -> blob_id pour chaque image du lot (blobs créés au besoin)."""
+        by_md5: Dict[str, MediaItem] = {}
+        for it in items:
+            by_md5.setdefault(it[0], it)
+        if not by_md5:
+            return {}
+
+        # 1) contenu identique
+        out = MediaRepo.find_blobs_by_md5(self.cur, list(by_md5))
+        for md5 in out:
+            self.stats["exact"] += 1
+            self.stats["bytes_skipped"] += len(by_md5[md5][1])
+
+        # 2) quasi-doublons
+        rest = [it for md5, it in by_md5.items() if md5 not in out]
+        if self.phash_dist > 0:
+            for md5, blob_id in self._near(rest).items():
+                out[md5] = blob_id
+                self.stats["near"] += 1
+                self.stats["bytes_skipped"] += len(by_md5[md5][1])
+            rest = [it for it in rest if it[0] not in out]
+
+        # 3) nouveaux blobs (écriture des octets, store externe compris)
+        if rest:
+            rows = []
+            for (md5, png, w, h, ph) in rest:
+                data, path = blob_columns(png)
+                rows.append((
+                    md5, "image/png",
+                    psycopg2.Binary(data) if data is not None else None, path,
+                    len(png), w, h, phash_to_db(ph),
+                ))
+                self.stats["bytes_written"] += len(png)
+            created = MediaRepo.insert_blobs(self.cur, rows)
+            out.update(created)
+            self.stats["new"] += len(created)
+        return out
+
+    def _near(self, items: Sequence[MediaItem]) -> Dict[str, int]:
+        wanted = [it for it in items if it[4] is not None and _informative(it[4])]
+        if not wanted:
+            return {}
+        bands: List[set] = [set(), set(), set(), set()]
+        for it in wanted:
+            for k, v in enumerate(phash_bands(it[4])):
+                bands[k].add(v)
+        candidates = MediaRepo.find_blobs_by_phash_bands(self.cur, [sorted(b) for b in bands])
+        if not candidates:
+            return {}
+
+        out: Dict[str, int] = {}
+        for (md5, _png, w, h, ph) in wanted:
+            best: Optional[Tuple[int, int]] = None
+            for (blob_id, bph, bw, bh) in candidates:
+                d = hamming_distance64(ph, phash_from_db(bph))
+                if d > self.phash_dist or not _same_size(w, h, bw, bh, self.size_tol):
+                    continue
+                if best is None or d < best[0]:
+                    best = (d, blob_id)
+            if best is not None:
+                out[md5] = best[1]
+        return out
+
+
+# ---------------------------------------------------------------------
+# Purge des blobs sans référence
+# ---------------------------------------------------------------------
+def purge_orphan_blobs(cur, *, grace_minutes: Optional[int] = None,
+                       limit: Optional[int] = None) -> Tuple[int, List[str]]:
+    """
+    Supprime un lot de blobs orphelins. -> (nombre supprimé, clés du store
+    à effacer APRÈS commit : ni référencées ailleurs, ni partagées).
+    """
+    grace = config.MEDIA_BLOB_GC_GRACE_MIN if grace_minutes is None else int(grace_minutes)
+    limit = config.MEDIA_BLOB_GC_BATCH if limit is None else int(limit)
+    paths = MediaRepo.delete_orphan_blobs(cur, grace_minutes=grace, limit=limit)
+    keys = sorted({p for p in paths if p})
+    in_use = MediaRepo.store_keys_in_use(cur, keys)
+    return len(paths), [k for k in keys if k not in in_use]
+
+
+def sweep_unreferenced_store_keys(cur, *, grace_minutes: Optional[int] = None,
+                                  batch: Optional[int] = None) -> List[str]:
+    """
+    Fichiers du store qu'aucune ligne ne référence (octets écrits avant un
+    commit qui n'a pas eu lieu) et plus vieux que la période de grâce.
+    Supprimés ici ; mtime relu juste avant : un put concurrent (même
+    contenu réutilisé par une ingestion en cours) rafraîchit le fichier.
+    """
+    store = get_blob_store()
+    if store is None:
+        return []
+    grace_s = 60.0 * (config.BLOB_STORE_SWEEP_GRACE_MIN if grace_minutes is None else int(grace_minutes))
+    batch = max(1, config.MEDIA_BLOB_GC_BATCH if batch is None else int(batch))
+    cutoff = time.time() - grace_s
+
+    removed: List[str] = []
+    pending: List[str] = []
+
+    def _flush() -> None:
+        in_use = MediaRepo.store_keys_in_use(cur, pending)
+        for key in pending:
+            if key in in_use:
+                continue
+            mt = store.mtime(key)
+            if mt is None or mt >= cutoff:
+                continue
+            try:
+                if store.delete(key):
+                    removed.append(key)
+            except Exception:
+                continue
+        pending.clear()
+
+    for key, mt in store.iter_keys():
+        if mt < cutoff:
+            pending.append(key)
+            if len(pending) >= batch:
+                _flush()
+    if pending:
+        _flush()
+    return removed
+
+
+def delete_store_keys(keys: Sequence[str]) -> int:
+    store = get_blob_store()
+    if store is None:
+        return 0
+    n = 0
+    for key in keys:
+        try:
+            n += bool(store.delete(key))
+        except Exception:
+            continue
+    return n
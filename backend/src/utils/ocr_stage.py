@@ -0,0 +1,160 @@
+from typing import List, Optional, Dict, Tuple, Callable
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import multiprocessing
+import time
+
+import fitz
+from psycopg2.extras import execute_values
+
+from core import config
+from utils.pdf_analysis import PdfAnalysis
+from utils.course import OCR_AVAILABLE, ocr_png_bytes
+
+# ===================================================================
+# OCR DES PAGES SCANNÉES (pool de processus + cache par md5 d'image)
+# ===================================================================
+# Pages sans couche texte -> rendu en niveaux de gris (OCR_DPI) dans le
+# parent, md5 du PNG, lecture groupée du cache academics.ocr_cache, OCR
+# des seuls bitmaps inconnus dans un pool de processus (tesseract est
+# mono-cœur), écriture groupée du cache. Un même scan ré-ingéré (ou
+# une page dupliquée) n'est donc jamais OCRisé deux fois.
+
+
+@dataclass
+class OcrStageResult:
+    texts: Dict[int, str] = field(default_factory=dict)          # page_no (1-based) -> texte
+    latency_ms: Dict[int, float] = field(default_factory=dict)   # page_no -> durée OCR (0 = cache)
+    cache_hits: int = 0
+    ocr_runs: int = 0
+
+
+def needs_ocr(n_chars: int, min_chars: Optional[int] = None) -> bool:
+    """Page « sans texte » : couche texte brute (PageAnalysis.text_chars) quasi vide."""
+    min_chars = config.OCR_MIN_TEXT_CHARS if min_chars is None else int(min_chars)
+    return int(n_chars or 0) < min_chars
+
+
+def render_page_for_ocr(page: fitz.Page, dpi: Optional[int] = None) -> bytes:
+    dpi = config.OCR_DPI if dpi is None else int(dpi)
+    pix = page.get_pixmap(matrix=fitz.Matrix(dpi / 72.0, dpi / 72.0), colorspace=fitz.csGRAY, alpha=False)
+    return pix.tobytes("png")
+
+
+def _ocr_timed(args: Tuple[bytes, str]) -> Tuple[str, float]:
+    png, lang = args
+    t0 = time.perf_counter()
+    txt = ocr_png_bytes(png, lang=lang)
+    return txt, (time.perf_counter() - t0) * 1000.0
+
+
+# ---------------------------------------------------------------------
+# Cache academics.ocr_cache (clé = md5 du PNG + langue)
+# ---------------------------------------------------------------------
+def load_cached_ocr(cur, md5s: List[str], lang: str) -> Dict[str, str]:
+    if not md5s:
+        return {}
+    cur.execute("""
+        SELECT md5, text
+        FROM academics.ocr_cache
+        WHERE lang = %s AND md5 = ANY(%s)
+    """, (lang, list(md5s)))
+    return {md5: (text or "") for md5, text in (cur.fetchall() or [])}
+
+
+def store_cached_ocr(cur, results: Dict[str, str], lang: str) -> None:
+    if not results:
+        return
+    execute_values(
+        cur,
+        """
+        INSERT INTO academics.ocr_cache (md5, lang, text)
+        VALUES %s
+        ON CONFLICT (md5, lang) DO NOTHING
+        """,
+        [(md5, lang, txt) for md5, txt in sorted(results.items())],
+    )
+
+
+# ---------------------------------------------------------------------
+# Étape OCR
+# ---------------------------------------------------------------------
+def run_ocr_stage(
+    cur,
+    analysis: PdfAnalysis,
+    page_numbers: List[int],
+    *,
+    workers: Optional[int] = None,
+    lang: Optional[str] = None,
+    dpi: Optional[int] = None,
+    batch_pages: Optional[int] = None,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+) -> OcrStageResult:
+    """
+    OCR des pages `page_numbers` (0-based). Rendu par lots de `batch_pages`
+    pages (mémoire bornée), cache consulté puis complété par lot.
+    """
+    res = OcrStageResult()
+    if not page_numbers or not OCR_AVAILABLE:
+        return res
+
+    workers = config.OCR_WORKERS if workers is None else int(workers)
+    lang = lang or config.OCR_LANG
+    batch_pages = max(1, config.OCR_BATCH_PAGES if batch_pages is None else int(batch_pages))
+    page_numbers = sorted(page_numbers)
+    total = len(page_numbers)
+
+    ex = None
+    if workers > 1 and total > 1:
+        ex = ProcessPoolExecutor(
+            max_workers=min(workers, total),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    try:
+        done = 0
+        for i in range(0, total, batch_pages):
+            batch = page_numbers[i:i + batch_pages]
+
+            # rendu + md5 (parent : le document est déjà ouvert)
+            pngs: Dict[str, bytes] = {}
+            page_md5: List[Tuple[int, str]] = []
+            for pno in batch:
+                png = render_page_for_ocr(analysis.page(pno).page, dpi=dpi)
+                analysis.release_page(pno)
+                md5 = hashlib.md5(png).hexdigest()
+                pngs.setdefault(md5, png)
+                page_md5.append((pno, md5))
+
+            known = load_cached_ocr(cur, list(pngs), lang)
+            todo = [md5 for md5 in pngs if md5 not in known]
+
+            # bitmaps inconnus seulement (doublons du lot OCRisés une fois)
+            args = [(pngs[md5], lang) for md5 in todo]
+            outputs = list(ex.map(_ocr_timed, args)) if ex is not None else [_ocr_timed(a) for a in args]
+            fresh: Dict[str, str] = {}
+            took: Dict[str, float] = {}
+            for md5, (txt, ms) in zip(todo, outputs):
+                fresh[md5] = txt
+                took[md5] = ms
+            # texte vide non mis en cache (échec tesseract possible) : ré-essayé au prochain passage
+            store_cached_ocr(cur, {m: t for m, t in fresh.items() if t}, lang)
+            res.ocr_runs += len(todo)
+
+            for pno, md5 in page_md5:
+                page_no = pno + 1
+                if md5 in took:
+                    # première page du lot à porter ce bitmap : coût réel
+                    res.latency_ms[page_no] = round(took.pop(md5), 1)
+                else:
+                    res.latency_ms[page_no] = 0.0
+                    res.cache_hits += 1
+                res.texts[page_no] = known.get(md5, fresh.get(md5, ""))
+
+            done += len(batch)
+            if progress:
+                progress("ocr", done, total)
+    finally:
+        if ex is not None:
+            ex.shutdown()
+    return res
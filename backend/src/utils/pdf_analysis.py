@@ -0,0 +1,298 @@
+from typing import List, Optional, Dict, Iterator, Any
+import hashlib
+import re
+import fitz
+
+# ===================================================================
+# ANALYSE DE PAGES (document ouvert une seule fois, cache par page)
+# ===================================================================
+# Chaque extraction coûteuse de PyMuPDF (get_drawings, get_text("dict"),
+# get_text("rawdict"), get_images) n'est calculée qu'au premier accès,
+# puis relue par le classifieur, l'extraction d'images, la détection de
+# tableaux et le filtre texte.
+
+# opérateurs de peinture de chemin (S, s, f, F, f*, B, B*, b, b*) dans un flux
+# de contenu : un chemin peint = un élément de get_drawings(). Les objets
+# texte (BT ... ET, sans chemins possibles) sont retirés avant comptage.
+_PAINT_OP_RE = re.compile(rb"(?<![^\s])(?:[SsfFBb]\*?)(?=\s|$)")
+_TEXT_OBJ_RE = re.compile(rb"(?<![^\s])BT(?=\s).*?(?<=\s)ET(?=\s|$)", re.S)
+
+
+class PageAnalysis:
+
+    def __init__(self, doc: fitz.Document, pno: int, xref_digests: Optional[Dict[int, str]] = None):
+        self._doc = doc
+        self.pno = pno
+        # digests des flux partagés (images, XObjects) : calculés une fois par document
+        self._xref_digests = xref_digests if xref_digests is not None else {}
+        self._fingerprint: Optional[str] = None
+        self.page_no = pno + 1
+        self._page: Optional[fitz.Page] = None
+        self._drawings: Optional[list] = None
+        self._rawdict: Optional[dict] = None
+        self._textdict: Optional[dict] = None
+        self._images: Optional[list] = None
+        self._n_words: Optional[int] = None
+        self._text_chars: Optional[int] = None
+        self._paint_ops: Optional[int] = None
+        self._has_forms: Optional[bool] = None
+
+    @property
+    def page(self) -> fitz.Page:
+        if self._page is None:
+            self._page = self._doc.load_page(self.pno)
+        return self._page
+
+    @property
+    def rect(self) -> fitz.Rect:
+        return self.page.rect
+
+    @property
+    def drawings(self) -> list:
+        if self._drawings is None:
+            try:
+                self._drawings = self.page.get_drawings() or []
+            except Exception:
+                self._drawings = []
+        return self._drawings
+
+    @property
+    def rawdict(self) -> dict:
+        if self._rawdict is None:
+            try:
+                raw = self.page.get_text("rawdict")
+                self._rawdict = raw if isinstance(raw, dict) else {}
+            except Exception:
+                self._rawdict = {}
+        return self._rawdict
+
+    @property
+    def textdict(self) -> dict:
+        if self._textdict is None:
+            try:
+                d = self.page.get_text("dict")
+                self._textdict = d if isinstance(d, dict) else {}
+            except Exception:
+                self._textdict = {}
+        return self._textdict
+
+    @property
+    def images(self) -> list:
+        if self._images is None:
+            try:
+                self._images = self.page.get_images(full=True) or []
+            except Exception:
+                self._images = []
+        return self._images
+
+    @property
+    def image_blocks(self) -> List[dict]:
+        """
+        Blocs image (type 1). "dict" et "rawdict" exposent les mêmes blocs
+        image : on lit le rawdict s'il est déjà calculé, sinon le dict
+        (nécessaire de toute façon pour le texte).
+        """
+        src = self._rawdict if self._rawdict is not None else self.textdict
+        return [b for b in src.get("blocks", []) if b.get("type") == 1]
+
+    @property
+    def n_words(self) -> int:
+        """
+        Nombre de mots calculé depuis le dict (équivalent à get_text("words")
+        sans refaire une extraction).
+        """
+        if self._n_words is None:
+            n = 0
+            for block in self.textdict.get("blocks", []):
+                if block.get("type") != 0:
+                    continue
+                for line in block.get("lines", []):
+                    line_text = "".join((sp.get("text") or "") for sp in line.get("spans", []))
+                    n += len(line_text.split())
+            self._n_words = n
+        return self._n_words
+
+    @property
+    def text_chars(self) -> int:
+        """
+        Caractères (hors blancs) de la couche texte brute, avant tout filtrage
+        (zones figures / images) : décision OCR d'une page scannée.
+        """
+        if self._text_chars is None:
+            n = 0
+            for block in self.textdict.get("blocks", []):
+                if block.get("type") != 0:
+                    continue
+                for line in block.get("lines", []):
+                    for sp in line.get("spans", []):
+                        n += len("".join((sp.get("text") or "").split()))
+            self._text_chars = n
+        return self._text_chars
+
+    # ------------------------------------------------------------------
+    # Signaux bon marché (classifieur) : pas de get_drawings()
+    # ------------------------------------------------------------------
+    @property
+    def aspect_ratio(self) -> float:
+        r = self.rect
+        return r.width / max(r.height, 1.0)
+
+    @property
+    def paint_ops(self) -> int:
+        """
+        Nombre d'opérateurs de peinture de chemin du flux de contenu :
+        estimation de len(drawings) sans get_drawings(), hors Form XObjects
+        (cf. has_forms).
+        """
+        if self._paint_ops is None:
+            try:
+                raw = _TEXT_OBJ_RE.sub(b" ", self.page.read_contents() or b"")
+                self._paint_ops = len(_PAINT_OP_RE.findall(raw))
+            except Exception:
+                self._paint_ops = -1   # flux illisible : le classifieur retombe sur drawings
+        return self._paint_ops
+
+    @property
+    def has_forms(self) -> bool:
+        """Form XObjects : leurs chemins n'apparaissent pas dans le flux de la page."""
+        if self._has_forms is None:
+            try:
+                self._has_forms = bool(self.page.get_xobjects())
+            except Exception:
+                self._has_forms = True
+        return self._has_forms
+
+    def cheap_features(self) -> Dict[str, Any]:
+        return {
+            "page_no": self.page_no,
+            "aspect_ratio": self.aspect_ratio,
+            "n_images": len(self.images),
+            "paint_ops": self.paint_ops,
+            "has_forms": self.has_forms,
+        }
+
+    def _xref_digest(self, xref: int) -> str:
+        d = self._xref_digests.get(xref)
+        if d is None:
+            try:
+                d = hashlib.sha256(self._doc.xref_stream_raw(xref) or b"").hexdigest()
+            except Exception:
+                d = ""
+            self._xref_digests[xref] = d
+        return d
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Empreinte de la page : géométrie + flux de contenu + contenu des
+        images / XObjects référencés (par leur flux, pas par leur numéro
+        d'xref qui change d'un fichier à l'autre) + polices utilisées.
+        Deux pages d'empreinte égale donnent le même texte et les mêmes crops.
+        """
+        if self._fingerprint is None:
+            page = self.page
+            h = hashlib.sha256()
+            h.update(f"{tuple(page.rect)}|{page.rotation}".encode())
+            try:
+                h.update(page.read_contents() or b"")
+            except Exception:
+                pass
+            for img in self.images:
+                h.update(f"|img:{img[7]}:{self._xref_digest(img[0])}".encode())
+            try:
+                for xo in page.get_xobjects():
+                    h.update(f"|xo:{xo[1]}:{self._xref_digest(xo[0])}".encode())
+            except Exception:
+                pass
+            try:
+                for font in page.get_fonts():
+                    h.update(f"|font:{font[2]}:{font[3]}:{font[4]}".encode())
+            except Exception:
+                pass
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def release(self) -> None:
+        """Libère les caches de la page (appelé quand plus aucun étage n'en a besoin)."""
+        self._page = None
+        self._drawings = None
+        self._rawdict = None
+        self._textdict = None
+        self._images = None
+
+
+class PdfAnalysis:
+
+    def __init__(self, doc: fitz.Document, *, owns_doc: bool = False):
+        self.doc = doc
+        self._owns_doc = owns_doc
+        self._pages: Dict[int, PageAnalysis] = {}
+        self._xref_digests: Dict[int, str] = {}
+        # couche texte brute des pages libérées (release_page) : pas de 2e get_text
+        self._text_chars: Dict[int, int] = {}
+
+    @classmethod
+    def from_bytes(cls, pdf_bytes: bytes) -> "PdfAnalysis":
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        return cls(doc, owns_doc=True)
+
+    @classmethod
+    def from_path(cls, path: str) -> "PdfAnalysis":
+        # ouverture par chemin : MuPDF lit le fichier à la demande (pas de copie en RAM)
+        doc = fitz.open(path, filetype="pdf")
+        return cls(doc, owns_doc=True)
+
+    def __len__(self) -> int:
+        return len(self.doc)
+
+    def page(self, pno: int) -> PageAnalysis:
+        pa = self._pages.get(pno)
+        if pa is None:
+            pa = PageAnalysis(self.doc, pno, self._xref_digests)
+            self._pages[pno] = pa
+        return pa
+
+    def __iter__(self) -> Iterator[PageAnalysis]:
+        for pno in range(len(self.doc)):
+            yield self.page(pno)
+
+    def fingerprints(self) -> List[str]:
+        """Empreintes de toutes les pages (sans garder les caches lourds)."""
+        out = []
+        for pno in range(len(self.doc)):
+            pa = self.page(pno)
+            out.append(pa.fingerprint)
+            if pa._drawings is None and pa._textdict is None and pa._rawdict is None:
+                # page chargée uniquement pour l'empreinte : on ne garde que le résultat
+                pa._page = None
+        return out
+
+    def text_chars(self, pno: int) -> int:
+        """PageAnalysis.text_chars, y compris pour une page déjà libérée."""
+        n = self._text_chars.get(pno)
+        if n is None:
+            n = self._text_chars[pno] = self.page(pno).text_chars
+        return n
+
+    def release_page(self, pno: int) -> None:
+        pa = self._pages.pop(pno, None)
+        if pa is not None:
+            if pa._text_chars is not None or pa._textdict is not None:
+                self._text_chars[pno] = pa.text_chars
+            pa.release()
+
+    def close(self) -> None:
+        for pa in self._pages.values():
+            pa.release()
+        self._pages.clear()
+        if self._owns_doc:
+            try:
+                self.doc.close()
+            except Exception:
+                pass
+
+    def __enter__(self) -> "PdfAnalysis":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,157 @@
+from typing import List, Optional, Dict, Any, Callable, Union, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+import multiprocessing
+import os
+import tempfile
+import threading
+
+from utils.pdf_analysis import PdfAnalysis
+from utils.course import PageExtract, extract_page_payload
+from utils.ingest_profile import IngestProfiler, current_profiler
+
+# ===================================================================
+# EXTRACTION PARALLÈLE (pool de processus, aucun accès DB côté worker)
+# ===================================================================
+# Un seul pool "spawn" par processus serveur, créé au premier ingest et
+# fermé avec l'exécuteur d'ingestion (shutdown_pdf_workers) : pas de
+# démarrage d'interpréteurs / réimport de PyMuPDF à chaque PDF.
+# Chaque tâche porte (chemin, options, tranche de pages) ; le worker ouvre
+# le PDF pour la tranche et le referme aussitôt : aucun document ni
+# descripteur ne survit à l'appel (fichier d'upload / temporaire supprimé
+# ensuite). Source en bytes : écrite une fois dans un fichier temporaire
+# (rien de plus n'est copié vers les workers).
+# Les workers renvoient des PageExtract (crops PNG, pHash, texte filtré) ;
+# le parent fusionne dans l'ordre des pages et fait toutes les écritures.
+
+DEFAULT_CHUNK_PAGES = 8
+
+_EXECUTOR: Optional[ProcessPoolExecutor] = None
+_EXECUTOR_SIZE = 0
+_LOCK = threading.Lock()
+
+
+def _extract_page_range(
+    path: str,
+    options: Dict[str, Any],
+    profile: bool,
+    pnos: List[int],
+) -> Tuple[List[PageExtract], Optional[Dict[str, Any]]]:
+    """Pages de la tranche + étapes mesurées (si le parent profile)."""
+    prof = IngestProfiler(memory=False, dump="") if profile else None
+    out: List[PageExtract] = []
+    with PdfAnalysis.from_path(path) as analysis, (prof.activate() if prof is not None else nullcontext()):
+        for pno in pnos:
+            out.append(extract_page_payload(analysis.page(pno), **options))
+            analysis.release_page(pno)
+    return out, (prof.export_stages() if prof is not None else None)
+
+
+def _submit_all(workers: int, tasks: List[tuple]) -> Tuple[ProcessPoolExecutor, list]:
+    """Soumet les tâches au pool partagé (créé, ou agrandi si un appel demande plus de workers)."""
+    global _EXECUTOR, _EXECUTOR_SIZE
+    with _LOCK:
+        if _EXECUTOR is None or workers > _EXECUTOR_SIZE:
+            old = _EXECUTOR
+            # spawn : pas de fork d'un process serveur multi-threadé
+            _EXECUTOR = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _EXECUTOR_SIZE = workers
+            if old is not None:
+                old.shutdown(wait=False)     # les tranches déjà soumises se terminent
+        ex = _EXECUTOR
+        return ex, [ex.submit(_extract_page_range, *t) for t in tasks]
+
+
+def _discard_executor(ex: ProcessPoolExecutor) -> None:
+    """Pool cassé (worker tué, OOM...) : recréé au prochain appel."""
+    global _EXECUTOR, _EXECUTOR_SIZE
+    with _LOCK:
+        if _EXECUTOR is ex:
+            _EXECUTOR = None
+            _EXECUTOR_SIZE = 0
+    ex.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pdf_workers() -> None:
+    global _EXECUTOR, _EXECUTOR_SIZE
+    with _LOCK:
+        ex, _EXECUTOR, _EXECUTOR_SIZE = _EXECUTOR, None, 0
+    if ex is not None:
+        ex.shutdown(wait=False, cancel_futures=True)
+
+
+def shard_pages(page_numbers: List[int], chunk_pages: int = DEFAULT_CHUNK_PAGES) -> List[List[int]]:
+    """Tranches de pages (0-based) dans l'ordre."""
+    chunk_pages = max(1, int(chunk_pages))
+    page_numbers = sorted(page_numbers)
+    return [page_numbers[i:i + chunk_pages] for i in range(0, len(page_numbers), chunk_pages)]
+
+
+def extract_pages_parallel(
+    pdf_source: Union[bytes, str],
+    n_pages: int,
+    *,
+    workers: int,
+    chunk_pages: int = DEFAULT_CHUNK_PAGES,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    page_numbers: Optional[List[int]] = None,
+    **options,
+) -> List[PageExtract]:
+    """
+    Extrait toutes les pages (ou seulement `page_numbers`, 0-based) via le
+    pool partagé (au moins `workers` processus). `pdf_source` : bytes ou chemin du PDF. `options` est transmis tel quel à
+    extract_page_payload. Résultat trié par page_no (fusion déterministe).
+    """
+    if page_numbers is None:
+        page_numbers = list(range(max(0, n_pages)))
+    if not page_numbers:
+        return []
+
+    shards = shard_pages(page_numbers, chunk_pages)
+    n_pages = len(page_numbers)
+    workers = max(1, min(int(workers), len(shards)))
+
+    tmp_path = None
+    if isinstance(pdf_source, str):
+        path = pdf_source
+    else:
+        fd, tmp_path = tempfile.mkstemp(prefix="pdfworkers-", suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_source)
+        path = tmp_path
+
+    parent_prof = current_profiler()
+    profile = parent_prof is not None
+    results: List[PageExtract] = []
+    ex = None
+    futures: list = []
+    try:
+        ex, futures = _submit_all(workers, [(path, options, profile, pnos) for pnos in shards])
+        for fut in futures:
+            chunk, stages = fut.result()
+            results.extend(chunk)
+            if parent_prof is not None:
+                parent_prof.merge_stages(stages)
+            if progress:
+                progress("extract", len(results), n_pages)
+    except BrokenProcessPool:
+        if ex is not None:
+            _discard_executor(ex)
+        raise
+    except BaseException:
+        for fut in futures:
+            fut.cancel()
+        raise
+    finally:
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    results.sort(key=lambda r: r.page_no)
+    return results
@@ -0,0 +1,134 @@
+from typing import List, Sequence, Optional
+import numpy as np
+import fitz
+
+# ===================================================================
+# pHASH 64 bits VECTORISÉ (NumPy)
+# ===================================================================
+# gris -> réduction 32x32 par moyenne de zones -> DCT-II 2D -> bloc 8x8
+# basses fréquences -> bits > médiane (hors DC) -> np.packbits.
+# Toutes les étapes acceptent un lot de crops (N, 32, 32).
+
+HASH_SIZE = 8       # 8x8 = 64 bits
+DCT_SIZE = 32       # taille de réduction avant DCT
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Matrice DCT-II orthonormée (n x n) : D = C @ X @ C.T."""
+    k = np.arange(n, dtype=np.float64)[:, None]
+    i = np.arange(n, dtype=np.float64)[None, :]
+    c = np.cos(np.pi * (2.0 * i + 1.0) * k / (2.0 * n))
+    c[0, :] *= 1.0 / np.sqrt(2.0)
+    return (c * np.sqrt(2.0 / n)).astype(np.float32)
+
+
+_DCT = _dct_matrix(DCT_SIZE)
+
+
+def pix_samples(pix: fitz.Pixmap) -> np.ndarray:
+    """
+    Échantillons (h, w, n) du pixmap en vue NumPy sans copie (samples_mv) :
+    valide tant que `pix` est vivant.
+    """
+    arr = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+    # stride > w*n possible : on passe par la largeur de ligne réelle
+    stride = getattr(pix, "stride", pix.w * pix.n) or pix.w * pix.n
+    return arr[: pix.h * stride].reshape(pix.h, stride)[:, : pix.w * pix.n].reshape(pix.h, pix.w, pix.n)
+
+
+def gray_from_array(arr: np.ndarray) -> np.ndarray:
+    """(h, w, C) uint8 -> gris float32 (alpha ignoré)."""
+    if arr.shape[2] <= 2:     # Gray (+ alpha)
+        return arr[..., 0].astype(np.float32)
+    return (0.299 * arr[..., 0] + 0.587 * arr[..., 1] + 0.114 * arr[..., 2]).astype(np.float32)
+
+
+def pix_to_gray(pix: fitz.Pixmap) -> np.ndarray:
+    if pix.n > 4:
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    return gray_from_array(pix_samples(pix))
+
+
+def area_mean(gray: np.ndarray, w: int, h: int) -> np.ndarray:
+    """
+    Réduction (h, w) par moyenne de zones. Mêmes bornes que l'ancien
+    _downscale_mean (linspace entier), sans boucle Python :
+    reshape si la taille est un multiple exact, np.add.reduceat sinon,
+    image intégrale pour les images plus petites que la cible (zones vides).
+    """
+    H, W = gray.shape
+    if H == 0 or W == 0:
+        return np.zeros((h, w), dtype=np.float32)
+    if H % h == 0 and W % w == 0:
+        return gray.reshape(h, H // h, w, W // w).mean(axis=(1, 3), dtype=np.float64).astype(np.float32)
+
+    ys = np.linspace(0, H, h + 1).astype(int)
+    xs = np.linspace(0, W, w + 1).astype(int)
+    counts = np.diff(ys)[:, None] * np.diff(xs)[None, :]
+
+    if H >= h and W >= w:
+        # bornes strictement croissantes : une seule passe sur les pixels
+        sums = np.add.reduceat(gray, ys[:-1], axis=0, dtype=np.float64)
+        sums = np.add.reduceat(sums, xs[:-1], axis=1)
+        return (sums / counts).astype(np.float32)
+
+    integral = np.zeros((H + 1, W + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(gray, axis=0, dtype=np.float64), axis=1, out=integral[1:, 1:])
+    y0, y1 = ys[:-1][:, None], ys[1:][:, None]
+    x0, x1 = xs[:-1][None, :], xs[1:][None, :]
+    sums = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+    out = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    return out.astype(np.float32)
+
+
+def phash64_batch(grays: Sequence[np.ndarray]) -> List[int]:
+    """pHash 64 bits pour un lot d'images en niveaux de gris (tailles libres)."""
+    if not grays:
+        return []
+    small = np.stack([area_mean(g, DCT_SIZE, DCT_SIZE) for g in grays])   # (N, 32, 32)
+    dct = _DCT @ small @ _DCT.T                                             # (N, 32, 32)
+    low = dct[:, :HASH_SIZE, :HASH_SIZE].reshape(len(grays), HASH_SIZE * HASH_SIZE)
+    # médiane hors composante continue [0, 0]
+    med = np.median(low[:, 1:], axis=1)
+    bits = low > med[:, None]
+    packed = np.packbits(bits, axis=1)                                      # (N, 8) big-endian
+    return [int(v) for v in packed.view(">u8").ravel()]
+
+
+def phash64_from_gray(gray: np.ndarray) -> int:
+    return phash64_batch([gray])[0]
+
+
+def phash64_from_pixmaps(pixes: Sequence[fitz.Pixmap]) -> List[Optional[int]]:
+    """Lot de pixmaps -> hashes (None pour un pixmap illisible)."""
+    out: List[Optional[int]] = [None] * len(pixes)
+    grays, idx = [], []
+    for i, pix in enumerate(pixes):
+        try:
+            grays.append(pix_to_gray(pix))
+            idx.append(i)
+        except Exception:
+            continue
+    for i, h in zip(idx, phash64_batch(grays)):
+        out[i] = h
+    return out
+
+
+def phash64_from_pixmap(pix: fitz.Pixmap) -> int:
+    return phash64_from_gray(pix_to_gray(pix))
+
+
+# BIGINT Postgres = 64 bits signés : même motif de bits, autre lecture
+def phash_to_db(h: Optional[int]) -> Optional[int]:
+    if h is None:
+        return None
+    h = int(h) & 0xFFFFFFFFFFFFFFFF
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+
+def phash_from_db(v: Optional[int]) -> Optional[int]:
+    return None if v is None else int(v) & 0xFFFFFFFFFFFFFFFF
+
+
+def hamming_distance64(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
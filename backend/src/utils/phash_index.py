@@ -0,0 +1,101 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.phash import hamming_distance64
+
+# ===================================================================
+# INDEX DE QUASI-DOUBLONS pHASH (multi-index par principe des tiroirs)
+# ===================================================================
+# Les 64 bits sont découpés en (max_radius + 1) segments disjoints. Si
+# hamming(a, b) <= max_radius, au moins un segment est identique : une
+# requête ne vérifie que les hashes qui partagent un segment exact avec
+# elle (tables de hachage), au lieu de tout parcourir.
+# Rayon > max_radius : repli sur un balayage linéaire (toujours exact).
+
+HASH_BITS = 64
+DEFAULT_MAX_RADIUS = 6
+
+
+def _segments(n_segments: int) -> List[Tuple[int, int]]:
+    """(décalage, masque) de chaque segment, tailles aussi égales que possible."""
+    base, extra = divmod(HASH_BITS, n_segments)
+    out, shift = [], 0
+    for i in range(n_segments):
+        width = base + (1 if i < extra else 0)
+        out.append((shift, (1 << width) - 1))
+        shift += width
+    return out
+
+
+class PHashIndex:
+    """
+    Index de hashes 64 bits avec insertion et requête par rayon de Hamming.
+    Chaque entrée porte une valeur libre (id d'asset, aire du crop, ...).
+    """
+
+    def __init__(self, max_radius: int = DEFAULT_MAX_RADIUS):
+        self.max_radius = max(0, int(max_radius))
+        self._segs = _segments(min(self.max_radius + 1, HASH_BITS))
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in self._segs]
+        self._hashes: List[int] = []
+        self._values: List[Any] = []
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __iter__(self) -> Iterator[Tuple[int, Any]]:
+        return iter(zip(self._hashes, self._values))
+
+    def __contains__(self, h: int) -> bool:
+        return self.any_within(int(h), 0)
+
+    def add(self, h: int, value: Any = None) -> None:
+        h = int(h) & 0xFFFFFFFFFFFFFFFF
+        idx = len(self._hashes)
+        self._hashes.append(h)
+        self._values.append(value)
+        for table, (shift, mask) in zip(self._tables, self._segs):
+            table.setdefault((h >> shift) & mask, []).append(idx)
+
+    def extend(self, items: Iterable[Tuple[int, Any]]) -> None:
+        for h, value in items:
+            self.add(h, value)
+
+    def _candidates(self, h: int, radius: int) -> Iterable[int]:
+        if radius > self.max_radius:
+            return range(len(self._hashes))
+        seen = set()
+        for table, (shift, mask) in zip(self._tables, self._segs):
+            for idx in table.get((h >> shift) & mask, ()):
+                if idx not in seen:
+                    seen.add(idx)
+        return sorted(seen)
+
+    def query(self, h: int, radius: int) -> List[Tuple[int, Any, int]]:
+        """(hash, valeur, distance) de toutes les entrées à distance <= radius, ordre d'insertion."""
+        h = int(h) & 0xFFFFFFFFFFFFFFFF
+        out = []
+        for idx in self._candidates(h, radius):
+            d = hamming_distance64(h, self._hashes[idx])
+            if d <= radius:
+                out.append((self._hashes[idx], self._values[idx], d))
+        return out
+
+    def any_within(self, h: int, radius: int) -> bool:
+        h = int(h) & 0xFFFFFFFFFFFFFFFF
+        for idx in self._candidates(h, radius):
+            if hamming_distance64(h, self._hashes[idx]) <= radius:
+                return True
+        return False
+
+    # ------------------------------------------------------------------
+    # Construction depuis la base
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[Any, Optional[int]]],
+                  max_radius: int = DEFAULT_MAX_RADIUS) -> "PHashIndex":
+        """Lignes (valeur, phash) — typiquement (id, phash) lus en base."""
+        index = cls(max_radius)
+        for value, h in rows:
+            if h is not None:
+                index.add(int(h), value)
+        return index
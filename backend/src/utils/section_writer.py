@@ -0,0 +1,130 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import re
+from psycopg2.extras import execute_values
+
+from utils.ingest_profile import profile_stage
+
+# ===================================================================
+# MATÉRIALISATION DES SECTIONS (ingestion PDF)
+# ===================================================================
+# Les titres détectés (build_sections_from_titles) deviennent un arbre :
+# le niveau vient de la numérotation (PARTIE > CHAPITRE / romain > 1 >
+# 1.1 > ...), le parent est le dernier titre de niveau inférieur.
+# Écriture sur le curseur de l'ingestion (même transaction) : un INSERT
+# multi-lignes par profondeur (les ids parents sont connus après le
+# niveau précédent), puis un seul INSERT pour toutes les citations.
+
+_PART = re.compile(r'^\s*PARTIE\s+\d+', re.I)
+_CHAPTER = re.compile(r'^\s*(?:CHAPITRE\s+\d+|[IVXLC]+\.\s+)', re.I)
+_NUMBERED = re.compile(r'^\s*(\d+(?:\.\d+)*)\s+')
+
+# section d'ouverture (texte avant le premier titre) : racine, jamais parente
+_INTRO_LEVEL = 1_000
+
+
+def title_level(title: str) -> Optional[int]:
+    """Niveau hiérarchique d'un titre (plus petit = plus haut), None si inconnu."""
+    if _PART.match(title):
+        return 1
+    if _CHAPTER.match(title):
+        return 2
+    m = _NUMBERED.match(title)
+    if m:
+        return 2 + m.group(1).count(".") + 1
+    return None
+
+
+def build_section_tree(sections: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    sections (ordre du document) -> mêmes dicts + depth, parent (index dans
+    la liste ou None), position (rang parmi les frères).
+    """
+    out: List[Dict[str, Any]] = []
+    stack: List[Tuple[int, int]] = []          # (niveau, index)
+    siblings: Dict[Optional[int], int] = {}
+    for i, sec in enumerate(sections):
+        level = title_level(sec["title"])
+        if level is None:
+            level = _INTRO_LEVEL if i == 0 else (stack[-1][0] if stack else 2)
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        parent = stack[-1][1] if stack else None
+        position = siblings.get(parent, 0)
+        siblings[parent] = position + 1
+        out.append({**sec, "depth": len(stack), "parent": parent, "position": position, "level": level})
+        stack.append((level, i))
+    return out
+
+
+def _section_type(node: Dict[str, Any]) -> str:
+    if node["level"] == _INTRO_LEVEL:
+        return "INTRO"
+    return "CHAPTER" if node["depth"] == 0 else "SUBCHAPTER"
+
+
+def materialize_sections(
+    cur,
+    *,
+    course_id: int,
+    version_id: int,
+    source_id: int,
+    sections: Sequence[Dict[str, Any]],
+) -> int:
+    """
+    Insère l'arbre de sections de la version + une citation (pages
+    couvertes) par section. Version qui a déjà des sections (même fichier
+    ré-uploadé, sections éditées) : laissée intacte. -> nb de sections créées.
+    """
+    if not sections:
+        return 0
+    cur.execute("SELECT 1 FROM academics.sections WHERE version_id=%s LIMIT 1", (version_id,))
+    if cur.fetchone():
+        return 0
+
+    with profile_stage("db_write"):
+        nodes = build_section_tree(sections)
+        ids: Dict[int, int] = {}
+        for depth in range(max(n["depth"] for n in nodes) + 1):
+            level_nodes = [(i, n) for i, n in enumerate(nodes) if n["depth"] == depth]
+            rows = [
+                (
+                    course_id, version_id,
+                    ids[n["parent"]] if n["parent"] is not None else None,
+                    n["position"], n["title"], n.get("content") or "", _section_type(n),
+                )
+                for _i, n in level_nodes
+            ]
+            returned = execute_values(
+                cur,
+                """
+                INSERT INTO academics.sections
+                    (course_id, version_id, parent_id, position, title, content_md, section_type)
+                VALUES %s
+                RETURNING id, parent_id, position
+                """,
+                rows,
+                page_size=len(rows),
+                fetch=True,
+            ) or []
+            # (parent_id, position) est unique dans un niveau : l'ordre de RETURNING importe peu
+            by_key = {(r[1], int(r[2])): int(r[0]) for r in returned}
+            for i, n in level_nodes:
+                parent_id = ids[n["parent"]] if n["parent"] is not None else None
+                ids[i] = by_key[(parent_id, n["position"])]
+
+        citations = [
+            (ids[i], source_id, min(n["pages"]), max(n["pages"]), None)
+            for i, n in enumerate(nodes) if n.get("pages")
+        ]
+        if citations:
+            execute_values(
+                cur,
+                """
+                INSERT INTO academics.citations (section_id, source_id, page_start, page_end, quote)
+                VALUES %s
+                ON CONFLICT DO NOTHING
+                """,
+                citations,
+                page_size=len(citations),
+            )
+    return len(ids)
@@ -0,0 +1,154 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import math
+import fitz
+
+# ===================================================================
+# INDEX SPATIAL (grille uniforme sur les coordonnées de page)
+# ===================================================================
+# Chaque rect est rangé dans les cases qu'il recouvre ; une requête ne
+# teste que les rects des cases touchées au lieu de toute la liste.
+# La grille supporte insert / remove / update (rects fusionnés qui
+# grossissent), ce qu'un R-tree STR statique ne permet pas.
+# Les rects qui couvriraient trop de cases (coordonnées aberrantes) sont
+# gardés à part et testés linéairement.
+
+DEFAULT_CELL = 64.0          # ~1/10 de page A4 en points
+MAX_CELLS_PER_RECT = 4096
+
+
+def rects_touch(a: fitz.Rect, b: fitz.Rect, pad: float = 0.0) -> bool:
+    """Intersection fermée (bords communs inclus), a élargi de `pad`."""
+    return (a.x0 - pad <= b.x1 and b.x0 <= a.x1 + pad and
+            a.y0 - pad <= b.y1 and b.y0 <= a.y1 + pad)
+
+
+def auto_cell_size(rects: Iterable[fitz.Rect]) -> float:
+    """Taille de case ~ côté médian des rects (bornée)."""
+    sides = sorted(max(r.width, r.height) for r in rects if not r.is_empty) or [DEFAULT_CELL]
+    return max(16.0, min(256.0, sides[len(sides) // 2]))
+
+
+def _rect_distance(r: fitz.Rect, x: float, y: float) -> float:
+    dx = max(r.x0 - x, 0.0, x - r.x1)
+    dy = max(r.y0 - y, 0.0, y - r.y1)
+    return math.hypot(dx, dy)
+
+
+def _ring(cx: int, cy: int, ring: int) -> Iterable[Tuple[int, int]]:
+    """Cases à distance de Tchebychev exactement `ring` de (cx, cy) : le pourtour seul."""
+    if ring == 0:
+        yield cx, cy
+        return
+    for ix in range(cx - ring, cx + ring + 1):
+        yield ix, cy - ring
+        yield ix, cy + ring
+    for iy in range(cy - ring + 1, cy + ring):
+        yield cx - ring, iy
+        yield cx + ring, iy
+
+
+class RectGrid:
+
+    def __init__(self, cell: float = DEFAULT_CELL):
+        self.cell = float(cell) if cell and cell > 0 else DEFAULT_CELL
+        self._rects: Dict[int, fitz.Rect] = {}
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        self._keys: Dict[int, List[Tuple[int, int]]] = {}
+        self._oversized: Set[int] = set()
+        # emprise (indices de cases) de tout ce qui a été rangé : borne des anneaux de nearest()
+        self._bounds: Optional[Tuple[int, int, int, int]] = None
+
+    @classmethod
+    def from_rects(cls, rects: Iterable[fitz.Rect], cell: Optional[float] = None) -> "RectGrid":
+        """Grille sur une liste fixe : id = position dans la liste."""
+        rects = list(rects)
+        grid = cls(cell if cell is not None else auto_cell_size(rects))
+        for i, r in enumerate(rects):
+            grid.insert(i, r)
+        return grid
+
+    def __len__(self) -> int:
+        return len(self._rects)
+
+    def __getitem__(self, item_id: int) -> fitz.Rect:
+        return self._rects[item_id]
+
+    def _span(self, x0: float, y0: float, x1: float, y1: float) -> Optional[Tuple[int, int, int, int]]:
+        c = self.cell
+        if not all(math.isfinite(v) for v in (x0, y0, x1, y1)):
+            return None
+        ix0, iy0 = math.floor(x0 / c), math.floor(y0 / c)
+        ix1, iy1 = math.floor(x1 / c), math.floor(y1 / c)
+        if (ix1 - ix0 + 1) * (iy1 - iy0 + 1) > MAX_CELLS_PER_RECT:
+            return None
+        return ix0, iy0, ix1, iy1
+
+    def insert(self, item_id: int, rect: fitz.Rect) -> None:
+        if item_id in self._rects:
+            self.remove(item_id)
+        r = fitz.Rect(rect)
+        self._rects[item_id] = r
+        span = self._span(r.x0, r.y0, r.x1, r.y1)
+        if span is None:
+            self._oversized.add(item_id)
+            return
+        ix0, iy0, ix1, iy1 = span
+        b = self._bounds
+        self._bounds = (ix0, iy0, ix1, iy1) if b is None else (
+            min(b[0], ix0), min(b[1], iy0), max(b[2], ix1), max(b[3], iy1))
+        keys = [(ix, iy) for ix in range(ix0, ix1 + 1) for iy in range(iy0, iy1 + 1)]
+        for k in keys:
+            self._cells.setdefault(k, set()).add(item_id)
+        self._keys[item_id] = keys
+
+    def remove(self, item_id: int) -> None:
+        self._rects.pop(item_id, None)
+        self._oversized.discard(item_id)
+        for k in self._keys.pop(item_id, ()):
+            bucket = self._cells.get(k)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self._cells[k]
+
+    def update(self, item_id: int, rect: fitz.Rect) -> None:
+        self.insert(item_id, rect)
+
+    def intersecting(self, rect: fitz.Rect, pad: float = 0.0) -> List[int]:
+        """Ids (triés) des rects qui touchent `rect` élargi de `pad`."""
+        r = fitz.Rect(rect)
+        found: Set[int] = set(self._oversized)
+        span = self._span(r.x0 - pad, r.y0 - pad, r.x1 + pad, r.y1 + pad)
+        if span is None:
+            found.update(self._rects)
+        else:
+            ix0, iy0, ix1, iy1 = span
+            for ix in range(ix0, ix1 + 1):
+                for iy in range(iy0, iy1 + 1):
+                    bucket = self._cells.get((ix, iy))
+                    if bucket:
+                        found.update(bucket)
+        return sorted(i for i in found if rects_touch(r, self._rects[i], pad))
+
+    def nearest(self, x: float, y: float, k: int = 1) -> List[Tuple[int, float]]:
+        """k rects les plus proches du point (x, y) : [(id, distance)], distance 0 si dedans."""
+        if not self._rects or k <= 0:
+            return []
+        if not (math.isfinite(x) and math.isfinite(y)) or self._bounds is None:
+            ranked = ((i, _rect_distance(r, x, y)) for i, r in self._rects.items())
+            return sorted(ranked, key=lambda t: (t[1], t[0]))[:k]
+
+        c = self.cell
+        cx, cy = math.floor(x / c), math.floor(y / c)
+        best: Dict[int, float] = {i: _rect_distance(self._rects[i], x, y) for i in self._oversized}
+        bx0, by0, bx1, by1 = self._bounds
+        max_ring = max(cx - bx0, bx1 - cx, cy - by0, by1 - cy, 0)
+        for ring in range(max_ring + 1):
+            for key in _ring(cx, cy, ring):
+                for i in self._cells.get(key, ()):
+                    if i not in best:
+                        best[i] = _rect_distance(self._rects[i], x, y)
+            # cases non parcourues : anneau >= ring + 1, donc à ring * cell au moins du point
+            if len(best) >= k and sorted(best.values())[k - 1] < ring * c:
+                break
+        return sorted(best.items(), key=lambda t: (t[1], t[0]))[:k]
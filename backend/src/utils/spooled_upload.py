@@ -0,0 +1,142 @@
+from typing import BinaryIO, Optional
+from dataclasses import dataclass
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+from fastapi import HTTPException, UploadFile
+
+from core import config
+from utils.pdf_analysis import PdfAnalysis
+from utils.worker import host_tag, pid_alive
+
+# ===================================================================
+# UPLOAD PDF EN FLUX (fichier temporaire + hachage incrémental)
+# ===================================================================
+# Le corps est recopié par blocs dans UPLOAD_TMP_DIR pendant que md5 et
+# sha256 sont mis à jour : aucun `await file.read()` du fichier entier.
+# Le PDF est ensuite ouvert depuis le chemin (MuPDF lit le fichier à la
+# demande) et le blob est écrit dans le store par blocs.
+
+SPOOL_PREFIX = "upload-"
+SPOOL_SUFFIX = ".pdf"
+# upload-<hôte>.<pid>-XXXX.pdf : le processus propriétaire est dans le nom
+_OWNER_RE = re.compile(r"^upload-(?P<host>[A-Za-z0-9_]+)\.(?P<pid>\d+)-")
+
+
+def _spool_prefix() -> str:
+    return f"{SPOOL_PREFIX}{host_tag()}.{os.getpid()}-"
+
+
+@dataclass
+class SpooledPdf:
+    path: str
+    size: int
+    md5: str
+    sha256: str
+    filename: Optional[str] = None
+
+    def open(self) -> BinaryIO:
+        return open(self.path, "rb")
+
+    def open_analysis(self) -> PdfAnalysis:
+        return PdfAnalysis.from_path(self.path)
+
+    def read_bytes(self) -> bytes:
+        """Contenu complet : réservé aux chemins qui exigent des bytes."""
+        with self.open() as f:
+            return f.read()
+
+    def cleanup(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "SpooledPdf":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cleanup()
+
+
+def _spool_dir() -> str:
+    d = os.path.abspath(config.UPLOAD_TMP_DIR)
+    os.makedirs(d, exist_ok=True)
+    return d
+
+
+def _max_upload_bytes() -> int:
+    return max(0, config.UPLOAD_MAX_MB) * 1024 * 1024
+
+
+async def spool_upload(upload: UploadFile, *, chunk_size: Optional[int] = None) -> SpooledPdf:
+    """
+    Recopie l'UploadFile par blocs dans un fichier temporaire (md5 + sha256
+    calculés au passage). 413 au-delà de UPLOAD_MAX_MB (0 = pas de limite).
+    """
+    chunk_size = chunk_size or max(64, config.UPLOAD_CHUNK_KB) * 1024
+    limit = _max_upload_bytes()
+    md5, sha = hashlib.md5(), hashlib.sha256()
+    size = 0
+
+    fd, path = tempfile.mkstemp(prefix=_spool_prefix(), suffix=SPOOL_SUFFIX, dir=_spool_dir())
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                buf = await upload.read(chunk_size)
+                if not buf:
+                    break
+                size += len(buf)
+                if limit and size > limit:
+                    raise HTTPException(status_code=413, detail=f"PDF trop volumineux (> {config.UPLOAD_MAX_MB} Mo).")
+                md5.update(buf)
+                sha.update(buf)
+                out.write(buf)
+    except BaseException:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    return SpooledPdf(
+        path=path,
+        size=size,
+        md5=md5.hexdigest(),
+        sha256=sha.hexdigest(),
+        filename=getattr(upload, "filename", None),
+    )
+
+
+def _spool_orphaned(name: str) -> bool:
+    """Propriétaire mort sur cet hôte ; inconnu (autre hôte, ancien nom) : False."""
+    m = _OWNER_RE.match(name)
+    if not m or m.group("host") != host_tag():
+        return False
+    pid = int(m.group("pid"))
+    return pid != os.getpid() and not pid_alive(pid)
+
+
+def cleanup_stale_spools(max_age_s: int = 24 * 3600) -> int:
+    """
+    Fichiers d'upload orphelins (crash / redémarrage pendant un job) : ceux
+    d'un processus mort de cet hôte, et tout fichier plus vieux que max_age_s.
+    Les uploads des autres workers vivants ne sont pas touchés.
+    """
+    d = _spool_dir()
+    now = time.time()
+    removed = 0
+    for name in os.listdir(d):
+        if not (name.startswith(SPOOL_PREFIX) and name.endswith(SPOOL_SUFFIX)):
+            continue
+        p = os.path.join(d, name)
+        try:
+            if _spool_orphaned(name) or now - os.path.getmtime(p) > max_age_s:
+                os.unlink(p)
+                removed += 1
+        except OSError:
+            continue
+    return removed
@@ -0,0 +1,35 @@
+import os
+import re
+import socket
+
+# ===================================================================
+# IDENTITÉ DU PROCESSUS (workers uvicorn / gunicorn, plusieurs hôtes)
+# ===================================================================
+# "hôte:pid" : propriétaire des jobs d'ingestion (ai.jobs.worker_id) et des
+# fichiers d'upload en cours. Recalculé après un fork (le pid change).
+
+_HOST = re.sub(r"[^A-Za-z0-9_]", "_", socket.gethostname() or "localhost")
+
+
+def host_tag() -> str:
+    """Nom d'hôte réduit à [A-Za-z0-9_] (utilisable dans un nom de fichier)."""
+    return _HOST
+
+
+def worker_id() -> str:
+    return f"{_HOST}:{os.getpid()}"
+
+
+def pid_alive(pid: int) -> bool:
+    """True si le processus `pid` existe sur cet hôte (signal 0)."""
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True     # existe, appartient à un autre utilisateur
+    except OSError:
+        return False
+    return True